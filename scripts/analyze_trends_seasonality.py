@@ -1,61 +1,30 @@
 import pandas as pd
-import glob
-import os
+import sys
 from datetime import datetime
 
+sys.path.append('.')
+from src.core.history import load_history
+
 # Configuration
-DATA_DIR = 'data'
 OUTPUT_FILE = 'strategic_analysis_report.md'
 
 def load_data():
-    """Loads and concatenates all sales CSV files."""
-    all_files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-    # Filter for relevant files (2019-2025 mainly, ignore others if format differs)
-    sales_files = [f for f in all_files if '20' in os.path.basename(f) and 'template' not in f and 'Forecast' not in f]
-    
-    print(f"Loading files: {sales_files}")
-    
-    df_list = []
-    for filename in sales_files:
-        try:
-            # Attempt to read with different encodings/separators if needed, but standard seems to be comma
-            df = pd.read_csv(filename, dtype={'AN': str, 'COD ARTICOL': str, 'CANTITATE FACTURATA': float, 'ID CLIENT': str, 'CLIENT SPECIFIC': str, 'STARE PM LA DATA FACTURA': str})
-            
-            # Standardize columns
-            df.columns = [c.strip().upper() for c in df.columns]
-            
-            # Keep only necessary columns (Updated list)
-            required_cols = ['AN', 'COD ARTICOL', 'DATA', 'CANTITATE FACTURATA']
-            
-            # Check for core columns
-            if all(col in df.columns for col in required_cols):
-                # Add optional new columns if they exist (handling older files that might miss them)
-                keep_cols = required_cols.copy()
-                for extra_col in ['ID CLIENT', 'CLIENT SPECIFIC', 'STARE PM LA DATA FACTURA']:
-                    if extra_col in df.columns:
-                        keep_cols.append(extra_col)
-                    else:
-                        # Add empty column if missing to align dataframes
-                        df[extra_col] = 'N/A'
-                        keep_cols.append(extra_col)
-                
-                df = df[keep_cols]
-                df_list.append(df)
-            else:
-                print(f"Skipping {filename}: missing core columns")
-        except Exception as e:
-            print(f"Error reading {filename}: {e}")
-
-    if not df_list:
+    """Loads all sales history from the shared cache (src/core/history.py)."""
+    keep_cols = ['AN', 'COD ARTICOL', 'DATA', 'CANTITATE FACTURATA', 'ID CLIENT', 'CLIENT SPECIFIC', 'STARE PM LA DATA FACTURA']
+    try:
+        df = load_history(keep_cols, client_final=False)
+    except FileNotFoundError:
         return pd.DataFrame()
     
-    full_df = pd.concat(df_list, ignore_index=True)
-    return full_df
+    # Older exports may miss the optional columns
+    for extra_col in ['ID CLIENT', 'CLIENT SPECIFIC', 'STARE PM LA DATA FACTURA']:
+        if extra_col not in df.columns:
+            df[extra_col] = 'N/A'
+    return df
 
 def preprocess_data(df):
     """Cleans and prepares data for analysis."""
-    # Convert 'DATA' to datetime. Analyze format dd.mm.yyyy
-    df['DATA'] = pd.to_datetime(df['DATA'], format='%d.%m.%Y', errors='coerce')
+    # 'DATA' is already parsed (dd.mm.yyyy) in the history cache
     df = df.dropna(subset=['DATA'])
     
     df['YEAR'] = df['DATA'].dt.year
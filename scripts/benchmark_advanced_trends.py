@@ -0,0 +1,309 @@
+"""
+Benchmark pentru compute_advanced_trends.py: implementarea vectorizată vs
+implementarea veche (bucle Python pe groupby / seturi de produse).
+
+Generează un istoric sintetic (implicit 10M rânduri), rulează ambele variante,
+afișează timpii pe metrică și verifică faptul că advanced_trends.json ar fi identic.
+
+Rulează cu: python scripts/benchmark_advanced_trends.py [nr_randuri] [nr_produse]
+"""
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('.')
+from scripts.compute_advanced_trends import (
+    CURRENT_YEAR, CURRENT_MONTH, compute_yoy_growth, compute_acceleration, compute_volatility,
+    compute_client_mix, compute_monthly_profile, build_result
+)
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DEFAULT_ROWS = 10_000_000
+DEFAULT_PRODUCTS = 30_000
+CLIENTS = 400_000
+START_DATE = "2019-01-01"
+
+
+def make_history(n_rows: int, n_products: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic Client Final sales rows (COD ARTICOL, DATA, CANTITATE, ID CLIENT, YEAR, MONTH)."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(year=CURRENT_YEAR, month=CURRENT_MONTH, day=1) + pd.offsets.MonthEnd(0)
+    days = pd.date_range(START_DATE, end, freq="D")
+
+    # Skewed popularity: a few products make most of the rows
+    popularity = rng.pareto(1.2, n_products) + 0.05
+    codes = rng.choice(n_products, n_rows, p=popularity / popularity.sum())
+    dates = days[rng.integers(0, len(days), n_rows)]
+
+    df = pd.DataFrame({
+        "COD ARTICOL": pd.Categorical.from_codes(codes, [f"ART{i:06d}" for i in range(n_products)]),
+        "DATA": dates,
+        "CANTITATE FACTURATA": rng.choice([1.0, 1.0, 1.0, 2.0, 3.0, -1.0], n_rows),
+        "ID CLIENT": pd.Categorical.from_codes(rng.integers(0, CLIENTS, n_rows), [str(i) for i in range(CLIENTS)]),
+    })
+    df["MONTH"] = df["DATA"].dt.month
+    df["YEAR"] = df["DATA"].dt.year
+    return df
+
+
+# ============================================================
+# IMPLEMENTAREA VECHE (referință pentru verificare)
+# ============================================================
+
+def legacy_yoy_growth(df):
+    """
+    Year-over-Year growth comparing same months.
+    
+    Compares current year's months (so far) vs same months last year.
+    """
+    print("\n=== YoY Growth ===")
+    
+    # Get this year and last year data
+    this_year = df[df["YEAR"] == CURRENT_YEAR]
+    last_year = df[df["YEAR"] == CURRENT_YEAR - 1]
+    
+    # Only compare months that exist in current year
+    months_this_year = this_year["MONTH"].unique()
+    
+    this_year_sales = this_year.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
+    last_year_same_months = last_year[last_year["MONTH"].isin(months_this_year)]
+    last_year_sales = last_year_same_months.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
+    
+    # Calculate YoY
+    yoy = {}
+    all_products = set(this_year_sales.index) | set(last_year_sales.index)
+    
+    for cod in all_products:
+        current = this_year_sales.get(cod, 0)
+        previous = last_year_sales.get(cod, 0)
+        
+        if previous > 0:
+            yoy[cod] = round((current - previous) / previous * 100, 1)
+        elif current > 0:
+            yoy[cod] = 100.0  # New product
+        else:
+            yoy[cod] = 0.0
+    
+    print(f"Calculated YoY for {len(yoy):,} products")
+    return yoy
+
+
+def legacy_acceleration(df):
+    """
+    Quarterly acceleration: Q4 vs Q3 (or last 3 months vs previous 3).
+    
+    Shows if product is accelerating or decelerating.
+    """
+    print("\n=== Acceleration ===")
+    
+    # Get last 6 months of data
+    recent = df[df["YEAR"] >= CURRENT_YEAR - 1].copy()
+    
+    # Last 3 months vs previous 3 months
+    recent["MONTH_KEY"] = recent["YEAR"] * 12 + recent["MONTH"]
+    max_month_key = recent["MONTH_KEY"].max()
+    
+    last_3m = recent[recent["MONTH_KEY"] > max_month_key - 3]
+    prev_3m = recent[(recent["MONTH_KEY"] <= max_month_key - 3) & (recent["MONTH_KEY"] > max_month_key - 6)]
+    
+    last_3m_sales = last_3m.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
+    prev_3m_sales = prev_3m.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
+    
+    acceleration = {}
+    all_products = set(last_3m_sales.index) | set(prev_3m_sales.index)
+    
+    for cod in all_products:
+        current = last_3m_sales.get(cod, 0)
+        previous = prev_3m_sales.get(cod, 0)
+        
+        if previous > 0:
+            accel = (current - previous) / previous * 100
+            acceleration[cod] = round(accel, 1)
+        elif current > 0:
+            acceleration[cod] = 100.0
+        else:
+            acceleration[cod] = 0.0
+    
+    accelerating = sum(1 for v in acceleration.values() if v > 10)
+    decelerating = sum(1 for v in acceleration.values() if v < -10)
+    print(f"Accelerating (>10%): {accelerating}, Decelerating (<-10%): {decelerating}")
+    
+    return acceleration
+
+
+def legacy_volatility(df):
+    """
+    Coefficient of Variation of monthly sales.
+    
+    CV = StdDev / Mean
+    Low CV = stable/predictable, High CV = volatile/risky
+    """
+    print("\n=== Volatility ===")
+    
+    # Monthly sales per product
+    monthly = df.groupby(["COD ARTICOL", "YEAR", "MONTH"])["CANTITATE FACTURATA"].sum().reset_index()
+    
+    # Calculate CV per product
+    volatility = {}
+    for cod, group in monthly.groupby("COD ARTICOL"):
+        if len(group) >= 3:  # Need at least 3 months
+            mean = group["CANTITATE FACTURATA"].mean()
+            std = group["CANTITATE FACTURATA"].std()
+            if mean > 0:
+                cv = std / mean
+                volatility[cod] = round(cv, 2)
+            else:
+                volatility[cod] = 0.0
+        else:
+            volatility[cod] = 1.0  # Not enough data = high uncertainty
+    
+    stable = sum(1 for v in volatility.values() if v < 0.5)
+    volatile = sum(1 for v in volatility.values() if v > 1.0)
+    print(f"Stable (CV<0.5): {stable}, Volatile (CV>1.0): {volatile}")
+    
+    return volatility
+
+
+def legacy_client_mix(df):
+    """
+    Analyze client patterns per product.
+    
+    - repeat_rate: % of clients who bought multiple times
+    - avg_orders_per_client: loyalty indicator
+    """
+    print("\n=== Client Mix ===")
+    
+    # Count orders per client per product
+    client_orders = df.groupby(["COD ARTICOL", "ID CLIENT"]).size().reset_index(name="orders")
+    
+    client_mix = {}
+    for cod, group in client_orders.groupby("COD ARTICOL"):
+        total_clients = len(group)
+        repeat_clients = (group["orders"] > 1).sum()
+        
+        if total_clients > 0:
+            repeat_rate = repeat_clients / total_clients * 100
+            avg_orders = group["orders"].mean()
+            client_mix[cod] = {
+                "repeat_rate": round(repeat_rate, 1),
+                "avg_orders": round(avg_orders, 2),
+                "unique_clients": total_clients
+            }
+        else:
+            client_mix[cod] = {"repeat_rate": 0, "avg_orders": 0, "unique_clients": 0}
+    
+    print(f"Analyzed client patterns for {len(client_mix):,} products")
+    return client_mix
+
+
+def legacy_monthly_profile(df):
+    """
+    Product-specific seasonality pattern.
+    
+    Which months does THIS product sell best?
+    """
+    print("\n=== Monthly Profile ===")
+    
+    monthly = df.groupby(["COD ARTICOL", "MONTH"])["CANTITATE FACTURATA"].sum().reset_index()
+    
+    profiles = {}
+    for cod, group in monthly.groupby("COD ARTICOL"):
+        if len(group) >= 3:
+            # Find peak month
+            peak_month = group.loc[group["CANTITATE FACTURATA"].idxmax(), "MONTH"]
+            
+            # Calculate % in peak
+            total = group["CANTITATE FACTURATA"].sum()
+            peak_sales = group[group["MONTH"] == peak_month]["CANTITATE FACTURATA"].sum()
+            peak_pct = peak_sales / total * 100 if total > 0 else 0
+            
+            profiles[cod] = {
+                "peak_month": int(peak_month),
+                "peak_pct": round(peak_pct, 1)
+            }
+        else:
+            profiles[cod] = {"peak_month": 0, "peak_pct": 0}
+    
+    return profiles
+
+
+def legacy_result(yoy, acceleration, volatility, client_mix, monthly_profile) -> dict:
+    """Old main(): merge the per-metric dicts."""
+    all_products = set(yoy.keys()) | set(acceleration.keys()) | set(volatility.keys())
+    result = {}
+    for cod in all_products:
+        cm = client_mix.get(cod, {"repeat_rate": 0, "avg_orders": 0, "unique_clients": 0})
+        mp = monthly_profile.get(cod, {"peak_month": 0, "peak_pct": 0})
+        result[cod] = {
+            "yoy_growth": float(yoy.get(cod, 0.0)),
+            "acceleration": float(acceleration.get(cod, 0.0)),
+            "volatility": float(volatility.get(cod, 1.0)),
+            "repeat_rate": float(cm["repeat_rate"]),
+            "avg_orders_per_client": float(cm["avg_orders"]),
+            "unique_clients": int(cm["unique_clients"]),
+            "peak_month": int(mp["peak_month"]),
+            "peak_month_pct": float(mp["peak_pct"])
+        }
+    return result
+
+
+METRICS = [
+    ("yoy", legacy_yoy_growth, compute_yoy_growth),
+    ("acceleration", legacy_acceleration, compute_acceleration),
+    ("volatility", legacy_volatility, compute_volatility),
+    ("client_mix", legacy_client_mix, compute_client_mix),
+    ("monthly_profile", legacy_monthly_profile, compute_monthly_profile),
+]
+
+
+def run(funcs, df):
+    """Run each metric silently; returns (outputs, seconds per metric)."""
+    outputs, timings = [], {}
+    for name, fn in funcs:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            outputs.append(fn(df))
+        timings[name] = time.perf_counter() - t0
+    return outputs, timings
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    n_products = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PRODUCTS
+
+    print("=" * 60)
+    print("BENCHMARK ADVANCED TRENDS")
+    print("=" * 60)
+
+    print(f"[1/3] Generez istoric sintetic: {n_rows:,} rânduri, {n_products:,} produse...")
+    df = make_history(n_rows, n_products)
+
+    print("[2/3] Rulez implementarea vectorizată și cea veche...")
+    new_out, new_t = run([(name, fn) for name, _, fn in METRICS], df)
+    new_result = build_result(*new_out)
+    old_out, old_t = run([(name, fn) for name, fn, _ in METRICS], df)
+    old_result = legacy_result(*old_out)
+
+    print("\n      Metrică            Veche (s)   Vectorizat (s)   Speedup")
+    for name, _, _ in METRICS:
+        print(f"      {name:<18} {old_t[name]:>9.2f}   {new_t[name]:>14.2f}   {old_t[name] / max(new_t[name], 1e-9):>6.1f}x")
+    old_total, new_total = sum(old_t.values()), sum(new_t.values())
+    print(f"      {'TOTAL':<18} {old_total:>9.2f}   {new_total:>14.2f}   {old_total / max(new_total, 1e-9):>6.1f}x")
+
+    print("[3/3] Verificare rezultate...")
+    old_result = {str(k): v for k, v in old_result.items()}
+    mismatches = [cod for cod in old_result.keys() | new_result.keys() if old_result.get(cod) != new_result.get(cod)]
+    if mismatches:
+        print(f"      ❌ {len(mismatches):,} produse diferă, ex: {mismatches[:5]}")
+        sys.exit(1)
+    print(f"      ✅ Rezultate identice pentru {len(new_result):,} produse")
+
+
+if __name__ == "__main__":
+    main()
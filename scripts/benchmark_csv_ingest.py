@@ -0,0 +1,132 @@
+"""
+Benchmark pentru modul CSV/Excel (PostgreSQL dezactivat): drumul vechi
+(read_csv complet + iterrows() + un Product Pydantic pe rând) vs ingestia
+rapidă din DataLoader (engine pyarrow cu usecols + dtype explicit,
+products_frame vectorizat, process_products_vectorized - același cadru ca
+în modul PostgreSQL).
+
+Pentru Excel măsoară prima citire (openpyxl + scrierea cache-ului Parquet din
+data/export_cache/) și citirile următoare (doar Parquet).
+
+Rulează cu: python scripts/benchmark_csv_ingest.py [nr_produse]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('.')
+from src.core import loader as loader_module
+from src.core.loader import DataLoader
+from src.core.processor import process_products_vectorized
+from src.models.product import Product
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DEFAULT_PRODUCTS = 20_000
+EXCEL_PRODUCTS = 5_000      # openpyxl scrie / citește încet: Excel mai mic
+EXTRA_COLUMNS = 40          # Coloane din export pe care aplicația nu le folosește
+CONFIG = {"default": {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1}}
+
+
+def make_export(n: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic BI export with the real column names."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "NR ART": np.arange(1, n + 1),
+        "COD ARTICOL": [f"{100000 + i}" for i in range(n)],
+        "DENUMIRE ARTICOL": [f"COVOR F{f:04d} {d}" for f, d in
+                             zip(rng.integers(0, 800, n), rng.choice(["080x150", "160x230", "200x290"], n))],
+        "FURNIZOR EXT": rng.choice(["INDOMEX", "MERINOS", "KARAT"], n),
+        "CLASA DENUMIRE": "COVOARE MODERNE SI CLASICE",
+        "SUBCLASA DENUMIRE": rng.choice(["MODERNE", "CLASICE"], n),
+        "STARE PM": rng.choice(["ACTIV", "OUT"], n, p=[0.9, 0.1]),
+        "PM": "PM1",
+    })
+    for src in DataLoader.NUMERIC_COLUMNS:
+        df[src] = rng.integers(0, 50, n).astype(float)
+    for i in range(EXTRA_COLUMNS):
+        df[f"Coloana export {i}"] = rng.random(n)
+    return df
+
+
+def legacy_parse(df: pd.DataFrame) -> list:
+    """Drumul vechi din app.py (parse_with_config): iterrows + Product pe rând."""
+    products = []
+    for _, row in df.iterrows():
+        def get_float(col):
+            val = row.get(col, 0.0)
+            return float(val) if pd.notnull(val) else 0.0
+
+        def get_str(col):
+            val = row.get(col, "")
+            if pd.isnull(val):
+                return ""
+            return str(int(val)) if isinstance(val, float) else str(val).strip()
+
+        kwargs = {field: get_float(src) for src, field in [
+            ("Cost Achizitie Furnizor (ultimul NIR_cronologic)", "cost_achizitie"),
+            ("Stoc Disponibil Cantitativ Magazine Dep+Acc+Outlet", "stoc_disponibil_total"),
+            ("CAFE cantitativ nereceptionat Furnizor", "stoc_in_tranzit"),
+            ("Stoc Disponibil Cantitativ Magazine", "stoc_magazin_total"),
+            ("Vanzari Cantitative Magazine_client final ult. 4 Luni", "vanzari_ultimele_4_luni"),
+            ("Vanzari Cantitative Magazine 360z (client final)", "vanzari_ultimele_360_zile"),
+        ]}
+        products.append(Product(nr_art=get_str("COD ARTICOL"), cod_articol=get_str("COD ARTICOL"),
+                                nume_produs=get_str("DENUMIRE ARTICOL"), furnizor=get_str("FURNIZOR EXT"),
+                                stare_pm=get_str("STARE PM"), **kwargs))
+    return products
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def old_path(path):
+    loader = DataLoader(path)
+    df = loader.load_data()
+    return legacy_parse(df)
+
+
+def fast_path(path):
+    loader = DataLoader(path)
+    df = loader.load_fast()
+    return process_products_vectorized(DataLoader.products_frame(df, CONFIG), CONFIG)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        loader_module.EXPORT_CACHE_DIR = tmp / "export_cache"
+
+        csv_path = tmp / "export.csv"
+        make_export(n).to_csv(csv_path, index=False)
+        old_s, old = timed(old_path, str(csv_path))
+        new_s, new = timed(fast_path, str(csv_path))
+
+        print(f"\n{'=' * 60}")
+        print(f"CSV: {n:,} produse, {len(make_export(1).columns)} coloane în export")
+        print(f"{'=' * 60}")
+        print(f"   Vechi (read_csv + iterrows + Product): {old_s:8.2f}s ({len(old):,} produse)")
+        print(f"   Rapid (pyarrow + vectorizat):          {new_s:8.2f}s ({len(new):,} produse)")
+        print(f"   Accelerare:                            {old_s / max(new_s, 1e-9):8.1f}x")
+
+        xlsx_path = tmp / "export.xlsx"
+        make_export(EXCEL_PRODUCTS).to_excel(xlsx_path, index=False)
+        first_s, _ = timed(DataLoader(str(xlsx_path)).load_fast)
+        cached_s, _ = timed(DataLoader(str(xlsx_path)).load_fast)
+
+        print(f"\nExcel: {EXCEL_PRODUCTS:,} produse")
+        print(f"   Prima citire (openpyxl + cache Parquet): {first_s:8.2f}s")
+        print(f"   Citiri următoare (Parquet):              {cached_s:8.3f}s ({first_s / max(cached_s, 1e-9):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark pentru latența interacțiunilor din tabelul de segment.
+
+Înainte de fragmente, orice bifă / "Detalii extinse" / "All" rerula tot
+app.py (CSS, sidebar, calendar, carduri KPI, tabel). Acum rerulează doar
+fragmentul tabelului (render_interactive_table). Scriptul pornește aplicația
+cu streamlit.testing (AppTest), face INTERACTIONS interacțiuni pe tabelul
+segmentului ales și compară, din timpii src/ui/timing.py:
+- "app": rularea completă a scriptului  -> latența de dinainte
+- "table_<SEGMENT>": fragmentul tabelului -> latența de acum
+
+Rulează cu: python scripts/benchmark_fragments.py [SEGMENT] [--csv]
+    --csv  dezactivează PostgreSQL (folosește primul CSV din data/)
+"""
+import sys
+from statistics import median
+
+sys.path.append('.')
+from streamlit.testing.v1 import AppTest
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+APP = "../src/ui/app.py"  # Relativ la acest script (AppTest.from_file)
+DEFAULT_SEGMENT = "CRITICAL"
+INTERACTIONS = 10
+TIMEOUT = 300
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    segment = args[0].upper() if args else DEFAULT_SEGMENT
+
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    at.run()
+    if "--csv" in sys.argv and at.toggle:
+        at.toggle[0].set_value(False).run()
+    if at.exception:
+        print(f"❌ Aplicația a aruncat o excepție: {at.exception[0].value}")
+        return
+
+    # The app returns before the segment navigation without a data source
+    if not any(b.key == f"nav_{segment}" for b in at.button):
+        notes = [m.value for m in list(at.error) + list(at.warning)]
+        print(f"❌ Nu există butonul nav_{segment}: aplicația nu are sursă de date "
+              f"(niciun CSV în data/ sau PostgreSQL neconfigurat - DB_CONNECTION_STRING / secrets).")
+        if notes:
+            print("   Mesaje din aplicație: " + " | ".join(str(n) for n in notes))
+        return
+
+    at.button(key=f"nav_{segment}").click().run()
+    details = [c for c in at.checkbox if c.key == f"details_{segment}"]
+    if not details:
+        print(f"Nu există tabel pentru {segment} (segment gol?)")
+        return
+
+    # Toggle "Detalii extinse": o interacțiune pur de UI pe tabel
+    for i in range(INTERACTIONS):
+        at.checkbox(key=f"details_{segment}").set_value(i % 2 == 0).run()
+
+    timings = at.session_state["_timings"]
+    app_ms = median(timings["app"][-INTERACTIONS:]) * 1000
+    table_ms = median(timings[f"table_{segment}"][-INTERACTIONS:]) * 1000
+
+    print(f"\n{'=' * 60}")
+    print(f"INTERACȚIUNI TABEL {segment} ({INTERACTIONS}x, mediana)")
+    print(f"{'=' * 60}")
+    print(f"   Înainte (rulare completă app.py): {app_ms:8.1f} ms")
+    print(f"   Acum (fragment tabel):            {table_ms:8.1f} ms")
+    print(f"   Economie per interacțiune:        {app_ms - table_ms:8.1f} ms ({app_ms / max(table_ms, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
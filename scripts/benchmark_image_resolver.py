@@ -0,0 +1,111 @@
+"""
+Benchmark pentru rezolvarea imaginilor din tabel (og:image din pagina
+produsului), pe un server HTTP local care imită paginile Mobexpert:
+- drumul vechi: requests.get serial, fără sesiune, câte o pagină pe rând
+- ImageResolver (src/core/image_fetcher.py): pool de thread-uri, sesiune
+  keep-alive, limită de cereri pe host, timeout-uri și deadline pe lot
+
+Serverul întârzie fiecare pagină cu PAGE_DELAY; fiecare a SLOW_EVERY-a pagină
+răspunde după SLOW_DELAY (peste timeout) și trebuie să rămână fără imagine.
+Se verifică și rata medie de cereri văzută de server.
+
+Rulează cu: python scripts/benchmark_image_resolver.py [nr_pagini]
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append('.')
+from src.core import image_fetcher
+from src.core.image_fetcher import ImageResolver, extract_image_url
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DEFAULT_PAGES = 60
+PAGE_DELAY = 0.15     # Latența unei pagini (s)
+SLOW_EVERY = 20       # Fiecare a N-a pagină e lentă
+SLOW_DELAY = 2.0      # Peste READ_TIMEOUT de mai jos
+READ_TIMEOUT = 1.0
+HOST_RATE = 20.0      # Cereri / secundă către serverul local
+WORKERS = 8
+
+_request_times = []
+
+
+class ProductPage(BaseHTTPRequestHandler):
+    """/products/<n> -> pagină HTML cu og:image (după PAGE_DELAY / SLOW_DELAY)."""
+    protocol_version = "HTTP/1.1"  # Keep-alive, ca serverele reale
+
+    def do_GET(self):
+        _request_times.append(time.monotonic())
+        n = int(self.path.rsplit("/", 1)[-1])
+        time.sleep(SLOW_DELAY if n % SLOW_EVERY == SLOW_EVERY - 1 else PAGE_DELAY)
+        body = (f'<html><head><meta property="og:image" '
+                f'content="https://cdn.shopify.com/s/files/covor-{n}.jpg"></head></html>').encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (timeout)
+
+    def log_message(self, *args):
+        pass
+
+
+def serial_fetch(urls):
+    """Drumul vechi: un requests.get nou pe pagină, una după alta."""
+    results = {}
+    for url in urls:
+        try:
+            results[url] = extract_image_url(requests.get(url, timeout=(1.0, READ_TIMEOUT)).text)
+        except requests.RequestException:
+            results[url] = None
+    return results
+
+
+def mean_rate(times):
+    """Cereri / secundă între prima și ultima cerere."""
+    times = sorted(times)
+    return (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGES
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProductPage)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/products/{i}" for i in range(n)]
+
+    t0 = time.perf_counter()
+    old = serial_fetch(urls)
+    old_s = time.perf_counter() - t0
+
+    _request_times.clear()
+    image_fetcher.clear_image_cache()
+    resolver = ImageResolver(max_workers=WORKERS, host_rate=HOST_RATE, timeout=(1.0, READ_TIMEOUT))
+    t0 = time.perf_counter()
+    new = resolver.resolve(urls, deadline=60)
+    new_s = time.perf_counter() - t0
+    server.shutdown()
+
+    expected_missing = sum(1 for i in range(n) if i % SLOW_EVERY == SLOW_EVERY - 1)
+    print(f"\n{'=' * 60}")
+    print(f"IMAGINI: {n} pagini, {PAGE_DELAY * 1000:.0f} ms latență, {expected_missing} peste timeout")
+    print(f"{'=' * 60}")
+    print(f"   Serial (vechi):        {old_s:6.2f}s  ({sum(v is not None for v in old.values())} imagini)")
+    print(f"   ImageResolver ({WORKERS} thr): {new_s:6.2f}s  ({sum(v is not None for v in new.values())} imagini)")
+    print(f"   Accelerare:            {old_s / max(new_s, 1e-9):6.1f}x")
+    print(f"   Rată medie pe host:    {mean_rate(_request_times):6.1f} cereri/s (limită {HOST_RATE:.0f})")
+
+    same = all(new.get(u) == old.get(u) for u in urls)
+    print(f"\n{'✅' if same else '❌'} Aceleași imagini ca drumul serial")
+
+
+if __name__ == "__main__":
+    main()
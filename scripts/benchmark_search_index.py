@@ -0,0 +1,102 @@
+"""
+Benchmark pentru căutarea de produse: indexul de trigrame
+(src/core/search_index.py) vs str.contains pe "cod | denumire" (drumul vechi
+din tabelele de segment și Order Builder).
+
+Generează un catalog sintetic (coduri, denumiri cu diacritice, familii,
+furnizori), construiește indexul și măsoară fiecare interogare (inclusiv
+greșeli de tastare și fără diacritice). Ținta: sub TARGET_MS pe interogare
+pentru tot catalogul.
+
+Rulează cu: python scripts/benchmark_search_index.py [nr_produse]
+"""
+import sys
+import time
+from statistics import median
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('.')
+from src.core.search_index import SearchIndex
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DEFAULT_PRODUCTS = 50_000
+TARGET_MS = 5.0
+REPEAT = 20
+MODELS = ["PERSIAN", "FLORENCE", "KASHMIR", "ȘAH", "MOCHETĂ", "ORIENTAL", "VINTAGE", "ŢESUT", "SHAGGY", "KILIM"]
+DIMENSIONS = ["060x110", "080x150", "120x170", "160x230", "200x290"]
+SUPPLIERS = ["INDOMEX", "MERINOS", "KARAT", "BALTA", "OSTA"]
+
+# (interogare, ce ar trebui găsit primul)
+QUERIES = [
+    ("persian", "PERSIAN"),
+    ("persan", "PERSIAN (greșeală)"),
+    ("flornce 160x230", "FLORENCE 160x230 (greșeală)"),
+    ("kashmr", "KASHMIR (greșeală)"),
+    ("sah", "ȘAH (fără diacritice)"),
+    ("mocheta", "MOCHETĂ (fără diacritice)"),
+    ("tesut", "ŢESUT (cedilă)"),
+    ("ART0012", "prefix de cod"),
+    ("ART001234", "cod exact"),
+    ("merinos shaggy", "furnizor + model"),
+]
+
+
+def make_catalogue(n: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic catalogue (as load_search_catalogue)."""
+    rng = np.random.default_rng(seed)
+    model = rng.integers(0, len(MODELS), n)
+    dimension = rng.integers(0, len(DIMENSIONS), n)
+    variant = rng.integers(0, 500, n)
+    return pd.DataFrame({
+        "cod_articol": [f"ART{i:06d}" for i in range(n)],
+        "denumire": [f"COVOR {MODELS[m]} {v:03d} {DIMENSIONS[d]}" for m, v, d in zip(model, variant, dimension)],
+        "furnizor": rng.choice(SUPPLIERS, n),
+    })
+
+
+def contains_search(catalogue: pd.DataFrame, query: str) -> pd.DataFrame:
+    """Drumul vechi: subșir case-insensitive, fără toleranță la greșeli / diacritice."""
+    produs = catalogue["cod_articol"] + " | " + catalogue["denumire"]
+    return catalogue[produs.str.lower().str.contains(query.lower(), na=False, regex=False)]
+
+
+def timed_ms(func, *args):
+    samples, result = [], None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = func(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return median(samples), result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    catalogue = make_catalogue(n)
+
+    t0 = time.perf_counter()
+    index = SearchIndex(catalogue)
+    build_s = time.perf_counter() - t0
+
+    print(f"\n{'=' * 90}")
+    print(f"CĂUTARE ÎN {n:,} PRODUSE (index construit în {build_s:.2f}s, o dată pe versiune de date)")
+    print(f"{'=' * 90}")
+    print(f"{'Interogare':<18} {'Index ms':>9} {'Găsite':>8} {'contains ms':>12} {'Găsite':>8}   Primul rezultat")
+
+    worst = 0.0
+    for query, expected in QUERIES:
+        index_ms, result = timed_ms(index.search, query)
+        old_ms, old = timed_ms(contains_search, catalogue, query)
+        worst = max(worst, index_ms)
+        top = f"{result['cod_articol'].iloc[0]} {result['denumire'].iloc[0]}" if len(result) else "-"
+        print(f"{query:<18} {index_ms:>9.2f} {len(result):>8,} {old_ms:>12.2f} {len(old):>8,}   {top}  [{expected}]")
+
+    status = "✅" if worst < TARGET_MS else "❌"
+    print(f"\n{status} Cea mai lentă interogare: {worst:.2f} ms (țintă < {TARGET_MS:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
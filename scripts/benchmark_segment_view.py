@@ -0,0 +1,244 @@
+"""
+Benchmark pentru tabelul de segment (render_interactive_table): construirea
+coloană cu coloană din DataFrame-ul procesat (src/ui/segment_view.py) vs
+drumul vechi to_dict('records') -> SimpleNamespace -> dict pe rând -> DataFrame.
+
+Generează produse sintetice, le trece prin process_products_vectorized,
+afișează timpii ambelor variante și verifică faptul că tabelul e identic.
+
+Rulează cu: python scripts/benchmark_segment_view.py [nr_produse]
+"""
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('.')
+from src.core.processor import process_products_vectorized
+from src.core.reference_data import REFERENCE_COLUMNS
+from src.core.month_comparison import comparison_columns, comparison_table
+from src.ui.segment_view import build_segment_view, family_order
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DEFAULT_PRODUCTS = 5_000
+FAMILIES = 400
+DIMENSIONS = ["060x110", "080x150", "120x170", "160x230", "200x290"]
+STORES = ["baneasa", "pipera", "militari", "pantelimon", "iasi", "brasov", "pitesti", "sibiu", "oradea", "constanta"]
+MONTHS = (10, 11, 12)
+YEAR = 2025
+REPEAT = 3
+
+
+def make_products(n: int, seed: int = 42):
+    """Synthetic products table rows (as load_segment_from_db) + reference frame."""
+    rng = np.random.default_rng(seed)
+    codes = [f"ART{i:06d}" for i in range(n)]
+    family = rng.integers(0, FAMILIES, n)
+    names = [
+        f"COVOR F{f:04d} {DIMENSIONS[d]}" if f % 10 else f"PRESU {f:04d} MODEL {i}"
+        for i, (f, d) in enumerate(zip(family, rng.integers(0, len(DIMENSIONS), n)))
+    ]
+    months = [f"{y}-{m:02d}" for y in (YEAR - 1, YEAR) for m in range(1, 13)]
+    histories = [json.dumps({m: int(q) for m, q in zip(months, rng.poisson(2, len(months))) if q})
+                 for _ in range(n)]
+
+    df = pd.DataFrame({
+        "cod_articol": codes,
+        "denumire": names,
+        "furnizor": "FURNIZOR TEST",
+        "clasa": rng.choice(["COVOARE MODERNE SI CLASICE", "PRESURI"], n),
+        "subclasa": rng.choice(["MODERNE", "CLASICE", ""], n),
+        "stare_pm": "ACTIV",
+        "stoc_total": rng.integers(0, 60, n).astype(float),
+        "stoc_tranzit": rng.integers(0, 10, n).astype(float),
+        "stoc_magazine": rng.integers(0, 40, n).astype(float),
+        **{f"stoc_{s}": rng.integers(0, 5, n).astype(float) for s in STORES},
+        "vanzari_4luni": rng.poisson(6, n).astype(float),
+        "vanzari_360z": rng.poisson(18, n).astype(float),
+        "vanzari_2024": rng.poisson(15, n).astype(float),
+        "vanzari_2025": rng.poisson(17, n).astype(float),
+        "cost_achizitie": rng.uniform(20, 900, n).round(2),
+        "pret_vanzare": rng.uniform(50, 2000, n).round(2),
+        "lead_time_days": rng.choice([14, 30, 45, 60], n),
+        "safety_stock_days": 7.0,
+        "moq": rng.choice([1.0, 1.0, 5.0], n),
+        "safety_stock_qty": rng.uniform(0, 6, n).round(1),
+        "sales_history": histories,
+        "sales_last_3m": rng.poisson(4, n).astype(float),
+        "segment": rng.choice(["CRITICAL", "URGENT", "ATTENTION", "OK"], n),
+    })
+
+    reference = pd.DataFrame(index=pd.Index(codes[: n * 3 // 4], name="cod_articol"))
+    m = len(reference)
+    reference["seasonality_index"] = rng.uniform(0.5, 2.0, m).round(2)
+    reference["is_rising_star"] = rng.random(m) < 0.05
+    reference["trend"] = rng.choice(["HOT", "COLD", "STABLE"], m)
+    reference["yoy_growth"] = rng.normal(0, 40, m).round(1)
+    reference["volatility"] = rng.uniform(0, 2, m).round(2)
+    reference["cubaj_m3"] = np.where(rng.random(m) < 0.8, rng.uniform(0.01, 0.4, m).round(4), np.nan)
+    reference["masa_kg"] = np.where(rng.random(m) < 0.8, rng.uniform(0.5, 30, m).round(1), np.nan)
+    reference["product_url"] = None
+    for col in REFERENCE_COLUMNS:
+        if col not in reference.columns:
+            reference[col] = REFERENCE_COLUMNS[col][2]
+    return df, reference
+
+
+# ============================================================
+# IMPLEMENTAREA VECHE (referință pentru verificare)
+# ============================================================
+
+def legacy_view(proc_df, specs, interval1_sales, interval2_sales):
+    """to_dict -> SimpleNamespace -> family sort with sorted() -> one dict per row."""
+    product_list = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
+
+    family_sales, family_stocks = {}, {}
+    for p in product_list:
+        if p.familie:
+            family_sales[p.familie] = family_sales.get(p.familie, 0) + p.vanzari_ultimele_4_luni
+            family_stocks[p.familie] = family_stocks.get(p.familie, 0) + p.total_stock
+
+    def is_unbalanced(p):
+        if not p.familie or p.familie not in family_sales:
+            return False
+        fam_sales = family_sales[p.familie]
+        fam_stock = family_stocks[p.familie]
+        if fam_sales <= 0 or fam_stock <= 0:
+            return False
+        sales_share = p.vanzari_ultimele_4_luni / fam_sales if fam_sales > 0 else 0
+        stock_share = p.total_stock / fam_stock if fam_stock > 0 else 0
+        return abs(sales_share - stock_share) > 0.15
+
+    def sort_key(p):
+        if p.familie:
+            return (0, -family_sales.get(p.familie, 0), p.familie, p.dimensiune or "zzz")
+        return (1, 0, "", p.nume_produs)
+
+    sorted_products = sorted(product_list, key=sort_key)
+    cols = [c for spec in specs for c in (spec.current, spec.prior, spec.yoy)]
+    month_table = comparison_table(pd.DataFrame([[getattr(p, c) for c in cols] for p in sorted_products],
+                                                columns=cols), specs)
+
+    data = []
+    for p in sorted_products:
+        is_unbal = is_unbalanced(p)
+        suggested_qty = int(p.suggested_order_qty)
+        adjusted_safety = round(p.effective_safety_stock_days * p.dimension_coefficient, 1)
+        formula_text = f"Media: {p.avg_daily_sales:.2f}/zi × (Lead:{p.lead_time_days} + Safety:{adjusted_safety} + 60) - Stoc:{int(p.total_stock)} = {suggested_qty} buc"
+        cov = round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999
+        alert = cov - p.lead_time_days < 5 and p.days_of_coverage < 999
+        data.append({
+            "Selecteaza": False,
+            "Img": p.image_url if hasattr(p, 'image_url') and p.image_url else None,
+            "Produs": f"{p.nr_art} | {(p.nume_produs[:18] + '..' if len(p.nume_produs) > 18 else p.nume_produs)}",
+            "Cost": round(p.cost_achizitie, 0),
+            "PVanz": round(p.pret_vanzare, 0),
+            "Stoc Idx": int(p.stoc_indomex),
+            "Stoc Mag": int(p.stoc_magazin_total),
+            "V.3L": int(p.sales_last_3m) if p.sales_last_3m > 0 else int(p.vanzari_ultimele_4_luni),
+            "Zile→0": (
+                f"🔴 {int(p.days_of_coverage)}" if p.days_of_coverage < p.lead_time_days else
+                f"⚠️ {int(p.days_of_coverage)}" if p.days_of_coverage < (p.lead_time_days + 14) else
+                f"✅ {int(p.days_of_coverage)}" if p.days_of_coverage < 999 else
+                "∞"
+            ) if p.avg_daily_sales > 0 else "∞",
+            "Status": p.segment,
+            "NECESAR": suggested_qty,
+            "_marja_raw": cov - p.lead_time_days,
+            "Zile Ac.": f"🔴 {round(p.days_of_coverage, 1):.1f}" if alert else (f"{round(p.days_of_coverage, 1):.1f}" if p.days_of_coverage < 999 else "999"),
+            "Lead": f"🔴 {p.lead_time_days}" if alert else str(p.lead_time_days),
+            "Marja": f"🔴 {cov - p.lead_time_days:.1f}" if alert else f"{cov - p.lead_time_days:.1f}",
+            "Cod": p.nr_art,
+            "Denumire": p.nume_produs,
+            "Familie": p.familie if p.familie else "-",
+            "Dim": p.dimensiune if p.dimensiune else "-",
+            "Tranzit": int(p.stoc_in_tranzit),
+            "V.4L": int(p.vanzari_ultimele_4_luni),
+            "V.360": int(p.vanzari_ultimele_360_zile),
+            "V.2024": int(p.vanzari_2024),
+            "V.2025": int(p.vanzari_2025),
+            "Med/Zi": round(p.avg_daily_sales, 2),
+            "Sezon": round(p.seasonality_index, 2),
+            "YoY%": f"{int(p.yoy_growth):+d}%" if p.yoy_growth != 0 else "-",
+            "Clasa": p.clasa[:15] if p.clasa else "-",
+            "Subclasa": p.subclasa[:15] if p.subclasa else "-",
+            "S.Ban": int(p.stoc_baneasa), "S.Pip": int(p.stoc_pipera), "S.Mil": int(p.stoc_militari),
+            "S.Pan": int(p.stoc_pantelimon), "S.Iasi": int(p.stoc_iasi), "S.Bras": int(p.stoc_brasov),
+            "S.Pit": int(p.stoc_pitesti), "S.Sib": int(p.stoc_sibiu), "S.Ora": int(p.stoc_oradea),
+            "S.Cta": int(p.stoc_constanta),
+            # NaN cubaj / masa used to print "nan"; both versions now show N/A / -
+            "Cubaj": f"{p.cubaj_m3:.3f}" if p.cubaj_m3 and not pd.isna(p.cubaj_m3) else "N/A",
+            "Masa": f"{p.masa_kg:.1f}" if p.masa_kg and not pd.isna(p.masa_kg) else "-",
+            "V.Int1": int(interval1_sales.get(p.cod_articol, 0)),
+            "V.Int2": int(interval2_sales.get(p.cod_articol, 0)),
+            "_formula": formula_text,
+            "_unbalanced": is_unbal,
+            "_cubaj_m3": p.cubaj_m3,
+            "_masa_kg": p.masa_kg,
+        })
+
+    df = pd.DataFrame(data)
+    split = df.columns.get_loc("V.3L") + 1
+    return pd.concat([df.iloc[:, :split], month_table, df.iloc[:, split:]], axis=1)
+
+
+def columnar_view(proc_df, specs, interval1_sales, interval2_sales):
+    frame = family_order(proc_df).reset_index(drop=True)
+    cols = [c for spec in specs for c in (spec.current, spec.prior, spec.yoy)]
+    month_table = comparison_table(frame[cols], specs)
+    return build_segment_view(frame, month_table, interval1_sales, interval2_sales)
+
+
+def timed(func, *args):
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    print("=" * 60)
+    print(f"BENCHMARK TABEL SEGMENT ({n:,} produse)")
+    print("=" * 60)
+
+    raw_df, reference = make_products(n)
+    proc_df = process_products_vectorized(raw_df, {}, reference, None, MONTHS, YEAR)
+    specs = comparison_columns(MONTHS, YEAR)
+    rng = np.random.default_rng(7)
+    interval1 = {c: int(q) for c, q in zip(proc_df["cod_articol"], rng.poisson(3, len(proc_df))) if q}
+    interval2 = {c: int(q) for c, q in zip(proc_df["cod_articol"], rng.poisson(3, len(proc_df))) if q}
+
+    t_old, old = timed(legacy_view, proc_df, specs, interval1, interval2)
+    t_new, new = timed(columnar_view, proc_df, specs, interval1, interval2)
+
+    print(f"\n  Vechi (SimpleNamespace + dict pe rând): {t_old * 1000:8.1f} ms")
+    print(f"  Nou (coloane din DataFrame):            {t_new * 1000:8.1f} ms")
+    print(f"  Accelerare: {t_old / t_new:.1f}x")
+
+    print("\n[+] Verificare tabel identic...")
+    if list(old.columns) != list(new.columns):
+        print(f"  ❌ Coloane diferite:\n    {list(old.columns)}\n    {list(new.columns)}")
+        sys.exit(1)
+    differing = []
+    for col in old.columns:
+        a, b = old[col], new[col]
+        same = (a.isna() & b.isna()) | (a.astype(object) == b.astype(object))
+        if not same.all():
+            differing.append((col, int((~same).sum())))
+    if differing:
+        for col, count in differing:
+            print(f"  ❌ {col}: {count} valori diferite")
+        sys.exit(1)
+    print(f"  ✅ {len(new):,} rânduri × {len(new.columns)} coloane identice")
+
+
+if __name__ == "__main__":
+    main()
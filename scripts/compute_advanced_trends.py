@@ -8,57 +8,106 @@ Uses date-level and client-level data to calculate refined metrics:
 4. Client Mix (new vs repeat)
 5. Monthly Profile (seasonality pattern per product)
 
+All metrics are bincount / dense-matrix aggregations over integer product codes
+(client mix: sparse client × product matrix, src/core/client_matrix.py), with no
+per-product Python loops; scripts/benchmark_advanced_trends.py checks the
+output against the old loop implementation.
+
+The monthly and client aggregates are kept on disk (history_cache/aggregates):
+a refresh only reads the months added since the last run. Full rebuild:
+python scripts/compute_advanced_trends.py --full
+
 Output: data/advanced_trends.json
 """
 
 import pandas as pd
 import numpy as np
 import json
+import sys
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append('.')
+from src.core.history import aggregate_history_incremental
+from src.core.client_matrix import ClientMatrix
+
 # Configuration
 DATA_DIR = Path("data")
 OUTPUT_FILE = DATA_DIR / "advanced_trends.json"
-CLIENT_FILTER = "Vanzari Magazin_Client Final"
 
 # Current context
 CURRENT_MONTH = datetime.now().month
 CURRENT_YEAR = datetime.now().year
 
 
-def load_and_prepare_data():
-    """Load all CSVs and prepare for analysis."""
-    files = [
-        DATA_DIR / "2019_2021.csv",
-        DATA_DIR / "2022_2024.csv",
-        DATA_DIR / "2025.csv"
-    ]
-    
-    dfs = []
-    for f in files:
-        if f.exists():
-            print(f"Loading {f.name}...")
-            df = pd.read_csv(f, low_memory=False)
-            dfs.append(df)
-    
-    combined = pd.concat(dfs, ignore_index=True)
-    
-    # Filter Client Final
-    if "CLIENT SPECIFIC" in combined.columns:
-        combined = combined[combined["CLIENT SPECIFIC"] == CLIENT_FILTER].copy()
-    
-    # Parse dates
-    combined["DATA_DT"] = pd.to_datetime(combined["DATA"], format="%d.%m.%Y", errors="coerce")
-    combined["MONTH"] = combined["DATA_DT"].dt.month
-    combined["YEAR"] = combined["DATA_DT"].dt.year
-    combined["QUARTER"] = combined["DATA_DT"].dt.quarter
-    
-    # Convert quantities
-    combined["CANTITATE FACTURATA"] = pd.to_numeric(combined["CANTITATE FACTURATA"], errors="coerce").fillna(0)
-    
-    print(f"Total rows after filter: {len(combined):,}")
-    return combined
+def load_and_prepare_data(full=False):
+    """Monthly Client Final sales per product, kept incrementally on top of the history cache."""
+    monthly = aggregate_history_incremental("trends_monthly", ["COD ARTICOL", "YEAR", "MONTH"],
+                                            ["CANTITATE FACTURATA"], client_final=True, full=full)
+    print(f"Total rows after filter: {monthly['ROWS'].sum():,} -> {len(monthly):,} product-months")
+    return monthly
+
+
+def load_client_orders(full=False):
+    """Invoice lines per (product, client), kept incrementally on top of the history cache."""
+    return aggregate_history_incremental("trends_client_orders", ["COD ARTICOL", "ID CLIENT"],
+                                         client_final=True, full=full)
+
+
+QTY = "CANTITATE FACTURATA"
+
+
+def _codes(values: pd.Series):
+    """Integer codes (-1 = missing) and labels; categoricals reuse their codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), pd.Index(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+
+def _sum_by_product(df, mask) -> pd.Series:
+    """Sum of quantity per product over the rows in mask (only products with rows)."""
+    codes, products = _codes(df["COD ARTICOL"])
+    keep = np.asarray(mask) & (codes >= 0)
+    qty = df[QTY].to_numpy(dtype=float)
+    sums = np.bincount(codes[keep], weights=qty[keep], minlength=len(products))
+    seen = np.bincount(codes[keep], minlength=len(products)) > 0
+    return pd.Series(sums[seen], index=products[seen])
+
+
+def _growth_pct(current: pd.Series, previous: pd.Series) -> pd.Series:
+    """(current - previous) / previous × 100; 100 for new products, 0 if both are 0."""
+    current, previous = current.align(previous, fill_value=0)
+    cur = current.to_numpy(dtype=float)
+    prev = previous.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(prev > 0, (cur - prev) / prev * 100, np.where(cur > 0, 100.0, 0.0))
+    return pd.Series(growth, index=current.index)
+
+
+def _product_month_matrix(df):
+    """
+    Dense product × calendar-month matrix of summed quantity.
+
+    Returns:
+        (sums P × M, present P × M bool - month had rows, product labels)
+    """
+    codes, products = _codes(df["COD ARTICOL"])
+    year = df["YEAR"].to_numpy(dtype=float)
+    month = df["MONTH"].to_numpy(dtype=float)
+    keep = (codes >= 0) & ~np.isnan(year) & ~np.isnan(month)
+    if not keep.any():
+        return np.zeros((0, 0)), np.zeros((0, 0), dtype=bool), products[:0]
+
+    first_year = int(year[keep].min())
+    n_months = (int(year[keep].max()) - first_year + 1) * 12
+    slot = codes[keep] * n_months + ((year[keep] - first_year) * 12 + month[keep] - 1).astype(np.int64)
+
+    size = len(products) * n_months
+    qty = df[QTY].to_numpy(dtype=float)[keep]
+    sums = np.bincount(slot, weights=qty, minlength=size).reshape(len(products), n_months)
+    present = (np.bincount(slot, minlength=size) > 0).reshape(len(products), n_months)
+    return sums, present, products
 
 
 def compute_yoy_growth(df):
@@ -69,32 +118,12 @@ def compute_yoy_growth(df):
     """
     print("\n=== YoY Growth ===")
     
-    # Get this year and last year data
-    this_year = df[df["YEAR"] == CURRENT_YEAR]
-    last_year = df[df["YEAR"] == CURRENT_YEAR - 1]
-    
     # Only compare months that exist in current year
-    months_this_year = this_year["MONTH"].unique()
-    
-    this_year_sales = this_year.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
-    last_year_same_months = last_year[last_year["MONTH"].isin(months_this_year)]
-    last_year_sales = last_year_same_months.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
-    
-    # Calculate YoY
-    yoy = {}
-    all_products = set(this_year_sales.index) | set(last_year_sales.index)
-    
-    for cod in all_products:
-        current = this_year_sales.get(cod, 0)
-        previous = last_year_sales.get(cod, 0)
-        
-        if previous > 0:
-            yoy[cod] = round((current - previous) / previous * 100, 1)
-        elif current > 0:
-            yoy[cod] = 100.0  # New product
-        else:
-            yoy[cod] = 0.0
+    this_year = (df["YEAR"] == CURRENT_YEAR).to_numpy()
+    months_this_year = df.loc[this_year, "MONTH"].unique()
+    last_year = ((df["YEAR"] == CURRENT_YEAR - 1) & df["MONTH"].isin(months_this_year)).to_numpy()
     
+    yoy = _growth_pct(_sum_by_product(df, this_year), _sum_by_product(df, last_year))
     print(f"Calculated YoY for {len(yoy):,} products")
     return yoy
 
@@ -107,36 +136,18 @@ def compute_acceleration(df):
     """
     print("\n=== Acceleration ===")
     
-    # Get last 6 months of data
-    recent = df[df["YEAR"] >= CURRENT_YEAR - 1].copy()
-    
-    # Last 3 months vs previous 3 months
-    recent["MONTH_KEY"] = recent["YEAR"] * 12 + recent["MONTH"]
-    max_month_key = recent["MONTH_KEY"].max()
+    # Last 3 months vs previous 3 months (months numbered YEAR × 12 + MONTH)
+    recent = (df["YEAR"] >= CURRENT_YEAR - 1).to_numpy()
+    month_key = (df["YEAR"] * 12 + df["MONTH"]).to_numpy(dtype=float)
+    max_month_key = np.nanmax(month_key[recent]) if recent.any() else np.nan
     
-    last_3m = recent[recent["MONTH_KEY"] > max_month_key - 3]
-    prev_3m = recent[(recent["MONTH_KEY"] <= max_month_key - 3) & (recent["MONTH_KEY"] > max_month_key - 6)]
+    last_3m = recent & (month_key > max_month_key - 3)
+    prev_3m = recent & (month_key <= max_month_key - 3) & (month_key > max_month_key - 6)
     
-    last_3m_sales = last_3m.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
-    prev_3m_sales = prev_3m.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
+    acceleration = _growth_pct(_sum_by_product(df, last_3m), _sum_by_product(df, prev_3m))
     
-    acceleration = {}
-    all_products = set(last_3m_sales.index) | set(prev_3m_sales.index)
-    
-    for cod in all_products:
-        current = last_3m_sales.get(cod, 0)
-        previous = prev_3m_sales.get(cod, 0)
-        
-        if previous > 0:
-            accel = (current - previous) / previous * 100
-            acceleration[cod] = round(accel, 1)
-        elif current > 0:
-            acceleration[cod] = 100.0
-        else:
-            acceleration[cod] = 0.0
-    
-    accelerating = sum(1 for v in acceleration.values() if v > 10)
-    decelerating = sum(1 for v in acceleration.values() if v < -10)
+    accelerating = int((acceleration.round(1) > 10).sum())
+    decelerating = int((acceleration.round(1) < -10).sum())
     print(f"Accelerating (>10%): {accelerating}, Decelerating (<-10%): {decelerating}")
     
     return acceleration
@@ -151,25 +162,23 @@ def compute_volatility(df):
     """
     print("\n=== Volatility ===")
     
-    # Monthly sales per product
-    monthly = df.groupby(["COD ARTICOL", "YEAR", "MONTH"])["CANTITATE FACTURATA"].sum().reset_index()
-    
-    # Calculate CV per product
-    volatility = {}
-    for cod, group in monthly.groupby("COD ARTICOL"):
-        if len(group) >= 3:  # Need at least 3 months
-            mean = group["CANTITATE FACTURATA"].mean()
-            std = group["CANTITATE FACTURATA"].std()
-            if mean > 0:
-                cv = std / mean
-                volatility[cod] = round(cv, 2)
-            else:
-                volatility[cod] = 0.0
-        else:
-            volatility[cod] = 1.0  # Not enough data = high uncertainty
-    
-    stable = sum(1 for v in volatility.values() if v < 0.5)
-    volatile = sum(1 for v in volatility.values() if v > 1.0)
+    # Monthly sales per product (only months with invoices count)
+    sums, present, products = _product_month_matrix(df)
+    n = present.sum(axis=1)
+    seen = n > 0
+    sums, present, n = sums[seen], present[seen], n[seen]
+    
+    # Two-pass sample std, as Series.std
+    mean = sums.sum(axis=1) / n
+    dev = np.where(present, sums - mean[:, None], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt((dev ** 2).sum(axis=1) / (n - 1))
+        cv = np.where(mean > 0, std / mean, 0.0)
+    # Not enough data (< 3 months) = high uncertainty
+    volatility = pd.Series(np.where(n >= 3, cv, 1.0), index=products[seen])
+    
+    stable = int((volatility.round(2) < 0.5).sum())
+    volatile = int((volatility.round(2) > 1.0).sum())
     print(f"Stable (CV<0.5): {stable}, Volatile (CV>1.0): {volatile}")
     
     return volatility
@@ -184,24 +193,9 @@ def compute_client_mix(df):
     """
     print("\n=== Client Mix ===")
     
-    # Count orders per client per product
-    client_orders = df.groupby(["COD ARTICOL", "ID CLIENT"]).size().reset_index(name="orders")
-    
-    client_mix = {}
-    for cod, group in client_orders.groupby("COD ARTICOL"):
-        total_clients = len(group)
-        repeat_clients = (group["orders"] > 1).sum()
-        
-        if total_clients > 0:
-            repeat_rate = repeat_clients / total_clients * 100
-            avg_orders = group["orders"].mean()
-            client_mix[cod] = {
-                "repeat_rate": round(repeat_rate, 1),
-                "avg_orders": round(avg_orders, 2),
-                "unique_clients": total_clients
-            }
-        else:
-            client_mix[cod] = {"repeat_rate": 0, "avg_orders": 0, "unique_clients": 0}
+    # Per-SKU column reductions of the sparse client × product order matrix; a
+    # pre-aggregated frame (load_client_orders) carries the line count in ROWS
+    client_mix = ClientMatrix.from_frame(df, quantity=None, value=None).repeat_rates()
     
     print(f"Analyzed client patterns for {len(client_mix):,} products")
     return client_mix
@@ -215,27 +209,74 @@ def compute_monthly_profile(df):
     """
     print("\n=== Monthly Profile ===")
     
-    monthly = df.groupby(["COD ARTICOL", "MONTH"])["CANTITATE FACTURATA"].sum().reset_index()
-    
-    profiles = {}
-    for cod, group in monthly.groupby("COD ARTICOL"):
-        if len(group) >= 3:
-            # Find peak month
-            peak_month = group.loc[group["CANTITATE FACTURATA"].idxmax(), "MONTH"]
-            
-            # Calculate % in peak
-            total = group["CANTITATE FACTURATA"].sum()
-            peak_sales = group[group["MONTH"] == peak_month]["CANTITATE FACTURATA"].sum()
-            peak_pct = peak_sales / total * 100 if total > 0 else 0
-            
-            profiles[cod] = {
-                "peak_month": int(peak_month),
-                "peak_pct": round(peak_pct, 1)
-            }
-        else:
-            profiles[cod] = {"peak_month": 0, "peak_pct": 0}
-    
-    return profiles
+    # Fold calendar months onto Jan..Dec
+    sums, present, products = _product_month_matrix(df)
+    values = sums.reshape(len(products), -1, 12).sum(axis=1) if sums.size else np.zeros((0, 12))
+    present = present.reshape(len(products), -1, 12).any(axis=1) if present.size else np.zeros((0, 12), dtype=bool)
+    seen = present.any(axis=1)
+    values, present = values[seen], present[seen]
+    
+    # First month with the highest sales (months without sales never win)
+    peak_idx = np.argmax(np.where(present, values, -np.inf), axis=1)
+    peak_sales = values[np.arange(len(values)), peak_idx]
+    total = values.sum(axis=1)
+    
+    enough = present.sum(axis=1) >= 3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peak_pct = np.where(total > 0, peak_sales / total * 100, 0.0)
+    
+    return pd.DataFrame({
+        "peak_month": np.where(enough, peak_idx + 1, 0).astype(int),
+        "peak_pct": np.where(enough, peak_pct, 0.0),
+    }, index=products[seen])
+
+
+def _round(values: pd.Series, ndigits: int) -> list:
+    """Python round() per value so the JSON matches the historical output exactly."""
+    return [round(v, ndigits) for v in values.tolist()]
+
+
+def build_result(yoy, acceleration, volatility, client_mix, monthly_profile) -> dict:
+    """Assemble {cod_articol: metrics} for every product with YoY, acceleration or volatility."""
+    index = pd.Index(sorted(set(yoy.index) | set(acceleration.index) | set(volatility.index)))
+    
+    cm = client_mix.reindex(index)
+    mp = monthly_profile.reindex(index)
+    columns = {
+        "yoy_growth": _round(yoy.reindex(index, fill_value=0.0), 1),
+        "acceleration": _round(acceleration.reindex(index, fill_value=0.0), 1),
+        "volatility": _round(volatility.reindex(index, fill_value=1.0), 2),
+        "repeat_rate": _round(cm["repeat_rate"].fillna(0.0), 1),
+        "avg_orders_per_client": _round(cm["avg_orders"].fillna(0.0), 2),
+        "unique_clients": cm["unique_clients"].fillna(0).astype(int).tolist(),
+        "peak_month": mp["peak_month"].fillna(0).astype(int).tolist(),
+        "peak_month_pct": _round(mp["peak_pct"].fillna(0.0), 1),
+    }
+    
+    names = list(columns)
+    rows = zip(*(columns[name] for name in names))
+    return {
+        cod: {name: (float(v) if name not in ("unique_clients", "peak_month") else int(v))
+              for name, v in zip(names, row)}
+        for cod, row in zip(index.tolist(), rows)
+    }
+
+
+def compute_all(df, client_orders=None) -> dict:
+    """
+    All advanced-trend metrics.
+
+    Args:
+        df: Sales rows or monthly aggregate (COD ARTICOL, YEAR, MONTH, CANTITATE FACTURATA)
+        client_orders: (COD ARTICOL, ID CLIENT, ROWS) aggregate; default: client mix from df
+    """
+    return build_result(
+        compute_yoy_growth(df),
+        compute_acceleration(df),
+        compute_volatility(df),
+        compute_client_mix(df if client_orders is None else client_orders),
+        compute_monthly_profile(df),
+    )
 
 
 def main():
@@ -243,32 +284,11 @@ def main():
     print("COMPUTE ADVANCED TRENDS")
     print("=" * 60)
     
-    df = load_and_prepare_data()
-    
-    yoy = compute_yoy_growth(df)
-    acceleration = compute_acceleration(df)
-    volatility = compute_volatility(df)
-    client_mix = compute_client_mix(df)
-    monthly_profile = compute_monthly_profile(df)
-    
-    # Combine all metrics
-    all_products = set(yoy.keys()) | set(acceleration.keys()) | set(volatility.keys())
+    full = "--full" in sys.argv
+    df = load_and_prepare_data(full)
+    client_orders = load_client_orders(full)
     
-    result = {}
-    for cod in all_products:
-        cm = client_mix.get(cod, {"repeat_rate": 0, "avg_orders": 0, "unique_clients": 0})
-        mp = monthly_profile.get(cod, {"peak_month": 0, "peak_pct": 0})
-        
-        result[cod] = {
-            "yoy_growth": float(yoy.get(cod, 0.0)),
-            "acceleration": float(acceleration.get(cod, 0.0)),
-            "volatility": float(volatility.get(cod, 1.0)),
-            "repeat_rate": float(cm["repeat_rate"]),
-            "avg_orders_per_client": float(cm["avg_orders"]),
-            "unique_clients": int(cm["unique_clients"]),
-            "peak_month": int(mp["peak_month"]),
-            "peak_month_pct": float(mp["peak_pct"])
-        }
+    result = compute_all(df, client_orders)
     
     # Save
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
@@ -0,0 +1,88 @@
+"""
+Script pentru indexul de afinitate (produse / familii cumpărate împreună).
+
+Un coș = același client (ID CLIENT) în aceeași zi (DATA), doar Client Final.
+Calculul folosește produse de matrici rare cu păstrarea primelor TOP_K
+asocieri per produs (src/core/affinity.py).
+
+Scrie:
+- product_affinity (cod_articol, related_cod, related_denumire, baskets, confidence, lift)
+- family_affinity  (familie, related_familie, baskets, confidence, lift)
+
+Rulează cu: python scripts/compute_affinity.py
+"""
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.append('.')
+from src.core.database import get_connection_string
+from src.core.history import aggregate_history
+from src.core.affinity import compute_affinity, TOP_K, MIN_PAIR_BASKETS
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DATABASE_URL = get_connection_string()
+
+
+def load_baskets() -> pd.DataFrame:
+    """Distinct (client, zi, produs) din istoric - fiecare rând = un produs într-un coș."""
+    print("[1/4] Încarc coșurile din istoric (client × zi)...")
+    lines = aggregate_history(["ID CLIENT", "DAY", "COD ARTICOL"], client_final=True)
+    print(f"      -> {len(lines):,} linii coș")
+    return lines
+
+
+def load_products(engine) -> pd.DataFrame:
+    print("[2/4] Încarc denumirile produselor (familii)...")
+    products = pd.read_sql(text("SELECT cod_articol, denumire FROM products"), engine)
+    print(f"      -> {len(products):,} produse")
+    return products
+
+
+def write_tables(engine, sku: pd.DataFrame, family: pd.DataFrame):
+    print("[4/4] Scriere în PostgreSQL...")
+    sku.to_sql("product_affinity", engine, if_exists="replace", index=False, method="multi", chunksize=5000)
+    family.to_sql("family_affinity", engine, if_exists="replace", index=False, method="multi", chunksize=5000)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_product_affinity_cod ON product_affinity(cod_articol)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_family_affinity_fam ON family_affinity(familie)"))
+        conn.commit()
+    print(f"      ✅ {len(sku):,} perechi produse, {len(family):,} perechi familii")
+
+
+def main():
+    print("=" * 60)
+    print("INDEX AFINITATE (CUMPĂRATE ÎMPREUNĂ)")
+    print("=" * 60)
+
+    engine = create_engine(DATABASE_URL)
+    lines = load_baskets()
+    products = load_products(engine)
+
+    print(f"[3/4] Calcul afinitate (top {TOP_K} / produs, minim {MIN_PAIR_BASKETS} coșuri comune)...")
+    t0 = time.time()
+    sku, family = compute_affinity(lines, products)
+    names = products.drop_duplicates("cod_articol").set_index("cod_articol")["denumire"]
+    sku.insert(2, "related_denumire", sku["related_cod"].astype(str).map(names))
+    print(f"      -> {time.time() - t0:.2f}s")
+
+    if not sku.empty:
+        print("\n      Cele mai puternice asocieri (lift):")
+        top = sku.sort_values(["lift", "baskets"], ascending=False).head(5)
+        for _, row in top.iterrows():
+            print(f"        {row['cod_articol']} -> {row['related_cod']}: "
+                  f"lift {row['lift']:.1f}, încredere {row['confidence']:.0%}, {row['baskets']} coșuri")
+
+    write_tables(engine, sku, family)
+
+    print("\n" + "=" * 60)
+    print("GATA!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
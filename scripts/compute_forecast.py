@@ -0,0 +1,86 @@
+"""
+Script pentru prognoza cererii per SKU (Croston SBA / Holt-Winters).
+Citește sales_history din products, clasifică fiecare serie lunară
+(ADI / CV²), alege modelul și scrie prognoza în tabelul `forecast`.
+
+Rulează cu: python scripts/compute_forecast.py [orizont_luni] [workers]
+"""
+import time
+import sys
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.append('.')
+from src.core.database import get_connection_string
+from src.core.forecasting import (
+    DEFAULT_HORIZON, build_monthly_matrix, run_forecast, forecast_to_frame
+)
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DATABASE_URL = get_connection_string()
+
+
+def load_histories(engine) -> pd.DataFrame:
+    """Load cod_articol + sales_history for all products."""
+    print("[1/4] Încarc istoricul lunar din products...")
+    df = pd.read_sql(text("SELECT cod_articol, sales_history FROM products"), engine)
+    print(f"      -> {len(df):,} produse")
+    return df
+
+
+def write_forecast(engine, frame: pd.DataFrame):
+    """Replace the forecast table and index it for lookups by cod_articol."""
+    print("[4/4] Scriere tabel forecast...")
+    frame.to_sql("forecast", engine, if_exists="replace", index=False,
+                 method="multi", chunksize=5000)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_forecast_cod ON forecast(cod_articol)"))
+        conn.commit()
+    print(f"      ✅ {len(frame):,} rânduri (produs × lună)")
+
+
+def main():
+    horizon = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HORIZON
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print("=" * 60)
+    print("PROGNOZA CERERE (Croston SBA / Holt-Winters)")
+    print("=" * 60)
+
+    engine = create_engine(DATABASE_URL)
+    df = load_histories(engine)
+
+    print("[2/4] Construire matrice SKU × lună...")
+    Y, sku_index, months = build_monthly_matrix(df["cod_articol"], df["sales_history"])
+    if Y.shape[1] == 0:
+        print("\n❌ Nu există istoric lunar! Rulează întâi scripts/import_full_data.py")
+        return
+    print(f"      -> {Y.shape[0]:,} SKU × {Y.shape[1]} luni ({months[0]} → {months[-1]})")
+
+    print(f"[3/4] Fitting modele (orizont {horizon} luni)...")
+    t0 = time.time()
+    result = run_forecast(Y, horizon=horizon, max_workers=workers)
+    elapsed = time.time() - t0
+    print(f"      -> {elapsed:.1f}s ({Y.shape[0] / max(elapsed, 1e-9):,.0f} SKU/s)")
+
+    frame = forecast_to_frame(result, sku_index, months)
+    summary = frame.drop_duplicates("cod_articol")
+    print("\n      Modele alese:")
+    for model, cnt in summary["model"].value_counts().items():
+        print(f"        {model}: {cnt:,}")
+    print("      Clase cerere:")
+    for cls, cnt in summary["demand_class"].value_counts().items():
+        print(f"        {cls}: {cnt:,}")
+
+    write_forecast(engine, frame)
+
+    print("\n" + "=" * 60)
+    print("GATA! Cantitățile sugerate folosesc acum prognoza.")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
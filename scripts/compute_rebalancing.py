@@ -0,0 +1,87 @@
+"""
+Script pentru calculul transferurilor între magazine (rebalansare stoc).
+Acoperă lipsurile locale din depozit (stoc_total) și din excesul altor
+magazine / outlet-uri, înainte de o comandă nouă la furnizor.
+
+Scrie:
+- transfer_plan   (cod_articol, from_location, to_location, qty, tip)
+- transfer_effect (lipsă înainte/după, unități mutate, segment înainte/după)
+
+Rulează cu: python scripts/compute_rebalancing.py [zile_acoperire]
+"""
+import time
+import sys
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.append('.')
+from src.core.database import get_connection_string
+from src.core.rebalancing import (
+    STORE_COLUMNS, DEFAULT_COVER_DAYS, compute_transfers, transfer_plan, rebalancing_effect
+)
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DATABASE_URL = get_connection_string()
+
+
+def load_stock(engine) -> pd.DataFrame:
+    """Per-location stock + sales + supplier params for all products."""
+    print("[1/3] Încarc stocurile pe locații...")
+    columns = ", ".join(
+        ["cod_articol", "stoc_total", "stoc_tranzit", "vanzari_4luni", "vanzari_360z",
+         "avg_daily_sales", "lead_time_days", "safety_stock_days"] + STORE_COLUMNS
+    )
+    df = pd.read_sql(text(f"SELECT {columns} FROM products"), engine)
+    print(f"      -> {len(df):,} produse")
+    return df
+
+
+def write_tables(engine, plan: pd.DataFrame, effect: pd.DataFrame):
+    print("[3/3] Scriere în PostgreSQL...")
+    plan.to_sql("transfer_plan", engine, if_exists="replace", index=False, method="multi", chunksize=5000)
+    effect.to_sql("transfer_effect", engine, if_exists="replace", index=False, method="multi", chunksize=5000)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_transfer_plan_cod ON transfer_plan(cod_articol)"))
+        conn.commit()
+    print(f"      ✅ {len(plan):,} transferuri, {len(effect):,} produse afectate")
+
+
+def main():
+    cover_days = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COVER_DAYS
+
+    print("=" * 60)
+    print("REBALANSARE STOC ÎNTRE MAGAZINE")
+    print("=" * 60)
+
+    engine = create_engine(DATABASE_URL)
+    df = load_stock(engine)
+
+    print(f"[2/3] Calcul transferuri (acoperire {cover_days:.0f} zile / magazin)...")
+    t0 = time.time()
+    result = compute_transfers(df, cover_days=cover_days)
+    plan = transfer_plan(df, result)
+    effect = rebalancing_effect(df, result)
+    effect = effect[effect["units_transferred"] > 0]
+    print(f"      -> {time.time() - t0:.2f}s")
+
+    print(f"\n      Lipsă magazine înainte: {effect['shortfall_before'].sum():,.0f} buc")
+    print(f"      Lipsă magazine după:    {effect['shortfall_after'].sum():,.0f} buc")
+    print("      Transferuri pe tip:")
+    for tip, qty in plan.groupby("tip")["qty"].sum().items():
+        print(f"        {tip}: {qty:,} buc")
+
+    print("\n      Segment înainte → după (produse cu transferuri):")
+    print(pd.crosstab(effect["segment_before"], effect["segment_after"]).to_string())
+
+    write_tables(engine, plan, effect)
+
+    print("\n" + "=" * 60)
+    print("GATA!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
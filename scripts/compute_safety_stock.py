@@ -0,0 +1,127 @@
+"""
+Script pentru calculul safety stock statistic în PostgreSQL.
+Din sales_transactions calculează media și deviația standard a cererii zilnice
+(zilele fără vânzări contează ca cerere 0), apoi:
+
+    SS  = z(nivel serviciu) × σ_zilnic × √lead_time
+    ROP = medie_zilnică × lead_time + SS
+
+Rezultatele se scriu în products (demand_mean_daily, demand_std_daily,
+lead_time_demand, service_level, safety_stock_qty, reorder_point).
+
+Rulează cu: python scripts/compute_safety_stock.py [zile_fereastra]
+"""
+import pandas as pd
+import numpy as np
+from sqlalchemy import create_engine, text
+import sys
+
+sys.path.append('.')
+from src.core.database import get_connection_string
+from src.core.config import load_supplier_config
+from src.core.safety_stock import (
+    DEMAND_WINDOW_DAYS, MIN_HISTORY_DAYS, SAFETY_STOCK_COLUMNS,
+    compute_safety_stock, supplier_service_levels, ensure_safety_stock_columns
+)
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DATABASE_URL = get_connection_string()
+STAGING_TABLE = "safety_stock_stats"
+
+
+def load_demand_sums(engine, window_days: int) -> pd.DataFrame:
+    """Per-SKU Σq, Σq² and history length over the last `window_days` (one SQL pass)."""
+    print(f"[1/3] Agregare cerere zilnică (ultimele {window_days} zile)...")
+
+    query = text("""
+        WITH bounds AS (
+            SELECT MAX(data) AS end_date FROM sales_transactions
+        ),
+        daily AS (
+            SELECT t.cod_articol, t.data, SUM(t.cantitate) AS qty
+            FROM sales_transactions t, bounds b
+            WHERE t.data > b.end_date - CAST(:window AS INT)
+            GROUP BY t.cod_articol, t.data
+        )
+        SELECT d.cod_articol,
+               SUM(d.qty) AS qty_sum,
+               SUM(d.qty * d.qty) AS qty_sumsq,
+               MAX(b.end_date) - MIN(d.data) + 1 AS active_days
+        FROM daily d, bounds b
+        GROUP BY d.cod_articol
+    """)
+    stats = pd.read_sql(query, engine, params={"window": window_days})
+
+    # Zilele dinaintea primei vânzări din fereastră nu intră în medie (produse noi)
+    stats["n_days"] = np.clip(stats["active_days"].astype(float), MIN_HISTORY_DAYS, window_days)
+    print(f"      -> {len(stats):,} produse cu vânzări")
+    return stats
+
+
+def attach_supplier_params(engine, stats: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Join lead time + supplier from products, resolve service level per supplier."""
+    products = pd.read_sql(
+        text("SELECT cod_articol, furnizor, lead_time_days FROM products"), engine
+    )
+    merged = stats.merge(products, on="cod_articol", how="inner")
+
+    default_lt = config.get("default", {}).get("lead_time_days", 30)
+    merged["lead_time_days"] = pd.to_numeric(merged["lead_time_days"], errors="coerce").fillna(default_lt)
+    merged["service_level"] = supplier_service_levels(merged["furnizor"].fillna(""), config)
+    return merged
+
+
+def write_results(engine, result: pd.DataFrame):
+    """Stage results and update products in one UPDATE ... FROM."""
+    print("[3/3] Scriere în PostgreSQL...")
+    result.to_sql(STAGING_TABLE, engine, if_exists="replace", index=False,
+                  method="multi", chunksize=5000)
+
+    set_clause = ", ".join(f"{col} = s.{col}" for col in SAFETY_STOCK_COLUMNS)
+    with engine.connect() as conn:
+        ensure_safety_stock_columns(conn)
+        # SKU-uri fără vânzări în fereastră: fără SS statistic (fallback la zile config)
+        conn.execute(text(f"UPDATE products SET {', '.join(f'{c} = NULL' for c in SAFETY_STOCK_COLUMNS)}"))
+        conn.execute(text(f"""
+            UPDATE products p SET {set_clause}
+            FROM {STAGING_TABLE} s
+            WHERE p.cod_articol = s.cod_articol
+        """))
+        conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+        conn.commit()
+    print(f"      ✅ {len(result):,} produse actualizate")
+
+
+def main():
+    window_days = int(sys.argv[1]) if len(sys.argv) > 1 else DEMAND_WINDOW_DAYS
+
+    print("=" * 60)
+    print("SAFETY STOCK STATISTIC (nivel serviciu × variabilitate cerere)")
+    print("=" * 60)
+
+    engine = create_engine(DATABASE_URL)
+    config = load_supplier_config()
+
+    stats = load_demand_sums(engine, window_days)
+    if stats.empty:
+        print("\n❌ Nu există tranzacții! Rulează întâi scripts/import_transactions.py")
+        return
+
+    print("[2/3] Calcul SS / ROP (vectorizat)...")
+    stats = attach_supplier_params(engine, stats, config)
+    result = compute_safety_stock(stats, stats["lead_time_days"].values, stats["service_level"].values)
+
+    print(f"      Safety stock median: {result['safety_stock_qty'].median():.2f} buc")
+    print(f"      ROP median: {result['reorder_point'].median():.2f} buc")
+
+    write_results(engine, result)
+
+    print("\n" + "=" * 60)
+    print("GATA! Rulează scripts/precompute_segments.py pentru segmente/cantități.")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
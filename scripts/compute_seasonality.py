@@ -4,76 +4,54 @@ Compute Seasonality Index and Rising Stars from Historical Data.
 This script loads historical sales data, filters by Client Final,
 and calculates:
 1. Seasonality Index per product (upcoming months vs average)
-2. Rising Stars (consistent >10% YoY growth for 3 years)
+2. Rising Stars (consistent >10% YoY growth over a 3-year window)
 3. Hot/Cold classification
 
+Rising stars and hot/cold are computed on SKU × year / SKU × period matrices
+(no per-product loops). Window: python scripts/compute_seasonality.py [ultimul_an] [--full]
+
+Monthly aggregates are kept on disk (history_cache/aggregates): a refresh only
+reads the months added since the last run; --full rebuilds them.
+
 Output: data/seasonality_index.json
 """
 
 import pandas as pd
+import numpy as np
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.append('.')
+from src.core.history import aggregate_history_incremental
+
 # Configuration
 DATA_DIR = Path("data")
 OUTPUT_FILE = DATA_DIR / "seasonality_index.json"
-CLIENT_FILTER = "Vanzari Magazin_Client Final"
 
 # Current month for seasonality calculation
 CURRENT_MONTH = datetime.now().month
 CURRENT_YEAR = datetime.now().year
 
+# Rising Stars: >10% growth in each year of the window, >= 10 units in the last one
+RISING_STAR_YEARS = [2022, 2023, 2024]
+RISING_STAR_MIN_GROWTH = 0.10
+RISING_STAR_MIN_SALES = 10
 
-def load_historical_data():
-    """Load and concatenate all historical CSV files."""
-    files = [
-        DATA_DIR / "2019_2021.csv",
-        DATA_DIR / "2022_2024.csv",
-        DATA_DIR / "2025.csv"
-    ]
-    
-    dfs = []
-    for f in files:
-        if f.exists():
-            print(f"Loading {f.name}...")
-            df = pd.read_csv(f, low_memory=False)
-            dfs.append(df)
-            print(f"  -> {len(df):,} rows")
-    
-    if not dfs:
-        raise FileNotFoundError("No historical CSV files found in data/")
-    
-    combined = pd.concat(dfs, ignore_index=True)
-    print(f"Total combined: {len(combined):,} rows")
-    return combined
-
-
-def filter_client_final(df):
-    """Keep only Client Final sales."""
-    if "CLIENT SPECIFIC" not in df.columns:
-        print("WARNING: 'CLIENT SPECIFIC' column not found. Skipping filter.")
-        return df
-    
-    before = len(df)
-    df = df[df["CLIENT SPECIFIC"] == CLIENT_FILTER].copy()
-    after = len(df)
-    print(f"Filtered Client Final: {before:,} -> {after:,} rows ({after/before*100:.1f}%)")
-    return df
+# Hot/Cold: last N months vs the same months last year
+HOT_COLD_MONTHS = 4
 
 
-def parse_dates(df):
-    """Convert DATA column to datetime and extract month/year."""
-    if "DATA" not in df.columns:
-        raise ValueError("'DATA' column not found")
-    
-    # Try DD.MM.YYYY format
-    df["DATA_DT"] = pd.to_datetime(df["DATA"], format="%d.%m.%Y", errors="coerce")
-    df["MONTH"] = df["DATA_DT"].dt.month
-    df["YEAR"] = df["DATA_DT"].dt.year
-    
-    valid = df["DATA_DT"].notna().sum()
-    print(f"Parsed dates: {valid:,} valid out of {len(df):,}")
+def load_historical_data(full=False):
+    """
+    Monthly Client Final sales per product (COD ARTICOL, YEAR, MONTH), kept
+    incrementally on top of the shared history cache. Every metric below only
+    needs monthly sums.
+    """
+    df = aggregate_history_incremental("seasonality_monthly", ["COD ARTICOL", "YEAR", "MONTH"],
+                                       ["CANTITATE FACTURATA"], client_final=True, full=full)
+    print(f"Total Client Final: {df['ROWS'].sum():,} rows -> {len(df):,} product-months")
     return df
 
 
@@ -107,94 +85,83 @@ def compute_seasonality_index(df):
     return seasonality.to_dict()
 
 
-def compute_rising_stars(df):
+def yearly_matrix(df, years):
+    """SKU × year matrix of sales for the given years (missing years = 0)."""
+    in_window = df[df["YEAR"].isin(years)]
+    yearly = in_window.groupby(["COD ARTICOL", "YEAR"], observed=True)["CANTITATE FACTURATA"].sum().unstack(fill_value=0)
+    return yearly.reindex(columns=list(years), fill_value=0)
+
+
+def compute_rising_stars(df, years=None):
     """
-    Identify Rising Stars: products with >10% growth in each of last 3 years.
+    Identify Rising Stars: products with >10% growth in each year of the window
+    and at least RISING_STAR_MIN_SALES units in the last year.
     
-    Returns dict: {cod_articol: True/False}
+    Returns Series: cod_articol -> True/False
     """
-    years = [2022, 2023, 2024]
-    
-    # Get yearly sales
-    yearly = df[df["YEAR"].isin(years)].groupby(["COD ARTICOL", "YEAR"])["CANTITATE FACTURATA"].sum().unstack(fill_value=0)
-    
-    rising_stars = {}
-    for cod in yearly.index:
-        try:
-            sales_2022 = yearly.loc[cod, 2022] if 2022 in yearly.columns else 0
-            sales_2023 = yearly.loc[cod, 2023] if 2023 in yearly.columns else 0
-            sales_2024 = yearly.loc[cod, 2024] if 2024 in yearly.columns else 0
-            
-            # Check consistent growth >10%
-            growth_23 = (sales_2023 - sales_2022) / sales_2022 if sales_2022 > 0 else 0
-            growth_24 = (sales_2024 - sales_2023) / sales_2023 if sales_2023 > 0 else 0
-            
-            is_rising = growth_23 > 0.10 and growth_24 > 0.10 and sales_2024 >= 10
-            rising_stars[cod] = is_rising
-        except:
-            rising_stars[cod] = False
-    
-    count = sum(rising_stars.values())
-    print(f"Rising Stars identified: {count} products")
+    years = list(years or RISING_STAR_YEARS)
+    yearly = yearly_matrix(df, years)
+    sales = yearly.to_numpy(dtype=float)
+    
+    # Growth per consecutive pair of years (0 when the base year had no sales)
+    prev, cur = sales[:, :-1], sales[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(prev > 0, (cur - prev) / prev, 0.0)
+    
+    is_rising = (growth > RISING_STAR_MIN_GROWTH).all(axis=1) & (sales[:, -1] >= RISING_STAR_MIN_SALES)
+    rising_stars = pd.Series(is_rising, index=yearly.index)
+    
+    print(f"Rising Stars identified ({years[0]}-{years[-1]}): {int(rising_stars.sum())} products")
     return rising_stars
 
 
-def compute_hot_cold(df):
+def compute_hot_cold(df, period_months=HOT_COLD_MONTHS):
     """
     Hot/Cold classification based on recent trend.
     
     FIXED: Now requires minimum volume to classify (avoid false positives)
-    Compares last 4 months vs same period last year.
+    Compares last `period_months` months vs same period last year.
     
-    Returns dict: {cod_articol: "HOT" | "COLD" | "STABLE"}
+    Returns Series: cod_articol -> "HOT" | "COLD" | "STABLE"
     """
     # Minimum volume to classify (avoid +200% on 1 sale)
     MIN_VOLUME_FOR_TREND = 5  # Need at least 5 units in current or previous period
     
-    # Get current period (last 4 months)
+    # Get current period (last N months)
     current_year = CURRENT_YEAR
-    current_months = [(CURRENT_MONTH - i - 1) % 12 + 1 for i in range(4)]
-    
-    # This year's sales
-    this_year = df[(df["YEAR"] == current_year) & (df["MONTH"].isin(current_months))]
-    this_year_sales = this_year.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
-    
-    # Last year same months
-    last_year = df[(df["YEAR"] == current_year - 1) & (df["MONTH"].isin(current_months))]
-    last_year_sales = last_year.groupby("COD ARTICOL")["CANTITATE FACTURATA"].sum()
-    
-    # Calculate trend
-    hot_cold = {}
-    all_products = set(this_year_sales.index) | set(last_year_sales.index)
-    
-    for cod in all_products:
-        current = this_year_sales.get(cod, 0)
-        previous = last_year_sales.get(cod, 0)
-        
-        # FIXED: Require minimum volume to classify as HOT/COLD
-        max_volume = max(current, previous)
-        if max_volume < MIN_VOLUME_FOR_TREND:
-            # Low volume = STABLE (can't trust trend on small numbers)
-            hot_cold[cod] = "STABLE"
-            continue
-        
-        if previous == 0:
-            # New product with decent volume
-            hot_cold[cod] = "HOT" if current >= 10 else "STABLE"
-        elif current == 0:
-            # FIXED: Product that stopped selling is COLD, not ignored
-            hot_cold[cod] = "COLD"
-        else:
-            change = (current - previous) / previous
-            if change > 0.20:
-                hot_cold[cod] = "HOT"
-            elif change < -0.20:
-                hot_cold[cod] = "COLD"
-            else:
-                hot_cold[cod] = "STABLE"
-    
-    hot_count = sum(1 for v in hot_cold.values() if v == "HOT")
-    cold_count = sum(1 for v in hot_cold.values() if v == "COLD")
+    current_months = [(CURRENT_MONTH - i - 1) % 12 + 1 for i in range(period_months)]
+    
+    # SKU × period matrix: [this year, same months last year]
+    in_months = df["MONTH"].isin(current_months)
+    period = np.select(
+        [(df["YEAR"] == current_year) & in_months, (df["YEAR"] == current_year - 1) & in_months],
+        [0, 1], default=-1
+    )
+    periods = df.loc[period >= 0, ["COD ARTICOL", "CANTITATE FACTURATA"]].assign(PERIOD=period[period >= 0])
+    matrix = (periods.groupby(["COD ARTICOL", "PERIOD"], observed=True)["CANTITATE FACTURATA"].sum()
+              .unstack(fill_value=0).reindex(columns=[0, 1], fill_value=0))
+    current = matrix[0].to_numpy(dtype=float)
+    previous = matrix[1].to_numpy(dtype=float)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(previous != 0, (current - previous) / previous, 0.0)
+    
+    trend = np.select(
+        [
+            np.maximum(current, previous) < MIN_VOLUME_FOR_TREND,  # Low volume: can't trust trend
+            (previous == 0) & (current >= 10),                      # New product with decent volume
+            previous == 0,
+            current == 0,                                           # Stopped selling = COLD
+            change > 0.20,
+            change < -0.20,
+        ],
+        ["STABLE", "HOT", "STABLE", "COLD", "HOT", "COLD"],
+        default="STABLE",
+    )
+    hot_cold = pd.Series(trend, index=matrix.index)
+    
+    hot_count = int((hot_cold == "HOT").sum())
+    cold_count = int((hot_cold == "COLD").sum())
     print(f"Hot/Cold: {hot_count} HOT, {cold_count} COLD, {len(hot_cold) - hot_count - cold_count} STABLE")
     
     return hot_cold
@@ -205,35 +172,36 @@ def main():
     print("COMPUTE SEASONALITY INDEX & RISING STARS")
     print("=" * 60)
     
-    # Load data
-    df = load_historical_data()
-    
-    # Filter
-    df = filter_client_final(df)
+    # Rising-star window: 3 years ending at the year given on the command line
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    last_year = int(args[0]) if args else RISING_STAR_YEARS[-1]
+    years = list(range(last_year - len(RISING_STAR_YEARS) + 1, last_year + 1))
     
-    # Parse dates
-    df = parse_dates(df)
+    # Load monthly sales (Client Final filter is applied while streaming)
+    df = load_historical_data(full="--full" in sys.argv)
     
     # Compute indices
     print("\nCalculating seasonality index...")
     seasonality = compute_seasonality_index(df)
     
     print("\nIdentifying Rising Stars...")
-    rising_stars = compute_rising_stars(df)
+    rising_stars = compute_rising_stars(df, years)
     
     print("\nClassifying Hot/Cold...")
     hot_cold = compute_hot_cold(df)
     
     # Combine results
-    all_products = set(seasonality.keys()) | set(rising_stars.keys()) | set(hot_cold.keys())
-    result = {}
-    
-    for cod in all_products:
-        result[cod] = {
-            "seasonality_index": round(float(seasonality.get(cod, 1.0)), 2),
-            "is_rising_star": bool(rising_stars.get(cod, False)),
-            "trend": str(hot_cold.get(cod, "STABLE"))
-        }
+    seasonality = pd.Series(seasonality, dtype=float)
+    index = pd.Index(sorted(set(seasonality.index) | set(rising_stars.index) | set(hot_cold.index)))
+    columns = zip(
+        seasonality.reindex(index, fill_value=1.0).tolist(),
+        rising_stars.reindex(index, fill_value=False).astype(bool).tolist(),
+        hot_cold.reindex(index, fill_value="STABLE").astype(str).tolist(),
+    )
+    result = {
+        cod: {"seasonality_index": round(index_value, 2), "is_rising_star": rising, "trend": trend}
+        for cod, (index_value, rising, trend) in zip(index.tolist(), columns)
+    }
     
     # Save
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
@@ -14,6 +14,7 @@ import os
 import sys
 sys.path.append('.') # Add root to path
 from src.core.database import get_connection_string
+from src.core.history import aggregate_history, CLIENT_FILTER
 
 # ============================================================
 # CONFIGURARE CONEXIUNE PostgreSQL
@@ -24,14 +25,7 @@ DATABASE_URL = get_connection_string()
 # FISIERE
 # ============================================================
 MASTER_CSV = "data/Tcioara Forecast_.csv"
-HISTORY_FILES = [
-    "data/2019_2021.csv",
-    "data/2022_2024.csv",
-    "data/2025.csv"
-]
-
-# Filtru pentru vânzări (doar Client Final, nu B2B)
-CLIENT_FILTER = "Vanzari Magazin_Client Final"
+# Istoricul (data/2019_2021.csv, 2022_2024.csv, 2025.csv) vine din src/core/history.py
 
 # ============================================================
 # MAPPING COLOANE MASTER -> SQL
@@ -91,68 +85,38 @@ def load_master_data():
 
 
 def load_historical_data():
-    """Load and concatenate historical sales data"""
-    print(f"\n[2/5] Incarc date istorice...")
-    
-    all_dfs = []
-    for fpath in HISTORY_FILES:
-        if os.path.exists(fpath):
-            print(f"      Loading: {fpath}")
-            df = pd.read_csv(fpath, low_memory=False)
-            all_dfs.append(df)
-            print(f"      -> {len(df):,} rows")
-        else:
-            print(f"      SKIP (nu exista): {fpath}")
-    
-    if not all_dfs:
+    """Monthly Client Final sales per product, streamed from the history cache"""
+    print(f"\n[2/5] Incarc date istorice (agregare lunara in streaming)...")
+    
+    try:
+        monthly = aggregate_history(["COD ARTICOL", "YEAR", "MONTH"], ["CANTITATE FACTURATA"], client_final=True)
+    except FileNotFoundError:
         print("      ATENTIE: Nu s-au gasit fisiere istorice!")
         return pd.DataFrame()
     
-    combined = pd.concat(all_dfs, ignore_index=True)
-    print(f"      TOTAL istoric: {len(combined):,} rows")
-    return combined
+    print(f"      TOTAL istoric: {monthly['ROWS'].sum():,} rows")
+    return monthly
 
 
 def aggregate_monthly_sales(df_history):
     """
     Aggregate sales by COD ARTICOL and month.
-    Filter only for Client Final sales.
+    Filter only for Client Final sales (applied while streaming the cache).
     """
     print(f"\n[3/5] Agregare vanzari lunare (filtru: {CLIENT_FILTER})...")
     
     if df_history.empty:
-        return {}
-    
-    # Filter by client type
-    if 'CLIENT SPECIFIC' in df_history.columns:
-        df_filtered = df_history[df_history['CLIENT SPECIFIC'] == CLIENT_FILTER].copy()
-        print(f"      Dupa filtru Client Final: {len(df_filtered):,} rows")
-    else:
-        print("      ATENTIE: Coloana 'CLIENT SPECIFIC' nu exista, folosesc tot")
-        df_filtered = df_history.copy()
-    
-    if df_filtered.empty:
         print("      ATENTIE: Nu sunt date dupa filtrare!")
         return {}
     
-    # Parse date - column is 'DATA'
-    if 'DATA' in df_filtered.columns:
-        df_filtered['date_parsed'] = pd.to_datetime(df_filtered['DATA'], errors='coerce')
-    else:
-        print("      EROARE: Coloana 'DATA' nu exista!")
-        return {}
-    
-    # Extract YYYY-MM
-    df_filtered['year_month'] = df_filtered['date_parsed'].dt.strftime('%Y-%m')
-    
-    # Aggregate: sum CANTITATE FACTURATA per COD ARTICOL + year_month
-    qty_col = 'CANTITATE FACTURATA'
-    if qty_col not in df_filtered.columns:
-        print(f"      EROARE: Coloana '{qty_col}' nu exista!")
-        return {}
-    
-    agg = df_filtered.groupby(['COD ARTICOL', 'year_month'])[qty_col].sum().reset_index()
-    agg.rename(columns={qty_col: 'qty'}, inplace=True)
+    # Extract YYYY-MM from the monthly aggregate
+    agg = pd.DataFrame({
+        'COD ARTICOL': df_history['COD ARTICOL'].astype(str),
+        'year_month': (df_history['YEAR'].astype(int).astype(str) + '-'
+                       + df_history['MONTH'].astype(int).astype(str).str.zfill(2)),
+        'qty': df_history['CANTITATE FACTURATA'],
+    })
+    agg = agg.groupby(['COD ARTICOL', 'year_month'])['qty'].sum().reset_index()
     
     # Build dict: {cod_articol: {"2024-10": 50, "2024-11": 45, ...}}
     sales_history = {}
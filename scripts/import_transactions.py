@@ -6,24 +6,18 @@ Rulează cu: python scripts/import_transactions.py
 """
 import pandas as pd
 from sqlalchemy import create_engine, text
-import os
 import sys
 
 sys.path.append('.')
 from src.core.database import get_connection_string
+from src.core.history import aggregate_history
 
 # ============================================================
 # CONFIGURARE
 # ============================================================
 DATABASE_URL = get_connection_string()
 
-HISTORY_FILES = [
-    "data/2019_2021.csv",
-    "data/2022_2024.csv",
-    "data/2025.csv"
-]
-
-CLIENT_FILTER = "Vanzari Magazin_Client Final"
+# Istoricul CSV (Client Final) vine din cache-ul Parquet: src/core/history.py
 
 
 def create_transactions_table(engine):
@@ -60,47 +54,23 @@ def load_and_import_transactions(engine):
     """Load CSVs and import daily transactions"""
     print("[2/3] Încarc și import tranzacțiile zilnice...")
     
-    all_dfs = []
-    for fpath in HISTORY_FILES:
-        if os.path.exists(fpath):
-            print(f"      Loading: {fpath}")
-            df = pd.read_csv(fpath, low_memory=False)
-            all_dfs.append(df)
-            print(f"      -> {len(df):,} rows")
-        else:
-            print(f"      SKIP: {fpath}")
-    
-    if not all_dfs:
+    # Daily sums per product, aggregated batch by batch from the history cache
+    try:
+        daily = aggregate_history(
+            ["COD ARTICOL", "DAY"], ["CANTITATE FACTURATA", "VALOARE FACTURATA"],
+            client_final=True
+        )
+    except FileNotFoundError:
         print("      ❌ Nu s-au găsit fișiere!")
         return 0
     
-    combined = pd.concat(all_dfs, ignore_index=True)
-    print(f"      TOTAL brut: {len(combined):,} rows")
-    
-    # Filter by client type
-    if 'CLIENT SPECIFIC' in combined.columns:
-        df_filtered = combined[combined['CLIENT SPECIFIC'] == CLIENT_FILTER].copy()
-        print(f"      După filtru Client Final: {len(df_filtered):,} rows")
-    else:
-        df_filtered = combined.copy()
-    
-    # Parse date
-    df_filtered['data'] = pd.to_datetime(df_filtered['DATA'], errors='coerce', dayfirst=True)
-    df_filtered = df_filtered.dropna(subset=['data'])
-    
-    # Prepare columns for insert
-    df_insert = pd.DataFrame({
-        'cod_articol': df_filtered['COD ARTICOL'].astype(str),
-        'data': df_filtered['data'].dt.date,
-        'cantitate': pd.to_numeric(df_filtered['CANTITATE FACTURATA'], errors='coerce').fillna(0),
-        'valoare': pd.to_numeric(df_filtered['VALOARE FACTURATA'], errors='coerce').fillna(0)
-    })
-    
-    # Aggregate duplicates (same product, same day)
-    df_agg = df_insert.groupby(['cod_articol', 'data']).agg({
-        'cantitate': 'sum',
-        'valoare': 'sum'
-    }).reset_index()
+    # Prepare columns for insert (same product, same day already summed)
+    df_agg = pd.DataFrame({
+        'cod_articol': daily['COD ARTICOL'].astype(str),
+        'data': daily['DAY'].dt.date,
+        'cantitate': daily['CANTITATE FACTURATA'],
+        'valoare': daily['VALOARE FACTURATA']
+    }).sort_values(['cod_articol', 'data'], ignore_index=True)
     
     print(f"      După agregare: {len(df_agg):,} rows unice (produs + zi)")
     
@@ -20,8 +20,8 @@ def main():
     print("="*60)
     print("Acest script va:")
     print("1. Seta conexiunea către baza ta de date din Cloud")
-    print("2. Importa produsele și istoricul vânzărilor (din CSV-urile locale)")
-    print("3. Calcula segmentele și sugestiile de stoc pe server")
+    print("2. Importa produsele, istoricul și tranzacțiile (din CSV-urile locale)")
+    print("3. Calcula safety stock, segmentele, sugestiile de stoc și prognoza pe server")
     print("-" * 60)
 
     # 1. Get Connection String
@@ -56,30 +56,20 @@ def main():
         print("Verifică parola și dacă ai selectat 'Direct Connection' sau 'Transaction Pooler' (ambele merg, dar parola trebuie să fie corectă).")
         return
 
-    # 2. Run Import
+    # 2. Run the refresh pipeline (import, transactions, safety stock, segments, ...)
+    # Independent steps run in parallel; the new connection string invalidates the DB steps.
     print("\n" + "="*30)
-    print("[PASUL 2] Încep Importul de Date...")
+    print("[PASUL 2] Import Date & Calcul Segmente (pipeline)...")
     print("="*30)
     time.sleep(1)
     
     try:
-        import scripts.import_full_data as importer
-        importer.main()
-    except Exception as e:
-        print(f"❌ EROARE LA IMPORT: {e}")
-        return
-
-    # 3. Run Precompute
-    print("\n" + "="*30)
-    print("[PASUL 3] Calcul Segmente & Sugestii...")
-    print("="*30)
-    time.sleep(1)
-
-    try:
-        import scripts.precompute_segments as seg
-        seg.add_segment_column()
+        from scripts.run_pipeline import run as run_pipeline
+        if not run_pipeline():
+            print("❌ EROARE: unul dintre pașii pipeline-ului a eșuat (vezi raportul de mai sus).")
+            return
     except Exception as e:
-        print(f"❌ EROARE LA CALCUL SEGMENTE: {e}")
+        print(f"❌ EROARE LA PIPELINE: {e}")
         return
 
     print("\n" + "="*60)
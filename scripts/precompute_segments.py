@@ -1,11 +1,16 @@
 """
 Script pentru pre-calcularea segmentelor in PostgreSQL
 Adauga coloana 'segment' si o populeaza bazat pe days_of_coverage
+(regulile de segmentare: src/core/segmentation.py)
 """
 from sqlalchemy import create_engine, text
 import sys
 sys.path.insert(0, '.')
 from src.core.database import get_engine, get_connection_string
+from src.core.safety_stock import (
+    EFFECTIVE_SAFETY_DAYS_SQL, ensure_safety_stock_columns, apply_safety_stock_refresh
+)
+from src.core.segmentation import update_metrics_sql, update_segments_sql
 
 def add_segment_column():
     """Add segment column and calculate segments in SQL"""
@@ -39,6 +44,12 @@ def add_segment_column():
         except Exception as e:
             print(f"   Eroare: {e}")
 
+        # Statistical safety stock columns (populated by compute_safety_stock.py)
+        try:
+            ensure_safety_stock_columns(conn)
+        except Exception as e:
+            print(f"   Eroare coloane safety stock: {e}")
+
         # ---------------------------------------------------------
         # UPDATE FROM CONFIG
         # ---------------------------------------------------------
@@ -88,6 +99,9 @@ def add_segment_column():
                         sql = f"UPDATE products SET {', '.join(update_parts)} WHERE furnizor = :s"
                         conn.execute(text(sql), query_params)
                 
+                # 3. Safety stock statistic (SS / ROP) pentru lead time-urile noi
+                apply_safety_stock_refresh(conn, config)
+                
                 conn.commit()
                 print("   [OK] Configuratie aplicata din JSON in DB")
             else:
@@ -95,62 +109,15 @@ def add_segment_column():
         except Exception as e:
             print(f"   [X] Eroare la citirea config: {e}")
         
-        # Calculate avg_daily_sales and days_of_coverage
+        # Calculate avg_daily_sales and days_of_coverage (4 luni, fallback 360 zile)
         print("[*] Calculare medie zilnica si zile acoperire...")
-        conn.execute(text("""
-            UPDATE products SET 
-                avg_daily_sales = COALESCE(vanzari_4luni, 0) / 120.0,
-                days_of_coverage = CASE 
-                    WHEN COALESCE(vanzari_4luni, 0) = 0 THEN 999
-                    ELSE (COALESCE(stoc_total, 0) + COALESCE(stoc_tranzit, 0)) / (COALESCE(vanzari_4luni, 0) / 120.0)
-                END
-        """))
+        conn.execute(text(update_metrics_sql()))
         conn.commit()
         print("   [OK] Calculat")
         
-        # Update segments based on days_of_coverage and lead_time
+        # Update segments - un singur UPDATE din tabelul de reguli (src/core/segmentation.py)
         print("[*] Calculare segmente...")
-        
-        # RESET ALL SEGMENTS TO NULL - force full recalculation
-        print("   [*] Resetare segmente existente...")
-        conn.execute(text("UPDATE products SET segment = NULL"))
-        conn.commit()
-        
-        # CRITICAL: days_of_coverage < lead_time_days
-        conn.execute(text("""
-            UPDATE products SET segment = 'CRITICAL'
-            WHERE days_of_coverage < COALESCE(lead_time_days, 30)
-        """))
-        
-        # URGENT: lead_time <= days_of_coverage < lead_time + safety_stock
-        conn.execute(text("""
-            UPDATE products SET segment = 'URGENT'
-            WHERE segment IS NULL 
-            AND days_of_coverage >= COALESCE(lead_time_days, 30)
-            AND days_of_coverage < (COALESCE(lead_time_days, 30) + COALESCE(safety_stock_days, 7))
-        """))
-        
-        # ATTENTION: slight buffer zone
-        conn.execute(text("""
-            UPDATE products SET segment = 'ATTENTION'
-            WHERE segment IS NULL 
-            AND days_of_coverage >= (COALESCE(lead_time_days, 30) + COALESCE(safety_stock_days, 7))
-            AND days_of_coverage < (COALESCE(lead_time_days, 30) + COALESCE(safety_stock_days, 7) + 30)
-        """))
-        
-        # OVERSTOCK: very high coverage (>180 days)
-        conn.execute(text("""
-            UPDATE products SET segment = 'OVERSTOCK'
-            WHERE segment IS NULL 
-            AND days_of_coverage > 180
-        """))
-        
-        # OK: everything else
-        conn.execute(text("""
-            UPDATE products SET segment = 'OK'
-            WHERE segment IS NULL
-        """))
-        
+        conn.execute(text(update_segments_sql()))
         conn.commit()
         print("   [OK] Segmente calculate")
         
@@ -169,7 +136,9 @@ def add_segment_column():
         # Calculate suggested_qty in SQL (same logic as Product.suggested_order_qty)
         # Formula: (avg_daily * coverage_days) - current_stock, rounded to MOQ
         # Dead Stock rule: if vanzari_360z < 3, suggested = 0
-        conn.execute(text("""
+        # Safety stock in zile: SS statistic / medie zilnica (fallback: safety_stock_days)
+        safety_days = EFFECTIVE_SAFETY_DAYS_SQL
+        conn.execute(text(f"""
             UPDATE products SET 
                 suggested_qty = CASE
                     -- Dead Stock: < 3 vânzări în 360 zile
@@ -182,7 +151,7 @@ def add_segment_column():
                                 (
                                     -- Cantitate necesară pentru acoperire
                                     (COALESCE(avg_daily_sales, 0) * 
-                                        (COALESCE(lead_time_days, 30) + 30 + COALESCE(safety_stock_days, 7))
+                                        (COALESCE(lead_time_days, 30) + 30 + {safety_days})
                                     )
                                     -- Minus stoc actual
                                     - (COALESCE(stoc_total, 0) + COALESCE(stoc_tranzit, 0))
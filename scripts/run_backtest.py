@@ -0,0 +1,105 @@
+"""
+Script pentru backtest-ul politicilor de reaprovizionare.
+Reia zi cu zi vânzările din sales_transactions pentru toate SKU-urile și
+compară politicile (builder / Formula 3.0 / ROP statistic):
+fill rate, zile stock-out, valoare medie stoc, număr comenzi.
+
+Rulează cu: python scripts/run_backtest.py [ani] [zile_review]
+"""
+import time
+import sys
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.append('.')
+from src.core.database import get_connection_string
+from src.core.config import load_supplier_config
+from src.core.backtest import (
+    WARMUP_DAYS, SkuParams, build_daily_matrix, run_backtest
+)
+from src.core.safety_stock import DEFAULT_SERVICE_LEVEL
+from src.models.product import extract_family_dimension, DIMENSION_COEFFICIENTS
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+DATABASE_URL = get_connection_string()
+OUTPUT_PATH = "data/backtest_summary.csv"
+
+
+def load_inputs(engine, years: int):
+    """Transactions for the replay window (+ warm-up) and per-SKU parameters."""
+    print(f"[1/3] Încarc tranzacțiile (ultimii {years} ani + {WARMUP_DAYS} zile warm-up)...")
+    tx = pd.read_sql(text("""
+        SELECT cod_articol, data, SUM(cantitate) AS cantitate
+        FROM sales_transactions
+        WHERE data > (SELECT MAX(data) FROM sales_transactions) - CAST(:days AS INT)
+        GROUP BY cod_articol, data
+    """), engine, params={"days": years * 365 + WARMUP_DAYS})
+    print(f"      -> {len(tx):,} rânduri (produs + zi)")
+
+    products = pd.read_sql(text("""
+        SELECT cod_articol, denumire, lead_time_days, moq, safety_stock_days, cost_achizitie
+        FROM products
+    """), engine)
+    products["cod_articol"] = products["cod_articol"].astype(str)
+    return tx, products.drop_duplicates("cod_articol").set_index("cod_articol")
+
+
+def build_params(products: pd.DataFrame, sku_index: pd.Index, config: dict) -> SkuParams:
+    """Align product parameters to the demand matrix rows."""
+    default = config.get("default", {})
+    p = products.reindex(sku_index)
+
+    fam_dim = p["denumire"].fillna("").astype(str).apply(extract_family_dimension)
+    family = fam_dim.str[0].fillna("")
+    width = fam_dim.str[1].fillna("").str.split("x").str[0]
+
+    return SkuParams(
+        lead_time_days=pd.to_numeric(p["lead_time_days"], errors="coerce").fillna(default.get("lead_time_days", 30)).values,
+        moq=pd.to_numeric(p["moq"], errors="coerce").fillna(default.get("moq", 1)).values,
+        safety_stock_days=pd.to_numeric(p["safety_stock_days"], errors="coerce").fillna(default.get("safety_stock_days", 7)).values,
+        unit_cost=pd.to_numeric(p["cost_achizitie"], errors="coerce").fillna(0).values,
+        dimension_coefficient=width.map(DIMENSION_COEFFICIENTS).fillna(1.0).values,
+        has_family=(family.str.len() > 0).values,
+        service_level=default.get("service_level", DEFAULT_SERVICE_LEVEL),
+    )
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    review_days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+
+    print("=" * 60)
+    print("BACKTEST POLITICI REAPROVIZIONARE")
+    print("=" * 60)
+
+    engine = create_engine(DATABASE_URL)
+    tx, products = load_inputs(engine, years)
+    if tx.empty:
+        print("\n❌ Nu există tranzacții! Rulează întâi scripts/import_transactions.py")
+        return
+
+    print("[2/3] Construire matrice cerere zilnică...")
+    codes = products.index.intersection(tx["cod_articol"].astype(str).unique())
+    D, sku_index, days = build_daily_matrix(tx, codes)
+    print(f"      -> {D.shape[0]:,} SKU × {D.shape[1]:,} zile ({days[0].date()} → {days[-1].date()})")
+    params = build_params(products, sku_index, load_supplier_config())
+
+    print(f"[3/3] Simulare (review la {review_days} zile)...")
+    t0 = time.time()
+    summary, _ = run_backtest(D, params, review_days=review_days)
+    print(f"      -> {time.time() - t0:.1f}s")
+
+    print("\n[+] REZULTATE:")
+    print("-" * 60)
+    with pd.option_context("display.float_format", "{:,.3f}".format, "display.width", 160):
+        print(summary)
+
+    summary.to_csv(OUTPUT_PATH)
+    print(f"\n[OK] Salvat: {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
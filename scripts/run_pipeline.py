@@ -0,0 +1,130 @@
+"""
+Script pentru reîmprospătarea completă a datelor (pipeline cu dependențe).
+
+Pașii (și ce citesc / scriu) sunt declarați mai jos; un pas rulează doar dacă
+s-au schimbat intrările, codul sau un pas anterior. Pașii independenți
+(sezonalitate, trenduri avansate, tranzacții, import master) rulează în paralel.
+La final: durată, rânduri/s și memorie maximă pe pas.
+
+Rulează cu:
+    python scripts/run_pipeline.py                     # tot ce e neactualizat
+    python scripts/run_pipeline.py --force             # tot, indiferent de cache
+    python scripts/run_pipeline.py precompute_segments # un pas + dependențele lui
+    python scripts/run_pipeline.py --dry-run
+"""
+import argparse
+import hashlib
+import sys
+from datetime import datetime
+
+sys.path.append('.')
+from src.core.history import HISTORY_FILES, history_row_count
+from src.core.pipeline import Step, run_pipeline, format_report, DEFAULT_WORKERS
+
+# ============================================================
+# CONFIGURARE
+# ============================================================
+MASTER_CSV = "data/Tcioara Forecast_.csv"
+SUPPLIER_CONFIG = "data/supplier_config.json"
+HISTORY = [str(f) for f in HISTORY_FILES]
+HISTORY_CODE = ["src/core/history.py"]
+
+
+def _database_key() -> str:
+    """Which database the DB steps write to (a new target DB invalidates them)."""
+    try:
+        from src.core.database import get_connection_string
+        return hashlib.sha1(get_connection_string().encode()).hexdigest()[:12]
+    except Exception:
+        return "unknown"
+
+
+def _current_month() -> str:
+    """Seasonality / trends depend on today's month, not only on the data."""
+    return datetime.now().strftime("%Y-%m")
+
+
+def _table_rows(table: str, where: str = None):
+    def count() -> int:
+        from sqlalchemy import text
+        from src.core.database import get_engine
+        query = f"SELECT COUNT(*) FROM {table}" + (f" WHERE {where}" if where else "")
+        with get_engine().connect() as conn:
+            return conn.execute(text(query)).scalar()
+    return count
+
+
+def _db_params():
+    return {"db": _database_key()}
+
+
+STEPS = [
+    Step("history_cache", "src.core.history", "build_cache",
+         inputs=HISTORY, outputs=[], rows=history_row_count),
+    Step("import_full_data", "scripts.import_full_data",
+         inputs=[MASTER_CSV, SUPPLIER_CONFIG] + HISTORY, outputs=["db:products"],
+         depends=["history_cache"], code=HISTORY_CODE, params=_db_params, rows=_table_rows("products")),
+    Step("import_transactions", "scripts.import_transactions",
+         inputs=HISTORY, outputs=["db:sales_transactions"],
+         depends=["history_cache"], code=HISTORY_CODE, params=_db_params, rows=history_row_count),
+    Step("compute_seasonality", "scripts.compute_seasonality",
+         inputs=HISTORY, outputs=["data/seasonality_index.json"],
+         depends=["history_cache"], code=HISTORY_CODE,
+         params=lambda: {"month": _current_month()}, rows=history_row_count),
+    Step("compute_advanced_trends", "scripts.compute_advanced_trends",
+         inputs=HISTORY, outputs=["data/advanced_trends.json"],
+         depends=["history_cache"], code=HISTORY_CODE,
+         params=lambda: {"month": _current_month()}, rows=history_row_count),
+    Step("reference_data", "src.core.reference_data", "load_reference",
+         inputs=["data/seasonality_index.json", "data/advanced_trends.json", "data/CUBAJ SI URL.csv"],
+         outputs=["data/reference_cache/reference.parquet"],
+         depends=["compute_seasonality", "compute_advanced_trends"], code=["src/core/cubaj_loader.py"]),
+    Step("compute_safety_stock", "scripts.compute_safety_stock",
+         inputs=[SUPPLIER_CONFIG], outputs=["db:products.safety_stock_qty"],
+         depends=["import_full_data", "import_transactions"], code=["src/core/safety_stock.py"],
+         params=_db_params, rows=_table_rows("products", "safety_stock_qty IS NOT NULL")),
+    Step("precompute_segments", "scripts.precompute_segments", "add_segment_column",
+         inputs=[SUPPLIER_CONFIG], outputs=["db:products.segment"],
+         depends=["import_full_data", "compute_safety_stock"],
+         code=["src/core/segmentation.py", "src/core/safety_stock.py"],
+         params=_db_params, rows=_table_rows("products")),
+    Step("compute_affinity", "scripts.compute_affinity",
+         inputs=HISTORY, outputs=["db:product_affinity", "db:family_affinity"],
+         depends=["history_cache", "import_full_data"], code=HISTORY_CODE + ["src/core/affinity.py"],
+         params=_db_params, rows=_table_rows("product_affinity")),
+    Step("compute_forecast", "scripts.compute_forecast",
+         outputs=["db:forecast"], depends=["import_full_data"], code=["src/core/forecasting.py"],
+         params=_db_params, rows=_table_rows("products")),
+]
+
+
+def run(targets=None, force=False, workers=DEFAULT_WORKERS, dry_run=False):
+    """Run the pipeline and print the report; returns True if no step failed."""
+    print("=" * 60)
+    print("PIPELINE REÎMPROSPĂTARE DATE")
+    print("=" * 60)
+
+    results = run_pipeline(STEPS, targets=targets, force=force, workers=workers, dry_run=dry_run)
+
+    print("\n[+] RAPORT:")
+    print(format_report(results))
+    failed = [r for r in results if r.status == "failed"]
+    for r in failed:
+        print(f"\n❌ {r.name}:\n{r.error}")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline reîmprospătare date")
+    parser.add_argument("targets", nargs="*", help="Pași de rulat (implicit: toți)")
+    parser.add_argument("--force", action="store_true", help="Ignoră cache-ul de amprente")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Pași rulați în paralel")
+    parser.add_argument("--dry-run", action="store_true", help="Doar afișează ce ar rula")
+    args = parser.parse_args()
+
+    ok = run(args.targets or None, args.force, args.workers, args.dry_run)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,34 +7,33 @@ Generates comprehensive client-level analysis for Top Management:
 3. Pareto Analysis (Top 20% clients contribution)
 4. Average Order Value by segment
 5. Client Lifetime Value estimation
+
+Recurrence, Pareto and value thresholds are reductions over the sparse
+client × product matrix (src/core/client_matrix.py).
 """
 
 import pandas as pd
-from pathlib import Path
+import sys
 from datetime import datetime
 
+sys.path.append('.')
+from src.core.history import aggregate_history
+from src.core.client_matrix import RECURRENCE_SEGMENTS, build_client_matrix
+
 # Configuration
-DATA_DIR = Path("data")
 OUTPUT_FILE = "strategic_analysis_enhanced.md"
 
 def load_all_data():
-    """Load and concatenate all historical CSV files."""
-    files = [
-        DATA_DIR / "2019_2021.csv",
-        DATA_DIR / "2022_2024.csv",
-        DATA_DIR / "2025.csv"
-    ]
-    
-    dfs = []
-    for f in files:
-        if f.exists():
-            print(f"Loading {f.name}...")
-            df = pd.read_csv(f, low_memory=False)
-            dfs.append(df)
-    
-    combined = pd.concat(dfs, ignore_index=True)
-    print(f"Total rows: {len(combined):,}")
-    return combined
+    """
+    Sales per (client type, client, year) for all client types, aggregated while
+    streaming the shared history cache (src/core/history.py).
+    """
+    df = aggregate_history(
+        ["CLIENT SPECIFIC", "ID CLIENT", "YEAR"], ["CANTITATE FACTURATA", "VALOARE FACTURATA"],
+        client_final=False, dropna=False
+    )
+    print(f"Total rows: {df['ROWS'].sum():,}")
+    return df
 
 
 def analyze_client_types(df):
@@ -58,31 +57,19 @@ def analyze_client_types(df):
     return client_types
 
 
-def analyze_recurrence(df):
+def analyze_recurrence(matrix):
     """Analyze customer recurrence patterns."""
     print("\n=== RECURRENCE ANALYSIS ===")
     
-    # Count purchases per client
-    client_purchases = df.groupby("ID CLIENT").agg({
-        "DATA": "count",  # Number of transactions
-        "CANTITATE FACTURATA": "sum",
-        "VALOARE FACTURATA": "sum"
-    }).reset_index()
-    
-    client_purchases.columns = ["ID_Client", "Nr_Tranzactii", "Cantitate_Total", "Valoare_Total"]
-    
-    # Categorize clients
-    def categorize(n):
-        if n == 1:
-            return "One-Time"
-        elif n <= 3:
-            return "Occasional (2-3)"
-        elif n <= 10:
-            return "Regular (4-10)"
-        else:
-            return "VIP (11+)"
-    
-    client_purchases["Segment"] = client_purchases["Nr_Tranzactii"].apply(categorize)
+    # Purchases per client = row sums of the client × product matrix
+    totals = matrix.client_totals()
+    client_purchases = pd.DataFrame({
+        "ID_Client": totals.index,
+        "Nr_Tranzactii": totals["orders"].to_numpy(),
+        "Cantitate_Total": totals["quantity"].to_numpy(),
+        "Valoare_Total": totals["value"].to_numpy(),
+        "Segment": matrix.recurrence_segments().to_numpy(),
+    })
     
     # Aggregate by segment
     recurrence = client_purchases.groupby("Segment").agg({
@@ -97,8 +84,8 @@ def analyze_recurrence(df):
     recurrence["% Valoare"] = (recurrence["Valoare RON"] / recurrence["Valoare RON"].sum() * 100).round(1)
     recurrence["Valoare Medie/Client"] = (recurrence["Valoare RON"] / recurrence["Nr Clienti"]).round(2)
     
-    # Sort by importance
-    order = {"VIP (11+)": 0, "Regular (4-10)": 1, "Occasional (2-3)": 2, "One-Time": 3}
+    # Sort by importance (most orders first)
+    order = {label: -i for i, (label, _) in enumerate(RECURRENCE_SEGMENTS)}
     recurrence["_sort"] = recurrence["Segment"].map(order)
     recurrence = recurrence.sort_values("_sort").drop("_sort", axis=1)
     
@@ -106,33 +93,12 @@ def analyze_recurrence(df):
     return recurrence, client_purchases
 
 
-def analyze_pareto(df, client_purchases):
+def analyze_pareto(matrix):
     """Pareto analysis - Top 20% clients contribution."""
     print("\n=== PARETO ANALYSIS (80/20 Rule) ===")
     
-    # Sort clients by value
-    sorted_clients = client_purchases.sort_values("Valoare_Total", ascending=False)
-    sorted_clients["Cumsum_Valoare"] = sorted_clients["Valoare_Total"].cumsum()
-    total_value = sorted_clients["Valoare_Total"].sum()
-    sorted_clients["Cumsum_%"] = (sorted_clients["Cumsum_Valoare"] / total_value * 100)
-    
-    total_clients = len(sorted_clients)
-    top_20_count = int(total_clients * 0.20)
-    top_10_count = int(total_clients * 0.10)
-    top_5_count = int(total_clients * 0.05)
-    top_1_count = int(total_clients * 0.01)
-    
-    top_20_value = sorted_clients.head(top_20_count)["Valoare_Total"].sum()
-    top_10_value = sorted_clients.head(top_10_count)["Valoare_Total"].sum()
-    top_5_value = sorted_clients.head(top_5_count)["Valoare_Total"].sum()
-    top_1_value = sorted_clients.head(top_1_count)["Valoare_Total"].sum()
-    
-    pareto = {
-        "Top 1%": {"clients": top_1_count, "value": top_1_value, "share": top_1_value/total_value*100},
-        "Top 5%": {"clients": top_5_count, "value": top_5_value, "share": top_5_value/total_value*100},
-        "Top 10%": {"clients": top_10_count, "value": top_10_value, "share": top_10_value/total_value*100},
-        "Top 20%": {"clients": top_20_count, "value": top_20_value, "share": top_20_value/total_value*100},
-    }
+    # Cumulative value curve over clients sorted by value
+    pareto = {f"Top {share * 100:.0f}%": v for share, v in matrix.pareto().items()}
     
     for k, v in pareto.items():
         print(f"{k}: {v['clients']:,} clienti = {v['share']:.1f}% din valoare ({v['value']:,.0f} RON)")
@@ -140,11 +106,11 @@ def analyze_pareto(df, client_purchases):
     return pareto
 
 
-def analyze_value_thresholds(client_purchases):
+def analyze_value_thresholds(matrix):
     """Analyze value thresholds for client segmentation."""
     print("\n=== VALUE THRESHOLDS ===")
     
-    quantiles = client_purchases["Valoare_Total"].quantile([0.25, 0.50, 0.75, 0.90, 0.95, 0.99])
+    quantiles = matrix.value_thresholds()
     
     print("Praguri de valoare (RON):")
     print(f"  25% clienti sub: {quantiles[0.25]:,.0f} RON")
@@ -161,8 +127,6 @@ def analyze_yearly_trends(df):
     """Analyze trends by year."""
     print("\n=== YEARLY TRENDS ===")
     
-    df["YEAR"] = pd.to_datetime(df["DATA"], format="%d.%m.%Y", errors="coerce").dt.year
-    
     yearly = df.groupby("YEAR").agg({
         "CANTITATE FACTURATA": "sum",
         "VALOARE FACTURATA": "sum",
@@ -289,15 +253,12 @@ def main():
     print("=" * 60)
     
     df = load_all_data()
-    
-    # Convert values to numeric
-    df["CANTITATE FACTURATA"] = pd.to_numeric(df["CANTITATE FACTURATA"], errors="coerce").fillna(0)
-    df["VALOARE FACTURATA"] = pd.to_numeric(df["VALOARE FACTURATA"], errors="coerce").fillna(0)
+    matrix = build_client_matrix(client_final=False)
     
     client_types = analyze_client_types(df)
-    recurrence, client_purchases = analyze_recurrence(df)
-    pareto = analyze_pareto(df, client_purchases)
-    thresholds = analyze_value_thresholds(client_purchases)
+    recurrence, client_purchases = analyze_recurrence(matrix)
+    pareto = analyze_pareto(matrix)
+    thresholds = analyze_value_thresholds(matrix)
     yearly = analyze_yearly_trends(df)
     
     generate_report(client_types, recurrence, pareto, thresholds, yearly)
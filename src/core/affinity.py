@@ -0,0 +1,155 @@
+"""
+Co-purchase Affinity
+Which SKUs / families are bought together by the same client on the same day.
+
+A basket is one (ID CLIENT, day). The baskets × SKUs incidence matrix B is
+sparse; co-occurrence counts are the sparse product Bᵀ·B, computed one block of
+antecedent SKUs at a time and pruned to the top-k consequents per SKU, so the
+full SKU × SKU matrix is never materialized.
+
+For a pair (a -> b):
+- baskets: baskets containing both
+- confidence: baskets(a, b) / baskets(a)
+- lift: confidence / (baskets(b) / total baskets)  (> 1 = bought together more than by chance)
+Family affinity uses the same computation on the baskets × families matrix.
+"""
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.models.product import extract_family_dimension
+
+# ============================================================
+# CONFIG
+# ============================================================
+TOP_K = 20                 # Related items kept per SKU / family
+MIN_PAIR_BASKETS = 3       # Pairs seen in fewer baskets are noise
+BLOCK_SIZE = 2_000         # Antecedent SKUs per sparse product block
+
+AFFINITY_COLUMNS = ["cod_articol", "related_cod", "baskets", "confidence", "lift"]
+
+
+def _codes(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), pd.Index(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+
+def basket_matrix(lines: pd.DataFrame, item_column: str = "COD ARTICOL") -> Tuple[sp.csr_matrix, pd.Index]:
+    """
+    Binary baskets × items matrix.
+
+    Args:
+        lines: One row per (ID CLIENT, DAY, item) - e.g. aggregate_history on those keys
+    """
+    client, _ = _codes(lines["ID CLIENT"])
+    day, _ = _codes(lines["DAY"])
+    items, labels = _codes(lines[item_column])
+    keep = (client >= 0) & (day >= 0) & (items >= 0)
+    if not keep.any():
+        return sp.csr_matrix((0, len(labels)), dtype=np.int32), labels
+    basket, _ = pd.factorize(client[keep] * (day.max() + 1) + day[keep])
+
+    matrix = sp.coo_matrix(
+        (np.ones(keep.sum(), dtype=np.int32), (basket, items[keep])),
+        shape=(int(basket.max()) + 1, len(labels)),
+    ).tocsr()
+    matrix.data[:] = 1  # duplicates summed by tocsr -> presence
+    return matrix, labels
+
+
+def _top_k_per_row(rows, cols, counts, lift, top_k):
+    """Keep the top_k entries of every row by lift, then co-occurrence count."""
+    order = np.lexsort((-counts, -lift, rows))
+    rows, cols, counts, lift = rows[order], cols[order], counts[order], lift[order]
+    idx = np.arange(len(rows))
+    first = np.r_[True, rows[1:] != rows[:-1]] if len(rows) else np.zeros(0, dtype=bool)
+    rank = idx - np.maximum.accumulate(np.where(first, idx, 0))
+    keep = rank < top_k
+    return rows[keep], cols[keep], counts[keep], lift[keep]
+
+
+def affinity_pairs(baskets: sp.csr_matrix, labels: pd.Index, top_k: int = TOP_K,
+                   min_baskets: int = MIN_PAIR_BASKETS, block_size: int = BLOCK_SIZE) -> pd.DataFrame:
+    """
+    Top-k associated items per item from a binary baskets × items matrix.
+
+    Returns:
+        DataFrame with AFFINITY_COLUMNS (cod_articol = antecedent)
+    """
+    n_baskets = baskets.shape[0]
+    item_baskets = baskets.getnnz(axis=0).astype(float)
+    # Single-item baskets add no pairs
+    multi = baskets[baskets.getnnz(axis=1) > 1]
+    transposed = multi.T.tocsr()
+
+    parts = []
+    for start in range(0, multi.shape[1], block_size):
+        block = (transposed[start:start + block_size] @ multi).tocoo()
+        rows = block.row.astype(np.int64) + start
+        cols = block.col.astype(np.int64)
+        counts = block.data.astype(float)
+        keep = (rows != cols) & (counts >= min_baskets)
+        rows, cols, counts = rows[keep], cols[keep], counts[keep]
+        lift = counts * n_baskets / (item_baskets[rows] * item_baskets[cols])
+        rows, cols, counts, lift = _top_k_per_row(rows, cols, counts, lift, top_k)
+        parts.append(pd.DataFrame({
+            "cod_articol": labels[rows],
+            "related_cod": labels[cols],
+            "baskets": counts.astype(int),
+            "confidence": counts / item_baskets[rows],
+            "lift": lift,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=AFFINITY_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def family_map(products: pd.DataFrame) -> pd.Series:
+    """cod_articol -> family (from denumire), products without a family dropped."""
+    families = products["denumire"].astype(str).map(lambda name: extract_family_dimension(name)[0])
+    result = pd.Series(families.to_numpy(), index=products["cod_articol"].astype(str).to_numpy())
+    return result[result != ""]
+
+
+def family_baskets(baskets: sp.csr_matrix, labels: pd.Index, families: pd.Series) -> Tuple[sp.csr_matrix, pd.Index]:
+    """Binary baskets × families matrix (B · SKU→family indicator)."""
+    family_of = families.reindex(labels.astype(str))
+    fam_codes, fam_labels = pd.factorize(family_of)
+    has_family = fam_codes >= 0
+    indicator = sp.coo_matrix(
+        (np.ones(has_family.sum()), (np.flatnonzero(has_family), fam_codes[has_family])),
+        shape=(len(labels), len(fam_labels)),
+    ).tocsr()
+    matrix = (baskets @ indicator).tocsr()
+    matrix.data[:] = 1
+    return matrix, pd.Index(fam_labels)
+
+
+def compute_affinity(lines: pd.DataFrame, products: pd.DataFrame = None,
+                     top_k: int = TOP_K, min_baskets: int = MIN_PAIR_BASKETS) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    SKU and family affinity tables.
+
+    Args:
+        lines: (ID CLIENT, DAY, COD ARTICOL) rows
+        products: cod_articol + denumire, for families (None = no family table)
+
+    Returns:
+        (sku_affinity, family_affinity); family table columns are renamed
+        familie / related_familie
+    """
+    baskets, labels = basket_matrix(lines)
+    sku = affinity_pairs(baskets, labels, top_k, min_baskets)
+
+    family = pd.DataFrame(columns=["familie", "related_familie", "baskets", "confidence", "lift"])
+    if products is not None and not products.empty:
+        fam_matrix, fam_labels = family_baskets(baskets, labels, family_map(products))
+        if len(fam_labels):
+            family = affinity_pairs(fam_matrix, fam_labels, top_k, min_baskets).rename(
+                columns={"cod_articol": "familie", "related_cod": "related_familie"})
+    return sku, family
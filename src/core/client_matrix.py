@@ -0,0 +1,173 @@
+"""
+Client × Product Matrix
+Sparse (CSR) clients × SKUs matrix with three layers built from the history:
+- quantity: CANTITATE FACTURATA
+- value: VALOARE FACTURATA
+- orders: invoice lines
+
+Client analytics become reductions over it instead of repeated group-bys on
+ID CLIENT:
+- row sums -> per-client totals (recurrence segments, Pareto curve, value thresholds)
+- column counts -> per-SKU unique / repeat clients (repeat rate, orders per client)
+Memory is proportional to the number of distinct (client, SKU) pairs.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.core.history import aggregate_history, aggregate_history_incremental
+
+# ============================================================
+# CONFIG
+# ============================================================
+CLIENT_COLUMN = "ID CLIENT"
+PRODUCT_COLUMN = "COD ARTICOL"
+QUANTITY_COLUMN = "CANTITATE FACTURATA"
+VALUE_COLUMN = "VALOARE FACTURATA"
+COUNT_COLUMN = "ROWS"
+
+# Recurrence segments: (label, max orders per client), first match wins
+RECURRENCE_SEGMENTS = [
+    ("One-Time", 1),
+    ("Occasional (2-3)", 3),
+    ("Regular (4-10)", 10),
+    ("VIP (11+)", None),
+]
+PARETO_SHARES = (0.01, 0.05, 0.10, 0.20)
+VALUE_QUANTILES = (0.25, 0.50, 0.75, 0.90, 0.95, 0.99)
+
+
+def _codes(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Integer codes (-1 = missing) and labels; categoricals reuse their codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), pd.Index(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+
+@dataclass
+class ClientMatrix:
+    clients: pd.Index
+    products: pd.Index
+    layers: Dict[str, sp.csr_matrix]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, quantity: Optional[str] = QUANTITY_COLUMN,
+                   value: Optional[str] = VALUE_COLUMN, count: Optional[str] = COUNT_COLUMN) -> "ClientMatrix":
+        """
+        Build from sales rows or a (client, product) aggregate. Duplicate pairs
+        are summed; without a `count` column every row counts as one order.
+        Rows with a missing client or product are ignored.
+        """
+        c_codes, clients = _codes(df[CLIENT_COLUMN])
+        p_codes, products = _codes(df[PRODUCT_COLUMN])
+        keep = (c_codes >= 0) & (p_codes >= 0)
+        rows, cols = c_codes[keep], p_codes[keep]
+        shape = (len(clients), len(products))
+
+        def layer(weights):
+            return sp.coo_matrix((weights, (rows, cols)), shape=shape).tocsr()
+
+        layers = {}
+        if quantity and quantity in df.columns:
+            layers["quantity"] = layer(df[quantity].to_numpy(dtype=float)[keep])
+        if value and value in df.columns:
+            layers["value"] = layer(df[value].to_numpy(dtype=float)[keep])
+        counts = (df[count].to_numpy(dtype=np.int64)[keep] if count and count in df.columns
+                  else np.ones(int(keep.sum()), dtype=np.int64))
+        layers["orders"] = layer(counts)
+        return cls(clients, products, layers)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.clients), len(self.products)
+
+    @property
+    def nnz(self) -> int:
+        return self.layers["orders"].nnz
+
+    # ------------------------------------------------------------
+    # Per-client reductions
+    # ------------------------------------------------------------
+
+    def client_totals(self) -> pd.DataFrame:
+        """Row sums of every layer, one row per client that bought anything."""
+        totals = {name: np.asarray(m.sum(axis=1)).ravel() for name, m in self.layers.items()}
+        seen = self.layers["orders"].getnnz(axis=1) > 0
+        return pd.DataFrame({name: t[seen] for name, t in totals.items()}, index=self.clients[seen])
+
+    def recurrence_segments(self, segments=RECURRENCE_SEGMENTS) -> pd.Series:
+        """Recurrence segment label per client, from its number of orders."""
+        totals = self.client_totals()
+        orders = totals["orders"].to_numpy()
+        conditions = [orders <= limit for _, limit in segments if limit is not None]
+        labels = [label for label, limit in segments if limit is not None]
+        default = next((label for label, limit in segments if limit is None), labels[-1])
+        return pd.Series(np.select(conditions, labels, default=default), index=totals.index)
+
+    def pareto(self, shares: Sequence[float] = PARETO_SHARES) -> Dict[float, dict]:
+        """
+        Value generated by the top `share` of clients (sorted by value).
+
+        Returns:
+            {share: {"clients": n, "value": v, "share": % of total value}}
+        """
+        values = np.sort(self.client_totals()["value"].to_numpy())[::-1]
+        cumulative = np.concatenate([[0.0], np.cumsum(values)])
+        total = cumulative[-1]
+        result = {}
+        for share in shares:
+            n = int(len(values) * share)
+            result[share] = {"clients": n, "value": cumulative[n],
+                             "share": cumulative[n] / total * 100 if total else 0.0}
+        return result
+
+    def value_thresholds(self, quantiles: Sequence[float] = VALUE_QUANTILES) -> pd.Series:
+        """Client value quantiles (linear interpolation, as Series.quantile)."""
+        values = self.client_totals()["value"].to_numpy()
+        return pd.Series(np.quantile(values, list(quantiles)), index=list(quantiles))
+
+    # ------------------------------------------------------------
+    # Per-product reductions
+    # ------------------------------------------------------------
+
+    def repeat_rates(self) -> pd.DataFrame:
+        """
+        Per SKU: unique_clients, repeat_rate (% of clients with > 1 order) and
+        avg_orders (orders per client), for SKUs with at least one client.
+        """
+        orders = self.layers["orders"]
+        unique_clients = orders.getnnz(axis=0)
+        repeat_clients = np.asarray((orders > 1).sum(axis=0)).ravel()
+        total_orders = np.asarray(orders.sum(axis=0)).ravel()
+        seen = unique_clients > 0
+        return pd.DataFrame({
+            "unique_clients": unique_clients[seen],
+            "repeat_rate": repeat_clients[seen] / unique_clients[seen] * 100,
+            "avg_orders": total_orders[seen] / unique_clients[seen],
+        }, index=self.products[seen])
+
+
+def build_client_matrix(client_final: bool = True, values: Sequence[str] = (QUANTITY_COLUMN, VALUE_COLUMN),
+                        incremental: Optional[str] = None, verbose: bool = True) -> ClientMatrix:
+    """
+    Stream the history cache once into a (client, SKU) aggregate and build the matrix.
+
+    Args:
+        client_final: Only Client Final sales
+        values: Value layers to include (orders are always counted)
+        incremental: State name for aggregate_history_incremental (None = full pass)
+    """
+    keys = [CLIENT_COLUMN, PRODUCT_COLUMN]
+    if incremental:
+        pairs = aggregate_history_incremental(incremental, keys, list(values), client_final=client_final,
+                                              verbose=verbose)
+    else:
+        pairs = aggregate_history(keys, list(values), client_final=client_final, verbose=verbose)
+    matrix = ClientMatrix.from_frame(pairs)
+    if verbose:
+        print(f"      Matrice clienți × produse: {matrix.shape[0]:,} × {matrix.shape[1]:,}, {matrix.nnz:,} perechi")
+    return matrix
@@ -3,11 +3,16 @@ Modul pentru încărcarea datelor de cubaj și masă din CUBAJ SI URL.csv
 Calculează volumul cilindric pentru covoare (rulouri).
 
 Formula: π × (D/2)² × H / 1.000.000 = m³
+
+Calculul e vectorizat pe coloane (fără iterrows). load_frame() întoarce un
+cadru indexat după cod_articol; reference_data îl păstrează în cache-ul
+Parquet (data/reference_cache/) și îl atașează produselor cu join_reference.
 """
-import pandas as pd
-import math
-from typing import Dict, Optional
 import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
 
 class CubajLoader:
     """
@@ -16,76 +21,84 @@ class CubajLoader:
     """
     
     DEFAULT_PATH = "data/CUBAJ SI URL.csv"
+    COLUMNS = ["cubaj_m3", "masa_kg", "product_url"]
+    NULL_VALUES = ["#null", "#NULL", "nan", "none", "None"]
     
     def __init__(self, csv_path: str = None):
         self.csv_path = csv_path or self.DEFAULT_PATH
-        self._cubaj_map: Dict[str, dict] = {}
-        self._loaded = False
+        self._frame: Optional[pd.DataFrame] = None
+        self._cubaj_map: Optional[Dict[str, dict]] = None
         self._stats = {"total": 0, "with_cubaj": 0, "missing_data": 0}
     
-    def load(self) -> Dict[str, dict]:
+    def load_frame(self) -> pd.DataFrame:
         """
-        Citește CSV-ul și returnează un dict cu cubaj și masă per cod articol.
+        Citește CSV-ul și calculează cubaj, masă și URL pe coloane.
         
         Returns:
-            Dict[cod_articol, {"cubaj_m3": float|None, "masa_kg": float|None}]
+            DataFrame indexat după cod_articol cu COLUMNS
+            (cubaj_m3 / masa_kg NaN = date lipsă, product_url "" = fără URL)
         """
-        if self._loaded:
-            return self._cubaj_map
+        if self._frame is not None:
+            return self._frame
         
+        self._frame = pd.DataFrame(columns=self.COLUMNS, index=pd.Index([], name="cod_articol", dtype=str))
         if not os.path.exists(self.csv_path):
             print(f"[CubajLoader] WARNING: File not found: {self.csv_path}")
-            self._loaded = True
-            return self._cubaj_map
+            return self._frame
             
         try:
-            df = pd.read_csv(self.csv_path, low_memory=False, encoding='utf-8')
+            df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=True, na_values=self.NULL_VALUES,
+                             encoding='utf-8')
             df.columns = [c.strip() for c in df.columns]
         except Exception as e:
             print(f"[CubajLoader] ERROR: Failed to read CSV: {e}")
-            self._loaded = True
-            return self._cubaj_map
+            return self._frame
         
-        for _, row in df.iterrows():
-            cod = self._get_string(row, "COD ARTICOL")
-            if not cod:
-                continue
-            
-            self._stats["total"] += 1
-            
-            # Extrage dimensiuni pentru cilindru
-            # Covoarele sunt rulouri: diametrul este lățimea ambalată, înălțimea ruloului este AMBALAT INALTIME
-            diametru = self._get_float(row, "AMBALAT DIAMETRU")
-            latime = self._get_float(row, "AMBALAT LATIME")
-            inaltime = self._get_float(row, "AMBALAT INALTIME")  # Înălțimea ruloului = înălțimea cilindrului
-            masa = self._get_float(row, "MASA")
-            
-            # Diametrul: preferă AMBALAT DIAMETRU, fallback la AMBALAT LATIME
-            d = diametru if diametru else latime
-            h = inaltime  # Înălțimea ruloului (nu lungimea covorului!)
-            
-            # Extract URL (Image)
-            url_poza = self._get_string(row, "URL POZA")
-            
-            # Calculează cubaj cilindric
-            if d and h:
-                cubaj = self._calculate_cylinder_volume(d, h)
-                self._stats["with_cubaj"] += 1
-            else:
-                cubaj = None
-                self._stats["missing_data"] += 1
-            
-            self._cubaj_map[cod] = {
-                "cubaj_m3": cubaj,
-                "masa_kg": masa,
-                "product_url": url_poza,  # Product page URL (not direct image)
-                "image_url": None  # Will be lazy-fetched from product_url
-            }
+        cod = self._strings(df, "COD ARTICOL")
+        df = df[cod != ""]
+        cod = cod[cod != ""]
+        
+        # Covoarele sunt rulouri: diametrul este lățimea ambalată, înălțimea ruloului este AMBALAT INALTIME
+        diametru = self._floats(df, "AMBALAT DIAMETRU")
+        latime = self._floats(df, "AMBALAT LATIME")
+        inaltime = self._floats(df, "AMBALAT INALTIME")  # Înălțimea ruloului (nu lungimea covorului!)
+        
+        # Diametrul: preferă AMBALAT DIAMETRU (lipsă sau 0 -> AMBALAT LATIME)
+        d = diametru.where(diametru.notna() & (diametru != 0), latime)
+        has_dims = d.notna() & (d != 0) & inaltime.notna() & (inaltime != 0)
+        cubaj = self._cylinder_volume(d, inaltime).where(has_dims)
         
-        self._loaded = True
+        frame = pd.DataFrame({
+            "cod_articol": cod,
+            "cubaj_m3": cubaj,
+            "masa_kg": self._floats(df, "MASA"),
+            "product_url": self._strings(df, "URL POZA"),  # Product page URL (not direct image)
+        })
+        # Același cod de mai multe ori: ultimul rând câștigă (ca vechiul dict)
+        self._frame = frame.drop_duplicates("cod_articol", keep="last").set_index("cod_articol")
+        
+        self._stats = {
+            "total": len(frame),
+            "with_cubaj": int(has_dims.sum()),
+            "missing_data": int((~has_dims).sum()),
+        }
         print(f"[CubajLoader] Loaded {self._stats['total']} products: "
               f"{self._stats['with_cubaj']} with cubaj, "
               f"{self._stats['missing_data']} missing data")
+        return self._frame
+    
+    def load(self) -> Dict[str, dict]:
+        """
+        Cubaj și masă per cod articol ca dict (compatibilitate cu get_cubaj_map).
+        
+        Returns:
+            Dict[cod_articol, {"cubaj_m3": float|None, "masa_kg": float|None, "product_url": str, "image_url": None}]
+        """
+        if self._cubaj_map is None:
+            frame = self.load_frame().astype(object)
+            frame = frame.where(frame.notna(), None)
+            frame["image_url"] = None  # Will be lazy-fetched from product_url
+            self._cubaj_map = frame.to_dict("index")
         return self._cubaj_map
     
     def get_stats(self) -> dict:
@@ -93,43 +106,32 @@ class CubajLoader:
         return self._stats.copy()
     
     @staticmethod
-    def _calculate_cylinder_volume(diameter_cm: float, height_cm: float) -> float:
+    def _cylinder_volume(diameter_cm: pd.Series, height_cm: pd.Series) -> pd.Series:
         """
-        Calculează volumul unui cilindru în metri cubi.
+        Volumul unui cilindru în metri cubi, pe coloane.
         
         Formula: π × r² × h
         Unde r = diameter / 2, totul în cm, convertit la m³
         
-        Args:
-            diameter_cm: Diametrul cilindrului în centimetri
-            height_cm: Înălțimea cilindrului în centimetri
-            
         Returns:
             Volumul în metri cubi (m³), rotunjit la 6 zecimale
         """
-        radius_cm = diameter_cm / 2
-        volume_cm3 = math.pi * (radius_cm ** 2) * height_cm
-        volume_m3 = volume_cm3 / 1_000_000  # cm³ → m³
-        return round(volume_m3, 6)
+        volume_cm3 = np.pi * (diameter_cm / 2) ** 2 * height_cm
+        return (volume_cm3 / 1_000_000).round(6)  # cm³ → m³
     
     @staticmethod
-    def _get_float(row, col: str) -> Optional[float]:
-        """Extrage valoare float din row, returnează None dacă invalid."""
-        val = row.get(col)
-        if pd.isna(val) or str(val).strip().lower() in ('#null', '', 'nan', 'none'):
-            return None
-        try:
-            return float(val)
-        except (ValueError, TypeError):
-            return None
+    def _floats(df: pd.DataFrame, col: str) -> pd.Series:
+        """Coloană numerică; lipsă / #null / text invalid -> NaN."""
+        if col not in df.columns:
+            return pd.Series(np.nan, index=df.index)
+        return pd.to_numeric(df[col].str.strip(), errors="coerce").astype("float64")
     
     @staticmethod
-    def _get_string(row, col: str) -> str:
-        """Extrage string din row."""
-        val = row.get(col, "")
-        if pd.isna(val):
-            return ""
-        return str(val).strip()
+    def _strings(df: pd.DataFrame, col: str) -> pd.Series:
+        """Coloană text fără spații la capete; lipsă -> ""."""
+        if col not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        return df[col].fillna("").astype(str).str.strip()
 
 
 # Singleton instance pentru refolosire
@@ -5,6 +5,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import pandas as pd
 import os
+import threading
 import streamlit as st
 
 # ============================================================
@@ -67,14 +68,40 @@ def get_connection_string():
     cfg = get_db_config()
     return f"postgresql://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['database']}"
 
+# Connection strings whose products table already has the safety stock columns
+# (failures are retried on the next engine, e.g. before the first import, and logged once)
+_schema_ready = set()
+_schema_failed = set()
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema(engine, conn_string):
+    """Add the safety stock columns once per database (queries select them unconditionally)."""
+    with _schema_lock:
+        if conn_string in _schema_ready:
+            return
+        from src.core.safety_stock import ensure_safety_stock_columns
+        try:
+            with engine.connect() as conn:
+                ensure_safety_stock_columns(conn)
+            _schema_ready.add(conn_string)
+        except Exception as e:
+            if conn_string not in _schema_failed:
+                _schema_failed.add(conn_string)
+                print(f"[get_engine] Safety stock columns not ensured: {e}")
+
+
 def get_engine():
     """Create SQLAlchemy engine with connection pooling"""
-    return create_engine(
-        get_connection_string(),
+    conn_string = get_connection_string()
+    engine = create_engine(
+        conn_string,
         pool_size=5,
         max_overflow=10,
         pool_pre_ping=True  # Validates connections before use
     )
+    _ensure_schema(engine, conn_string)
+    return engine
 
 # ============================================================
 # QUERY FUNCTIONS
@@ -144,6 +171,8 @@ def load_products_from_db(furnizor=None, stare_pm=None, limit=None, offset=0, or
             lead_time_days,
             safety_stock_days,
             moq,
+            safety_stock_qty,
+            reorder_point,
             sales_history,
             sales_last_3m
         FROM products
@@ -322,8 +351,108 @@ def get_segment_counts(furnizor=None, stare_pm=None):
         }
     return result
 
+# Server-side sort options for segment pages (whitelisted ORDER BY clauses)
+SEGMENT_SORTS = {
+    "coverage": "days_of_coverage ASC",
+    "value": "cost_achizitie * stoc_total DESC",
+    "sales": "vanzari_4luni DESC",
+    "name": "denumire ASC",
+    "code": "cod_articol ASC",
+    "relevance": "search_rank.match_order",  # Order of the search_index matches (_segment_source join)
+}
+
+
+def _segment_filters(segment, furnizor=None, stare_pm=None, search=None, codes=None):
+    """
+    WHERE clause + params shared by the segment page and count queries.
+    codes (e.g. search_index matches) restricts to those cod_articol values.
+    """
+    where = "WHERE segment = :segment"
+    params = {"segment": segment}
+    
+    if furnizor and furnizor != "ALL":
+        where += " AND furnizor = :furnizor"
+        params["furnizor"] = furnizor
+    
+    if stare_pm and stare_pm != "ALL":
+        where += " AND stare_pm = :stare_pm"
+        params["stare_pm"] = stare_pm
+    
+    if search:
+        where += " AND (cod_articol ILIKE :search OR denumire ILIKE :search)"
+        params["search"] = f"%{search.strip()}%"
+    
+    if codes is not None:
+        where += " AND cod_articol = ANY(:codes)"
+        params["codes"] = list(codes)
+    
+    return where, params
+
+
+def _segment_sort(segment, sort_by=None, codes=None):
+    """SEGMENT_SORTS key: urgency for CRITICAL/URGENT, value otherwise; "relevance" needs the codes filter."""
+    if sort_by not in SEGMENT_SORTS or (sort_by == "relevance" and codes is None):
+        return "coverage" if segment in ['CRITICAL', 'URGENT'] else "value"
+    return sort_by
+
+
+def _segment_source(segment, sort_by=None, codes=None):
+    """
+    FROM clause for segment pages. Relevance joins the match list with its
+    positions (one hash join) instead of an array_position scan per row.
+    """
+    if _segment_sort(segment, sort_by, codes) != "relevance":
+        return "products"
+    return ("products JOIN unnest(CAST(:codes AS text[])) WITH ORDINALITY AS search_rank(code, match_order)"
+            " ON search_rank.code = products.cod_articol")
+
+
+def _segment_order(segment, sort_by=None, codes=None):
+    """
+    ORDER BY for segment pages: urgency (days_of_coverage ascending) for
+    CRITICAL/URGENT, value otherwise; cod_articol makes the order total so
+    pages never overlap.
+    """
+    return f" ORDER BY {SEGMENT_SORTS[_segment_sort(segment, sort_by, codes)]}, cod_articol"
+
+
+def segment_export_query(segment=None, furnizor=None, stare_pm=None, sort_by=None, search=None, codes=None):
+    """
+    Full-table query (all columns, no LIMIT) for exports streamed with a
+    server-side cursor (exports.export_query). segment=None = whole inventory.
+    
+    Returns:
+        (query, params)
+    """
+    if segment:
+        where, params = _segment_filters(segment, furnizor, stare_pm, search, codes)
+        source = _segment_source(segment, sort_by, codes)
+        return f"SELECT products.* FROM {source} {where}{_segment_order(segment, sort_by, codes)}", params
+    
+    where, params = "WHERE 1=1", {}
+    if furnizor and furnizor != "ALL":
+        where += " AND furnizor = :furnizor"
+        params["furnizor"] = furnizor
+    if stare_pm and stare_pm != "ALL":
+        where += " AND stare_pm = :stare_pm"
+        params["stare_pm"] = stare_pm
+    return f"SELECT * FROM products {where} ORDER BY cod_articol", params
+
+
+@st.cache_data(ttl=300)
+def count_segment_products(segment, furnizor=None, stare_pm=None, search=None, codes=None) -> int:
+    """
+    Number of products in a segment with the same filters as load_segment_from_db.
+    Errors propagate (not cached): a DB failure must not look like an empty segment.
+    """
+    where, params = _segment_filters(segment, furnizor, stare_pm, search, codes)
+    with get_engine().connect() as conn:
+        return int(conn.execute(text(f"SELECT COUNT(*) FROM products {where}"), params).scalar() or 0)
+
+
 @st.cache_data(ttl=300)
-def load_segment_from_db(segment, furnizor=None, stare_pm=None, limit=500, offset=0):
+def load_segment_from_db(segment, furnizor=None, stare_pm=None, limit=500, offset=0, sort_by=None, search=None,
+                         codes=None):
     """
     Load products for a specific segment with pagination - FAST!
     
@@ -333,6 +462,9 @@ def load_segment_from_db(segment, furnizor=None, stare_pm=None, limit=500, offse
         stare_pm: Filter by PM status (None = all)
         limit: Max rows per page (default 500)
         offset: Starting row for pagination
+        sort_by: Key of SEGMENT_SORTS (None = urgency for CRITICAL/URGENT, value otherwise)
+        search: Substring of cod_articol / denumire (case-insensitive)
+        codes: Only these cod_articol values (tuple, e.g. search_index matches)
     
     Returns:
         pandas DataFrame with product data
@@ -372,35 +504,32 @@ def load_segment_from_db(segment, furnizor=None, stare_pm=None, limit=500, offse
             lead_time_days,
             safety_stock_days,
             moq,
+            safety_stock_qty,
+            reorder_point,
             avg_daily_sales,
             days_of_coverage,
             segment,
             sales_history,
             sales_last_3m
-        FROM products
-        WHERE segment = :segment
     """
-    params = {"segment": segment}
-    
-    if furnizor and furnizor != "ALL":
-        query += " AND furnizor = :furnizor"
-        params["furnizor"] = furnizor
-    
-    if stare_pm and stare_pm != "ALL":
-        query += " AND stare_pm = :stare_pm"
-        params["stare_pm"] = stare_pm
-    
-    # Order by urgency (days_of_coverage ascending for CRITICAL/URGENT)
-    if segment in ['CRITICAL', 'URGENT']:
-        query += " ORDER BY days_of_coverage ASC"
-    else:
-        query += " ORDER BY cost_achizitie * stoc_total DESC"  # By value
+    where, params = _segment_filters(segment, furnizor, stare_pm, search, codes)
+    query += f"FROM {_segment_source(segment, sort_by, codes)} " + where + _segment_order(segment, sort_by, codes)
     
     query += f" LIMIT {int(limit)} OFFSET {int(offset)}"
     
     engine = get_engine()
     return pd.read_sql(text(query), engine, params=params)
 
+@st.cache_data(ttl=3600)
+def load_search_catalogue() -> pd.DataFrame:
+    """Code, name and supplier of every product (input of search_index.SearchIndex)."""
+    engine = get_engine()
+    try:
+        return pd.read_sql(text("SELECT cod_articol, denumire, furnizor FROM products ORDER BY cod_articol"), engine)
+    except Exception as e:
+        print(f"[load_search_catalogue] Error: {e}")
+        return pd.DataFrame(columns=["cod_articol", "denumire", "furnizor"])
+
 # ============================================================
 # SUBCLASS ORDER BUILDER FUNCTIONS
 # ============================================================
@@ -545,6 +674,8 @@ def load_subclass_products(furnizor: str, subclasa: str, limit: int = None, offs
             lead_time_days,
             safety_stock_days,
             moq,
+            safety_stock_qty,
+            reorder_point,
             avg_daily_sales,
             days_of_coverage,
             segment,
@@ -648,3 +779,82 @@ def get_transactions_date_range() -> tuple:
         print(f"[get_transactions_date_range] Error: {e}")
         return (None, None)
 
+
+@st.cache_data(ttl=3600)
+def load_forecast_matrix() -> pd.DataFrame:
+    """
+    Load monthly demand forecasts (written by scripts/compute_forecast.py).
+    
+    Returns:
+        DataFrame indexed by cod_articol with columns 1..H (forecast qty per
+        future month) plus 'model' and 'demand_class'. Empty if the table is missing.
+    """
+    engine = get_engine()
+    
+    query = """
+        SELECT cod_articol, horizon, forecast_qty, model, demand_class
+        FROM forecast
+    """
+    
+    try:
+        df = pd.read_sql(text(query), engine)
+        if df.empty:
+            return pd.DataFrame()
+        matrix = df.pivot_table(index="cod_articol", columns="horizon", values="forecast_qty", aggfunc="sum")
+        meta = df.drop_duplicates("cod_articol").set_index("cod_articol")[["model", "demand_class"]]
+        return matrix.join(meta)
+    except Exception as e:
+        print(f"[load_forecast_matrix] Error: {e}")
+        return pd.DataFrame()
+
+
+# ============================================================
+# CO-PURCHASE AFFINITY (written by scripts/compute_affinity.py)
+# ============================================================
+
+@st.cache_data(ttl=3600)
+def get_product_affinity(codes: tuple, limit: int = 10) -> pd.DataFrame:
+    """
+    Products most often bought together with any of `codes` (same client, same day).
+    
+    Returns:
+        DataFrame (related_cod, related_denumire, baskets, confidence, lift), best
+        lift first, without the input codes. Empty if the table is missing.
+    """
+    engine = get_engine()
+    
+    query = """
+        SELECT related_cod, MAX(related_denumire) AS related_denumire,
+               SUM(baskets) AS baskets, MAX(confidence) AS confidence, MAX(lift) AS lift
+        FROM product_affinity
+        WHERE cod_articol = ANY(:codes) AND NOT (related_cod = ANY(:codes))
+        GROUP BY related_cod
+        ORDER BY MAX(lift) DESC, SUM(baskets) DESC
+        LIMIT :limit
+    """
+    
+    try:
+        return pd.read_sql(text(query), engine, params={"codes": list(codes), "limit": limit})
+    except Exception as e:
+        print(f"[get_product_affinity] Error: {e}")
+        return pd.DataFrame()
+
+
+@st.cache_data(ttl=3600)
+def get_family_affinity(familie: str, limit: int = 5) -> pd.DataFrame:
+    """Families most often bought together with `familie` (same client, same day)."""
+    engine = get_engine()
+    
+    query = """
+        SELECT related_familie, baskets, confidence, lift
+        FROM family_affinity
+        WHERE familie = :familie
+        ORDER BY lift DESC, baskets DESC
+        LIMIT :limit
+    """
+    
+    try:
+        return pd.read_sql(text(query), engine, params={"familie": familie, "limit": limit})
+    except Exception as e:
+        print(f"[get_family_affinity] Error: {e}")
+        return pd.DataFrame()
@@ -0,0 +1,231 @@
+"""
+Exports
+CSV / XLSX / Parquet / Arrow files built only when the user clicks download.
+
+st.download_button accepts a callable: the export runs on click, not on every
+rerun. Files are written chunk by chunk to a spooled temporary file (in memory
+up to SPOOL_BYTES, then on disk):
+- CSV: appended per chunk
+- XLSX: openpyxl write-only workbook (rows streamed, constant memory; a new
+  sheet every XLSX_MAX_ROWS rows)
+- Parquet: one row group per chunk (pyarrow ParquetWriter)
+- Arrow: IPC file, one record batch per chunk
+
+Full-table dumps read the query through a server-side cursor
+(stream_results), CHUNK_ROWS rows at a time, so the result is never a single
+DataFrame. The finished file is still read into memory once, on click, because
+st.download_button needs bytes (see download_buttons).
+
+JSONB / nested cells (dict, list) are written as JSON text. The Arrow /
+Parquet schema comes from the column dtypes (object columns by their values);
+every chunk is cast to it, so later chunks cannot change a column's type.
+Columns with no value in the first chunk are written as text.
+"""
+import json
+import tempfile
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import streamlit as st
+from sqlalchemy import text
+
+# ============================================================
+# CONFIG
+# ============================================================
+CHUNK_ROWS = 20_000
+SPOOL_BYTES = 32 * 1024 * 1024
+XLSX_MAX_ROWS = 1_048_575  # Excel sheet limit minus the header row
+
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "arrow": ("Arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+# ============================================================
+# WRITERS
+# ============================================================
+
+def _is_nested(value) -> bool:
+    return isinstance(value, (dict, list, tuple))
+
+
+def _scalar(chunk: pd.DataFrame) -> pd.DataFrame:
+    """dict / list cells (JSONB columns from psycopg2) as JSON text; other cells untouched."""
+    nested = [c for c in chunk.columns if chunk[c].dtype == object and chunk[c].map(_is_nested).any()]
+    if not nested:
+        return chunk
+    chunk = chunk.copy()
+    for c in nested:
+        chunk[c] = chunk[c].map(
+            lambda v: json.dumps(v, ensure_ascii=False, default=str) if _is_nested(v) else v
+        )
+    return chunk
+
+
+def _write_csv(chunks: Iterable[pd.DataFrame], out: BinaryIO, **_):
+    header = True
+    for chunk in chunks:
+        out.write(_scalar(chunk).to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+
+
+def _write_xlsx(chunks: Iterable[pd.DataFrame], out: BinaryIO, sheet_name: str = "Export"):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws, rows, sheets, columns = None, 0, 0, None
+    for chunk in chunks:
+        chunk = _scalar(chunk)
+        columns = [str(c) for c in chunk.columns]
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if ws is None or rows >= XLSX_MAX_ROWS:
+                sheets += 1
+                ws = wb.create_sheet(sheet_name if sheets == 1 else f"{sheet_name} {sheets}")
+                ws.append(columns)
+                rows = 0
+            ws.append(list(row))
+            rows += 1
+    if ws is None:
+        ws = wb.create_sheet(sheet_name)
+        if columns:
+            ws.append(columns)
+    wb.save(out)
+
+
+_INFERRED_TYPES = {
+    "boolean": pa.bool_(),
+    "integer": pa.int64(),
+    "floating": pa.float64(),
+    "mixed-integer-float": pa.float64(),
+    "decimal": pa.float64(),
+}
+
+
+def _arrow_type(col: pd.Series) -> pa.DataType:
+    """Arrow type of a column from its dtype (object columns: from their values, else text)."""
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(col.dtype):
+        return pa.float64()
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        return pa.Array.from_pandas(col).type
+    if col.dtype == object:
+        return _INFERRED_TYPES.get(pd.api.types.infer_dtype(col, skipna=True), pa.string())
+    return pa.string()
+
+
+def _arrow_column(col: pd.Series, type_: pa.DataType) -> pa.Array:
+    if pa.types.is_string(type_):
+        values = col.astype(object).where(col.notna(), None)
+        return pa.array([v if v is None or isinstance(v, str) else str(v) for v in values], type=type_)
+    if pa.types.is_floating(type_) and col.dtype == object:
+        col = pd.to_numeric(col)  # Decimal / mixed int-float cells
+    return pa.array(col, type=type_, from_pandas=True)
+
+
+def _arrow_tables(chunks: Iterable[pd.DataFrame]) -> Iterator[pa.Table]:
+    """Chunks as Arrow tables, all cast to the schema built from the first chunk's column types."""
+    schema = None
+    for chunk in chunks:
+        chunk = _scalar(chunk)
+        if schema is None:
+            schema = pa.schema([pa.field(str(c), _arrow_type(chunk[c])) for c in chunk.columns])
+        yield pa.Table.from_arrays(
+            [_arrow_column(chunk[c], f.type) for c, f in zip(chunk.columns, schema)], schema=schema
+        )
+
+
+def _write_parquet(chunks: Iterable[pd.DataFrame], out: BinaryIO, **_):
+    writer = None
+    for table in _arrow_tables(chunks):
+        if writer is None:
+            writer = pq.ParquetWriter(out, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+def _write_arrow(chunks: Iterable[pd.DataFrame], out: BinaryIO, **_):
+    writer = None
+    for table in _arrow_tables(chunks):
+        if writer is None:
+            writer = ipc.new_file(out, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+_WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet, "arrow": _write_arrow}
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], fmt: str, sheet_name: str = "Export") -> BinaryIO:
+    """
+    Write DataFrame chunks (same columns) to a file-like object, rewound.
+
+    Args:
+        chunks: Iterable of DataFrames, consumed once
+        fmt: Key of EXPORT_FORMATS
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    _WRITERS[fmt](chunks, out, sheet_name=sheet_name)
+    out.seek(0)
+    return out
+
+
+def export_frame(df: pd.DataFrame, fmt: str, sheet_name: str = "Export") -> BinaryIO:
+    """One DataFrame, written in CHUNK_ROWS slices."""
+    return write_chunks((df.iloc[i:i + CHUNK_ROWS] for i in range(0, max(len(df), 1), CHUNK_ROWS)),
+                        fmt, sheet_name)
+
+
+def query_chunks(query: str, params: Optional[dict] = None, chunk_rows: int = CHUNK_ROWS,
+                 engine=None) -> Iterator[pd.DataFrame]:
+    """Rows of a SQL query in chunks, through a server-side cursor."""
+    if engine is None:
+        from src.core.database import get_engine
+        engine = get_engine()
+    with engine.connect().execution_options(stream_results=True) as conn:
+        yield from pd.read_sql(text(query), conn, params=params or {}, chunksize=chunk_rows)
+
+
+def export_query(query: str, params: Optional[dict], fmt: str, sheet_name: str = "Export") -> BinaryIO:
+    """Stream a query result straight into an export file."""
+    return write_chunks(query_chunks(query, params), fmt, sheet_name)
+
+
+# ============================================================
+# STREAMLIT
+# ============================================================
+
+def download_buttons(make_file: Callable[[str], BinaryIO], file_stem: str, key: str,
+                     formats: Sequence[str] = ("csv", "xlsx", "parquet", "arrow"), label: str = "📥"):
+    """
+    One download button per format; the file is produced only when clicked.
+
+    Args:
+        make_file: fmt -> file-like object (e.g. lambda fmt: export_frame(df, fmt))
+        file_stem: File name without extension
+        key: Widget key prefix
+    """
+    def payload(fmt):
+        # Streamlit takes bytes / BytesIO from a deferred callable, not a spooled file
+        with make_file(fmt) as f:
+            return f.read()
+
+    for fmt in formats:
+        name, mime = EXPORT_FORMATS[fmt]
+        st.download_button(
+            f"{label} {name}", data=lambda fmt=fmt: payload(fmt), file_name=f"{file_stem}.{fmt}",
+            mime=mime, key=f"{key}_{fmt}", on_click="ignore", use_container_width=True,
+        )
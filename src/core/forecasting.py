@@ -0,0 +1,384 @@
+"""
+Demand Forecasting Engine
+Batched per-SKU forecasts over the monthly sales history.
+
+Model selection per SKU (Syntetos-Boylan classification):
+- ADI >= 1.32 (intermittent / lumpy)  -> Croston SBA
+- ADI <  1.32 (smooth / erratic)      -> Holt-Winters (damped trend, additive
+                                         seasonality when >= 24 months of history,
+                                         Holt linear otherwise)
+
+All models run as array recurrences over time, vectorized across SKUs.
+Smoothing parameters are chosen per SKU from a small grid by one-step-ahead SSE.
+Large inputs are split into chunks and fitted in a process pool.
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product as grid_product
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# CONFIG
+# ============================================================
+ADI_CUTOFF = 1.32
+CV2_CUTOFF = 0.49
+SEASON_LENGTH = 12
+MIN_SEASONAL_MONTHS = 2 * SEASON_LENGTH
+DEFAULT_HORIZON = 12
+DAYS_PER_MONTH = 30.44
+
+SBA_ALPHAS = (0.05, 0.1, 0.2, 0.3)
+HW_GRID = list(grid_product(
+    (0.1, 0.3, 0.5),    # alpha (level)
+    (0.01, 0.1),        # beta  (trend)
+    (0.05, 0.2),        # gamma (season)
+))
+HW_DAMPING = 0.9
+
+CHUNK_SIZE = 2000
+
+
+# ============================================================
+# INPUT: MONTHLY MATRIX
+# ============================================================
+
+def build_monthly_matrix(codes, histories, end_month: Optional[str] = None) -> Tuple[np.ndarray, pd.Index, pd.PeriodIndex]:
+    """
+    Build a dense SKU × month matrix from sales_history dicts {"YYYY-MM": qty}.
+
+    Args:
+        codes: Iterable of cod_articol
+        histories: Iterable of dicts or JSON strings aligned with codes
+        end_month: Last month of the grid ("YYYY-MM"), default = latest month present
+
+    Returns:
+        (Y, sku_index, month_index) with Y[i, t] = quantity (0 where missing)
+    """
+    records = []
+    for cod, hist in zip(codes, histories):
+        if isinstance(hist, str):
+            try:
+                hist = json.loads(hist)
+            except (ValueError, TypeError):
+                hist = {}
+        if isinstance(hist, dict):
+            records.extend((str(cod), k, v) for k, v in hist.items())
+
+    sku_index = pd.Index(pd.unique(pd.Series([str(c) for c in codes])), name="cod_articol")
+    if not records:
+        return np.zeros((len(sku_index), 0)), sku_index, pd.PeriodIndex([], freq="M")
+
+    long = pd.DataFrame(records, columns=["cod_articol", "month", "qty"])
+    long["month"] = pd.PeriodIndex(long["month"], freq="M")
+    long["qty"] = pd.to_numeric(long["qty"], errors="coerce").fillna(0).clip(lower=0)
+
+    last = pd.Period(end_month, freq="M") if end_month else long["month"].max()
+    long = long[long["month"] <= last]
+    months = pd.period_range(long["month"].min(), last, freq="M")
+
+    wide = long.pivot_table(index="cod_articol", columns="month", values="qty", aggfunc="sum")
+    wide = wide.reindex(index=sku_index, columns=months, fill_value=0).fillna(0)
+    return wide.to_numpy(dtype=float), sku_index, months
+
+
+# ============================================================
+# CLASSIFICATION
+# ============================================================
+
+def first_sale_index(Y: np.ndarray) -> np.ndarray:
+    """Index of the first month with a sale (T if none)."""
+    has = Y > 0
+    return np.where(has.any(axis=1), has.argmax(axis=1), Y.shape[1])
+
+
+def classify_demand(Y: np.ndarray, start: np.ndarray) -> pd.DataFrame:
+    """
+    ADI / CV² per SKU, measured from the first sale onwards.
+
+    Returns:
+        DataFrame with adi, cv2, active_months, demand_class
+    """
+    T = Y.shape[1]
+    active_months = T - start
+    nonzero = (Y > 0).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adi = np.where(nonzero > 0, active_months / np.maximum(nonzero, 1), np.inf)
+        mean_size = Y.sum(axis=1) / nonzero
+        var_size = (Y ** 2).sum(axis=1) / nonzero - mean_size ** 2
+        cv2 = np.where(nonzero > 1, np.clip(var_size, 0.0, None) / mean_size ** 2, 0.0)
+
+    intermittent = adi >= ADI_CUTOFF
+    erratic = cv2 >= CV2_CUTOFF
+    demand_class = np.select(
+        [nonzero == 0, intermittent & erratic, intermittent, erratic],
+        ["NONE", "LUMPY", "INTERMITTENT", "ERRATIC"],
+        default="SMOOTH",
+    )
+    return pd.DataFrame({
+        "adi": np.round(np.where(np.isfinite(adi), adi, 0.0), 3),
+        "cv2": np.round(np.nan_to_num(cv2), 3),
+        "active_months": active_months,
+        "demand_class": demand_class,
+    })
+
+
+# ============================================================
+# MODELS (vectorized across SKUs)
+# ============================================================
+
+def croston_sba(Y: np.ndarray, start: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Croston with Syntetos-Boylan bias correction.
+
+    Returns:
+        (per-month forecast, one-step SSE) for each row
+    """
+    N, T = Y.shape
+    nonzero = Y > 0
+    first_size = Y[np.arange(N), np.minimum(start, T - 1)] if T else np.zeros(N)
+    z = np.where(start < T, first_size, 0.0)              # smoothed demand size
+    p = np.ones(N)                                        # smoothed inter-demand interval
+    q = np.ones(N)                                        # periods since last demand
+    sse = np.zeros(N)
+    bias = 1.0 - alpha / 2.0
+
+    for t in range(int(start.min()) + 1 if N else T, T):
+        active = t > start
+        y = Y[:, t]
+        f = bias * z / p
+        sse += np.where(active, (y - f) ** 2, 0.0)
+
+        hit = active & nonzero[:, t]
+        z = np.where(hit, z + alpha * (y - z), z)
+        p = np.where(hit, p + alpha * (q - p), p)
+        q = np.where(hit, 1.0, np.where(active, q + 1.0, q))
+
+    return bias * z / p, sse
+
+
+def _seasonal_init(Y: np.ndarray, start: np.ndarray, seasonal: np.ndarray):
+    """Level, trend and calendar-month seasonals from each SKU's first two years."""
+    N, T = Y.shape
+    rows = np.arange(N)[:, None]
+    offs = np.arange(SEASON_LENGTH)[None, :]
+
+    idx1 = np.minimum(start[:, None] + offs, T - 1)
+    idx2 = np.minimum(start[:, None] + SEASON_LENGTH + offs, T - 1)
+    year1 = Y[rows, idx1]
+    year2 = Y[rows, idx2]
+
+    level = year1.mean(axis=1)
+    trend = np.where(seasonal, (year2.mean(axis=1) - level) / SEASON_LENGTH, 0.0)
+
+    S = np.zeros((N, SEASON_LENGTH))
+    np.put_along_axis(S, idx1 % SEASON_LENGTH, year1 - level[:, None], axis=1)
+    S[~seasonal] = 0.0
+    return level, trend, S
+
+
+def holt_winters(Y: np.ndarray, start: np.ndarray, seasonal: np.ndarray,
+                 alpha: float, beta: float, gamma: float, horizon: int,
+                 phi: float = HW_DAMPING) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Damped-trend Holt-Winters with additive seasonality (rows where `seasonal`)
+    or damped Holt linear (other rows). Seasonals are kept per calendar slot (t % 12).
+
+    Returns:
+        (forecast matrix N × horizon, one-step SSE)
+    """
+    N, T = Y.shape
+    level, trend, S = _seasonal_init(Y, start, seasonal)
+    sse = np.zeros(N)
+    rows = np.arange(N)
+    burn_in = np.where(seasonal, SEASON_LENGTH, 1)
+
+    for t in range(int(start.min()) + 1 if N else T, T):
+        active = t > start
+        m = t % SEASON_LENGTH
+        y = Y[:, t]
+        s_m = S[:, m]
+
+        f = level + phi * trend + s_m
+        sse += np.where(active & (t >= start + burn_in), (y - f) ** 2, 0.0)
+
+        new_level = alpha * (y - s_m) + (1 - alpha) * (level + phi * trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        new_s = np.where(seasonal, gamma * (y - new_level) + (1 - gamma) * s_m, 0.0)
+
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        S[:, m] = np.where(active, new_s, s_m)
+
+    steps = np.arange(1, horizon + 1)
+    damp = np.cumsum(phi ** steps)
+    future_slots = (T + steps - 1) % SEASON_LENGTH
+    fc = level[:, None] + trend[:, None] * damp[None, :] + S[rows[:, None], future_slots[None, :]]
+    return np.clip(fc, 0.0, None), sse
+
+
+def _best_of_grid(candidates):
+    """Pick per-row forecast with the lowest SSE from a list of (forecast, sse)."""
+    forecasts = np.stack([c[0] for c in candidates])        # G × N × H
+    sses = np.stack([c[1] for c in candidates])             # G × N
+    best = sses.argmin(axis=0)
+    return forecasts[best, np.arange(forecasts.shape[1])], best
+
+
+# ============================================================
+# ENGINE
+# ============================================================
+
+def forecast_chunk(Y: np.ndarray, horizon: int = DEFAULT_HORIZON) -> dict:
+    """
+    Fit and forecast one block of SKUs (picklable for the process pool).
+
+    Returns:
+        Dict of arrays: forecast (N × horizon), model, params, adi, cv2, demand_class
+    """
+    N, T = Y.shape
+    start = first_sale_index(Y)
+    cls = classify_demand(Y, start)
+    use_sba = cls["demand_class"].isin(["INTERMITTENT", "LUMPY"]).to_numpy()
+    has_sales = (cls["demand_class"] != "NONE").to_numpy()
+    seasonal = (cls["active_months"].to_numpy() >= MIN_SEASONAL_MONTHS)
+
+    forecast = np.zeros((N, horizon))
+    model = np.full(N, "NONE", dtype=object)
+    params = np.full(N, "", dtype=object)
+
+    sba_rows = np.flatnonzero(use_sba & has_sales)
+    if len(sba_rows):
+        Ys, st = Y[sba_rows], start[sba_rows]
+        cands = []
+        for a in SBA_ALPHAS:
+            f, sse = croston_sba(Ys, st, a)
+            cands.append((np.repeat(f[:, None], horizon, axis=1), sse))
+        fc, best = _best_of_grid(cands)
+        forecast[sba_rows] = fc
+        model[sba_rows] = "SBA"
+        params[sba_rows] = [f"alpha={SBA_ALPHAS[b]}" for b in best]
+
+    hw_rows = np.flatnonzero(~use_sba & has_sales)
+    if len(hw_rows):
+        Yh, st, seas = Y[hw_rows], start[hw_rows], seasonal[hw_rows]
+        cands = [holt_winters(Yh, st, seas, a, b, g, horizon) for a, b, g in HW_GRID]
+        fc, best = _best_of_grid(cands)
+        forecast[hw_rows] = fc
+        model[hw_rows] = np.where(seas, "HOLT_WINTERS", "HOLT")
+        params[hw_rows] = ["alpha={}, beta={}, gamma={}".format(*HW_GRID[b]) for b in best]
+
+    return {
+        "forecast": np.round(forecast, 3),
+        "model": model,
+        "params": params,
+        "adi": cls["adi"].to_numpy(),
+        "cv2": cls["cv2"].to_numpy(),
+        "demand_class": cls["demand_class"].to_numpy(),
+    }
+
+
+def run_forecast(Y: np.ndarray, horizon: int = DEFAULT_HORIZON,
+                 chunk_size: int = CHUNK_SIZE, max_workers: Optional[int] = None) -> dict:
+    """
+    Forecast all SKUs, fanning chunks out to a process pool when there is more than one.
+
+    Args:
+        Y: SKU × month matrix (see build_monthly_matrix)
+        horizon: Months to forecast
+        chunk_size: SKUs per worker task
+        max_workers: Pool size (None = os.cpu_count(); 1 = run in-process)
+    """
+    N = Y.shape[0]
+    bounds = [(i, min(i + chunk_size, N)) for i in range(0, N, chunk_size)] or [(0, 0)]
+    blocks = [Y[a:b] for a, b in bounds]
+
+    if len(blocks) == 1 or max_workers == 1:
+        results = [forecast_chunk(b, horizon) for b in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(forecast_chunk, blocks, [horizon] * len(blocks)))
+
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def forecast_to_frame(result: dict, sku_index: pd.Index, months: pd.PeriodIndex) -> pd.DataFrame:
+    """
+    Long-format table for the `forecast` DB table:
+    cod_articol, luna (YYYY-MM), forecast_qty, model, params, demand_class, adi, cv2
+    """
+    horizon = result["forecast"].shape[1]
+    last = months[-1] if len(months) else pd.Period.now("M") - 1
+    future = pd.period_range(last + 1, periods=horizon, freq="M").strftime("%Y-%m")
+
+    N = len(sku_index)
+    frame = pd.DataFrame({
+        "cod_articol": np.repeat(sku_index.to_numpy(), horizon),
+        "luna": np.tile(future, N),
+        "horizon": np.tile(np.arange(1, horizon + 1), N),
+        "forecast_qty": result["forecast"].reshape(-1),
+    })
+    for key in ("model", "params", "demand_class", "adi", "cv2"):
+        frame[key] = np.repeat(result[key], horizon)
+    return frame
+
+
+# ============================================================
+# CONSUMPTION
+# ============================================================
+
+def forecast_demand_over_days(monthly: np.ndarray, days) -> np.ndarray:
+    """
+    Expected demand over the next `days` days from a monthly forecast matrix
+    (partial last month pro-rated). Beyond the horizon the last month repeats.
+
+    Args:
+        monthly: N × H forecast matrix (NaN rows = no forecast)
+        days: Scalar or N-vector of days
+    """
+    monthly = np.asarray(monthly, dtype=float)
+    N, H = monthly.shape
+    months = np.asarray(days, dtype=float) / DAYS_PER_MONTH
+    months = np.broadcast_to(months, (N,))
+
+    full = np.floor(months).astype(int)
+    frac = months - full
+
+    cum = np.concatenate([np.zeros((N, 1)), np.cumsum(monthly, axis=1)], axis=1)
+    within = np.minimum(full, H)
+    base = cum[np.arange(N), within]
+    extra_months = np.maximum(full - H, 0)
+    tail = monthly[:, -1] if H else np.zeros(N)
+    next_month = monthly[np.arange(N), np.minimum(full, H - 1)] if H else np.zeros(N)
+
+    return base + extra_months * tail + frac * next_month
+
+
+def forecast_daily_rate(codes: pd.Series, forecast_matrix: Optional[pd.DataFrame], days) -> pd.Series:
+    """
+    Forecast demand rate (units/day) over the next `days` for each code.
+
+    Args:
+        codes: cod_articol values
+        forecast_matrix: Output of database.load_forecast_matrix (columns 1..H + 'model')
+        days: Scalar or array aligned with codes (e.g. lead time + review period)
+
+    Returns:
+        Series aligned with codes; NaN where there is no usable forecast
+    """
+    if forecast_matrix is None or forecast_matrix.empty:
+        return pd.Series(np.nan, index=codes.index)
+
+    horizon_cols = [c for c in forecast_matrix.columns if isinstance(c, (int, np.integer))]
+    aligned = forecast_matrix.reindex(codes.astype(str).values)
+    monthly = aligned[sorted(horizon_cols)].to_numpy(dtype=float)
+
+    days = np.broadcast_to(np.asarray(days, dtype=float), (len(codes),))
+    demand = forecast_demand_over_days(np.nan_to_num(monthly), days)
+    usable = aligned["model"].notna().to_numpy() & (aligned["model"] != "NONE").to_numpy() & (days > 0)
+
+    rate = np.where(usable, demand / np.where(days > 0, days, 1.0), np.nan)
+    return pd.Series(rate, index=codes.index)
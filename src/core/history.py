@@ -0,0 +1,571 @@
+"""
+Sales History Cache
+Shared loader for the raw history exports (2019_2021.csv, 2022_2024.csv, 2025.csv).
+
+Each CSV is converted once into a Parquet partition under data/history_cache/:
+- DATA parsed to datetime (dd.mm.yyyy)
+- CANTITATE / VALOARE FACTURATA numeric (missing -> 0)
+- every other text column stored as a categorical (dictionary encoded)
+Partitions are keyed by the SHA-1 of the source file, so editing or replacing a
+CSV rebuilds only that partition. Conversion streams the CSV in chunks.
+
+Readers:
+- load_history: memory-mapped, column-pruned frame, Client Final filter
+  pushed down into the Parquet scan
+- iter_history / aggregate_history: batch streaming with per-batch filtering
+  and partial aggregates (monthly / daily / client), so peak memory depends on
+  the number of groups, not on how many years of history there are
+- aggregate_history_incremental: the same aggregates kept on disk per source
+  file; a refresh only reads the months added since the last run
+"""
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# ============================================================
+# CONFIG
+# ============================================================
+DATA_DIR = Path("data")
+HISTORY_FILES = [
+    DATA_DIR / "2019_2021.csv",
+    DATA_DIR / "2022_2024.csv",
+    DATA_DIR / "2025.csv",
+]
+CACHE_DIR = DATA_DIR / "history_cache"
+MANIFEST_FILE = CACHE_DIR / "manifest.json"
+AGGREGATE_DIR = CACHE_DIR / "aggregates"
+
+CLIENT_FILTER = "Vanzari Magazin_Client Final"
+CLIENT_COLUMN = "CLIENT SPECIFIC"
+DATE_COLUMN = "DATA"
+DATE_FORMAT = "%d.%m.%Y"
+NUMERIC_COLUMNS = ["CANTITATE FACTURATA", "VALOARE FACTURATA"]
+DATE_PARTS = ("YEAR", "MONTH", "DAY")
+
+CSV_CHUNK_ROWS = 500_000     # CSV -> Parquet conversion chunk (= row group)
+BATCH_ROWS = 1_000_000       # Rows per batch when streaming the cache
+COMPACT_GROUPS = 5_000_000   # Fold partial aggregates once they hold this many groups
+
+
+# ============================================================
+# SOURCE HASHING
+# ============================================================
+
+def _file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest() -> dict:
+    if MANIFEST_FILE.exists():
+        try:
+            with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _save_manifest(manifest: dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def source_hash(path: Path, manifest: Optional[dict] = None) -> str:
+    """
+    Content hash of a source CSV. The (size, mtime) of the last hash is kept in
+    the manifest so unchanged multi-GB files are not re-read on every load.
+    """
+    stat = path.stat()
+    entry = (manifest or {}).get(str(path), {})
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime and entry.get("sha1"):
+        return entry["sha1"]
+    return _file_sha1(path)
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+
+def _type_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the cache types to a chunk read with dtype=str."""
+    df.columns = [c.strip() for c in df.columns]
+
+    if DATE_COLUMN in df.columns:
+        raw = df[DATE_COLUMN]
+        parsed = pd.to_datetime(raw, format=DATE_FORMAT, errors="coerce")
+        # Rows in another layout (e.g. ISO dates) fall back to day-first parsing
+        missing = parsed.isna() & raw.notna()
+        if missing.any():
+            parsed[missing] = pd.to_datetime(raw[missing], errors="coerce", dayfirst=True)
+        df[DATE_COLUMN] = parsed
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+
+    for col in df.columns:
+        if col != DATE_COLUMN and col not in NUMERIC_COLUMNS:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _arrow_schema(columns: Sequence[str]) -> pa.Schema:
+    """Fixed partition schema, so every chunk / row group has the same types."""
+    fields = []
+    for col in columns:
+        if col == DATE_COLUMN:
+            fields.append(pa.field(col, pa.timestamp("us")))
+        elif col in NUMERIC_COLUMNS:
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+    return pa.schema(fields)
+
+
+def convert_csv(path: Path, target: Path, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """
+    Stream one raw history CSV into a Parquet partition, chunk by chunk
+    (one row group per chunk), so peak memory is bounded by chunk_rows.
+
+    Returns:
+        Number of rows written
+    """
+    rows = 0
+    writer = None
+    try:
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=True, chunksize=chunk_rows):
+            chunk = _type_chunk(chunk)
+            if writer is None:
+                schema = _arrow_schema(chunk.columns)
+                writer = pq.ParquetWriter(target, schema, compression="zstd")
+            table = pa.Table.from_pandas(chunk, preserve_index=False).cast(schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def partition_path(path: Path, sha1: str) -> Path:
+    return CACHE_DIR / f"{path.stem}-{sha1[:16]}.parquet"
+
+
+def build_cache(files: Sequence[Path] = None, verbose: bool = True) -> List[Path]:
+    """
+    Make sure every source CSV has an up-to-date partition.
+
+    Returns:
+        Partition paths, in source order (missing CSVs are skipped)
+    """
+    files = [Path(f) for f in (files or HISTORY_FILES)]
+    manifest = _load_manifest()
+    partitions = []
+    changed = False
+
+    for src in files:
+        if not src.exists():
+            if verbose:
+                print(f"      SKIP (nu exista): {src}")
+            continue
+
+        sha1 = source_hash(src, manifest)
+        target = partition_path(src, sha1)
+        if not target.exists():
+            if verbose:
+                print(f"      Conversie {src.name} -> {target.name}...")
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            rows = convert_csv(src, tmp)
+            tmp.replace(target)
+            # Drop partitions of older versions of the same file
+            for old in CACHE_DIR.glob(f"{src.stem}-*.parquet"):
+                if old != target:
+                    old.unlink()
+            if verbose:
+                print(f"      -> {rows:,} rows")
+
+        stat = src.stat()
+        entry = {"sha1": sha1, "size": stat.st_size, "mtime": stat.st_mtime, "partition": target.name}
+        if manifest.get(str(src)) != entry:
+            manifest[str(src)] = entry
+            changed = True
+        partitions.append(target)
+
+    if changed:
+        _save_manifest(manifest)
+    return partitions
+
+
+# ============================================================
+# READING
+# ============================================================
+
+def _readable_partitions(client_final: bool, files: Sequence[Path], verbose: bool):
+    """
+    Partitions to read and whether to filter them on CLIENT SPECIFIC.
+
+    Same semantics as filtering the concatenated CSVs: once any export has
+    CLIENT SPECIFIC, rows of exports without it are not Client Final.
+    """
+    partitions = build_cache(files, verbose=verbose)
+    if not partitions:
+        raise FileNotFoundError("No historical CSV files found in data/")
+
+    schemas = {part: set(pq.read_schema(part).names) for part in partitions}
+    filter_clients = client_final and any(CLIENT_COLUMN in names for names in schemas.values())
+    selected = [(part, schemas[part]) for part in partitions
+                if not (filter_clients and CLIENT_COLUMN not in schemas[part])]
+    return selected, filter_clients
+
+
+def history_row_count(files: Sequence[Path] = None) -> int:
+    """Rows in the cached history (all client types), from Parquet metadata only."""
+    return sum(pq.ParquetFile(part).metadata.num_rows for part in build_cache(files, verbose=False))
+
+
+def load_history(columns: Optional[Sequence[str]] = None, client_final: bool = True,
+                 files: Sequence[Path] = None, verbose: bool = True) -> pd.DataFrame:
+    """
+    Load the sales history from the Parquet cache (building it if needed).
+
+    Args:
+        columns: Columns to read (None = all). Pruned at the Parquet level.
+        client_final: Keep only CLIENT SPECIFIC == CLIENT_FILTER (no filter when
+                      none of the exports has a CLIENT SPECIFIC column)
+        files: Source CSVs (default: HISTORY_FILES)
+
+    Returns:
+        Concatenated DataFrame (DATA as datetime64, text columns categorical)
+    """
+    selected, filter_clients = _readable_partitions(client_final, files, verbose)
+
+    frames = []
+    for part, available in selected:
+        wanted = [c for c in columns if c in available] if columns is not None else None
+        filters = [(CLIENT_COLUMN, "==", CLIENT_FILTER)] if filter_clients else None
+        table = pq.read_table(part, columns=wanted, filters=filters, memory_map=True)
+        frames.append(table.to_pandas())
+
+    if not frames:
+        return pd.DataFrame(columns=list(columns or []))
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    # concat of categoricals with different categories falls back to object
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype):
+            df[col] = df[col].astype("category")
+    if verbose:
+        print(f"      Istoric: {len(df):,} rows ({'Client Final' if client_final else 'toti clientii'})")
+    return df
+
+
+def _row_group_before(parquet: pq.ParquetFile, group: int, since: datetime, keep_undated: bool) -> bool:
+    """True if row-group statistics prove every DATA value is < since."""
+    names = parquet.schema_arrow.names
+    stats = parquet.metadata.row_group(group).column(names.index(DATE_COLUMN)).statistics
+    if stats is None or not stats.has_min_max:
+        return False
+    if keep_undated and stats.null_count:
+        return False
+    return stats.max < since
+
+
+def _partition_batches(part: Path, available: set, columns: Sequence[str], filter_clients: bool,
+                       batch_rows: int, since: datetime = None, until: datetime = None,
+                       keep_undated: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Batches of one partition, optionally restricted to since <= DATA < until
+    (keep_undated: rows without a date are kept too). Row groups entirely
+    before `since` are skipped from the Parquet statistics.
+    """
+    dated = (since is not None or until is not None) and DATE_COLUMN in available
+    wanted = [c for c in columns if c in available]
+    read = list(wanted)
+    if filter_clients and CLIENT_COLUMN not in read:
+        read.append(CLIENT_COLUMN)
+    if dated and DATE_COLUMN not in read:
+        read.append(DATE_COLUMN)
+
+    parquet = pq.ParquetFile(part, memory_map=True)
+    groups = list(range(parquet.num_row_groups))
+    if dated and since is not None:
+        groups = [g for g in groups if not _row_group_before(parquet, g, since, keep_undated)]
+    if not groups:
+        return
+
+    for batch in parquet.iter_batches(batch_size=batch_rows, row_groups=groups, columns=read):
+        mask = None
+        if filter_clients:
+            mask = pc.equal(batch.column(read.index(CLIENT_COLUMN)).cast(pa.string()), CLIENT_FILTER)
+        if dated:
+            dates = batch.column(read.index(DATE_COLUMN))
+            in_range = None
+            if since is not None:
+                in_range = pc.greater_equal(dates, pa.scalar(since, dates.type))
+            if until is not None:
+                before = pc.less(dates, pa.scalar(until, dates.type))
+                in_range = before if in_range is None else pc.and_kleene(in_range, before)
+            if keep_undated:
+                in_range = pc.or_kleene(in_range, pc.is_null(dates))
+            mask = in_range if mask is None else pc.and_kleene(mask, in_range)
+        if mask is not None:
+            batch = batch.filter(mask)
+            if batch.num_rows == 0:
+                continue
+        chunk = batch.select(wanted).to_pandas()
+        for col in columns:
+            if col not in chunk.columns:
+                chunk[col] = None
+        yield chunk[list(columns)]
+
+
+def iter_history(columns: Sequence[str], client_final: bool = True, files: Sequence[Path] = None,
+                 batch_rows: int = BATCH_ROWS, verbose: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Stream the history in batches of at most batch_rows (memory-mapped, only
+    `columns` decoded). Non-Client-Final rows are dropped per batch; columns an
+    export does not have come back as missing values.
+    """
+    selected, filter_clients = _readable_partitions(client_final, files, verbose)
+
+    for part, available in selected:
+        yield from _partition_batches(part, available, columns, filter_clients, batch_rows)
+
+
+def _add_date_parts(chunk: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    dates = chunk[DATE_COLUMN]
+    for key in keys:
+        if key == "YEAR":
+            chunk["YEAR"] = dates.dt.year
+        elif key == "MONTH":
+            chunk["MONTH"] = dates.dt.month
+        elif key == "DAY":
+            chunk["DAY"] = dates.dt.normalize()
+    return chunk
+
+
+def _reduce(partials: List[pd.DataFrame], n_keys: int, dropna: bool) -> pd.DataFrame:
+    combined = pd.concat(partials) if len(partials) > 1 else partials[0]
+    return combined.groupby(level=list(range(n_keys)), observed=True, dropna=dropna, sort=False).sum()
+
+
+def _source_columns(keys: Sequence[str], values: Sequence[str]) -> List[str]:
+    date_keys = [k for k in keys if k in DATE_PARTS]
+    source = [k for k in keys if k not in DATE_PARTS] + list(values) + ([DATE_COLUMN] if date_keys else [])
+    return list(dict.fromkeys(source))
+
+
+def _aggregate_chunks(chunks: Iterator[pd.DataFrame], keys: List[str], values: List[str],
+                      count_name: str, dropna: bool):
+    """
+    Fold a stream of row batches into one aggregate indexed by keys.
+
+    Returns:
+        (aggregate or None when there were no rows, number of rows read)
+    """
+    date_keys = [k for k in keys if k in DATE_PARTS]
+    partials: List[pd.DataFrame] = []
+    pending = rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+        if date_keys:
+            chunk = _add_date_parts(chunk, date_keys)
+        grouped = chunk.groupby(keys, observed=True, dropna=dropna, sort=False)
+        part = grouped[values].sum() if values else pd.DataFrame(index=grouped.size().index)
+        part[count_name] = grouped.size()
+        partials.append(part)
+        pending += len(part)
+        # Fold partials together before they outgrow the groups themselves
+        if pending > COMPACT_GROUPS and len(partials) > 1:
+            partials = [_reduce(partials, len(keys), dropna)]
+            pending = len(partials[0])
+
+    if not partials:
+        return None, rows
+    return _reduce(partials, len(keys), dropna), rows
+
+
+def aggregate_history(keys: Sequence[str], values: Sequence[str] = (), client_final: bool = True,
+                      files: Sequence[Path] = None, count_name: str = "ROWS", dropna: bool = True,
+                      batch_rows: int = BATCH_ROWS, verbose: bool = True) -> pd.DataFrame:
+    """
+    Streaming group-by: sums of `values` plus a row count per `keys`, built from
+    per-batch partial aggregates. Memory is bounded by the number of groups,
+    not by the number of history rows.
+
+    Keys can be any history column or a date part of DATA: YEAR, MONTH, DAY.
+
+    Returns:
+        DataFrame with keys, values and count_name columns (one row per group)
+    """
+    keys, values = list(keys), list(values)
+    chunks = iter_history(_source_columns(keys, values), client_final, files, batch_rows, verbose)
+    aggregate, rows = _aggregate_chunks(chunks, keys, values, count_name, dropna)
+
+    if aggregate is None:
+        return pd.DataFrame(columns=keys + values + [count_name])
+    result = aggregate.reset_index()
+    if verbose:
+        print(f"      Istoric agregat: {rows:,} rows -> {len(result):,} grupuri ({', '.join(keys)})")
+    return result
+
+
+# ============================================================
+# INCREMENTAL AGGREGATES
+# ============================================================
+
+def _last_month_start(part: Path) -> Optional[datetime]:
+    """First day of the latest month in a partition (from row-group statistics)."""
+    parquet = pq.ParquetFile(part)
+    names = parquet.schema_arrow.names
+    if DATE_COLUMN not in names:
+        return None
+    idx = names.index(DATE_COLUMN)
+    latest = None
+    for group in range(parquet.num_row_groups):
+        stats = parquet.metadata.row_group(group).column(idx).statistics
+        if stats is None or not stats.has_min_max:
+            latest = pc.max(pq.read_table(part, columns=[DATE_COLUMN]).column(0)).as_py()
+            break
+        if stats.max is not None and (latest is None or stats.max > latest):
+            latest = stats.max
+    if latest is None:
+        return None
+    return datetime(latest.year, latest.month, 1)
+
+
+def _read_state(path: Path) -> dict:
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _save_aggregate(aggregate: Optional[pd.DataFrame], path: Path):
+    if aggregate is None:
+        path.unlink(missing_ok=True)
+    else:
+        aggregate.reset_index().to_parquet(path, index=False)
+
+
+def _load_aggregate(path: Path, keys: List[str]) -> Optional[pd.DataFrame]:
+    return pd.read_parquet(path).set_index(keys) if path.exists() else None
+
+
+def aggregate_history_incremental(name: str, keys: Sequence[str], values: Sequence[str] = (),
+                                  client_final: bool = True, files: Sequence[Path] = None,
+                                  count_name: str = "ROWS", dropna: bool = True, full: bool = False,
+                                  batch_rows: int = BATCH_ROWS, verbose: bool = True) -> pd.DataFrame:
+    """
+    aggregate_history with a persistent state under data/history_cache/aggregates/.
+
+    Per source file the aggregate is kept in two parts, split at the first day
+    of the file's latest month (the watermark):
+    - closed: every month before the watermark (complete months)
+    - open: the latest month and rows without a date
+
+    When a source changes (new export with more data), only rows from the old
+    watermark onward are read: they are folded into the closed part and the
+    open part is rebuilt. Unchanged sources are not read at all. Assumes months
+    before the old watermark are never edited; pass full=True to rebuild.
+
+    Args:
+        name: State name (one per caller, e.g. "seasonality_monthly")
+
+    Returns:
+        Same frame as aggregate_history(keys, values, ...)
+    """
+    keys, values = list(keys), list(values)
+    columns = _source_columns(keys, values)
+    selected, filter_clients = _readable_partitions(client_final, files, verbose)
+
+    AGGREGATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = AGGREGATE_DIR / f"{name}.json"
+    spec = {"keys": keys, "values": values, "count_name": count_name,
+            "dropna": dropna, "filter_clients": filter_clients}
+    state = _read_state(state_file)
+    if full or state.get("spec") != spec:
+        state = {"spec": spec, "sources": {}}
+
+    def aggregate(part, available, **window):
+        chunks = _partition_batches(part, available, columns, filter_clients, batch_rows, **window)
+        return _aggregate_chunks(chunks, keys, values, count_name, dropna)
+
+    totals, read_rows = [], 0
+    for part, available in selected:
+        source = part.stem.rsplit("-", 1)[0]
+        closed_file = AGGREGATE_DIR / f"{name}-{source}-closed.parquet"
+        open_file = AGGREGATE_DIR / f"{name}-{source}-open.parquet"
+        entry = state["sources"].get(source)
+        # A state whose files were removed is rebuilt from scratch
+        if entry and not all(f.exists() for f, kept in ((closed_file, entry.get("closed")),
+                                                        (open_file, entry.get("open"))) if kept):
+            entry = None
+
+        if entry and entry["partition"] == part.name:
+            totals += [a for a in (_load_aggregate(closed_file, keys), _load_aggregate(open_file, keys))
+                       if a is not None]
+            continue
+
+        watermark = _last_month_start(part)
+        old_watermark = datetime.fromisoformat(entry["watermark"]) if entry and entry.get("watermark") else None
+        if watermark is None:
+            # No dates: nothing can be closed
+            closed, rows_closed = None, 0
+            opened, rows_open = aggregate(part, available)
+            mode = "complet"
+        elif old_watermark is not None and old_watermark <= watermark:
+            # Fold [old watermark, new watermark) into the stored closed months
+            added, rows_closed = aggregate(part, available, since=old_watermark, until=watermark)
+            parts = [a for a in (_load_aggregate(closed_file, keys), added) if a is not None]
+            closed = _reduce(parts, len(keys), dropna) if parts else None
+            opened, rows_open = aggregate(part, available, since=watermark, keep_undated=True)
+            mode = f"incremental de la {old_watermark:%Y-%m}"
+        else:
+            closed, rows_closed = aggregate(part, available, until=watermark)
+            opened, rows_open = aggregate(part, available, since=watermark, keep_undated=True)
+            mode = "complet"
+
+        _save_aggregate(closed, closed_file)
+        _save_aggregate(opened, open_file)
+        state["sources"][source] = {
+            "partition": part.name,
+            "watermark": watermark.isoformat() if watermark else None,
+            "closed": closed is not None,
+            "open": opened is not None,
+        }
+        totals += [a for a in (closed, opened) if a is not None]
+        read_rows += rows_closed + rows_open
+        if verbose:
+            print(f"      {source}: {mode}, {rows_closed + rows_open:,} rows citite")
+
+    # Sources that disappeared no longer contribute
+    for source in set(state["sources"]) - {p.stem.rsplit("-", 1)[0] for p, _ in selected}:
+        del state["sources"][source]
+        for suffix in ("closed", "open"):
+            (AGGREGATE_DIR / f"{name}-{source}-{suffix}.parquet").unlink(missing_ok=True)
+
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+    if not totals:
+        return pd.DataFrame(columns=keys + values + [count_name])
+    result = _reduce(totals, len(keys), dropna).reset_index()
+    if verbose:
+        print(f"      Istoric agregat ({name}): {read_rows:,} rows noi -> {len(result):,} grupuri")
+    return result
@@ -1,69 +1,218 @@
 """
 Image URL Fetcher with Caching
 Extracts og:image from Mobexpert product pages on demand.
-Uses st.cache_data for persistence across reruns.
+
+- ImageResolver resolves product pages in a small thread pool: bounded
+  concurrency, one keep-alive requests.Session (connection reuse), a per-host
+  rate limit and (connect, read) timeouts plus a deadline per batch
+- Results live in a process-wide cache shared by all sessions; tables read it
+  without blocking (cached_image) and show a placeholder until a page is resolved
+- get_product_image_cached / batch_fetch_images keep the old blocking API
 """
-import requests
 import re
-from typing import Optional, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 
-# In-memory cache to avoid repeated requests within same session
+# ============================================================
+# CONFIG
+# ============================================================
+MAX_WORKERS = 8              # Concurrent page requests
+HOST_RATE = 10.0             # Requests per second per host
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 5.0
+BATCH_DEADLINE = 30.0        # Seconds; pages not started by then are retried on a later render
+MAX_BATCH = 200              # URLs scheduled per call (the rest on the next render)
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+_NULL_URLS = ('#null', 'nan', 'none', '')
+
+# In-memory cache shared by the whole process (product_url -> image URL / None)
 _image_cache: Dict[str, Optional[str]] = {}
+_cache_lock = threading.Lock()
+
+
+def _is_url(product_url) -> bool:
+    return isinstance(product_url, str) and product_url.strip().lower() not in _NULL_URLS
+
+
+def extract_image_url(content: str) -> Optional[str]:
+    """og:image (either attribute order), else the first Shopify CDN image."""
+    match = re.search(r'<meta\s+property="og:image"\s+content="([^"]+)"', content)
+    if match:
+        return match.group(1)
+
+    match = re.search(r'<meta\s+content="([^"]+)"\s+property="og:image"', content)
+    if match:
+        return match.group(1)
+
+    match = re.search(r'(https://cdn\.shopify\.com/s/files/[^"\'>\s]+\.(?:jpg|png|webp))', content, re.I)
+    if match:
+        return match.group(1)
+    return None
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1 / rate seconds apart (across threads)."""
+
+    def __init__(self, rate: float = HOST_RATE):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ImageResolver:
+    """
+    Background og:image resolution for product pages.
+
+    Args:
+        max_workers: Concurrent requests
+        host_rate: Requests per second per host
+        timeout: (connect, read) seconds per request
+        session: requests.Session to reuse (default: a new keep-alive pool)
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, host_rate: float = HOST_RATE,
+                 timeout: tuple = (CONNECT_TIMEOUT, READ_TIMEOUT), session: requests.Session = None):
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(host_rate)
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(HEADERS)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="images")
+        self._pending: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, product_url: str, timeout: tuple = None) -> Optional[str]:
+        """Resolve one page now (rate-limited) and cache the result."""
+        try:
+            self.limiter.wait(product_url)
+            r = self.session.get(product_url, timeout=timeout or self.timeout)
+            img_url = extract_image_url(r.text)
+        except Exception as e:
+            print(f"[ImageFetcher] Error fetching {product_url}: {e}")
+            img_url = None
+        with _cache_lock:
+            _image_cache[product_url] = img_url
+        return img_url
+
+    def _job(self, product_url: str, deadline: float):
+        try:
+            if time.monotonic() < deadline:
+                self.fetch(product_url)
+        finally:
+            with self._lock:
+                self._pending.pop(product_url, None)
+
+    def submit(self, product_urls: Iterable[str], deadline: float = BATCH_DEADLINE,
+               limit: int = MAX_BATCH) -> int:
+        """
+        Schedule uncached, not yet pending URLs (first `limit`, in order).
+
+        Returns:
+            Number of URLs scheduled
+        """
+        expires = time.monotonic() + deadline
+        scheduled = 0
+        with self._lock:
+            for url in dict.fromkeys(u.strip() for u in product_urls if _is_url(u)):
+                if scheduled >= limit:
+                    break
+                if url in _image_cache or url in self._pending:
+                    continue
+                self._pending[url] = self._pool.submit(self._job, url, expires)
+                scheduled += 1
+        return scheduled
+
+    def pending(self, product_urls: Iterable[str] = None) -> int:
+        """URLs still queued / loading (among product_urls, or in total)."""
+        with self._lock:
+            if product_urls is None:
+                return len(self._pending)
+            return sum(1 for u in set(product_urls) if isinstance(u, str) and u.strip() in self._pending)
+
+    def resolve(self, product_urls: Iterable[str], deadline: float = BATCH_DEADLINE) -> Dict[str, Optional[str]]:
+        """Schedule and wait (at most `deadline` seconds); unresolved URLs are left out."""
+        urls = [u.strip() for u in product_urls if _is_url(u)]
+        self.submit(urls, deadline, limit=len(urls))
+        with self._lock:
+            futures = [self._pending[u] for u in urls if u in self._pending]
+        stop = time.monotonic() + deadline
+        for future in futures:
+            try:
+                future.result(timeout=max(0.0, stop - time.monotonic()))
+            except Exception:
+                break  # Deadline reached: return what is cached so far
+        return {u: _image_cache[u] for u in urls if u in _image_cache}
+
+
+_resolver: Optional[ImageResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> ImageResolver:
+    """Process-wide resolver (one thread pool + connection pool for all sessions)."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ImageResolver()
+        return _resolver
+
+
+def cached_image(product_url) -> Optional[str]:
+    """Image URL if already resolved, else None (placeholder) - never blocks."""
+    if not _is_url(product_url):
+        return None
+    return _image_cache.get(product_url.strip())
+
+
+def resolve_in_background(product_urls: Iterable[str]) -> int:
+    """Schedule the thumbnails of a table; returns how many are still loading."""
+    urls = [u for u in product_urls if _is_url(u)]
+    resolver = get_resolver()
+    resolver.submit(urls)
+    return resolver.pending(urls)
+
 
 def fetch_og_image(product_url: str, timeout: int = 5) -> Optional[str]:
     """
-    Fetch og:image from a Mobexpert product page.
-    
+    Fetch og:image from a Mobexpert product page (blocking).
+
     Args:
         product_url: URL like https://mobexpert.ro/products/xyz
-        timeout: Request timeout in seconds
-        
+        timeout: Read timeout in seconds
+
     Returns:
         Direct image URL or None if not found
     """
-    if not product_url or product_url in ('#null', 'nan', ''):
+    if not _is_url(product_url):
         return None
-    
+    product_url = product_url.strip()
+
     # Check in-memory cache first
     if product_url in _image_cache:
         return _image_cache[product_url]
-    
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        r = requests.get(product_url, headers=headers, timeout=timeout)
-        content = r.text
-        
-        # Try og:image first
-        match = re.search(r'<meta\s+property="og:image"\s+content="([^"]+)"', content)
-        if match:
-            img_url = match.group(1)
-            _image_cache[product_url] = img_url
-            return img_url
-        
-        # Try og:image:secure_url
-        match = re.search(r'<meta\s+content="([^"]+)"\s+property="og:image"', content)
-        if match:
-            img_url = match.group(1)
-            _image_cache[product_url] = img_url
-            return img_url
-            
-        # Fallback: any Shopify CDN image
-        match = re.search(r'(https://cdn\.shopify\.com/s/files/[^"\'>\s]+\.(?:jpg|png|webp))', content, re.I)
-        if match:
-            img_url = match.group(1)
-            _image_cache[product_url] = img_url
-            return img_url
-        
-        _image_cache[product_url] = None
-        return None
-        
-    except Exception as e:
-        print(f"[ImageFetcher] Error fetching {product_url}: {e}")
-        _image_cache[product_url] = None
-        return None
+
+    return get_resolver().fetch(product_url, (CONNECT_TIMEOUT, timeout))
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
@@ -75,35 +224,21 @@ def get_product_image_cached(product_url: str) -> Optional[str]:
     return fetch_og_image(product_url)
 
 
-def batch_fetch_images(product_urls: list, max_concurrent: int = 5) -> Dict[str, Optional[str]]:
+def batch_fetch_images(product_urls: list, deadline: float = BATCH_DEADLINE) -> Dict[str, Optional[str]]:
     """
-    Fetch images for multiple products.
-    Limited to avoid overwhelming the server.
-    
+    Fetch images for multiple products concurrently (MAX_WORKERS in flight).
+
     Args:
         product_urls: List of product page URLs
-        max_concurrent: Max URLs to fetch in one batch
-        
+        deadline: Seconds to wait; pages not resolved by then are left out
+
     Returns:
         Dict mapping URL to image URL
     """
-    results = {}
-    
-    # Only fetch first N to avoid slow page load
-    to_fetch = [u for u in product_urls if u and u not in _image_cache][:max_concurrent]
-    
-    for url in to_fetch:
-        results[url] = fetch_og_image(url)
-    
-    # Add cached results
-    for url in product_urls:
-        if url in _image_cache:
-            results[url] = _image_cache[url]
-    
-    return results
+    return get_resolver().resolve(product_urls, deadline)
 
 
 def clear_image_cache():
     """Clear the in-memory image cache."""
-    global _image_cache
-    _image_cache = {}
+    with _cache_lock:
+        _image_cache.clear()
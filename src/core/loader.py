@@ -1,7 +1,18 @@
-import pandas as pd
+import hashlib
+from pathlib import Path
 from typing import List
+
+import pandas as pd
 from src.models.product import Product
 
+# ============================================================
+# CONFIG
+# ============================================================
+EXPORT_CACHE_DIR = Path("data") / "export_cache"  # Parquet sidecars of Excel exports
+
+DEFAULT_SUPPLIER_CFG = {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1}
+
+
 class DataLoader:
     """Loads and parses BI export CSV into Product objects"""
     
@@ -24,6 +35,45 @@ class DataLoader:
         "Vanzari Cantitative Magazine 2024 (client final)": "vanzari_2024",
         "Vanzari Cantitative Magazine 2025 (client final)": "vanzari_2025",
     }
+    
+    # Fast mode: export column -> products-table column (load_products_from_db schema).
+    # Only these columns are read.
+    TEXT_COLUMNS = {
+        "COD ARTICOL": "cod_articol",
+        "DENUMIRE ARTICOL": "denumire",
+        "FURNIZOR EXT": "furnizor",
+        "CLASA DENUMIRE": "clasa",
+        "SUBCLASA DENUMIRE": "subclasa",
+        "STARE PM": "stare_pm",
+        "PM": "pm",
+    }
+    NUMERIC_COLUMNS = {
+        "Cost Achizitie Furnizor (ultimul NIR_cronologic)": "cost_achizitie",
+        "Pret de Catalog cu TVA": "pret_catalog",
+        "Pret Vanzare cu TVA (magazin _client final)": "pret_vanzare",
+        "Pret mediu Vanzare Furnizor catre Retea la zi": "pret_retea",
+        "Stoc Disponibil Cantitativ Magazine Dep+Acc+Outlet": "stoc_total",
+        "CAFE cantitativ nereceptionat Furnizor": "stoc_tranzit",
+        "Stoc Disponibil Cantitativ Magazine": "stoc_magazine",
+        "Stoc Disponibil Cantitativ Baneasa": "stoc_baneasa",
+        "Stoc Disponibil Cantitativ Pipera": "stoc_pipera",
+        "Stoc Disponibil Cantitativ Militari": "stoc_militari",
+        "Stoc Disponibil Cantitativ Pantelimon": "stoc_pantelimon",
+        "Stoc Disponibil Cantitativ Iasi": "stoc_iasi",
+        "Stoc Disponibil Cantitativ Brasov": "stoc_brasov",
+        "Stoc Disponibil Cantitativ Pitesti": "stoc_pitesti",
+        "Stoc Disponibil Cantitativ Sibiu": "stoc_sibiu",
+        "Stoc Disponibil Cantitativ Oradea": "stoc_oradea",
+        "Stoc Disponibil Cantitativ Constanta": "stoc_constanta",
+        "Stoc Disponibil Cantitativ Constanta Outlet": "stoc_outlet_constanta",
+        "Stoc Disponibil Cantitativ Pipera Outlet": "stoc_outlet_pipera",
+        "Vanzari Cantitative Magazine_client final ult. 4 Luni": "vanzari_4luni",
+        "Vanzari Cantitative Magazine 360z (client final)": "vanzari_360z",
+        "Vanzari Cantitative Magazine 2024 (client final)": "vanzari_2024",
+        "Vanzari Cantitative Magazine 2025 (client final)": "vanzari_2025",
+        "Vanzari Cantitative Furnizor 360z catre M16": "vanzari_m16",
+        "Vanzari Cantitative Furnizor 360z exclus M16": "vanzari_fara_m16",
+    }
 
     def __init__(self, file_path: str, lead_time: int = 30, safety_stock_days: float = 7.0, moq: float = 1.0):
         self.file_path = file_path
@@ -44,6 +94,96 @@ class DataLoader:
         self.df.columns = [c.strip() for c in self.df.columns]
         return self.df
 
+    def load_fast(self) -> pd.DataFrame:
+        """
+        Load only TEXT_COLUMNS + NUMERIC_COLUMNS with explicit dtypes.
+        
+        - CSV: pyarrow engine (multi-threaded); when a numeric column holds
+          text, falls back to the C engine and coerces it to NaN
+        - Excel: parsed once with openpyxl, then read from a Parquet sidecar
+          in EXPORT_CACHE_DIR keyed by the file's size + mtime
+        """
+        if self.file_path.endswith('.csv'):
+            self.df = self._read_csv_fast()
+        elif self.file_path.endswith(('.xls', '.xlsx')):
+            self.df = self._read_excel_cached()
+        else:
+            raise ValueError("Unsupported file format. Use .csv or .xlsx")
+        return self.df
+
+    def _wanted(self, column) -> bool:
+        name = str(column).strip()
+        return name in self.TEXT_COLUMNS or name in self.NUMERIC_COLUMNS
+
+    def _typed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Stripped column names, numeric columns as float64 (bad cells -> NaN)."""
+        df.columns = [str(c).strip() for c in df.columns]
+        for col in self.NUMERIC_COLUMNS:
+            if col in df.columns and df[col].dtype != "float64":
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        return df
+
+    def _read_csv_fast(self) -> pd.DataFrame:
+        header = pd.read_csv(self.file_path, nrows=0, encoding='utf-8').columns
+        usecols = [c for c in header if self._wanted(c)]
+        text = {c: str for c in usecols if c.strip() in self.TEXT_COLUMNS}
+        try:
+            dtype = {**{c: "float64" for c in usecols if c not in text}, **text}
+            df = pd.read_csv(self.file_path, engine="pyarrow", usecols=usecols, dtype=dtype, encoding='utf-8')
+        except ValueError:  # pyarrow.ArrowInvalid: text in a numeric column ("-", "1.234,5")
+            df = pd.read_csv(self.file_path, usecols=usecols, dtype=text, low_memory=False, encoding='utf-8')
+        return self._typed(df)
+
+    def _read_excel_cached(self) -> pd.DataFrame:
+        path = Path(self.file_path)
+        stat = path.stat()
+        key = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+        sidecar = EXPORT_CACHE_DIR / f"{path.stem}-{key}.parquet"
+        if sidecar.exists():
+            return pd.read_parquet(sidecar)
+        
+        df = self._typed(pd.read_excel(path, usecols=self._wanted, dtype={c: str for c in self.TEXT_COLUMNS}))
+        try:
+            EXPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = sidecar.with_suffix(".tmp")
+            df.to_parquet(tmp, index=False)
+            tmp.replace(sidecar)
+            # Drop sidecars of older versions of the same file
+            for old in EXPORT_CACHE_DIR.glob(f"{path.stem}-*.parquet"):
+                if old != sidecar:
+                    old.unlink()
+        except OSError as e:
+            print(f"[DataLoader] Nu pot scrie cache-ul Parquet: {e}")
+        return df
+
+    @classmethod
+    def products_frame(cls, df: pd.DataFrame, config: dict = None) -> pd.DataFrame:
+        """
+        Export rows (load_fast) as a products-table frame (same columns as
+        load_products_from_db), ready for process_products_vectorized.
+        Rows without COD ARTICOL are dropped; lead time / safety stock / MOQ
+        come from the supplier config ("default" for unknown suppliers).
+        """
+        frame = pd.DataFrame(index=df.index)
+        for src, col in cls.TEXT_COLUMNS.items():
+            frame[col] = df[src].fillna("").astype(str).str.strip() if src in df.columns else ""
+        for src, col in cls.NUMERIC_COLUMNS.items():
+            frame[col] = pd.to_numeric(df[src], errors="coerce").fillna(0.0) if src in df.columns else 0.0
+        
+        # Codes read as numbers by older exports: "12345.0" -> "12345"
+        frame["cod_articol"] = frame["cod_articol"].str.replace(r"\.0$", "", regex=True)
+        frame = frame[frame["cod_articol"] != ""].reset_index(drop=True)
+        frame["categorie"] = frame["clasa"]
+        frame["sales_last_3m"] = 0.0
+        
+        config = config or {}
+        default = {**DEFAULT_SUPPLIER_CFG, **config.get("default", {})}
+        for key, fallback in DEFAULT_SUPPLIER_CFG.items():
+            per_supplier = {name: cfg.get(key, fallback) for name, cfg in config.items() if isinstance(cfg, dict)}
+            frame[key] = frame["furnizor"].map(per_supplier).fillna(default[key]).astype(float)
+        frame["lead_time_days"] = frame["lead_time_days"].astype(int)
+        return frame
+
     def parse_products(self) -> List[Product]:
         """Parse DataFrame into Product objects with segmentation"""
         if self.df is None:
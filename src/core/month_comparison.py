@@ -0,0 +1,143 @@
+"""
+Month Comparison
+Sales in selected calendar months vs the same months one year earlier, for
+all SKUs at once.
+
+The monthly history (sales_history {"YYYY-MM": qty}) is read into a SKU ×
+month frame restricted to the needed months in a single pass; current, prior
+and YoY% columns are then plain column arithmetic. Tables only pick the
+resulting columns, so the compared months can be changed freely.
+"""
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# CONFIG
+# ============================================================
+DEFAULT_MONTHS = (10, 11, 12)
+DEFAULT_YEAR = 2025
+
+MONTH_NAMES = {1: "Ian", 2: "Feb", 3: "Mar", 4: "Apr", 5: "Mai", 6: "Iun",
+               7: "Iul", 8: "Aug", 9: "Sep", 10: "Oct", 11: "Nov", 12: "Dec"}
+MONTH_FULL_NAMES = {1: "Ianuarie", 2: "Februarie", 3: "Martie", 4: "Aprilie", 5: "Mai", 6: "Iunie",
+                    7: "Iulie", 8: "August", 9: "Septembrie", 10: "Octombrie", 11: "Noiembrie", 12: "Decembrie"}
+
+
+@dataclass(frozen=True)
+class MonthColumns:
+    """Column names for one compared month: data columns and table labels."""
+    month: int
+    year: int
+
+    @property
+    def current(self) -> str:
+        return f"sales_{self.year}_{self.month:02d}"
+
+    @property
+    def prior(self) -> str:
+        return f"sales_{self.year - 1}_{self.month:02d}"
+
+    @property
+    def yoy(self) -> str:
+        return f"yoy_{self.year}_{self.month:02d}"
+
+    @property
+    def current_label(self) -> str:
+        return f"V.{MONTH_NAMES[self.month]}'{self.year % 100:02d}"
+
+    @property
+    def prior_label(self) -> str:
+        return f"V.{MONTH_NAMES[self.month]}'{(self.year - 1) % 100:02d}"
+
+    @property
+    def trend_label(self) -> str:
+        return f"Tr.{MONTH_NAMES[self.month]}"
+
+    @property
+    def has_trend(self) -> bool:
+        """No trend for months that have not started yet (no sales to compare)."""
+        today = date.today()
+        return (self.year, self.month) <= (today.year, today.month)
+
+    def labels(self) -> List[str]:
+        return [self.current_label, self.prior_label] + ([self.trend_label] if self.has_trend else [])
+
+
+def comparison_columns(months: Sequence[int] = DEFAULT_MONTHS, year: int = DEFAULT_YEAR) -> List[MonthColumns]:
+    """One MonthColumns per target month, in calendar order."""
+    return [MonthColumns(int(m), int(year)) for m in sorted(set(months))]
+
+
+def _as_dict(history) -> dict:
+    if isinstance(history, str):
+        try:
+            history = json.loads(history)
+        except (ValueError, TypeError):
+            return {}
+    return history if isinstance(history, dict) else {}
+
+
+def month_comparison(histories: Iterable, months: Sequence[int] = DEFAULT_MONTHS,
+                     year: int = DEFAULT_YEAR, index=None) -> pd.DataFrame:
+    """
+    Current-year sales, prior-year sales and YoY% per SKU for every target month.
+
+    Args:
+        histories: sales_history per SKU (dict or JSON string)
+        months: Target months (1-12)
+        year: Current year of the comparison (prior = year - 1)
+        index: Index of the result (default: positional)
+
+    Returns:
+        DataFrame with MonthColumns.current / .prior (int) and .yoy (float,
+        rounded to 0.1; NaN when the prior-year month had no sales)
+    """
+    specs = comparison_columns(months, year)
+    keys = {spec.current: f"{spec.year}-{spec.month:02d}" for spec in specs}
+    keys.update({spec.prior: f"{spec.year - 1}-{spec.month:02d}" for spec in specs})
+
+    records = [_as_dict(h) for h in histories]
+    wide = pd.DataFrame.from_records(records, columns=list(dict.fromkeys(keys.values())))
+    wide = wide.apply(pd.to_numeric, errors="coerce").fillna(0)
+
+    result = pd.DataFrame(index=index if index is not None else pd.RangeIndex(len(records)))
+    for spec in specs:
+        current = wide[keys[spec.current]].to_numpy(dtype=float)
+        prior = wide[keys[spec.prior]].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            yoy = np.where(prior > 0, np.round((current / prior - 1) * 100, 1), np.nan)
+        result[spec.current] = current.astype(int)
+        result[spec.prior] = prior.astype(int)
+        result[spec.yoy] = yoy
+    return result
+
+
+def format_trend(yoy: pd.Series) -> pd.Series:
+    """YoY% as "+12%" / "-5%" (truncated like int()), "-" without a prior-year base."""
+    truncated = np.trunc(yoy.to_numpy(dtype=float))
+    text = [f"{int(v):+d}%" if not np.isnan(v) else "-" for v in truncated]
+    return pd.Series(text, index=yoy.index)
+
+
+def table_labels(specs: Sequence[MonthColumns]) -> list:
+    """Column labels of comparison_table, in order."""
+    labels = []
+    for spec in specs:
+        labels += [spec.current_label, spec.prior_label] + ([spec.trend_label] if spec.has_trend else [])
+    return labels
+
+
+def comparison_table(data: pd.DataFrame, specs: Sequence[MonthColumns]) -> pd.DataFrame:
+    """Table columns (V.Oct'25, V.Oct'24, Tr.Oct, ...) from month_comparison columns."""
+    table = pd.DataFrame(index=data.index)
+    for spec in specs:
+        table[spec.current_label] = data[spec.current].astype(int)
+        table[spec.prior_label] = data[spec.prior].astype(int)
+        if spec.has_trend:
+            table[spec.trend_label] = format_trend(data[spec.yoy])
+    return table
@@ -0,0 +1,320 @@
+"""
+Data Refresh Pipeline
+Runs the import / compute scripts as a DAG of steps with declared inputs and
+outputs.
+
+- A step's fingerprint = hash of its input files, its code, its params and the
+  fingerprints of the steps it depends on. Steps whose fingerprint matches the
+  last successful run (and whose output files still exist) are skipped.
+- Ready steps run in parallel, each in a fresh process (spawn), so independent
+  work (seasonality, advanced trends, transactions) overlaps.
+- Every run reports duration, rows/s and the peak RSS of the step's process.
+State is kept in data/pipeline_state.json.
+"""
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+# ============================================================
+# CONFIG
+# ============================================================
+STATE_FILE = Path("data") / "pipeline_state.json"
+DEFAULT_WORKERS = 3
+
+
+@dataclass
+class Step:
+    """
+    One pipeline step.
+
+    Args:
+        name: Step id
+        module: Module to import in the worker (e.g. scripts.compute_seasonality)
+        func: Function to call (no arguments)
+        inputs: Files the step reads
+        outputs: Files the step writes (DB tables are named for the report only)
+        depends: Steps that must finish first
+        code: Source files whose changes invalidate the step (default: the module file)
+        params: Callable returning extra fingerprint data (e.g. the current month)
+        rows: Callable returning the number of rows processed, evaluated after a run
+    """
+    name: str
+    module: str
+    func: str = "main"
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    depends: Sequence[str] = ()
+    code: Sequence[str] = ()
+    params: Optional[Callable[[], object]] = None
+    rows: Optional[Callable[[], int]] = None
+
+    @property
+    def module_file(self) -> str:
+        return self.module.replace(".", "/") + ".py"
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str                 # ran | skipped | failed | blocked
+    duration: float = 0.0
+    rows: Optional[int] = None
+    peak_mb: Optional[float] = None
+    error: str = ""
+    extra: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        if self.rows is None or self.duration <= 0:
+            return None
+        return self.rows / self.duration
+
+
+# ============================================================
+# FINGERPRINTS
+# ============================================================
+
+def _file_digest(path: Path, memo: dict) -> str:
+    """SHA-1 of a file; reuses the last hash while size and mtime are unchanged."""
+    if not path.exists():
+        return "missing"
+    stat = path.stat()
+    entry = memo.get(str(path))
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return entry["sha1"]
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    memo[str(path)] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": digest.hexdigest()}
+    return memo[str(path)]["sha1"]
+
+
+def compute_fingerprints(steps: Dict[str, Step], order: List[str], memo: dict) -> Dict[str, str]:
+    """Fingerprint of every step, upstream first."""
+    prints = {}
+    for name in order:
+        step = steps[name]
+        digest = hashlib.sha1()
+        for path in sorted(set(step.inputs)):
+            digest.update(f"in:{path}:{_file_digest(Path(path), memo)}".encode())
+        for path in sorted(set(step.code) | {step.module_file}):
+            digest.update(f"code:{path}:{_file_digest(Path(path), memo)}".encode())
+        if step.params is not None:
+            digest.update(f"params:{json.dumps(step.params(), sort_keys=True, default=str)}".encode())
+        for dep in sorted(step.depends):
+            digest.update(f"dep:{dep}:{prints[dep]}".encode())
+        prints[name] = digest.hexdigest()
+    return prints
+
+
+def topological_order(steps: Dict[str, Step]) -> List[str]:
+    """Kahn's algorithm; raises on unknown dependencies or cycles."""
+    for step in steps.values():
+        missing = [d for d in step.depends if d not in steps]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on unknown steps: {missing}")
+
+    remaining = {name: set(step.depends) for name, step in steps.items()}
+    order = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"Dependency cycle between steps: {sorted(remaining)}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def load_state() -> dict:
+    if STATE_FILE.exists():
+        try:
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"steps": {}, "files": {}}
+
+
+def save_state(state: dict):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, default=str)
+
+
+def data_version() -> str:
+    """
+    Stamp of the last pipeline run (state file size + mtime): changes whenever
+    a run wrote new data. "none" before the first run.
+    """
+    try:
+        stat = STATE_FILE.stat()
+    except OSError:
+        return "none"
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+# ============================================================
+# EXECUTION
+# ============================================================
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process (None where unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_in_worker(module: str, func: str, cwd: str) -> dict:
+    """Executed in a fresh process: import the step module and call its function."""
+    os.chdir(cwd)
+    if cwd not in sys.path:
+        sys.path.insert(0, cwd)
+    # Scripts read optional CLI args from sys.argv - give them a clean one
+    sys.argv = [module.replace(".", "/") + ".py"]
+
+    t0 = time.perf_counter()
+    try:
+        getattr(importlib.import_module(module), func)()
+        error = ""
+    except BaseException:  # SystemExit from scripts counts as a failure too
+        error = traceback.format_exc()
+    return {"duration": time.perf_counter() - t0, "peak_mb": _peak_rss_mb(), "error": error}
+
+
+def run_pipeline(steps: Sequence[Step], targets: Optional[Sequence[str]] = None, force: bool = False,
+                 workers: int = DEFAULT_WORKERS, dry_run: bool = False,
+                 log: Callable[[str], None] = print) -> List[StepResult]:
+    """
+    Run the DAG.
+
+    Args:
+        steps: All declared steps
+        targets: Run only these steps and their upstream steps (None = all)
+        force: Ignore fingerprints and run every selected step
+        workers: Max steps running at the same time
+        dry_run: Only report what would run
+
+    Returns:
+        One StepResult per selected step, in topological order
+    """
+    by_name = {s.name: s for s in steps}
+    order = topological_order(by_name)
+
+    selected = set(order)
+    if targets:
+        unknown = [t for t in targets if t not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown steps: {unknown}")
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(by_name[name].depends)
+    order = [n for n in order if n in selected]
+
+    state = load_state()
+    prints = compute_fingerprints(by_name, order, state.setdefault("files", {}))
+
+    def up_to_date(name: str) -> bool:
+        last = state["steps"].get(name, {})
+        outputs_exist = all(Path(p).exists() for p in by_name[name].outputs if not p.startswith("db:"))
+        return not force and last.get("fingerprint") == prints[name] and outputs_exist
+
+    results: Dict[str, StepResult] = {}
+    pending = [n for n in order]
+    for name in order:
+        if up_to_date(name):
+            results[name] = StepResult(name, "skipped")
+            pending.remove(name)
+
+    if dry_run:
+        for name in pending:
+            results[name] = StepResult(name, "would run")
+        return [results[n] for n in order]
+
+    ctx = multiprocessing.get_context("spawn")
+    cwd = os.getcwd()
+    running = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx, max_tasks_per_child=1) as pool:
+        while pending or running:
+            # Submit every step whose dependencies are done
+            for name in list(pending):
+                deps = [d for d in by_name[name].depends if d in selected]
+                if any(results.get(d) and results[d].status in ("failed", "blocked") for d in deps):
+                    results[name] = StepResult(name, "blocked", error="upstream step failed")
+                    pending.remove(name)
+                    log(f"      ⏭  {name}: blocat (pas anterior eșuat)")
+                elif all(d in results for d in deps) and len(running) < max(1, workers):
+                    step = by_name[name]
+                    log(f"      ▶  {name}...")
+                    running[pool.submit(_run_in_worker, step.module, step.func, cwd)] = name
+                    pending.remove(name)
+
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                step = by_name[name]
+                try:
+                    outcome = future.result()
+                except Exception as e:  # worker crashed (e.g. killed by the OOM killer)
+                    outcome = {"duration": 0.0, "peak_mb": None, "error": repr(e)}
+
+                if outcome["error"]:
+                    results[name] = StepResult(name, "failed", outcome["duration"], None,
+                                               outcome["peak_mb"], outcome["error"])
+                    log(f"      ❌ {name} a eșuat după {outcome['duration']:.1f}s")
+                    continue
+
+                rows = None
+                if step.rows is not None:
+                    try:
+                        rows = int(step.rows())
+                    except Exception:
+                        rows = None
+                results[name] = StepResult(name, "ran", outcome["duration"], rows, outcome["peak_mb"])
+                state["steps"][name] = {
+                    "fingerprint": prints[name],
+                    "finished_at": datetime.now().isoformat(timespec="seconds"),
+                    "duration": round(outcome["duration"], 2),
+                    "rows": rows,
+                    "peak_mb": outcome["peak_mb"],
+                }
+                save_state(state)
+                log(f"      ✅ {name} ({outcome['duration']:.1f}s)")
+
+    save_state(state)
+    return [results[n] for n in order]
+
+
+def format_report(results: Sequence[StepResult]) -> str:
+    """Per-step table: status, duration, rows, rows/s, peak memory."""
+    lines = [f"{'Pas':<26}{'Status':<11}{'Durată':>10}{'Rânduri':>14}{'Rânduri/s':>13}{'Mem. max':>11}"]
+    lines.append("-" * len(lines[0]))
+    for r in results:
+        duration = f"{r.duration:.1f}s" if r.status in ("ran", "failed") else "-"
+        rows = f"{r.rows:,}" if r.rows is not None else "-"
+        rate = f"{r.rows_per_sec:,.0f}" if r.status == "ran" and r.rows_per_sec is not None else "-"
+        mem = f"{r.peak_mb:,.0f} MB" if r.peak_mb is not None else "-"
+        lines.append(f"{r.name:<26}{r.status:<11}{duration:>10}{rows:>14}{rate:>13}{mem:>11}")
+    return "\n".join(lines)
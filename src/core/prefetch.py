@@ -0,0 +1,126 @@
+"""
+Prefetch
+Background loading of the views the buyer is likely to open next.
+
+While the current segment / subclass is being read, a small thread pool loads
+(and processes) the neighbouring ones: other segment tabs for the same
+supplier / status filters, the most urgent subclasses of the selected supplier.
+
+Results live in a process-wide store (shared by all sessions), keyed by
+everything that determines them, for RESULT_TTL seconds. fetch() returns a
+stored result, waits for one that is still loading, or computes it inline, so
+the foreground never runs the same work twice. Failed background jobs are
+dropped silently; fetch() then computes and raises normally.
+
+clear() starts a new generation: jobs still running from before it finish,
+but their (possibly stale) results are not stored.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterable
+
+# ============================================================
+# CONFIG
+# ============================================================
+PREFETCH_WORKERS = 3
+RESULT_TTL = 300        # Same as the query caches (st.cache_data ttl=300)
+MAX_RESULTS = 64        # Processed frames kept (LRU)
+
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_pending: dict = {}
+_results: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, value)
+_generation = [0]  # Bumped by clear()
+
+
+def _fresh(key: Hashable):
+    """(True, value) for a stored, unexpired result. Call with _lock held."""
+    entry = _results.get(key)
+    if entry is None:
+        return False, None
+    if time.monotonic() - entry[0] > RESULT_TTL:
+        del _results[key]
+        return False, None
+    _results.move_to_end(key)
+    return True, entry[1]
+
+
+def _store(key: Hashable, value: Any, generation: int):
+    with _lock:
+        if generation != _generation[0]:
+            return  # Started before clear(): may predate the refresh
+        _results[key] = (time.monotonic(), value)
+        _results.move_to_end(key)
+        while len(_results) > MAX_RESULTS:
+            _results.popitem(last=False)
+
+
+def _run(key: Hashable, fn: Callable, args: tuple, kwargs: dict, generation: int, future: Future = None):
+    try:
+        value = fn(*args, **kwargs)
+        _store(key, value, generation)
+        return value
+    finally:
+        if future is not None:
+            with _lock:
+                if _pending.get(key) is future:  # Not a newer job for the same key
+                    del _pending[key]
+
+
+def prefetch(key: Hashable, fn: Callable, *args, **kwargs) -> bool:
+    """
+    Schedule fn(*args, **kwargs) in the background unless its result is
+    already stored or loading.
+
+    Returns:
+        True if a job was submitted
+    """
+    with _lock:
+        found, _ = _fresh(key)
+        if found or key in _pending:
+            return False
+        future = Future()
+        _pending[key] = future
+        generation = _generation[0]
+
+    def job():
+        try:
+            future.set_result(_run(key, fn, args, kwargs, generation, future))
+        except BaseException as e:  # fetch() recomputes; nothing to report here
+            future.set_exception(e)
+    _pool.submit(job)
+    return True
+
+
+def prefetch_many(jobs: Iterable[tuple]) -> int:
+    """Schedule (key, fn, *args) tuples; returns the number submitted."""
+    return sum(prefetch(key, fn, *args) for key, fn, *args in jobs)
+
+
+def fetch(key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Result of fn(*args, **kwargs): from the store, from the background job
+    already computing it, or computed now (and stored).
+    """
+    with _lock:
+        found, value = _fresh(key)
+        if found:
+            return value
+        future = _pending.get(key)
+        generation = _generation[0]
+    if future is not None:
+        try:
+            return future.result()
+        except Exception:
+            pass  # Background failure: retry in the foreground
+    return _run(key, fn, args, kwargs, generation)
+
+
+def clear():
+    """Drop all stored results and forget running jobs (e.g. after a data refresh)."""
+    with _lock:
+        _generation[0] += 1
+        _results.clear()
+        _pending.clear()
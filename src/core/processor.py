@@ -2,8 +2,20 @@ import pandas as pd
 import numpy as np
 import json
 from src.models.product import extract_family_dimension, DIMENSION_COEFFICIENTS
+from src.core.safety_stock import effective_safety_days
+from src.core.forecasting import forecast_daily_rate
+from src.core.segmentation import classify_segments
+from src.core.reference_data import join_reference
+from src.core.month_comparison import month_comparison, DEFAULT_MONTHS, DEFAULT_YEAR
 
-def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data: dict = None, advanced_trends_data: dict = None, cubaj_data: dict = None) -> pd.DataFrame:
+# Reference columns attached to every processed product
+REFERENCE_JOIN_COLUMNS = [
+    "seasonality_index", "is_rising_star", "trend", "yoy_growth", "volatility",
+    "cubaj_m3", "masa_kg", "product_url",
+]
+
+def process_products_vectorized(df: pd.DataFrame, config: dict, reference: pd.DataFrame = None, forecast_data: pd.DataFrame = None,
+                                compare_months=DEFAULT_MONTHS, compare_year: int = DEFAULT_YEAR) -> pd.DataFrame:
     """
     Process product DataFrame using vectorized operations (High Performance).
     Replaces the slow Pydantic generic parsing loop.
@@ -11,8 +23,12 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
     Args:
         df: Raw DataFrame from SQL (columns: cod_articol, denumire, furnizor, stoc_total, etc.)
         config: Supplier configuration dict
-        seasonality_data: Dict mapping cod_articol -> seasonality info
-        advanced_trends_data: Dict mapping cod_articol -> trends info
+        reference: Reference frame (seasonality, trends, cubaj) indexed by cod_articol;
+                   defaults to reference_data.load_reference()
+        forecast_data: Monthly forecast matrix (database.load_forecast_matrix); when present
+                       the forecast rate replaces the historical average in suggested qty
+        compare_months, compare_year: Months for the month-comparison columns
+                       (month_comparison.MonthColumns: sales_YYYY_MM, yoy_YYYY_MM)
         
     Returns:
         DataFrame with added calculated columns, ready for display.
@@ -28,7 +44,8 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
         "stoc_baneasa", "stoc_pipera", "stoc_militari", "stoc_pantelimon",
         "stoc_iasi", "stoc_brasov", "stoc_pitesti", "stoc_sibiu", 
         "stoc_oradea", "stoc_constanta", "stoc_outlet_constanta", "stoc_outlet_pipera",
-        "lead_time_days", "safety_stock_days", "moq", "days_of_coverage"
+        "lead_time_days", "safety_stock_days", "moq", "days_of_coverage",
+        "safety_stock_qty", "reorder_point"
     ]
     
     for col in numeric_cols:
@@ -86,48 +103,10 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
         df["days_of_coverage"]
     )
     
-    # 6. Seasonality & Trends Integration
-    # Map from seasonality_data dict
-    if seasonality_data:
-        # Create series from dict
-        season_index_map = {k: v.get("seasonality_index", 1.0) for k, v in seasonality_data.items()}
-        rising_star_map = {k: v.get("is_rising_star", False) for k, v in seasonality_data.items()}
-        trend_map = {k: v.get("trend", "STABLE") for k, v in seasonality_data.items()}
-        
-        df["seasonality_index"] = df["cod_articol"].map(season_index_map).fillna(1.0)
-        df["is_rising_star"] = df["cod_articol"].map(rising_star_map).fillna(False)
-        df["trend_label"] = df["cod_articol"].map(trend_map).fillna("STABLE")
-    else:
-        df["seasonality_index"] = 1.0
-        df["is_rising_star"] = False
-        df["trend_label"] = "STABLE"
-
-    # Map from advanced_trends_data
-    if advanced_trends_data:
-        yoy_map = {k: v.get("yoy_growth", 0.0) for k, v in advanced_trends_data.items()}
-        vol_map = {k: v.get("volatility", 1.0) for k, v in advanced_trends_data.items()}
-        
-        df["yoy_growth"] = df["cod_articol"].map(yoy_map).fillna(0.0)
-        df["volatility"] = df["cod_articol"].map(vol_map).fillna(1.0)
-    else:
-        df["yoy_growth"] = 0.0
-        df["volatility"] = 1.0
-
-    # 6.5 Cubaj & Logistics
-    if cubaj_data:
-        cubaj_map = {k: v.get("cubaj_m3") for k, v in cubaj_data.items()}
-        masa_map = {k: v.get("masa_kg") for k, v in cubaj_data.items()}
-        product_url_map = {k: v.get("product_url") for k, v in cubaj_data.items()}
-        
-        df["cubaj_m3"] = df["cod_articol"].map(cubaj_map).where(pd.notnull(df["cod_articol"].map(cubaj_map)), None)
-        df["masa_kg"] = df["cod_articol"].map(masa_map).where(pd.notnull(df["cod_articol"].map(masa_map)), None)
-        df["product_url"] = df["cod_articol"].map(product_url_map).where(pd.notnull(df["cod_articol"].map(product_url_map)), None)
-        df["image_url"] = None  # Will be lazy-fetched from product_url
-    else:
-        df["cubaj_m3"] = None
-        df["masa_kg"] = None
-        df["product_url"] = None
-        df["image_url"] = None
+    # 6. Seasonality, Trends, Cubaj & Logistics (one indexed lookup in the reference store)
+    df = join_reference(df, reference, REFERENCE_JOIN_COLUMNS)
+    df["trend_label"] = df.pop("trend")
+    df["image_url"] = None  # Will be lazy-fetched from product_url
 
     # 7. Suggested Order Quantity (Simplified Formula - Matching Order Builder)
     # Formula: Need = (AvgDaily * (Lead + Frequency + Safety)) - TotalStock
@@ -141,15 +120,40 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
     # Builder code: df_calc["safety_stock_days"]. It comes from DB/Config.
     # Processor used: df["safety_stock_days"] * df["dimension_coefficient"].
     # We will stick to the simplest interpretation of "Same as Builder": Raw.
-    target_days = df["lead_time_days"] + review_period_days + df["safety_stock_days"]
+    # Statistical safety stock (z × σ × √L) converted to days when available,
+    # otherwise the flat supplier safety_stock_days.
+    df["effective_safety_stock_days"] = effective_safety_days(
+        df["safety_stock_qty"] if "safety_stock_qty" in df.columns else 0.0,
+        df["avg_daily_sales"],
+        df["safety_stock_days"]
+    )
+    
+    # Segment from the shared rule table when the DB did not provide one
+    if "segment" not in df.columns:
+        df["segment"] = classify_segments({
+            "avg_daily_sales": df["avg_daily_sales"],
+            "total_stock": df["total_stock"],
+            "days_of_coverage": df["days_of_coverage"],
+            "lead_time_days": df["lead_time_days"] if "lead_time_days" in df.columns else 30.0,
+            "safety_days": df["effective_safety_stock_days"],
+        })
     
     # 3. Target Quantity
     # Builder: df_calc["sim_avg_daily"] * df_calc["target_days"]
     # We ignore seasonality here to match Builder simulation default (sim_factor=1.0)
     # BUT App usually wants seasonality?
     # User said "formula in builder sa fie peste tot". Builder defaults to sim_factor=1.0.
-    # So we use raw avg_daily_sales.
-    target_qty = df["avg_daily_sales"] * target_days
+    # Demand rate: SBA / Holt-Winters forecast over lead + review when available,
+    # else raw avg_daily_sales.
+    cycle_days = df["lead_time_days"] + review_period_days
+    df["forecast_daily"] = forecast_daily_rate(df["cod_articol"], forecast_data, cycle_days).values
+    df["forecast_model"] = (
+        forecast_data["model"].reindex(df["cod_articol"].astype(str).values).values
+        if forecast_data is not None and not forecast_data.empty else None
+    )
+    demand_rate = df["forecast_daily"].fillna(df["avg_daily_sales"])
+    safety_qty = df["avg_daily_sales"] * df["effective_safety_stock_days"]
+    target_qty = demand_rate * cycle_days + safety_qty
     
     # 4. Net Need
     net_needed = target_qty - df["total_stock"]
@@ -171,13 +175,14 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
     df["suggested_qty"] = np.where(is_dead, 0.0, df["suggested_qty"])
     
     # Final clamp to 0 if sales=0
-    df["suggested_qty"] = np.where(df["avg_daily_sales"] <= 0, 0.0, df["suggested_qty"])
+    df["suggested_qty"] = np.where((df["avg_daily_sales"] <= 0) | (demand_rate <= 0), 0.0, df["suggested_qty"])
 
     # 8. Mapped Columns for UI (Compatible with render_interactive_table expectations)
     df["nr_art"] = df["cod_articol"]
     df["nume_produs"] = df["denumire"]
     df["stoc_indomex"] = df["stoc_total"] 
     df["stoc_magazin_total"] = df["stoc_magazine"]
+    df["stock_value"] = df["total_stock"] * df["cost_achizitie"]
 
     # Pydantic Compatibility Aliases
     col_map = {
@@ -206,4 +211,8 @@ def process_products_vectorized(df: pd.DataFrame, config: dict, seasonality_data
     else:
          df["sales_history"] = [{} for _ in range(len(df))]
     
+    # 9. Month comparison (current vs prior year for the selected months, all SKUs at once)
+    comparison = month_comparison(df["sales_history"], compare_months, compare_year, index=df.index)
+    df = df.drop(columns=[c for c in comparison.columns if c in df.columns]).join(comparison)
+    
     return df
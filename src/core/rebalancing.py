@@ -0,0 +1,252 @@
+"""
+Inter-Store Stock Rebalancing
+Suggests transfers between stores / outlets and from the warehouse pool
+(stoc_total) to cover local shortfalls before a new supplier order is placed.
+
+Per SKU and location:
+    target    = ceil(avg_daily_sales × store weight × cover_days)
+    shortfall = max(0, target − stock)
+    excess    = max(0, stock − max(target, display units))
+
+Matching is greedy, in cost order:
+    1. warehouse → stores
+    2. store → store inside the same region (Bucuresti, Constanta)
+    3. store → store across regions
+Each pass is a vectorized "north-west corner" allocation over all SKUs at once:
+sources and sinks are laid out on a line by cumulative sum and the flow between
+source i and sink j is the overlap of their intervals (N × sources × sinks).
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.core.segmentation import NO_SALES_COVERAGE, classify_segments
+
+# ============================================================
+# CONFIG
+# ============================================================
+STORE_COLUMNS = [
+    "stoc_baneasa", "stoc_pipera", "stoc_militari", "stoc_pantelimon",
+    "stoc_iasi", "stoc_brasov", "stoc_pitesti", "stoc_sibiu",
+    "stoc_oradea", "stoc_constanta", "stoc_outlet_constanta", "stoc_outlet_pipera",
+]
+WAREHOUSE_COLUMN = "stoc_total"
+WAREHOUSE_NAME = "depozit"
+
+REGIONS = {
+    "BUCURESTI": ["stoc_baneasa", "stoc_pipera", "stoc_militari", "stoc_pantelimon", "stoc_outlet_pipera"],
+    "CONSTANTA": ["stoc_constanta", "stoc_outlet_constanta"],
+}
+
+DEFAULT_COVER_DAYS = 30     # Stores are stocked for one review period
+MIN_DISPLAY_UNITS = 1       # A store never gives away its last display piece
+
+
+def location_name(column: str) -> str:
+    """stoc_outlet_pipera -> outlet_pipera"""
+    return column.replace("stoc_", "", 1)
+
+
+def network_store_weights(df: pd.DataFrame) -> np.ndarray:
+    """
+    Share of each store in total store stock across all SKUs - a proxy for
+    store throughput when no per-store sales are available.
+    """
+    totals = df[STORE_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0).clip(lower=0).sum().to_numpy()
+    if totals.sum() <= 0:
+        return np.full(len(STORE_COLUMNS), 1.0 / len(STORE_COLUMNS))
+    return totals / totals.sum()
+
+
+# ============================================================
+# ALLOCATION
+# ============================================================
+
+def greedy_transport(supply: np.ndarray, demand: np.ndarray) -> np.ndarray:
+    """
+    North-west corner allocation per row, vectorized.
+
+    Args:
+        supply: N × S available units (in priority order)
+        demand: N × K needed units (in priority order)
+
+    Returns:
+        N × S × K flow, sum over K <= supply, sum over S <= demand
+    """
+    s_hi = np.cumsum(supply, axis=1)
+    s_lo = s_hi - supply
+    d_hi = np.cumsum(demand, axis=1)
+    d_lo = d_hi - demand
+
+    lo = np.maximum(s_lo[:, :, None], d_lo[:, None, :])
+    hi = np.minimum(s_hi[:, :, None], d_hi[:, None, :])
+    return np.clip(hi - lo, 0.0, None)
+
+
+def _priority_order(values: np.ndarray) -> np.ndarray:
+    """Column order per row, largest first (stable)."""
+    return np.argsort(-values, axis=1, kind="stable")
+
+
+def _transport_by_priority(supply: np.ndarray, demand: np.ndarray) -> np.ndarray:
+    """greedy_transport with largest sources / shortfalls served first in each row."""
+    s_ord = _priority_order(supply)
+    d_ord = _priority_order(demand)
+    flow_sorted = greedy_transport(np.take_along_axis(supply, s_ord, axis=1),
+                                   np.take_along_axis(demand, d_ord, axis=1))
+
+    N, S, K = flow_sorted.shape
+    flow = np.zeros_like(flow_sorted)
+    rows = np.arange(N)[:, None, None]
+    flow[rows, s_ord[:, :, None], d_ord[:, None, :]] = flow_sorted
+    return flow
+
+
+def compute_transfers(df: pd.DataFrame, cover_days: float = DEFAULT_COVER_DAYS,
+                      store_weights: Optional[np.ndarray] = None,
+                      warehouse_reserve_days: float = 0.0) -> Dict[str, object]:
+    """
+    Compute the transfer flows for all SKUs.
+
+    Args:
+        df: Products with cod_articol, avg_daily_sales (or vanzari_4luni / vanzari_360z),
+            STORE_COLUMNS and stoc_total
+        cover_days: Days of sales each store should hold
+        store_weights: Share of SKU demand per store (default: network stock share)
+        warehouse_reserve_days: Days of total sales the warehouse keeps back
+
+    Returns:
+        Dict with flow (N × (1+K) × K, source 0 = warehouse), target, stock,
+        shortfall_before / shortfall_after (N × K), pass_of (N × (1+K) × K)
+    """
+    stock = df[STORE_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0).clip(lower=0).to_numpy(dtype=float)
+    warehouse = pd.to_numeric(df[WAREHOUSE_COLUMN], errors="coerce").fillna(0).clip(lower=0).to_numpy(dtype=float)
+    rate = _avg_daily_sales(df)
+
+    weights = network_store_weights(df) if store_weights is None else np.asarray(store_weights, dtype=float)
+    weights = weights / weights.sum()
+
+    target = np.ceil(rate[:, None] * weights[None, :] * cover_days)
+    shortfall = np.clip(target - stock, 0.0, None)
+    keep = np.maximum(target, np.where(stock > 0, MIN_DISPLAY_UNITS, 0))
+    excess = np.clip(stock - keep, 0.0, None)
+    wh_free = np.clip(warehouse - np.ceil(rate * warehouse_reserve_days), 0.0, None)
+
+    N, K = stock.shape
+    flow = np.zeros((N, K + 1, K))
+    pass_of = np.zeros((N, K + 1, K), dtype=np.int8)
+    need = shortfall.copy()
+
+    # Pass 1: warehouse -> stores
+    f = _transport_by_priority(wh_free[:, None], need)
+    flow[:, :1, :] += f
+    pass_of[:, :1, :][f > 0] = 1
+    need -= f.sum(axis=1)
+
+    # Pass 2: store -> store within region
+    avail = excess.copy()
+    for cols in REGIONS.values():
+        idx = np.array([STORE_COLUMNS.index(c) for c in cols])
+        f = _transport_by_priority(avail[:, idx], need[:, idx])
+        flow[:, 1 + idx[:, None], idx[None, :]] += f
+        block = pass_of[:, 1 + idx[:, None], idx[None, :]]
+        block[f > 0] = 2
+        pass_of[:, 1 + idx[:, None], idx[None, :]] = block
+        avail[:, idx] -= f.sum(axis=2)
+        need[:, idx] -= f.sum(axis=1)
+
+    # Pass 3: store -> store across regions
+    f = _transport_by_priority(avail, need)
+    flow[:, 1:, :] += f
+    block = pass_of[:, 1:, :]
+    block[(f > 0) & (block == 0)] = 3
+    need -= f.sum(axis=1)
+
+    return {
+        "flow": np.round(flow),
+        "pass_of": pass_of,
+        "target": target,
+        "stock": stock,
+        "shortfall_before": shortfall,
+        "shortfall_after": np.clip(need, 0.0, None),
+        "warehouse_shipped": flow[:, 0, :].sum(axis=1),
+    }
+
+
+def _avg_daily_sales(df: pd.DataFrame) -> np.ndarray:
+    """avg_daily_sales column if present, else the usual 4-month / 360-day fallback."""
+    if "avg_daily_sales" in df.columns:
+        return pd.to_numeric(df["avg_daily_sales"], errors="coerce").fillna(0).clip(lower=0).to_numpy(dtype=float)
+    v4 = pd.to_numeric(df.get("vanzari_4luni", 0), errors="coerce")
+    v360 = pd.to_numeric(df.get("vanzari_360z", 0), errors="coerce")
+    v4 = np.nan_to_num(np.broadcast_to(np.asarray(v4, dtype=float), (len(df),)))
+    v360 = np.nan_to_num(np.broadcast_to(np.asarray(v360, dtype=float), (len(df),)))
+    return np.where(v4 > 0, v4 / 120.0, v360 / 360.0)
+
+
+# ============================================================
+# OUTPUT TABLES
+# ============================================================
+
+PASS_LABELS = {1: "DEPOZIT", 2: "REGIONAL", 3: "INTER-REGIONAL"}
+
+
+def transfer_plan(df: pd.DataFrame, result: dict) -> pd.DataFrame:
+    """Long-format plan: cod_articol, from_location, to_location, qty, tip."""
+    flow = result["flow"]
+    i, s, k = np.nonzero(flow > 0)
+    sources = np.array([WAREHOUSE_NAME] + [location_name(c) for c in STORE_COLUMNS])
+    sinks = np.array([location_name(c) for c in STORE_COLUMNS])
+
+    return pd.DataFrame({
+        "cod_articol": df["cod_articol"].to_numpy()[i],
+        "from_location": sources[s],
+        "to_location": sinks[k],
+        "qty": flow[i, s, k].astype(int),
+        "tip": pd.Series(result["pass_of"][i, s, k]).map(PASS_LABELS).to_numpy(),
+    })
+
+
+def segment_from_coverage(coverage: np.ndarray, lead_time: np.ndarray, safety_days: np.ndarray,
+                          avg_daily: np.ndarray, total_stock: np.ndarray) -> np.ndarray:
+    """Segments from the shared rule table (src/core/segmentation.py)."""
+    return classify_segments({
+        "avg_daily_sales": avg_daily,
+        "total_stock": total_stock,
+        "days_of_coverage": coverage,
+        "lead_time_days": lead_time,
+        "safety_days": safety_days,
+    })
+
+
+def rebalancing_effect(df: pd.DataFrame, result: dict) -> pd.DataFrame:
+    """
+    Per-SKU effect of the plan: store shortfall covered, warehouse drawdown and
+    the segment before / after (coverage = warehouse + transit, as in the DB).
+    """
+    rate = _avg_daily_sales(df)
+    warehouse = pd.to_numeric(df[WAREHOUSE_COLUMN], errors="coerce").fillna(0).to_numpy(dtype=float)
+    transit = pd.to_numeric(df.get("stoc_tranzit", 0), errors="coerce")
+    transit = np.nan_to_num(np.broadcast_to(np.asarray(transit, dtype=float), (len(df),)))
+    lead = pd.to_numeric(df.get("lead_time_days", 30), errors="coerce")
+    lead = np.nan_to_num(np.broadcast_to(np.asarray(lead, dtype=float), (len(df),)), nan=30.0)
+    safety = pd.to_numeric(df.get("safety_stock_days", 7), errors="coerce")
+    safety = np.nan_to_num(np.broadcast_to(np.asarray(safety, dtype=float), (len(df),)), nan=7.0)
+
+    shipped = result["warehouse_shipped"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov_before = np.where(rate > 0, (warehouse + transit) / rate, NO_SALES_COVERAGE)
+        cov_after = np.where(rate > 0, (warehouse - shipped + transit) / rate, NO_SALES_COVERAGE)
+
+    before = result["shortfall_before"].sum(axis=1)
+    after = result["shortfall_after"].sum(axis=1)
+    return pd.DataFrame({
+        "cod_articol": df["cod_articol"].to_numpy(),
+        "shortfall_before": before,
+        "shortfall_after": after,
+        "units_transferred": result["flow"].sum(axis=(1, 2)),
+        "warehouse_shipped": shipped,
+        "segment_before": segment_from_coverage(cov_before, lead, safety, rate, warehouse + transit),
+        "segment_after": segment_from_coverage(cov_after, lead, safety, rate, warehouse - shipped + transit),
+    })
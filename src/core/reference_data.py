@@ -0,0 +1,218 @@
+"""
+Reference Data Store
+Per-product reference datasets (seasonality, advanced trends, cubaj) kept as one
+typed columnar frame indexed by cod_articol.
+
+- Sources: data/seasonality_index.json, data/advanced_trends.json and the
+  cubaj CSV (CubajLoader)
+- The merged frame is written to data/reference_cache/reference.parquet, tagged
+  with the (size, mtime) of every source, so a new process reads Parquet
+  instead of re-parsing the JSON / CSV files
+- load_reference() keeps the frame in memory for the whole process and only
+  reloads when a source file changes (one build at a time; the cache files are
+  written to temp files and renamed into place, so another process never reads
+  a half-written cache)
+- join_reference() attaches the columns to a product frame with a single
+  indexed lookup; products missing from a dataset get the column default
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.core.cubaj_loader import CubajLoader
+
+# ============================================================
+# CONFIG
+# ============================================================
+DATA_DIR = Path("data")
+SOURCES = {
+    "seasonality": DATA_DIR / "seasonality_index.json",
+    "trends": DATA_DIR / "advanced_trends.json",
+    "cubaj": Path(CubajLoader.DEFAULT_PATH),
+}
+CACHE_DIR = DATA_DIR / "reference_cache"
+CACHE_FILE = CACHE_DIR / "reference.parquet"
+MANIFEST_FILE = CACHE_DIR / "manifest.json"
+
+# Column -> (dataset, dtype after join, default for products missing from the dataset)
+REFERENCE_COLUMNS: Dict[str, tuple] = {
+    "seasonality_index": ("seasonality", "float64", 1.0),
+    "is_rising_star": ("seasonality", "bool", False),
+    "trend": ("seasonality", "object", "STABLE"),
+    "yoy_growth": ("trends", "float64", 0.0),
+    "acceleration": ("trends", "float64", 0.0),
+    "volatility": ("trends", "float64", 1.0),
+    "repeat_rate": ("trends", "float64", 0.0),
+    "avg_orders_per_client": ("trends", "float64", 0.0),
+    "unique_clients": ("trends", "int64", 0),
+    "peak_month": ("trends", "int64", 0),
+    "peak_month_pct": ("trends", "float64", 0.0),
+    # No default: missing cubaj stays NaN ("N/A" in the UI)
+    "cubaj_m3": ("cubaj", "float64", None),
+    "masa_kg": ("cubaj", "float64", None),
+    "product_url": ("cubaj", "object", None),
+}
+
+# Nullable storage types (a product can be in one dataset and not in another)
+_STORAGE_DTYPES = {"float64": "float64", "bool": "boolean", "int64": "Int64", "object": "string"}
+
+_store = {"version": None, "frame": None}
+_lock = threading.Lock()
+
+
+# ============================================================
+# VERSIONING
+# ============================================================
+
+def _source_stamps() -> Dict[str, list]:
+    stamps = {}
+    for name, path in SOURCES.items():
+        if path.exists():
+            stat = path.stat()
+            stamps[name] = [stat.st_size, stat.st_mtime_ns]
+        else:
+            stamps[name] = None
+    return stamps
+
+
+def reference_version() -> str:
+    """Short hash of the source stamps - changes whenever a source file changes."""
+    payload = json.dumps(_source_stamps(), sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def _dataset_columns(dataset: str) -> list:
+    return [col for col, (ds, _, _) in REFERENCE_COLUMNS.items() if ds == dataset]
+
+
+def _read_json_dataset(dataset: str) -> pd.DataFrame:
+    path = SOURCES[dataset]
+    if not path.exists():
+        return pd.DataFrame(columns=_dataset_columns(dataset))
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return pd.DataFrame.from_dict(data, orient="index").reindex(columns=_dataset_columns(dataset))
+
+
+def _read_cubaj_dataset() -> pd.DataFrame:
+    return CubajLoader(str(SOURCES["cubaj"])).load_frame().reindex(columns=_dataset_columns("cubaj"))
+
+
+def build_reference() -> pd.DataFrame:
+    """Read every source and merge it into one typed frame indexed by cod_articol."""
+    parts = [
+        _read_json_dataset("seasonality"),
+        _read_json_dataset("trends"),
+        _read_cubaj_dataset(),
+    ]
+    frame = pd.concat(parts, axis=1, join="outer")
+    frame.index = frame.index.astype(str)
+    frame = frame[~frame.index.duplicated(keep="first")]
+    frame.index.name = "cod_articol"
+
+    for col, (_, dtype, _) in REFERENCE_COLUMNS.items():
+        if dtype == "bool":
+            frame[col] = frame[col].map({True: True, False: False}).astype("boolean")
+        elif dtype == "object":
+            frame[col] = frame[col].where(frame[col].notna(), None).astype("string")
+        else:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce").astype(_STORAGE_DTYPES[dtype])
+    return frame
+
+
+def _read_cache(stamps: dict) -> Optional[pd.DataFrame]:
+    if not (CACHE_FILE.exists() and MANIFEST_FILE.exists()):
+        return None
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("sources") != stamps or manifest.get("columns") != list(REFERENCE_COLUMNS):
+            return None
+        return pd.read_parquet(CACHE_FILE)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(frame: pd.DataFrame, stamps: dict):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Parquet first, then the manifest that vouches for it
+        tmp = CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        frame.to_parquet(tmp)
+        tmp.replace(CACHE_FILE)
+        tmp = MANIFEST_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sources": stamps, "columns": list(REFERENCE_COLUMNS)}, f, indent=2)
+        tmp.replace(MANIFEST_FILE)
+    except OSError as e:
+        # Read-only deployments still work, they just rebuild per process
+        print(f"[ReferenceData] WARNING: cache not written: {e}")
+
+
+# ============================================================
+# PUBLIC API
+# ============================================================
+
+def load_reference(force: bool = False) -> pd.DataFrame:
+    """
+    Reference frame for the current process.
+
+    Reused while no source file changes; otherwise read from the Parquet cache,
+    or rebuilt from the sources (and the cache refreshed).
+    """
+    with _lock:  # Prefetch threads and page renders share one build
+        stamps = _source_stamps()
+        if not force and _store["frame"] is not None and _store["version"] == stamps:
+            return _store["frame"]
+
+        frame = None if force else _read_cache(stamps)
+        if frame is None:
+            frame = build_reference()
+            _write_cache(frame, stamps)
+
+        _store["version"] = stamps
+        _store["frame"] = frame
+        return frame
+
+
+def empty_reference() -> pd.DataFrame:
+    """Reference frame with no products (join_reference then fills the defaults)."""
+    return pd.DataFrame({
+        col: pd.Series(dtype=_STORAGE_DTYPES[dtype]) for col, (_, dtype, _) in REFERENCE_COLUMNS.items()
+    }, index=pd.Index([], dtype=str, name="cod_articol"))
+
+
+def join_reference(df: pd.DataFrame, reference: pd.DataFrame = None,
+                   columns: Sequence[str] = None) -> pd.DataFrame:
+    """
+    Attach reference columns to a product frame (one indexed lookup on cod_articol).
+
+    Existing columns with the same name are replaced. Products missing from a
+    dataset get the default from REFERENCE_COLUMNS.
+    """
+    reference = load_reference() if reference is None else reference
+    columns = list(columns) if columns is not None else list(REFERENCE_COLUMNS)
+
+    matched = reference[columns].reindex(df["cod_articol"].astype(str).to_numpy())
+    for col in columns:
+        _, dtype, default = REFERENCE_COLUMNS[col]
+        values = matched[col]
+        if default is not None:
+            values = values.fillna(default)
+        if dtype == "object":
+            values = values.astype(object).where(values.notna(), None)
+        else:
+            values = values.to_numpy(dtype=dtype if default is not None else "float64", na_value=np.nan)
+        df[col] = np.asarray(values)
+    return df
+
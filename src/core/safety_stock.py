@@ -0,0 +1,177 @@
+"""
+Statistical Safety Stock
+Derives safety stock and reorder point from the variability of daily demand.
+
+    σ_LT = σ_d × √L
+    SS   = z(service level) × σ_LT
+    ROP  = μ_d × L + SS
+
+Daily statistics are computed from per-SKU sums (Σq, Σq²) over a fixed window,
+so days without sales count as zero demand without materializing them.
+"""
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+DEFAULT_SERVICE_LEVEL = 0.95
+DEMAND_WINDOW_DAYS = 365
+MIN_HISTORY_DAYS = 30  # New SKUs: never divide by less than one month
+
+# Columns written into `products` by scripts/compute_safety_stock.py
+SAFETY_STOCK_COLUMNS = {
+    "demand_mean_daily": "DECIMAL(12,4)",
+    "demand_std_daily": "DECIMAL(12,4)",
+    "lead_time_demand": "DECIMAL(12,2)",
+    "service_level": "DECIMAL(5,4)",
+    "safety_stock_qty": "DECIMAL(12,2)",
+    "reorder_point": "DECIMAL(12,2)",
+}
+
+# Safety stock expressed in days of sales. Falls back to the flat supplier
+# `safety_stock_days` when no statistical safety stock has been computed.
+EFFECTIVE_SAFETY_DAYS_SQL = """
+    CASE
+        WHEN COALESCE(safety_stock_qty, 0) > 0 AND COALESCE(avg_daily_sales, 0) > 0
+            THEN safety_stock_qty / avg_daily_sales
+        ELSE COALESCE(safety_stock_days, 7)
+    END
+"""
+
+
+def service_level_z(service_level) -> np.ndarray:
+    """z-score for a cycle service level (0.95 -> 1.645). Accepts scalar or array."""
+    levels = np.clip(np.asarray(service_level, dtype=float), 0.5, 0.9999)
+    inv = np.vectorize(NormalDist().inv_cdf, otypes=[float])
+    return inv(levels)
+
+
+def demand_stats_from_sums(qty_sum, qty_sumsq, n_days):
+    """
+    Mean and sample standard deviation of daily demand from aggregated sums.
+
+    Args:
+        qty_sum: Σq per SKU over the window
+        qty_sumsq: Σq² per SKU (days with sales only - zero days add nothing)
+        n_days: Number of calendar days in each SKU's window
+
+    Returns:
+        (mean, std) arrays
+    """
+    s = np.asarray(qty_sum, dtype=float)
+    ss = np.asarray(qty_sumsq, dtype=float)
+    n = np.maximum(np.asarray(n_days, dtype=float), 2.0)
+
+    mean = s / n
+    var = (ss - n * mean ** 2) / (n - 1)
+    std = np.sqrt(np.clip(var, 0.0, None))
+    return mean, std
+
+
+def compute_safety_stock(stats: pd.DataFrame, lead_time_days, service_level=DEFAULT_SERVICE_LEVEL) -> pd.DataFrame:
+    """
+    Vectorized safety stock + reorder point for all SKUs.
+
+    Args:
+        stats: DataFrame with cod_articol, qty_sum, qty_sumsq, n_days
+        lead_time_days: Scalar or array aligned with stats (days)
+        service_level: Scalar or array aligned with stats (0.5 - 0.9999)
+
+    Returns:
+        DataFrame indexed like stats with the SAFETY_STOCK_COLUMNS
+    """
+    mean, std = demand_stats_from_sums(stats["qty_sum"], stats["qty_sumsq"], stats["n_days"])
+    lead = np.maximum(np.asarray(lead_time_days, dtype=float), 0.0)
+    level = np.broadcast_to(np.asarray(service_level, dtype=float), mean.shape)
+    z = service_level_z(level)
+
+    safety = z * std * np.sqrt(lead)
+    lt_demand = mean * lead
+
+    return pd.DataFrame({
+        "cod_articol": stats["cod_articol"].values,
+        "demand_mean_daily": np.round(mean, 4),
+        "demand_std_daily": np.round(std, 4),
+        "lead_time_demand": np.round(lt_demand, 2),
+        "service_level": level,
+        "safety_stock_qty": np.round(safety, 2),
+        "reorder_point": np.round(lt_demand + safety, 2),
+    }, index=stats.index)
+
+
+def effective_safety_days(safety_stock_qty, avg_daily_sales, safety_stock_days) -> np.ndarray:
+    """
+    Vectorized counterpart of EFFECTIVE_SAFETY_DAYS_SQL.
+    Safety stock in days = SS units / average daily sales, else the flat config days.
+    """
+    ss_qty = np.nan_to_num(np.asarray(safety_stock_qty, dtype=float), nan=0.0)
+    avg = np.nan_to_num(np.asarray(avg_daily_sales, dtype=float), nan=0.0)
+    flat = np.asarray(safety_stock_days, dtype=float)
+
+    use_stat = (ss_qty > 0) & (avg > 0)
+    return np.where(use_stat, ss_qty / np.where(avg > 0, avg, 1.0), flat)
+
+
+def supplier_service_levels(furnizori: pd.Series, config: dict) -> np.ndarray:
+    """Map each row's supplier to its configured service level (default from config['default'])."""
+    default_level = config.get("default", {}).get("service_level", DEFAULT_SERVICE_LEVEL)
+    levels = {k: v.get("service_level", default_level) for k, v in config.items() if isinstance(v, dict)}
+    return furnizori.map(levels).fillna(default_level).astype(float).values
+
+
+def refresh_supplier_safety_stock_sql(where: Optional[str] = None) -> str:
+    """
+    UPDATE that recomputes SS / ROP from the stored daily statistics
+    (used when a supplier's lead time or service level changes in Settings).
+    Expects :z and :service_level bind parameters.
+    """
+    sql = """
+        UPDATE products SET
+            service_level = :service_level,
+            lead_time_demand = demand_mean_daily * lead_time_days,
+            safety_stock_qty = :z * demand_std_daily * SQRT(GREATEST(lead_time_days, 0)),
+            reorder_point = demand_mean_daily * lead_time_days
+                            + :z * demand_std_daily * SQRT(GREATEST(lead_time_days, 0))
+        WHERE demand_std_daily IS NOT NULL
+    """
+    if where:
+        sql += f" AND {where}"
+    return sql
+
+
+def ensure_safety_stock_columns(conn):
+    """Add the safety stock columns to `products` (idempotent)."""
+    for col, sql_type in SAFETY_STOCK_COLUMNS.items():
+        conn.execute(text(f"ALTER TABLE products ADD COLUMN IF NOT EXISTS {col} {sql_type}"))
+    conn.commit()
+
+
+def apply_safety_stock_refresh(conn, config: dict, supplier: Optional[str] = None):
+    """
+    Re-derive SS / ROP in SQL from stored daily statistics using the configured
+    service levels. Lead time is read per row, so only z differs between suppliers.
+
+    Args:
+        conn: Open SQLAlchemy connection (caller commits)
+        config: Supplier config dict (from data/supplier_config.json)
+        supplier: Refresh only this supplier (None = all products)
+    """
+    default_level = config.get("default", {}).get("service_level", DEFAULT_SERVICE_LEVEL)
+
+    def _run(level, where=None, params=None):
+        query_params = {"z": float(service_level_z(level)), "service_level": float(level)}
+        query_params.update(params or {})
+        conn.execute(text(refresh_supplier_safety_stock_sql(where)), query_params)
+
+    if supplier is not None:
+        level = config.get(supplier, {}).get("service_level", default_level)
+        _run(level, "furnizor = :s", {"s": supplier})
+        return
+
+    _run(default_level)
+    for name, params in config.items():
+        if name == "default" or not isinstance(params, dict) or "service_level" not in params:
+            continue
+        _run(params["service_level"], "furnizor = :s", {"s": name})
@@ -0,0 +1,184 @@
+"""
+Product Search Index
+Typo-tolerant, diacritic-folded product lookup over cod_articol, denumire,
+familie and furnizor.
+
+- Text is folded (NFKD, combining marks dropped, lower case, punctuation to
+  spaces), so "ș" == "s" and "Persian" == "PERSIAN".
+- Every token is split into padded trigrams ("  pe", " pe", "per", ... "an ").
+  The index keeps one posting list (doc ids) per trigram.
+- A query's score for a product = share of the query's trigrams the product
+  has, plus a small bonus for short documents and for code prefix / exact
+  matches. "persan" still finds PERSIAN (5 of 7 trigrams). Code-prefix hits
+  rank first; only a whole code (exact match, or as long as a typical code)
+  drops the fuzzy text matches.
+- Scoring is one np.bincount over the query's posting lists: well under 5 ms
+  for the whole catalogue.
+
+The index is built once per data version and shared by the whole process.
+"""
+import re
+import threading
+import unicodedata
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.models.product import extract_family_dimension
+
+# ============================================================
+# CONFIG
+# ============================================================
+SEARCH_FIELDS = ["cod_articol", "denumire", "familie", "furnizor"]
+MIN_SCORE = 0.5          # Share of query trigrams a match must have
+DEFAULT_LIMIT = 50
+LENGTH_WEIGHT = 0.1      # Bonus for shorter documents (query covers more of them)
+CODE_PREFIX_BONUS = 2.0  # Above any text score (at most 1 + LENGTH_WEIGHT)
+CODE_EXACT_BONUS = 2.0
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+_store = {"version": None, "index": None}
+_lock = threading.Lock()
+
+
+def fold(text) -> str:
+    """Lower case, no diacritics, alphanumeric tokens separated by single spaces."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def trigrams(folded: str) -> set:
+    """Padded trigrams of every token ("  p", " pe", "per", ..., "an ")."""
+    grams = set()
+    for token in folded.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    Trigram index over a products frame.
+
+    Args:
+        frame: Must have cod_articol; denumire / familie / furnizor are used when
+               present (familie is derived from denumire when missing)
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.drop_duplicates("cod_articol").reset_index(drop=True)
+        if "familie" not in frame.columns and "denumire" in frame.columns:
+            frame = frame.assign(familie=[extract_family_dimension(str(n))[0] for n in frame["denumire"]])
+        self.frame = frame[[c for c in SEARCH_FIELDS if c in frame.columns]].copy()
+        self.codes = frame["cod_articol"].astype(str)
+        self._positions = pd.Index(self.codes)
+
+        # Compact folded codes, sorted: prefix / exact lookups are binary searches
+        compact = np.array([fold(c).replace(" ", "") for c in self.codes], dtype=str)
+        self._code_order = np.argsort(compact, kind="stable")
+        self._sorted_codes = compact[self._code_order]
+        self._code_length = int(np.median(np.char.str_len(compact))) if len(compact) else 0
+
+        fields = self.frame.fillna("").astype(str)
+        texts = fields.iloc[:, 0].str.cat([fields[c] for c in fields.columns[1:]], sep=" ")
+        doc_grams = [list(trigrams(fold(text))) for text in texts]
+        sizes = np.fromiter((len(g) for g in doc_grams), dtype=np.int64, count=len(doc_grams))
+        gram_ids, vocabulary = pd.factorize(pd.Series([g for grams in doc_grams for g in grams], dtype=object))
+        doc_ids = np.repeat(np.arange(len(doc_grams), dtype=np.int32), sizes)
+
+        # Posting lists: doc ids grouped by gram (CSR layout)
+        order = np.argsort(gram_ids, kind="stable")
+        self._postings = doc_ids[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(gram_ids, minlength=len(vocabulary)))])
+        self._vocabulary = {gram: i for i, gram in enumerate(vocabulary)}
+        self._sizes = np.maximum(sizes.astype(np.float64), 1.0)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Score per indexed product (0 = no shared trigram)."""
+        folded = fold(query)
+        n = len(self.codes)
+        grams = trigrams(folded)
+        if not grams or n == 0:
+            return np.zeros(n)
+        ids = [self._vocabulary[g] for g in grams if g in self._vocabulary]
+        if ids:
+            hits = np.concatenate([self._postings[self._offsets[i]:self._offsets[i + 1]] for i in ids])
+            shared = np.bincount(hits, minlength=n).astype(np.float64)
+        else:
+            shared = np.zeros(n)
+        score = shared / len(grams) + LENGTH_WEIGHT * shared / self._sizes
+
+        # Codes: exact / prefix matches first (queries are often pasted codes)
+        compact = folded.replace(" ", "")
+        if len(compact) >= 3:
+            lo, hi = np.searchsorted(self._sorted_codes, [compact, compact + "\uffff"])
+            score[self._code_order[lo:hi]] += CODE_PREFIX_BONUS
+            lo, hi = (np.searchsorted(self._sorted_codes, compact, side=side) for side in ("left", "right"))
+            score[self._code_order[lo:hi]] += CODE_EXACT_BONUS
+        return score
+
+    def is_whole_code(self, query: str) -> bool:
+        """Query matches a code exactly or is as long as a typical code ("160" is not: 160x230)."""
+        compact = fold(query).replace(" ", "")
+        if len(compact) < 3:
+            return False
+        lo, hi = (np.searchsorted(self._sorted_codes, compact, side=side) for side in ("left", "right"))
+        return hi > lo or len(compact) >= self._code_length
+
+    def search(self, query: str, limit: Optional[int] = DEFAULT_LIMIT, min_score: float = MIN_SCORE,
+               candidates: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Best matches, highest score first.
+
+        Args:
+            query: Free text (code, name, family, supplier; typos and diacritics allowed)
+            limit: Max rows (None = all matches)
+            min_score: Minimum share of the query's trigrams
+            candidates: Only rank these codes (e.g. the products of one table)
+
+        Returns:
+            Indexed fields + score, indexed 0..n-1
+        """
+        score = self.scores(query)
+        keep = score >= min_score
+        if candidates is not None:
+            positions = self._positions.get_indexer(pd.Index([str(c) for c in candidates]))
+            allowed = np.zeros(len(score), dtype=bool)
+            allowed[positions[positions >= 0]] = True
+            keep &= allowed
+        if self.is_whole_code(query) and (score[keep] >= CODE_PREFIX_BONUS).any():
+            keep &= score >= CODE_PREFIX_BONUS  # Pasted code: no fuzzy neighbours
+        hits = np.flatnonzero(keep)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-score[hits], limit - 1)[:limit]]
+        hits = hits[np.lexsort((hits, -score[hits]))]
+        result = self.frame.iloc[hits].reset_index(drop=True)
+        result["score"] = score[hits]
+        return result
+
+    def codes_for(self, query: str, limit: Optional[int] = DEFAULT_LIMIT, **kwargs) -> list:
+        """Matching cod_articol values, best first."""
+        return self.search(query, limit, **kwargs)["cod_articol"].astype(str).tolist()
+
+
+def get_index(version: str, load: Callable[[], pd.DataFrame]) -> SearchIndex:
+    """
+    Process-wide index, rebuilt only when `version` changes.
+
+    Args:
+        version: Data version (e.g. view_cache.data_version() + data source)
+        load: Returns the catalogue frame (called only on rebuild)
+    """
+    with _lock:
+        if _store["index"] is None or _store["version"] != version:
+            _store["index"] = SearchIndex(load())
+            _store["version"] = version
+        return _store["index"]
@@ -0,0 +1,163 @@
+"""
+Segmentation Rules
+Single source of truth for CRITICAL / URGENT / ATTENTION / OK / OVERSTOCK.
+
+The rule table is declarative: an ordered list of (segment, conditions), first
+match wins. Each condition compares a metric against a sum of metrics/constants.
+The same table compiles to:
+- a SQL CASE expression (DB precompute, sync_supplier_to_db)
+- a vectorized NumPy classifier (in-memory DataFrames)
+- a scalar classifier (Product model)
+"""
+import operator
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.core.safety_stock import EFFECTIVE_SAFETY_DAYS_SQL
+
+# ============================================================
+# THRESHOLDS
+# ============================================================
+ATTENTION_BUFFER_DAYS = 30   # ATTENTION: up to lead + safety + 30 days
+OVERSTOCK_DAYS = 180         # OVERSTOCK: more than 180 days of coverage
+NO_SALES_COVERAGE = 999.0    # days_of_coverage when there are no sales
+DEFAULT_SEGMENT = "OK"
+
+SEGMENTS = ["CRITICAL", "URGENT", "ATTENTION", "OK", "OVERSTOCK"]
+
+Term = Union[str, float, int]
+Condition = Tuple[str, str, Union[Term, Sequence[Term]]]
+
+# Ordered rule table - first match wins, else DEFAULT_SEGMENT
+SEGMENT_RULES: List[Tuple[str, List[Condition]]] = [
+    # No sales: stock sitting there is overstock, nothing at all is fine
+    ("OVERSTOCK", [("avg_daily_sales", "<=", 0), ("total_stock", ">", 0)]),
+    ("OK",        [("avg_daily_sales", "<=", 0)]),
+    # Selling products: coverage vs lead time / safety stock
+    ("CRITICAL",  [("days_of_coverage", "<", "lead_time_days")]),
+    ("URGENT",    [("days_of_coverage", "<", ("lead_time_days", "safety_days"))]),
+    ("ATTENTION", [("days_of_coverage", "<", ("lead_time_days", "safety_days", ATTENTION_BUFFER_DAYS))]),
+    ("OVERSTOCK", [("days_of_coverage", ">", OVERSTOCK_DAYS)]),
+]
+
+# Metric name -> SQL expression over the products table
+METRIC_SQL = {
+    "avg_daily_sales": "COALESCE(avg_daily_sales, 0)",
+    "total_stock": "(COALESCE(stoc_total, 0) + COALESCE(stoc_tranzit, 0))",
+    "days_of_coverage": "COALESCE(days_of_coverage, 999)",
+    "lead_time_days": "COALESCE(lead_time_days, 30)",
+    "safety_days": f"({EFFECTIVE_SAFETY_DAYS_SQL.strip()})",
+}
+
+# Avg daily sales / coverage shared by every code path (4 months, else 360 days)
+AVG_DAILY_SALES_SQL = """
+    CASE
+        WHEN COALESCE(vanzari_4luni, 0) > 0 THEN vanzari_4luni / 120.0
+        WHEN COALESCE(vanzari_360z, 0) > 0 THEN vanzari_360z / 360.0
+        ELSE 0
+    END
+"""
+DAYS_OF_COVERAGE_SQL = f"""
+    CASE
+        WHEN ({AVG_DAILY_SALES_SQL}) > 0
+            THEN (COALESCE(stoc_total, 0) + COALESCE(stoc_tranzit, 0)) / ({AVG_DAILY_SALES_SQL})
+        ELSE {NO_SALES_COVERAGE:g}
+    END
+"""
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _terms(rhs) -> tuple:
+    return tuple(rhs) if isinstance(rhs, (list, tuple)) else (rhs,)
+
+
+# ============================================================
+# COMPILERS
+# ============================================================
+
+def segment_case_sql(rules=SEGMENT_RULES, metric_sql: Dict[str, str] = None) -> str:
+    """Compile the rule table to a SQL CASE expression."""
+    metric_sql = metric_sql or METRIC_SQL
+
+    def term_sql(term):
+        return metric_sql[term] if isinstance(term, str) else repr(term)
+
+    whens = []
+    for segment, conditions in rules:
+        parts = [
+            f"{metric_sql[lhs]} {op} ({' + '.join(term_sql(t) for t in _terms(rhs))})"
+            for lhs, op, rhs in conditions
+        ]
+        whens.append(f"WHEN {' AND '.join(parts)} THEN '{segment}'")
+    return "CASE\n    " + "\n    ".join(whens) + f"\n    ELSE '{DEFAULT_SEGMENT}'\nEND"
+
+
+def classify_segments(metrics: Dict[str, np.ndarray], rules=SEGMENT_RULES) -> np.ndarray:
+    """
+    Vectorized classifier.
+
+    Args:
+        metrics: Arrays for every metric used by the rules (avg_daily_sales,
+                 total_stock, days_of_coverage, lead_time_days, safety_days)
+    """
+    def value(term):
+        return np.asarray(metrics[term], dtype=float) if isinstance(term, str) else float(term)
+
+    condlist = []
+    for _, conditions in rules:
+        mask = True
+        for lhs, op, rhs in conditions:
+            mask = mask & _OPS[op](value(lhs), sum(value(t) for t in _terms(rhs)))
+        condlist.append(np.asarray(mask, dtype=bool))
+    return np.select(condlist, [segment for segment, _ in rules], default=DEFAULT_SEGMENT)
+
+
+def classify_segment(metrics: Dict[str, float], rules=SEGMENT_RULES) -> str:
+    """Scalar classifier (one product)."""
+    def value(term):
+        return float(metrics[term]) if isinstance(term, str) else float(term)
+
+    for segment, conditions in rules:
+        if all(_OPS[op](value(lhs), sum(value(t) for t in _terms(rhs))) for lhs, op, rhs in conditions):
+            return segment
+    return DEFAULT_SEGMENT
+
+
+# ============================================================
+# NUMPY COUNTERPARTS OF THE SQL METRICS
+# ============================================================
+
+def avg_daily_sales(vanzari_4luni, vanzari_360z) -> np.ndarray:
+    """4 months / 120 if > 0, else 360 days / 360 (same as AVG_DAILY_SALES_SQL)."""
+    v4 = np.nan_to_num(np.asarray(vanzari_4luni, dtype=float))
+    v360 = np.nan_to_num(np.asarray(vanzari_360z, dtype=float))
+    return np.where(v4 > 0, v4 / 120.0, np.where(v360 > 0, v360 / 360.0, 0.0))
+
+
+def days_of_coverage(total_stock, avg_daily) -> np.ndarray:
+    """Stock / daily sales, NO_SALES_COVERAGE when there are no sales."""
+    stock = np.asarray(total_stock, dtype=float)
+    avg = np.asarray(avg_daily, dtype=float)
+    return np.where(avg > 0, stock / np.where(avg > 0, avg, 1.0), NO_SALES_COVERAGE)
+
+
+def update_metrics_sql(where: str = None) -> str:
+    """UPDATE for avg_daily_sales + days_of_coverage (run before update_segments_sql)."""
+    sql = f"""
+        UPDATE products SET
+            avg_daily_sales = {AVG_DAILY_SALES_SQL},
+            days_of_coverage = {DAYS_OF_COVERAGE_SQL}
+    """
+    if where:
+        sql += f" WHERE {where}"
+    return sql
+
+
+def update_segments_sql(where: str = None) -> str:
+    """UPDATE that sets segment from the rule table in a single pass."""
+    sql = f"UPDATE products SET segment = {segment_case_sql()}"
+    if where:
+        sql += f" WHERE {where}"
+    return sql
@@ -2,10 +2,7 @@ from pydantic import BaseModel, Field, computed_field
 from typing import Optional, Literal
 import re
 
-# Segment thresholds (in days relative to lead_time)
-SEGMENT_URGENT_BUFFER = 7    # Lead time + 7 days
-SEGMENT_ATTENTION_BUFFER = 21  # Lead time + 21 days
-SEGMENT_OVERSTOCK_DAYS = 90   # More than 90 days coverage
+from src.core.segmentation import classify_segment
 
 # Dimension coefficients for balanced stock
 # Small dimensions sell faster -> need more safety buffer
@@ -117,6 +114,10 @@ class Product(BaseModel):
     moq: float = Field(1.0, description="Minimum Order Quantity")
     safety_stock_days: float = Field(7.0, description="Safety stock in days")
     
+    # Statistical safety stock (injected from compute_safety_stock.py)
+    safety_stock_qty: float = Field(0.0, description="Safety stock units: z × σ_daily × √lead_time (0 = not computed)")
+    reorder_point: float = Field(0.0, description="Reorder point units: mean daily × lead_time + safety stock")
+    
     # Seasonality & Intelligence (injected from compute_seasonality.py)
     seasonality_index: float = Field(1.0, description="Seasonality multiplier (>1 = peak coming)")
     is_rising_star: bool = Field(False, description="Product with consistent 3-year growth")
@@ -198,41 +199,39 @@ class Product(BaseModel):
             return 999.0 if self.total_stock > 0 else 0.0
         return self.total_stock / self.avg_daily_sales
 
+    @computed_field
+    @property
+    def effective_safety_stock_days(self) -> float:
+        """Statistical safety stock in days of sales, else flat safety_stock_days"""
+        if self.safety_stock_qty > 0 and self.avg_daily_sales > 0:
+            return self.safety_stock_qty / self.avg_daily_sales
+        return self.safety_stock_days
+
     @computed_field
     @property
     def reorder_point_days(self) -> float:
         """Threshold in days: lead_time + safety_stock"""
-        return self.lead_time_days + self.safety_stock_days
+        return self.lead_time_days + self.effective_safety_stock_days
 
     @computed_field
     @property
     def segment(self) -> str:
         """
-        Segmentation logic per documentation:
+        Segmentation per src/core/segmentation.py (same rules as the DB precompute):
+        - No sales: OVERSTOCK if there is stock, else OK
         - CRITICAL: coverage < lead_time (stockout before resupply)
         - URGENT: coverage < lead_time + safety_stock
-        - ATTENTION: coverage < lead_time + safety + 14 days
+        - ATTENTION: coverage < lead_time + safety + 30 days
+        - OVERSTOCK: coverage > 180 days
         - OK: normal
-        - OVERSTOCK: coverage > 90 days or 2x normal
         """
-        cov = self.days_of_coverage
-        lt = self.lead_time_days
-        
-        # No sales = check stock level only
-        if self.avg_daily_sales <= 0:
-            if self.total_stock > 0:
-                return "OVERSTOCK"
-            return "OK"
-        
-        if cov < lt:
-            return "CRITICAL"
-        elif cov < lt + self.safety_stock_days:
-            return "URGENT"
-        elif cov < lt + self.safety_stock_days + 14:
-            return "ATTENTION"
-        elif cov > SEGMENT_OVERSTOCK_DAYS:
-            return "OVERSTOCK"
-        return "OK"
+        return classify_segment({
+            "avg_daily_sales": self.avg_daily_sales,
+            "total_stock": self.total_stock,
+            "days_of_coverage": self.days_of_coverage,
+            "lead_time_days": self.lead_time_days,
+            "safety_days": self.effective_safety_stock_days,
+        })
 
     @computed_field
     @property
@@ -322,14 +321,15 @@ class Product(BaseModel):
         # ============================================================
         # SAFETY STOCK ADJUSTMENTS
         # ============================================================
-        adjusted_safety = self.safety_stock_days * self.dimension_coefficient
+        adjusted_safety = self.effective_safety_stock_days * self.dimension_coefficient
         
         # Rising Star gets +50% safety (growth expected)
         if self.is_rising_star:
             adjusted_safety *= 1.5
         
         # High volatility gets +30% safety (unpredictable demand)
-        if self.volatility > 1.0:
+        # Statistical safety stock already scales with σ -> no extra bump
+        if self.volatility > 1.0 and self.safety_stock_qty <= 0:
             adjusted_safety *= 1.3
         
         # ============================================================
@@ -8,29 +8,41 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.core.loader import DataLoader
-from src.models.product import Product, get_sales_ref_month_yoy
+from src.models.product import Product
 from src.core.database import (
     load_products_from_db, get_unique_suppliers, get_unique_statuses, 
     load_products_from_db, get_unique_suppliers, get_unique_statuses, 
-    test_connection, get_segment_counts, load_segment_from_db,
+    test_connection, get_segment_counts,
     get_unique_families, load_family_products_from_db,
     get_subclass_summary, load_subclass_products, get_unique_subclasses,
-    get_sales_in_interval, get_transactions_date_range
+    get_sales_in_interval, get_transactions_date_range, load_forecast_matrix,
+    segment_export_query, load_search_catalogue
 )
 from datetime import datetime, timedelta, date
 from src.core.processor import process_products_vectorized
 from types import SimpleNamespace
-from src.core.cubaj_loader import get_cubaj_map, get_cubaj_stats
-from src.core.image_fetcher import get_product_image_cached
-from src.ui.order_builder import render_order_builder_v2
+from src.core.reference_data import load_reference, join_reference
+from src.core.month_comparison import (
+    DEFAULT_MONTHS, DEFAULT_YEAR, MONTH_NAMES, MONTH_FULL_NAMES,
+    comparison_columns, comparison_table, month_comparison, table_labels
+)
+from src.core.image_fetcher import cached_image, resolve_in_background
+from src.core.exports import download_buttons, export_frame, export_query
+from src.core import prefetch
+from src.ui.order_builder import render_order_builder_v2, render_affinity_panel
+from src.ui.segment_grid import SEGMENTS, prefetch_segments, render_segment_grid
+from src.ui.segment_view import build_segment_view, family_order, products_frame
+from src.ui.view_cache import cached_view, clear_views, config_hash, data_version, product_index
+from src.ui.timing import render_timings, timed
+from src.core.safety_stock import DEFAULT_SERVICE_LEVEL, apply_safety_stock_refresh
+from src.core.segmentation import update_metrics_sql, update_segments_sql
 
 # ============================================================
 # CONFIG
 # ============================================================
 CONFIG_PATH = "data/supplier_config.json"
 GEMINI_CONFIG_PATH = "data/gemini_config.json"
-SEASONALITY_PATH = "data/seasonality_index.json"
-ADVANCED_TRENDS_PATH = "data/advanced_trends.json"
+IMAGE_POLL_SECONDS = 2  # Thumbnail progress check while images resolve in the background
 
 def load_supplier_config():
     if os.path.exists(CONFIG_PATH):
@@ -38,20 +50,6 @@ def load_supplier_config():
             return json.load(f)
     return {"default": {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1}}
 
-def load_seasonality_index():
-    """Load pre-computed seasonality index from JSON"""
-    if os.path.exists(SEASONALITY_PATH):
-        with open(SEASONALITY_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
-def load_advanced_trends():
-    """Load pre-computed advanced trends from JSON"""
-    if os.path.exists(ADVANCED_TRENDS_PATH):
-        with open(ADVANCED_TRENDS_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
-
 def save_supplier_config(config):
     with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2, ensure_ascii=False)
@@ -70,7 +68,8 @@ def save_gemini_config(config):
 def sync_supplier_to_db(supplier_name, lead_time, safety_stock, moq):
     """
     Sync supplier config to DB and recalculate segments for that supplier.
-    This updates lead_time_days, safety_stock_days, moq AND recalculates segments.
+    This updates lead_time_days, safety_stock_days, moq, re-derives the statistical
+    safety stock (new lead time / service level) AND recalculates segments.
     """
     try:
         from src.core.database import get_engine
@@ -86,56 +85,14 @@ def sync_supplier_to_db(supplier_name, lead_time, safety_stock, moq):
                 WHERE furnizor = :furn
             """), {"lt": lead_time, "ss": safety_stock, "moq": moq, "furn": supplier_name})
             
-            # 2. Recalculate avg_daily_sales and days_of_coverage for this supplier
-            conn.execute(text("""
-                UPDATE products SET 
-                    avg_daily_sales = COALESCE(vanzari_4luni, 0) / 120.0,
-                    days_of_coverage = CASE 
-                        WHEN COALESCE(vanzari_4luni, 0) = 0 THEN 999
-                        ELSE (COALESCE(stoc_total, 0) + COALESCE(stoc_tranzit, 0)) / (COALESCE(vanzari_4luni, 0) / 120.0)
-                    END
-                WHERE furnizor = :furn
-            """), {"furn": supplier_name})
-            
-            # 3. Recalculate segments for this supplier
-            # CRITICAL
-            conn.execute(text("""
-                UPDATE products SET segment = 'CRITICAL'
-                WHERE furnizor = :furn AND days_of_coverage < lead_time_days
-            """), {"furn": supplier_name})
+            # 1b. Statistical safety stock (z × σ × √L) for the new lead time / service level
+            apply_safety_stock_refresh(conn, load_supplier_config(), supplier_name)
             
-            # URGENT
-            conn.execute(text("""
-                UPDATE products SET segment = 'URGENT'
-                WHERE furnizor = :furn 
-                AND segment != 'CRITICAL'
-                AND days_of_coverage >= lead_time_days
-                AND days_of_coverage < (lead_time_days + safety_stock_days)
-            """), {"furn": supplier_name})
-            
-            # ATTENTION
-            conn.execute(text("""
-                UPDATE products SET segment = 'ATTENTION'
-                WHERE furnizor = :furn 
-                AND segment NOT IN ('CRITICAL', 'URGENT')
-                AND days_of_coverage >= (lead_time_days + safety_stock_days)
-                AND days_of_coverage < (lead_time_days + safety_stock_days + 30)
-            """), {"furn": supplier_name})
-            
-            # OVERSTOCK
-            conn.execute(text("""
-                UPDATE products SET segment = 'OVERSTOCK'
-                WHERE furnizor = :furn 
-                AND segment NOT IN ('CRITICAL', 'URGENT', 'ATTENTION')
-                AND days_of_coverage > 180
-            """), {"furn": supplier_name})
+            # 2. Recalculate avg_daily_sales and days_of_coverage for this supplier
+            conn.execute(text(update_metrics_sql("furnizor = :furn")), {"furn": supplier_name})
             
-            # OK (everything else)
-            conn.execute(text("""
-                UPDATE products SET segment = 'OK'
-                WHERE furnizor = :furn 
-                AND segment NOT IN ('CRITICAL', 'URGENT', 'ATTENTION', 'OVERSTOCK')
-            """), {"furn": supplier_name})
+            # 3. Recalculate segments for this supplier (shared rule table)
+            conn.execute(text(update_segments_sql("furnizor = :furn")), {"furn": supplier_name})
             
             conn.commit()
             return True, "OK"
@@ -496,9 +453,7 @@ Raspunde in romana, concis si actionabil."""
 def main():
     config = load_supplier_config()
     gemini_cfg = load_gemini_config()
-    seasonality_data = load_seasonality_index()  # Load at startup
-    advanced_trends_data = load_advanced_trends()  # Load advanced trends
-    cubaj_data = get_cubaj_map()  # Load cubaj/logistics data
+    reference = load_reference()  # Seasonality, trends, cubaj (loaded once per process)
     default_cfg = config.get("default", {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1})
     
     # Initialize ORDER BUILDER session state at top level for persistence
@@ -545,16 +500,20 @@ def main():
             with tab_defaults:
                 st.markdown("### Default Supplier Parameters")
                 st.markdown("*Acesti parametri se aplica furnizorilor fara setari specifice*")
-                col1, col2, col3 = st.columns(3)
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     new_lt = st.number_input("Lead Time (days)", value=default_cfg.get("lead_time_days", 30), min_value=1, max_value=180, key="set_lt")
                 with col2:
-                    new_ss = st.number_input("Safety Stock (days)", value=float(default_cfg.get("safety_stock_days", 7)), min_value=0.0, max_value=60.0, key="set_ss")
+                    new_ss = st.number_input("Safety Stock (days)", value=float(default_cfg.get("safety_stock_days", 7)), min_value=0.0, max_value=60.0, key="set_ss",
+                                             help="Folosit doar pentru produsele fără safety stock statistic (compute_safety_stock.py)")
                 with col3:
                     new_moq = st.number_input("MOQ", value=float(default_cfg.get("moq", 1)), min_value=1.0, key="set_moq")
+                with col4:
+                    new_sl = st.number_input("Nivel Serviciu (%)", value=float(default_cfg.get("service_level", DEFAULT_SERVICE_LEVEL)) * 100, min_value=50.0, max_value=99.9, step=0.5, key="set_sl",
+                                             help="Probabilitatea de a nu rămâne fără stoc în lead time. SS = z × σ zilnic × √Lead Time")
                 
                 if st.button("Save Defaults"):
-                    config["default"] = {"lead_time_days": new_lt, "safety_stock_days": new_ss, "moq": new_moq}
+                    config["default"] = {"lead_time_days": new_lt, "safety_stock_days": new_ss, "moq": new_moq, "service_level": round(new_sl / 100, 4)}
                     save_supplier_config(config)
                     st.success("Saved")
                     st.rerun()
@@ -574,6 +533,8 @@ def main():
                         if result.returncode == 0:
                             st.success("✅ Segmentele au fost recalculate! Refresh pagina pentru a vedea noile valori.")
                             st.cache_data.clear()  # Clear cached data
+                            prefetch.clear()
+                            clear_views()
                         else:
                             st.error(f"❌ Eroare: {result.stderr}")
             
@@ -594,6 +555,7 @@ def main():
                             "Lead Time": config[sup].get("lead_time_days", "-"),
                             "Safety Stock": config[sup].get("safety_stock_days", "-"),
                             "MOQ": config[sup].get("moq", "-"),
+                            "Nivel Serviciu": config[sup].get("service_level", "-"),
                         })
                     st.dataframe(cfg_data, width='stretch')
                 else:
@@ -606,18 +568,20 @@ def main():
                     new_supplier_name = st.selectbox("Alege Furnizor", ["(alege)"] + all_suppliers, key="new_sup_select")
                     if new_supplier_name and new_supplier_name != "(alege)":
                         existing = config.get(new_supplier_name, default_cfg.copy())
-                        col1, col2, col3 = st.columns(3)
+                        col1, col2, col3, col4 = st.columns(4)
                         with col1:
                             sup_lt = st.number_input("Lead Time", value=int(existing.get("lead_time_days", 30)), min_value=1, max_value=180, key="new_sup_lt")
                         with col2:
                             sup_ss = st.number_input("Safety Stock", value=float(existing.get("safety_stock_days", 7)), min_value=0.0, key="new_sup_ss")
                         with col3:
                             sup_moq = st.number_input("MOQ", value=float(existing.get("moq", 1)), min_value=1.0, key="new_sup_moq")
+                        with col4:
+                            sup_sl = st.number_input("Nivel Serviciu (%)", value=float(existing.get("service_level", DEFAULT_SERVICE_LEVEL)) * 100, min_value=50.0, max_value=99.9, step=0.5, key="new_sup_sl")
                         
                         col_save, col_del = st.columns(2)
                         with col_save:
                             if st.button("Salveaza Furnizor", key="save_new_sup"):
-                                config[new_supplier_name] = {"lead_time_days": sup_lt, "safety_stock_days": sup_ss, "moq": sup_moq}
+                                config[new_supplier_name] = {"lead_time_days": sup_lt, "safety_stock_days": sup_ss, "moq": sup_moq, "service_level": round(sup_sl / 100, 4)}
                                 save_supplier_config(config)
                                 # Sync to DB and recalculate segments
                                 success, msg = sync_supplier_to_db(new_supplier_name, sup_lt, sup_ss, sup_moq)
@@ -626,6 +590,8 @@ def main():
                                 else:
                                     st.warning(f"Salvat in JSON, dar eroare DB: {msg}")
                                 st.cache_data.clear()
+                                prefetch.clear()
+                                clear_views()
                                 st.rerun()
                         with col_del:
                             if new_supplier_name in config and new_supplier_name != "default":
@@ -703,8 +669,8 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
 - Actiune: Plaseaza comanda ACUM
 
 **ATTENTION (Galben)**
-- Acoperire < Lead Time + Safety Stock + 14 zile
-- Ai ~2 saptamani sa comanzi
+- Acoperire < Lead Time + Safety Stock + 30 zile
+- Ai ~o luna sa comanzi
 - Actiune: Planifica comanda, verifica MOQ
 
 **OK (Verde)**
@@ -713,7 +679,7 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
 - Actiune: Monitorizare saptamanala
 
 **OVERSTOCK (Albastru)**
-- Acoperire > 90 zile
+- Acoperire > 180 zile (sau stoc fara vanzari)
 - Capital blocat in marfa
 - Actiune: Promotie? Reduce comenzile viitoare
                 """)
@@ -739,6 +705,7 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
     
     # Data Source Toggle (compact)
     use_postgres = st.sidebar.toggle("PostgreSQL", value=True, help="Folosește PostgreSQL pentru viteză")
+    forecast_data = None  # Monthly demand forecasts (PostgreSQL only)
     
     if use_postgres:
         success, msg = test_connection()
@@ -748,6 +715,7 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
             
             selected_supplier = st.sidebar.selectbox("Furnizor", ["ALL"] + suppliers, key="pg_supplier")
             selected_status = st.sidebar.selectbox("Stare PM", ["ALL"] + pm_statuses, key="pg_status")
+            forecast_data = load_forecast_matrix()
             
             with st.spinner("Incarcare..."):
                 raw_df = load_products_from_db(
@@ -761,12 +729,20 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
 
                 if selected_subclasses:
                      raw_df = raw_df[raw_df['subclasa'].isin(selected_subclasses)]
+
+            # Full inventory dump: streamed from the server-side cursor, built on click
+            with st.sidebar.expander("📥 Export inventar", expanded=False):
+                inv_query, inv_params = segment_export_query(
+                    furnizor=selected_supplier, stare_pm=selected_status
+                )
+                download_buttons(lambda fmt: export_query(inv_query, inv_params, fmt, "Inventar"),
+                                 f"inventar_{selected_supplier[:20].lower()}", key="exp_inventory")
         else:
             st.sidebar.error(f"Nu pot conecta la PostgreSQL: {msg}")
             use_postgres = False
     
     if not use_postgres:
-        data_files = [f for f in os.listdir("data") if f.endswith('.csv')] if os.path.exists("data") else []
+        data_files = [f for f in os.listdir("data") if f.endswith(('.csv', '.xlsx'))] if os.path.exists("data") else []
         if not data_files:
             st.sidebar.warning("No CSV in /data")
             return
@@ -775,16 +751,17 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
             index=data_files.index("Tcioara Forecast_.csv") if "Tcioara Forecast_.csv" in data_files else 0,
             key="csv_file")
         data_path = f"data/{selected_file}"
+        data_mtime = os.path.getmtime(data_path)  # A re-exported file is re-read and re-keyed
         
         @st.cache_data(show_spinner=False)
-        def load_raw(path):
+        def load_raw(path, mtime):
             loader = DataLoader(path)
-            loader.load_data()
+            loader.load_fast()
             return loader.df
         
         with st.spinner("Incarcare CSV..."):
             try:
-                raw_df = load_raw(data_path)
+                raw_df = load_raw(data_path, data_mtime)
             except Exception as e:
                 st.error(f"Eroare: {e}")
                 return
@@ -802,9 +779,10 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
             sup_lt = st.number_input("Lead Time", value=int(current_cfg.get("lead_time_days", 30)), min_value=1, max_value=180, key="sb_lt")
             sup_ss = st.number_input("Safety Stock", value=float(current_cfg.get("safety_stock_days", 7)), min_value=0.0, key="sb_ss")
             sup_moq = st.number_input("MOQ", value=float(current_cfg.get("moq", 1)), min_value=1.0, key="sb_moq")
+            sup_sl = st.number_input("Nivel Serviciu (%)", value=float(current_cfg.get("service_level", DEFAULT_SERVICE_LEVEL)) * 100, min_value=50.0, max_value=99.9, step=0.5, key="sb_sl")
             
             if st.button("Salveaza", key="sb_save"):
-                config[selected_supplier] = {"lead_time_days": sup_lt, "safety_stock_days": sup_ss, "moq": sup_moq}
+                config[selected_supplier] = {"lead_time_days": sup_lt, "safety_stock_days": sup_ss, "moq": sup_moq, "service_level": round(sup_sl / 100, 4)}
                 save_supplier_config(config)
                 # Sync to DB and recalculate segments
                 success, msg = sync_supplier_to_db(selected_supplier, sup_lt, sup_ss, sup_moq)
@@ -813,33 +791,82 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
                 else:
                     st.warning(f"Salvat in JSON, dar eroare DB: {msg}")
                 st.cache_data.clear()
+                prefetch.clear()
+                clear_views()
                 st.rerun()
     
+    # Month comparison (V.Oct'25 / V.Oct'24 / Tr.Oct columns)
+    with st.sidebar.expander("Comparație lunară", expanded=False):
+        compare_months = st.multiselect(
+            "Luni", list(MONTH_NAMES), default=list(DEFAULT_MONTHS),
+            format_func=lambda m: MONTH_FULL_NAMES[m], key="compare_months"
+        ) or list(DEFAULT_MONTHS)
+        compare_year = int(st.number_input(
+            "An curent", value=DEFAULT_YEAR, min_value=2015, max_value=2100, step=1, key="compare_year",
+            help="Vânzările lunilor alese în acest an vs. anul anterior"
+        ))
+    month_specs = comparison_columns(compare_months, compare_year)
+    
+    # Everything the computed views depend on besides segment / page / intervals (view_cache key)
+    view_scope = (
+        selected_supplier, selected_status,
+        tuple(st.session_state.get("pg_subclass") or ()) if use_postgres else (selected_file, data_mtime),
+        config_hash(config), data_version(), tuple(compare_months), compare_year,
+    )
+    
+    # Search index over the whole catalogue (shared by all sessions, rebuilt per data version)
+    if use_postgres:
+        catalogue_source, load_catalogue = "db", load_search_catalogue
+    else:
+        catalogue_source = f"csv:{selected_file}:{data_mtime}"
+        
+        def load_catalogue():
+            return DataLoader.products_frame(raw_df)[["cod_articol", "denumire", "furnizor"]]
+    
+    def search_codes(text):
+        """Codes matching the search text (typos / diacritics tolerated), best match first."""
+        return tuple(product_index(catalogue_source, load_catalogue).codes_for(text, limit=None))
+    
+    def month_comparison_for(products):
+        """Comparison columns for a product frame / list: taken from the processed frame when present."""
+        cols = [c for spec in month_specs for c in (spec.current, spec.prior, spec.yoy)]
+        if isinstance(products, pd.DataFrame):
+            if all(c in products.columns for c in cols):
+                return products[cols].reset_index(drop=True)
+            return month_comparison(products["sales_history"], compare_months, compare_year)
+        return month_comparison([p.sales_history for p in products], compare_months, compare_year)
+    
+    def month_column_config(specs):
+        config = {}
+        for spec in specs:
+            name = MONTH_FULL_NAMES[spec.month]
+            config[spec.current_label] = st.column_config.NumberColumn(
+                spec.current_label, help=f"Vânzări {name} {spec.year}", format="%d")
+            config[spec.prior_label] = st.column_config.NumberColumn(
+                spec.prior_label, help=f"Vânzări {name} {spec.year - 1} (baseline)", format="%d")
+            config[spec.trend_label] = st.column_config.TextColumn(
+                spec.trend_label, help=f"Trend YoY pentru {name}: ({spec.year}/{spec.year - 1} - 1) × 100%")
+        return config
+    
     # ============================================================
     # PARSE PRODUCTS
     # ============================================================
     
-    def parse_from_postgres(df, cfg, seasonality_data=None, advanced_trends_data=None, cubaj_data=None):
+    def parse_from_postgres(df, cfg, reference=None):
         """Parse products from PostgreSQL DataFrame (different column names)"""
         products = []
         default = cfg.get("default", {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1})
-        seasonality_data = seasonality_data or {}
-        advanced_trends_data = advanced_trends_data or {}
-        cubaj_data = cubaj_data or {}
+        if df.empty:
+            return products
+        # Seasonality / trends / cubaj for all rows in one lookup
+        ref_df = join_reference(df[["cod_articol"]].copy(), reference)
         
-        for _, row in df.iterrows():
+        for (_, row), (_, ref) in zip(df.iterrows(), ref_df.iterrows()):
             try:
                 furnizor = str(row.get("furnizor", "")) if pd.notnull(row.get("furnizor")) else ""
                 supplier_cfg = cfg.get(furnizor, default)
                 cod = str(row.get("cod_articol", ""))
                 
-                # Get seasonality info for this product
-                season_info = seasonality_data.get(cod, {})
-                # Get advanced trends for this product
-                trends_info = advanced_trends_data.get(cod, {})
-                # Get cubaj/logistics info for this product
-                cubaj_info = cubaj_data.get(cod, {})
-                
                 p = Product(
                     nr_art=cod,
                     cod_articol=cod,
@@ -876,106 +903,30 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
                     lead_time_days=int(row.get("lead_time_days", 30) or 30),
                     safety_stock_days=float(row.get("safety_stock_days", 7) or 7),
                     moq=float(row.get("moq", 1) or 1),
+                    safety_stock_qty=float(row.get("safety_stock_qty", 0) or 0),
+                    reorder_point=float(row.get("reorder_point", 0) or 0),
                     # Seasonality fields
-                    seasonality_index=float(season_info.get("seasonality_index", 1.0)),
-                    is_rising_star=bool(season_info.get("is_rising_star", False)),
-                    trend=str(season_info.get("trend", "STABLE")),
+                    seasonality_index=float(ref["seasonality_index"]),
+                    is_rising_star=bool(ref["is_rising_star"]),
+                    trend=str(ref["trend"]),
                     # Advanced Trends fields
-                    yoy_growth=float(trends_info.get("yoy_growth", 0.0)),
-                    acceleration=float(trends_info.get("acceleration", 0.0)),
-                    volatility=float(trends_info.get("volatility", 1.0)),
-                    repeat_rate=float(trends_info.get("repeat_rate", 0.0)),
-                    peak_month=int(trends_info.get("peak_month", 0)),
+                    yoy_growth=float(ref["yoy_growth"]),
+                    acceleration=float(ref["acceleration"]),
+                    volatility=float(ref["volatility"]),
+                    repeat_rate=float(ref["repeat_rate"]),
+                    peak_month=int(ref["peak_month"]),
                     # Historical sales data from DB
                     sales_history=json.loads(row.get("sales_history", "{}") or "{}") if isinstance(row.get("sales_history"), str) else (row.get("sales_history") or {}),
                     sales_last_3m=float(row.get("sales_last_3m", 0) or 0),
                     # Cubaj & Logistics
-                    cubaj_m3=cubaj_info.get("cubaj_m3"),
-                    masa_kg=cubaj_info.get("masa_kg")
+                    cubaj_m3=ref["cubaj_m3"] if pd.notnull(ref["cubaj_m3"]) else None,
+                    masa_kg=ref["masa_kg"] if pd.notnull(ref["masa_kg"]) else None
                 )
                 products.append(p)
             except Exception:
                 continue
         return products
     
-    def parse_with_config(df, cfg):
-        products = []
-        default = cfg.get("default", {"lead_time_days": 30, "safety_stock_days": 7, "moq": 1})
-        
-        for _, row in df.iterrows():
-            try:
-                def get_float(col, d=0.0):
-                    val = row.get(col, d)
-                    try: return float(val) if pd.notnull(val) else d
-                    except: return d
-                def get_str(col, d=""):
-                    val = row.get(col, d)
-                    if pd.notnull(val):
-                        # Handle numeric values - convert to int first to remove .0
-                        try:
-                            if isinstance(val, float):
-                                return str(int(val))
-                            return str(val).strip()
-                        except:
-                            return str(val).strip()
-                    return d
-                
-                # Use COD ARTICOL as primary identifier (NR ART is just row number)
-                nr_art = get_str("COD ARTICOL")
-                if not nr_art: continue
-                
-                furnizor = get_str("FURNIZOR EXT")
-                supplier_cfg = cfg.get(furnizor, default)
-                
-                p = Product(
-                    nr_art=nr_art,
-                    cod_articol=get_str("COD ARTICOL"),
-                    nume_produs=get_str("DENUMIRE ARTICOL"),
-                    furnizor=furnizor,
-                    categorie=get_str("CLASA DENUMIRE"),
-                    stare_pm=get_str("STARE PM", ""),
-                    # Classification
-                    clasa=get_str("CLASA DENUMIRE"),
-                    subclasa=get_str("SUBCLASA DENUMIRE"),
-                    pm=get_str("PM"),
-                    # Prices
-                    cost_achizitie=get_float("Cost Achizitie Furnizor (ultimul NIR_cronologic)"),
-                    pret_catalog=get_float("Pret de Catalog cu TVA"),
-                    pret_vanzare=get_float("Pret Vanzare cu TVA (magazin _client final)"),
-                    pret_retea=get_float("Pret mediu Vanzare Furnizor catre Retea la zi"),
-                    # Stock totals
-                    stoc_disponibil_total=get_float("Stoc Disponibil Cantitativ Magazine Dep+Acc+Outlet"),
-                    stoc_in_tranzit=get_float("CAFE cantitativ nereceptionat Furnizor"),
-                    stoc_magazin_total=get_float("Stoc Disponibil Cantitativ Magazine"),
-                    # Stock per store
-                    stoc_baneasa=get_float("Stoc Disponibil Cantitativ Baneasa"),
-                    stoc_pipera=get_float("Stoc Disponibil Cantitativ Pipera"),
-                    stoc_militari=get_float("Stoc Disponibil Cantitativ Militari"),
-                    stoc_pantelimon=get_float("Stoc Disponibil Cantitativ Pantelimon"),
-                    stoc_iasi=get_float("Stoc Disponibil Cantitativ Iasi"),
-                    stoc_brasov=get_float("Stoc Disponibil Cantitativ Brasov"),
-                    stoc_pitesti=get_float("Stoc Disponibil Cantitativ Pitesti"),
-                    stoc_sibiu=get_float("Stoc Disponibil Cantitativ Sibiu"),
-                    stoc_oradea=get_float("Stoc Disponibil Cantitativ Oradea"),
-                    stoc_constanta=get_float("Stoc Disponibil Cantitativ Constanta"),
-                    stoc_outlet_constanta=get_float("Stoc Disponibil Cantitativ Constanta Outlet"),
-                    stoc_outlet_pipera=get_float("Stoc Disponibil Cantitativ Pipera Outlet"),
-                    # Sales
-                    vanzari_ultimele_4_luni=get_float("Vanzari Cantitative Magazine_client final ult. 4 Luni"),
-                    vanzari_ultimele_360_zile=get_float("Vanzari Cantitative Magazine 360z (client final)"),
-                    vanzari_2024=get_float("Vanzari Cantitative Magazine 2024 (client final)"),
-                    vanzari_2025=get_float("Vanzari Cantitative Magazine 2025 (client final)"),
-                    vanzari_m16=get_float("Vanzari Cantitative Furnizor 360z catre M16"),
-                    vanzari_fara_m16=get_float("Vanzari Cantitative Furnizor 360z exclus M16"),
-                    # Supplier config
-                    lead_time_days=int(supplier_cfg.get("lead_time_days", 30)),
-                    safety_stock_days=float(supplier_cfg.get("safety_stock_days", 7)),
-                    moq=float(supplier_cfg.get("moq", 1))
-                )
-                products.append(p)
-            except: continue
-        return products
-    
     # ============================================================
     # PROCESS DATA - OPTIMIZED PATH FOR POSTGRESQL
     # ============================================================
@@ -992,25 +943,28 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
         # Don't load all products upfront - load per-tab later
         products = []  # Empty - will load per segment in tabs
     else:
-        # CSV mode - need to parse all
-        with st.spinner("⏳ Se procesează produsele din CSV... Poate dura mai mult."):
-            products = parse_with_config(raw_df, config)
+        # CSV mode - same processed frame as the PostgreSQL path (once per filters / config / data version)
+        def parse_csv_products():
+            with st.spinner("⏳ Se procesează produsele din CSV..."):
+                frame = DataLoader.products_frame(raw_df, config)
+                if selected_supplier != "ALL":
+                    frame = frame[frame["furnizor"] == selected_supplier]
+                if selected_status != "ALL":
+                    frame = frame[frame["stare_pm"] == selected_status]
+                return process_products_vectorized(frame.reset_index(drop=True), config, reference,
+                                                   None, compare_months, compare_year)
         
-        # Apply filters for CSV mode
-        if selected_supplier != "ALL":
-            products = [p for p in products if p.furnizor == selected_supplier]
-        if selected_status != "ALL":
-            products = [p for p in products if p.stare_pm == selected_status]
+        products = cached_view("csv_products", view_scope, parse_csv_products)
         
-        # Build segments for CSV mode
-        for p in products:
-            segments[p.segment].append(p)
+        # Segment tabs take the processed frame directly
+        if not products.empty:
+            for seg_name in segments:
+                segments[seg_name] = products[products["segment"] == seg_name].reset_index(drop=True)
         
-        # Build stats from parsed products
         for seg_name in segments:
             segment_stats[seg_name] = {
                 "count": len(segments[seg_name]),
-                "value": sum(p.stock_value for p in segments[seg_name])
+                "value": float(segments[seg_name]["stock_value"].sum()) if len(segments[seg_name]) else 0.0
             }
     
     # ============================================================
@@ -1188,74 +1142,32 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
     
     st.markdown("---")
     
-    def render_interactive_table(product_list, segment_name, allow_order=True):
+    def build_table_view(products, paged=False):
         """
-        Renders an interactive table with checkbox selection and on-demand order calculation.
+        Processed frame + "Buyer 12" display frame for render_interactive_table.
         
-        Args:
-            product_list: List of Product objects
-            segment_name: Name of segment (for unique keys)
-            allow_order: If False, no order calculation is available (for OVERSTOCK)
+        Returns:
+            (frame, display df, family sales, family stocks)
         """
-        if not product_list:
-            st.info("Nu exista produse in aceasta categorie")
-            return None
-            
-        # Build product lookup by nr_art
-        product_lookup = {p.nr_art: p for p in product_list}
+        frame = products if isinstance(products, pd.DataFrame) else products_frame(products)
         
         # ============================================================
         # FAMILY GROUPING: Sort products so families stay together
+        # (a server-paged grid page keeps the SQL order)
         # ============================================================
-        # First, identify all families and their total sales
-        family_sales = {}
-        family_stocks = {}
-        for p in product_list:
-            if p.familie:
-                family_sales[p.familie] = family_sales.get(p.familie, 0) + p.vanzari_ultimele_4_luni
-                family_stocks[p.familie] = family_stocks.get(p.familie, 0) + p.total_stock
-        
-        # Calculate family-level unbalanced status for each product
-        def is_unbalanced(p):
-            """Check if product has unbalanced stock within its family"""
-            if not p.familie or p.familie not in family_sales:
-                return False
-            fam_sales = family_sales[p.familie]
-            fam_stock = family_stocks[p.familie]
-            if fam_sales <= 0 or fam_stock <= 0:
-                return False
-            # Calculate shares
-            sales_share = p.vanzari_ultimele_4_luni / fam_sales if fam_sales > 0 else 0
-            stock_share = p.total_stock / fam_stock if fam_stock > 0 else 0
-            # Unbalanced if difference > 15%
-            return abs(sales_share - stock_share) > 0.15
+        if not paged:
+            frame = family_order(frame)
+        frame = frame.reset_index(drop=True)
         
-        # Sort: family groups together, then by dimension within family
-        # Non-family products go last
-        def sort_key(p):
-            if p.familie:
-                # Primary: family sales (descending), Secondary: family name, Tertiary: dimension
-                fam_sales_val = family_sales.get(p.familie, 0)
-                return (0, -fam_sales_val, p.familie, p.dimensiune or "zzz")
-            else:
-                return (1, 0, "", p.nume_produs)
-        
-        sorted_products = sorted(product_list, key=sort_key)
+        # Family totals (AI explanation)
+        family_totals = frame.groupby("familie")[["vanzari_ultimele_4_luni", "total_stock"]].sum()
         
         # ============================================================
         # BUILD DATA - "BUYER 12" SIMPLIFIED COLUMNS
         # ============================================================
-        from datetime import datetime
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        
-        # FIXED: Target months for comparison = Oct, Nov, Dec (2025 vs 2024)
-        target_months = [10, 11, 12]  # Oct, Nov, Dec
-        compare_year = 2025  # Current year to show
-        prior_year = 2024    # Prior year for comparison
         
-        month_names = {1: "Ian", 2: "Feb", 3: "Mar", 4: "Apr", 5: "Mai", 6: "Iun",
-                       7: "Iul", 8: "Aug", 9: "Sep", 10: "Oct", 11: "Nov", 12: "Dec"}
+        # Month comparison columns (months / year from the sidebar), all products at once
+        month_table = comparison_table(month_comparison_for(frame), month_specs)
         
         # ============================================================
         # FETCH INTERVAL SALES FROM DUAL CALENDAR
@@ -1271,127 +1183,72 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
             int2_start, int2_end = st.session_state.interval2_range
             interval2_sales = get_sales_in_interval(int2_start, int2_end)
         
-        data = []
-        for p in sorted_products:
-            # Get YoY data for Oct, Nov, Dec (2025 vs 2024)
-            oct_data = get_sales_ref_month_yoy(p.sales_history, 10, compare_year)
-            nov_data = get_sales_ref_month_yoy(p.sales_history, 11, compare_year)
-            dec_data = get_sales_ref_month_yoy(p.sales_history, 12, compare_year)
-            
-            # Check if unbalanced within family
-            is_unbal = is_unbalanced(p)
-            
-            # Calculate suggested quantity with formula explanation
-            suggested_qty = int(p.suggested_order_qty)
-            adjusted_safety = round(p.safety_stock_days * p.dimension_coefficient, 1)
-            formula_text = f"Media: {p.avg_daily_sales:.2f}/zi × (Lead:{p.lead_time_days} + Safety:{adjusted_safety} + 60) - Stoc:{int(p.total_stock)} = {suggested_qty} buc"
-            
-            # ============================================================
-            # PRIMARY COLUMNS (Always Visible - "Buyer 12")
-            # Oct, Nov, Dec with 2025 vs 2024 comparison + Trend for Oct and Nov
-            # ============================================================
-            row = {
-                "Selecteaza": False,  # Checkbox column
-                # 0. Image - Lazy fetch from product URL if needed
-                "Img": (
-                    p.image_url if hasattr(p, 'image_url') and p.image_url
-                    else (get_product_image_cached(p.product_url) if hasattr(p, 'product_url') and p.product_url else None)
-                ),
-                # 1. Produs (Code + Name)
-                "Produs": f"{p.nr_art} | {(p.nume_produs[:18] + '..' if len(p.nume_produs) > 18 else p.nume_produs)}",
-                # 2. Pret (Cost / Sell)
-                "Cost": round(p.cost_achizitie, 0),
-                "PVanz": round(p.pret_vanzare, 0),
-                # 3. Stoc Indomex (Primary - Furnizor)
-                "Stoc Idx": int(p.stoc_indomex),
-                # 4. Stoc Magazine (Network)
-                "Stoc Mag": int(p.stoc_magazin_total),
-                # 5. Sales Last 3 Months
-                "V.3L": int(p.sales_last_3m) if p.sales_last_3m > 0 else int(p.vanzari_ultimele_4_luni),
-                # 6-8. OCTOBER: 2025 vs 2024 + Trend
-                "V.Oct'25": int(oct_data["current_year_sales"]),
-                "V.Oct'24": int(oct_data["prior_year_sales"]),
-                "Tr.Oct": f"{int(oct_data['yoy_pct']):+d}%" if oct_data["prior_year_sales"] > 0 else "-",
-                # 9-11. NOVEMBER: 2025 vs 2024 + Trend
-                "V.Nov'25": int(nov_data["current_year_sales"]),
-                "V.Nov'24": int(nov_data["prior_year_sales"]),
-                "Tr.Nov": f"{int(nov_data['yoy_pct']):+d}%" if nov_data["prior_year_sales"] > 0 else "-",
-                # 12-13. DECEMBER: 2025 vs 2024 (no trend - future month)
-                "V.Dec'25": int(dec_data["current_year_sales"]),
-                "V.Dec'24": int(dec_data["prior_year_sales"]),
-
-                # ============================================================
-                # ZILEÔćĺ0: Days Until Stockout (Priority Feature)
-                # ­čö┤ = < Lead Time (STOCKOUT IMMINENT)
-                # ÔÜá´ŞĆ = < Lead Time + 14 days (URGENT)
-                # Ôťů = > Lead Time + 14 days (SAFE)
-                # ============================================================
-                "ZileÔćĺ0": (
-                    f"­čö┤ {int(p.days_of_coverage)}" if p.days_of_coverage < p.lead_time_days else
-                    f"ÔÜá´ŞĆ {int(p.days_of_coverage)}" if p.days_of_coverage < (p.lead_time_days + 14) else
-                    f"Ôťů {int(p.days_of_coverage)}" if p.days_of_coverage < 999 else
-                    "Ôł×"
-                ) if p.avg_daily_sales > 0 else "Ôł×",
-
-                # 14. Status + Suggested Qty
-                "Status": p.segment,
-                "NECESAR": suggested_qty,
-                
-                # ============================================================
-                # LEAD TIME ALERT COLUMNS (Primary - always visible)
-                # Marja = Zile Acoperire - Lead Time
-                # Red alert (🔴) when Marja < 5
-                # ============================================================
-                "_marja_raw": (round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days,
-                "Zile Ac.": f"🔴 {round(p.days_of_coverage, 1):.1f}" if ((round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days < 5 and p.days_of_coverage < 999) else (f"{round(p.days_of_coverage, 1):.1f}" if p.days_of_coverage < 999 else "999"),
-                "Lead": f"🔴 {p.lead_time_days}" if ((round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days < 5 and p.days_of_coverage < 999) else str(p.lead_time_days),
-                "Marja": f"🔴 {((round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days):.1f}" if ((round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days < 5 and p.days_of_coverage < 999) else f"{((round(p.days_of_coverage, 1) if p.days_of_coverage < 999 else 999) - p.lead_time_days):.1f}",
-                
-                # ============================================================
-                # SECONDARY COLUMNS (Hidden by default - show via toggle)
-                # ============================================================
-                "Cod": p.nr_art,
-                "Denumire": p.nume_produs,
-                "Familie": f"{p.familie}" if (p.familie and is_unbal) else (p.familie if p.familie else "-"),
-                "Dim": p.dimensiune if p.dimensiune else "-",
-                "Tranzit": int(p.stoc_in_tranzit),
-                "V.4L": int(p.vanzari_ultimele_4_luni),
-                "V.360": int(p.vanzari_ultimele_360_zile),
-                "V.2024": int(p.vanzari_2024),
-                "V.2025": int(p.vanzari_2025),
-                "Med/Zi": round(p.avg_daily_sales, 2),
-                "Sezon": round(p.seasonality_index, 2),
-                "YoY%": f"{int(p.yoy_growth):+d}%" if p.yoy_growth != 0 else "-",
-                "Clasa": p.clasa[:15] if p.clasa else "-",
-                "Subclasa": p.subclasa[:15] if p.subclasa else "-",
-                # Store stocks
-                "S.Ban": int(p.stoc_baneasa),
-                "S.Pip": int(p.stoc_pipera),
-                "S.Mil": int(p.stoc_militari),
-                "S.Pan": int(p.stoc_pantelimon),
-                "S.Iasi": int(p.stoc_iasi),
-                "S.Bras": int(p.stoc_brasov),
-                "S.Pit": int(p.stoc_pitesti),
-                "S.Sib": int(p.stoc_sibiu),
-                "S.Ora": int(p.stoc_oradea),
-                "S.Cta": int(p.stoc_constanta),
-                # Cubaj & Logistics
-                "Cubaj": f"{p.cubaj_m3:.3f}" if p.cubaj_m3 else "N/A",
-                "Masa": f"{p.masa_kg:.1f}" if p.masa_kg else "-",
-                # ============================================================
-                # CALENDAR INTERVAL COLUMNS (Dual Comparison)
-                # ============================================================
-                "V.Int1": int(interval1_sales.get(p.cod_articol, 0)),
-                "V.Int2": int(interval2_sales.get(p.cod_articol, 0)),
-                # Metadata
-                "_formula": formula_text,
-                "_unbalanced": is_unbal,
-                "_cubaj_m3": p.cubaj_m3,  # Raw value for calculation
-                "_masa_kg": p.masa_kg,    # Raw value for calculation
-            }
-            data.append(row)
+        # Display frame straight from the product columns (segment_view.build_segment_view)
+        df = build_segment_view(frame, month_table, interval1_sales, interval2_sales)
+        return (frame, df, family_totals["vanzari_ultimele_4_luni"].to_dict(),
+                family_totals["total_stock"].to_dict())
+    
+    @st.fragment(run_every=IMAGE_POLL_SECONDS)
+    def image_progress(urls):
+        """Placeholder note while thumbnails resolve; one rerun once they are all in."""
+        waiting = resolve_in_background(urls)
+        if waiting:
+            st.caption(f"🖼️ Se încarcă {waiting} imagini...")
+        else:
+            st.rerun()
+    
+    @st.fragment
+    def render_interactive_table(products, segment_name, allow_order=True, selection=None, key_suffix=""):
+        """
+        Table + selection + live totals as a fragment: ticking a row, "All", search or
+        "Detalii extinse" rerun only this block, not the sidebar / calendar / KPI cards.
+        """
+        with timed(f"table_{segment_name}"):
+            render_table_body(products, segment_name, allow_order, selection, key_suffix)
+    
+    def render_table_body(products, segment_name, allow_order=True, selection=None, key_suffix=""):
+        """
+        Renders an interactive table with checkbox selection and on-demand order calculation.
         
-        df = pd.DataFrame(data)
+        Args:
+            products: Processed DataFrame (process_products_vectorized) or list of Product objects
+            segment_name: Name of segment (for unique keys)
+            allow_order: If False, no order calculation is available (for OVERSTOCK)
+            selection: Set of ticked codes kept across pages (segment_grid); when given the
+                       list is one server-sorted page: no client-side re-sort or search
+            key_suffix: Widget key suffix (one editor state per page)
+        """
+        if len(products) == 0:
+            st.info("Nu exista produse in aceasta categorie")
+            return None
+        
+        # Processed + display frames are memoized per session: UI-only reruns (details,
+        # search, "All") reuse them. The rows (codes) identify the page / segment content.
+        codes = tuple(products["cod_articol"].astype(str)) if isinstance(products, pd.DataFrame) \
+            else tuple(p.cod_articol for p in products)
+        view_key = view_scope + (
+            key_suffix, codes,
+            st.session_state.get("interval1_range"), st.session_state.get("interval2_range"),
+        )
+        frame, df, family_sales, family_stocks = cached_view(
+            f"segment_{segment_name}", view_key,
+            lambda: build_table_view(products, paged=selection is not None),
+        )
+        
+        # Thumbnails: resolved in a background pool, placeholders until then (the memoized
+        # view keeps only stored image_url, so new images show up on the next rerun)
+        if "product_url" in frame.columns:
+            urls = frame["product_url"].tolist()
+            df = df.assign(Img=[img or cached_image(url) for img, url in zip(df["Img"].tolist(), urls)])
+            if resolve_in_background(urls):
+                image_progress(urls)
+        
+        def lookup_products(codes):
+            """nr_art -> product object, only for the given codes."""
+            if not isinstance(products, pd.DataFrame):
+                return {p.nr_art: p for p in products if p.nr_art in set(codes)}
+            rows = frame[frame["nr_art"].astype(str).isin(set(codes))]
+            return {r["nr_art"]: SimpleNamespace(**r) for r in rows.to_dict("records")}
         
         # ============================================================
         # "BUYER 12" COLUMN CONFIGURATION
@@ -1399,12 +1256,10 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
         # ============================================================
         
         # Define PRIMARY columns (Buyer 12 - always visible)
-        # Oct, Nov, Dec 2025 vs 2024 + Trends for Oct and Nov
+        # Selected months: current vs prior year + YoY trend
         primary_cols = [
             "Selecteaza", "Img", "Produs", "Cost", "PVanz", "Stoc Idx", "Stoc Mag", "V.3L",
-            "V.Oct'25", "V.Oct'24", "Tr.Oct",
-            "V.Nov'25", "V.Nov'24", "Tr.Nov",
-            "V.Dec'25", "V.Dec'24",
+            *table_labels(month_specs),
             "Zile Ac.", "Lead", "Marja", "Status", 
             "V.Int1", "V.Int2", "NECESAR"  # Interval columns next to NECESAR
         ]
@@ -1470,47 +1325,8 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
                 help=f"Vânzări Interval 2: {st.session_state.get('interval2_range', ('N/A', 'N/A'))}",
                 format="%d"
             ),
-            # OCTOBER columns
-            "V.Oct'25": st.column_config.NumberColumn(
-                "V.Oct'25",
-                help="Vânzări Octombrie 2025",
-                format="%d"
-            ),
-            "V.Oct'24": st.column_config.NumberColumn(
-                "V.Oct'24",
-                help="Vânzări Octombrie 2024 (baseline)",
-                format="%d"
-            ),
-            "Tr.Oct": st.column_config.TextColumn(
-                "Tr.Oct",
-                help="Trend YoY pentru Octombrie: (2025/2024 - 1) × 100%"
-            ),
-            # NOVEMBER columns
-            "V.Nov'25": st.column_config.NumberColumn(
-                "V.Nov'25",
-                help="Vânzări Noiembrie 2025",
-                format="%d"
-            ),
-            "V.Nov'24": st.column_config.NumberColumn(
-                "V.Nov'24",
-                help="Vânzări Noiembrie 2024 (baseline)",
-                format="%d"
-            ),
-            "Tr.Nov": st.column_config.TextColumn(
-                "Tr.Nov",
-                help="Trend YoY pentru Noiembrie: (2025/2024 - 1) × 100%"
-            ),
-            # DECEMBER columns
-            "V.Dec'25": st.column_config.NumberColumn(
-                "V.Dec'25",
-                help="Vânzări Decembrie 2025",
-                format="%d"
-            ),
-            "V.Dec'24": st.column_config.NumberColumn(
-                "V.Dec'24",
-                help="Vânzări Decembrie 2024 (baseline)",
-                format="%d"
-            ),
+            # MONTH COMPARISON columns
+            **month_column_config(month_specs),
             "Status": st.column_config.TextColumn(
                 "Status",
                 help="CRITICAL = stockout iminent, URGENT = comandă azi, OK = stoc suficient, OVERSTOCK = prea mult"
@@ -1571,17 +1387,38 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
         # INLINE TOOLBAR (Consolidated: Search | Details | All | AI | CSV)
         # ============================================================
         
+        # Row codes from "Produs" (format: "CODE | Name"); the index is NECESAR
+        def row_codes(frame):
+            return frame["Produs"].astype(str).str.split(" | ", regex=False).str[0]
+        
+        def toggle_page(sel_key, page_codes):
+            """Paged "All": tick / untick this page's codes once, when the box changes."""
+            if st.session_state[sel_key]:
+                selection.update(page_codes)
+            else:
+                selection.difference_update(page_codes)
+            st.session_state.pop(f"editor_{segment_name}{key_suffix}", None)  # Drop stale row edits
+        
         # Layout: Search (3) | Details (1) | All (1) | CSV (1)
         toolbar_cols = st.columns([3, 1.5, 1, 1])
         
         with toolbar_cols[0]:
-             search_text = st.text_input("🔎", key=f"search_{segment_name}", placeholder="Caută cod/denumire...", label_visibility="collapsed")
+             if selection is None:
+                 search_text = st.text_input("🔎", key=f"search_{segment_name}", placeholder="Caută cod/denumire...", label_visibility="collapsed")
+             else:
+                 search_text = ""  # Searched server-side by the segment grid
         
         with toolbar_cols[1]:
              show_details = st.checkbox("Detalii extinse", key=f"details_{segment_name}", help="Afișează tranzit, vânzări 360, etc.")
 
         with toolbar_cols[2]:
-             if allow_order:
+             if allow_order and selection is not None:
+                 # One page of a server-paged grid: applied on change, later row ticks win
+                 sel_key = f"sel_all_{segment_name}{key_suffix}"
+                 st.checkbox("All", key=sel_key, on_change=toggle_page,
+                             args=(sel_key, row_codes(df).tolist()))
+                 select_all = False
+             elif allow_order:
                  select_all = st.checkbox("All", key=f"sel_all_{segment_name}")
              else:
                  select_all = False
@@ -1590,8 +1427,11 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
         explain_btn = False  # AI button was removed, keeping variable for backward compatibility
                   
         with toolbar_cols[3]:
-             csv_data = df.to_csv(index=False).encode('utf-8')
-             st.download_button("📥 CSV", csv_data, f"{segment_name.lower()}.csv", "text/csv", key=f"exp_{segment_name}", use_container_width=True)
+             # Built only on click (no CSV re-encoded on every rerun)
+             export_cols = [c for c in df.columns if not c.startswith("_") and c not in ("Selecteaza", "Img")]
+             with st.popover("📥", use_container_width=True):
+                 download_buttons(lambda fmt: export_frame(df[export_cols], fmt, segment_name[:31]),
+                                  segment_name.lower(), key=f"exp_{segment_name}{key_suffix}")
              
         # Logic for columns display moved AFTER toolbar interaction
         if show_details:
@@ -1609,18 +1449,16 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
         class_filter = "Toate"
         subclass_filter = "Toate"
         
-        if search_text:
-            search_lower = search_text.lower()
-            # Search in Produs column (which contains Cod | Denumire)
-            if "Produs" in display_df.columns:
-                display_df = display_df[
-                    display_df["Produs"].astype(str).str.lower().str.contains(search_lower, na=False)
-                ]
-            elif "Cod" in display_df.columns:
-                display_df = display_df[
-                    display_df["Cod"].astype(str).str.lower().str.contains(search_lower, na=False) |
-                    display_df["Denumire"].astype(str).str.lower().str.contains(search_lower, na=False)
-                ]
+        if search_text and ("Produs" in display_df.columns or "Cod" in display_df.columns):
+            # Matching rows only, best match first (search index: typos / diacritics tolerated)
+            codes = row_codes(display_df) if "Produs" in display_df.columns else display_df["Cod"].astype(str)
+            rank = {code: i for i, code in enumerate(search_codes(search_text))}
+            row_rank = codes.map(rank).reset_index(drop=True)
+            display_df = display_df.iloc[row_rank.dropna().sort_values(kind="stable").index]
+        
+        # Ticks kept from other pages / reruns
+        if selection:
+            display_df["Selecteaza"] = row_codes(display_df).isin(selection).to_numpy()
         
         # If select all is checked, update all checkboxes
         if select_all:
@@ -1631,12 +1469,30 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
             display_df,
             column_config=column_config,
             width="stretch",
-            height=550,
+            height=550 if selection is None else min(550, 35 * (len(display_df) + 1) + 3),
             hide_index=False,
-            key=f"editor_{segment_name}",
+            key=f"editor_{segment_name}{key_suffix}",
             disabled=[col for col in display_df.columns if col != "Selecteaza"]  # All columns except checkbox are read-only
         )
         
+        ticked_codes = row_codes(edited_df[edited_df["Selecteaza"] == True]).tolist()
+        if selection is not None:
+            selection.difference_update(row_codes(edited_df))
+            selection.update(ticked_codes)
+        
+        # Live totals for the ticked rows (recomputed on each tick, inside the fragment)
+        if ticked_codes:
+            ticked = df[df["Cod"].isin(ticked_codes)]
+            qty = int(ticked["NECESAR"].sum())
+            value = float((ticked["NECESAR"] * ticked["Cost"]).sum())
+            st.caption(f"✓ {len(ticked_codes)} selectate · {qty:,} buc necesar · {value:,.0f} RON")
+        if selection:
+            st.caption(f"✓ {len(selection)} produse selectate în {segment_name} (toate paginile)")
+        
+        # Co-purchase suggestions for the ticked products
+        if ticked_codes:
+            render_affinity_panel(ticked_codes, ticked["Denumire"].tolist())
+        
         # ============================================================
         # AI ANALYSIS
         # ============================================================
@@ -1657,12 +1513,13 @@ Cand zilele de acoperire scad sub acest prag, trebuie comandat.
                 st.toast("AI analizează... Scrollează în jos pentru rezultate!")
                 
                 # Build explanation data for selected products
+                product_lookup = lookup_products(selected_codes)
                 products_for_ai = []
                 for code in selected_codes:
                     if code in product_lookup:
                         p = product_lookup[code]
                         qty = int(p.suggested_order_qty)
-                        adjusted_safety = round(p.safety_stock_days * p.dimension_coefficient, 1)
+                        adjusted_safety = round(p.effective_safety_stock_days * p.dimension_coefficient, 1)
                         trend_pct = int((p.sales_trend - 1.0) * 100)
                         
                         # Check family balance
@@ -1932,6 +1789,46 @@ Răspunde în română. FII AUTENTIC în thinking."""
         
         return edited_df
     
+    def process_segment_page(raw_df):
+        return process_products_vectorized(raw_df, config, reference, forecast_data, compare_months, compare_year)
+    
+    # Everything process_segment_page depends on besides the page itself (prefetch cache key)
+    segment_process_key = (
+        config_hash(config), data_version(),
+        None if forecast_data is None else len(forecast_data),
+        tuple(compare_months), compare_year,
+    )
+    
+    def render_segment_page(segment, allow_order=True):
+        """
+        Segment tab (PostgreSQL): server-paged grid, one processed page per rerun.
+        The other segments' pages are loaded and processed in the background.
+        """
+        def render_page(proc_df, selection, key_suffix):
+            render_interactive_table(proc_df, segment, allow_order=allow_order,
+                                     selection=selection, key_suffix=key_suffix)
+        
+        render_segment_grid(
+            segment,
+            furnizor=selected_supplier if selected_supplier != "ALL" else None,
+            stare_pm=selected_status if selected_status != "ALL" else None,
+            render_page=render_page,
+            process=process_segment_page,
+            process_key=segment_process_key,
+            search_codes=search_codes,
+        )
+    
+    # Warm all segment tabs while the current view is read (tab switches hit the prefetch store)
+    if use_postgres:
+        prefetch_segments(
+            SEGMENTS,
+            furnizor=selected_supplier if selected_supplier != "ALL" else None,
+            stare_pm=selected_status if selected_status != "ALL" else None,
+            process=process_segment_page,
+            process_key=segment_process_key,
+            search_codes=search_codes,
+        )
+    
     # Legacy function for compatibility (OVERSTOCK and ALL DATA)
     def render_table(product_list, show_order=False):
         if not product_list:
@@ -1991,18 +1888,9 @@ Zile Acoperire = (Stoc Disponibil + Stoc Tranzit) / Vanzari Medii Zilnice
 **Actiune recomandata:** Comanda EXPRESS sau cauta furnizor alternativ URGENT!
             """)
         
-        # Lazy Load Logic for CRITICAL (same as other tabs)
+        # Server-paged grid: only the visible page is loaded and processed
         if use_postgres:
-            with st.spinner("Se încarcă produsele CRITICAL (Rapid)..."):
-                # FAST VECTORIZED LOAD
-                raw_df = load_segment_from_db("CRITICAL", 
-                    furnizor=selected_supplier if selected_supplier != "ALL" else None, 
-                    stare_pm=selected_status if selected_status != "ALL" else None,
-                    limit=5000
-                )
-                proc_df = process_products_vectorized(raw_df, config, seasonality_data, advanced_trends_data, cubaj_data)
-                seg_products = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
-            render_interactive_table(seg_products, "CRITICAL", allow_order=True)
+            render_segment_page("CRITICAL", allow_order=True)
         else:
             render_interactive_table(segments["CRITICAL"], "CRITICAL", allow_order=True)
     
@@ -2021,49 +1909,33 @@ Zile Acoperire = (Stoc Disponibil + Stoc Tranzit) / Vanzari Medii Zilnice
             """)
 
         
-        # Lazy Load Logic
+        # Server-paged grid: only the visible page is loaded and processed
         if use_postgres:
-            with st.spinner("Se încarcă produsele URGENT (Rapid)..."):
-                raw_df = load_segment_from_db("URGENT", 
-                    furnizor=selected_supplier if selected_supplier != "ALL" else None, 
-                    stare_pm=selected_status if selected_status != "ALL" else None,
-                    limit=5000
-                )
-                proc_df = process_products_vectorized(raw_df, config, seasonality_data, advanced_trends_data, cubaj_data)
-                seg_products = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
-            render_interactive_table(seg_products, "URGENT")
+            render_segment_page("URGENT", allow_order=True)
         else:
             render_interactive_table(segments["URGENT"], "URGENT", allow_order=True)
     
     if "Attention" in selected_nav:
         with st.expander("Cum se calculeaza Attention?", expanded=False):
             st.markdown("""
-**Conditie:** `Lead Time + Safety Stock <= Zile Acoperire < Lead Time + Safety Stock + 14 zile`
+**Conditie:** `Lead Time + Safety Stock <= Zile Acoperire < Lead Time + Safety Stock + 30 zile`
 
-**Ce inseamna:** Ai ~2 saptamani sa planifici comanda. Stocul este "la limita" dar nu urgent.
+**Ce inseamna:** Ai ~o luna sa planifici comanda. Stocul este "la limita" dar nu urgent.
 
 **Actiune recomandata:** Planifica comanda, verifica MOQ (Minimum Order Quantity), negociaza cu furnizorul.
             """)
 
         
-        # Lazy Load Logic
+        # Server-paged grid: only the visible page is loaded and processed
         if use_postgres:
-            with st.spinner("Se încarcă produsele ATTENTION (Rapid)..."):
-                raw_df = load_segment_from_db("ATTENTION", 
-                    furnizor=selected_supplier if selected_supplier != "ALL" else None, 
-                    stare_pm=selected_status if selected_status != "ALL" else None,
-                    limit=5000
-                )
-                proc_df = process_products_vectorized(raw_df, config, seasonality_data, advanced_trends_data, cubaj_data)
-                seg_products = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
-            render_interactive_table(seg_products, "ATTENTION", allow_order=True)
+            render_segment_page("ATTENTION", allow_order=True)
         else:
             render_interactive_table(segments["ATTENTION"], "ATTENTION", allow_order=True)
     
     if "OK" in selected_nav:
         with st.expander("ℹ️ Cum se calculeaza OK? (click pentru detalii)", expanded=False):
             st.markdown("""
-**Conditie:** `Lead Time + Safety Stock + 14 zile <= Zile Acoperire <= 90 zile`
+**Conditie:** `Lead Time + Safety Stock + 30 zile <= Zile Acoperire <= 180 zile` (sau fara vanzari si fara stoc)
 
 **Ce inseamna:** Stocul este sanatos. Ai suficienta marfa pentru a acoperi cererea curenta.
 
@@ -2071,24 +1943,16 @@ Zile Acoperire = (Stoc Disponibil + Stoc Tranzit) / Vanzari Medii Zilnice
             """)
 
         
-        # Lazy Load Logic
+        # Server-paged grid: only the visible page is loaded and processed
         if use_postgres:
-            with st.spinner("Se încarcă produsele OK (Rapid)..."):
-                raw_df = load_segment_from_db("OK", 
-                    furnizor=selected_supplier if selected_supplier != "ALL" else None, 
-                    stare_pm=selected_status if selected_status != "ALL" else None,
-                    limit=5000
-                )
-                proc_df = process_products_vectorized(raw_df, config, seasonality_data, advanced_trends_data, cubaj_data)
-                seg_products = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
-            render_interactive_table(seg_products, "OK", allow_order=True)
+            render_segment_page("OK", allow_order=True)
         else:
             render_interactive_table(segments["OK"], "OK", allow_order=True)
     
     if "Overstock" in selected_nav:
         with st.expander("Cum se calculeaza Overstock?", expanded=False):
             st.markdown("""
-**Conditie:** `Zile Acoperire > 90 zile`
+**Conditie:** `Zile Acoperire > 180 zile` sau stoc fara vanzari
 
 **Ce inseamna:** Ai prea multa marfa pe stoc. Capital blocat, risc de depreciere sau uzura morala.
 
@@ -2106,23 +1970,13 @@ Valoare Stoc = Cantitate x Cost Achizitie
         # OVERSTOCK doesn't need order calculation
         
         if use_postgres:
-            # Load lazy
-            with st.spinner("Se încarcă produsele OVERSTOCK (Rapid)..."):
-                raw_df = load_segment_from_db("OVERSTOCK", 
-                    furnizor=selected_supplier if selected_supplier != "ALL" else None, 
-                    stare_pm=selected_status if selected_status != "ALL" else None,
-                    limit=5000
-                )
-                proc_df = process_products_vectorized(raw_df, config, seasonality_data, advanced_trends_data, cubaj_data)
-                seg_products = [SimpleNamespace(**x) for x in proc_df.to_dict('records')]
-                
-            render_interactive_table(seg_products, "OVERSTOCK", allow_order=False)
+            render_segment_page("OVERSTOCK", allow_order=False)
             
             # Use pre-calculated stats for total value
             total = segment_stats.get("OVERSTOCK", {}).get("value", 0)
         else:
             render_interactive_table(segments["OVERSTOCK"], "OVERSTOCK", allow_order=False)
-            total = sum(p.stock_value for p in segments["OVERSTOCK"])
+            total = segment_stats["OVERSTOCK"]["value"]
             
         st.markdown(f"**Total overstock: {total:,.0f} RON**")
     
@@ -2177,7 +2031,7 @@ Valoare Stoc = Cantitate x Cost Achizitie
                     order_by=sort_column,
                     order_dir=sort_dir
                 )
-                all_products = parse_from_postgres(raw_all, config, seasonality_data, advanced_trends_data)
+                all_products = parse_from_postgres(raw_all, config, reference)
             render_interactive_table(all_products, "ALL", allow_order=True)
         else:
             st.markdown(f"**Total produse: {len(products)}**")
@@ -2207,7 +2061,7 @@ Valoare Stoc = Cantitate x Cost Achizitie
                 if use_postgres:
                     with st.spinner(f"Se încarcă familia {selected_family}..."):
                         raw_fam_df = load_family_products_from_db(selected_family)
-                        family_products = parse_from_postgres(raw_fam_df, config, seasonality_data, advanced_trends_data)
+                        family_products = parse_from_postgres(raw_fam_df, config, reference)
                 else:
                     family_products = [p for p in products if p.familie == selected_family]
                 
@@ -2313,8 +2167,9 @@ Răspunde concis în română."""
                                 else:
                                     st.warning("⚠️ Configurează API key în Settings > Gemini API")
                             
-                            result_csv = result_df.to_csv(index=False).encode('utf-8')
-                            st.download_button("📥 Export Comandă Familie", result_csv, f"comanda_{selected_family.lower()}.csv", "text/csv", key="exp_family")
+                            with st.popover("📥 Export Comandă Familie"):
+                                download_buttons(lambda fmt: export_frame(result_df, fmt, "Comanda"),
+                                                 f"comanda_{selected_family.lower()}", key="exp_family", formats=("csv", "xlsx"))
                         else:
                             st.info("Nu sunt necesare comenzi pentru această familie.")
     
@@ -2378,8 +2233,8 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
         } for p in products]
         df_all = pd.DataFrame(all_data)
         st.dataframe(df_all, width='stretch', height=500)
-        csv = df_all.to_csv(index=False).encode('utf-8')
-        st.download_button("Export All", csv, "full_inventory.csv", "text/csv")
+        download_buttons(lambda fmt: export_frame(df_all, fmt, "Inventory"), "full_inventory", key="exp_all",
+                         formats=("csv", "xlsx"), label="Export All")
     
     # ============================================================
     # SUPPLIER AUDIT TAB - 🚫 INACTIVAT
@@ -2422,8 +2277,8 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
                     "Suggested Order": int(p.suggested_order_qty)
                 } for p in sup_products]
                 sup_df = pd.DataFrame(sup_data)
-                csv = sup_df.to_csv(index=False).encode('utf-8')
-                st.download_button(f"Export {audit_supplier[:20]} Audit", csv, f"audit_{audit_supplier[:15]}.csv", "text/csv")
+                download_buttons(lambda fmt: export_frame(sup_df, fmt, "Audit"), f"audit_{audit_supplier[:15]}",
+                                 key="exp_audit", formats=("csv",), label=f"Export {audit_supplier[:20]} Audit")
                 
                 # AI Analysis
                 st.markdown("---")
@@ -2533,22 +2388,11 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
                         """)
                         
                         # Export button
-                        if st.button("📤 Export Excel", key="export_order"):
-                            import io
-                            output = io.BytesIO()
-                            rows = []
-                            for subclass_name, items in st.session_state.order_items.items():
-                                for item in items:
-                                    rows.append(item)
-                            if rows:
-                                export_df = pd.DataFrame(rows)
-                                export_df.to_excel(output, index=False)
-                                st.download_button(
-                                    "⬇️ Descarcă Excel",
-                                    output.getvalue(),
-                                    f"comanda_{order_supplier[:20]}.xlsx",
-                                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                )
+                        order_rows = [item for items in st.session_state.order_items.values() for item in items]
+                        if order_rows:
+                            download_buttons(lambda fmt: export_frame(pd.DataFrame(order_rows), fmt, "Comanda"),
+                                             f"comanda_{order_supplier[:20]}", key="export_order",
+                                             formats=("xlsx",), label="📤 Export")
                         
                         if st.button("🗑️ Golește Comanda", key="clear_order"):
                             st.session_state.order_items = {}
@@ -2578,18 +2422,13 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
                 st.warning("Nu există articole în această subclasă.")
             else:
                 # Parse into Product objects (reuse existing logic)
-                subclass_products = parse_from_postgres(subclass_df, config, seasonality_data, advanced_trends_data, cubaj_data)
+                subclass_products = parse_from_postgres(subclass_df, config, reference)
                 
                 # Build data with columns (SAME structure as render_interactive_table)
-                from datetime import datetime
-                compare_year = 2025
+                month_table = comparison_table(month_comparison_for(subclass_products), month_specs)
                 
                 data = []
                 for p in subclass_products:
-                    oct_data = get_sales_ref_month_yoy(p.sales_history, 10, compare_year)
-                    nov_data = get_sales_ref_month_yoy(p.sales_history, 11, compare_year)
-                    dec_data = get_sales_ref_month_yoy(p.sales_history, 12, compare_year)
-                    
                     suggested_qty = int(p.suggested_order_qty)
                     
                     row = {
@@ -2601,14 +2440,6 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
                         "Stoc Idx": int(p.stoc_indomex),
                         "Stoc Mag": int(p.stoc_magazin_total),
                         "V.3L": int(p.sales_last_3m) if p.sales_last_3m > 0 else int(p.vanzari_ultimele_4_luni),
-                        "V.Oct'25": int(oct_data["current_year_sales"]),
-                        "V.Oct'24": int(oct_data["prior_year_sales"]),
-                        "Tr.Oct": f"{int(oct_data['yoy_pct']):+d}%" if oct_data["prior_year_sales"] > 0 else "-",
-                        "V.Nov'25": int(nov_data["current_year_sales"]),
-                        "V.Nov'24": int(nov_data["prior_year_sales"]),
-                        "Tr.Nov": f"{int(nov_data['yoy_pct']):+d}%" if nov_data["prior_year_sales"] > 0 else "-",
-                        "V.Dec'25": int(dec_data["current_year_sales"]),
-                        "V.Dec'24": int(dec_data["prior_year_sales"]),
                         "Status": p.segment,
                         "Cant.Sug.": suggested_qty,
                         # SECONDARY COLUMNS (hidden by default)
@@ -2647,13 +2478,13 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
                     data.append(row)
                 
                 df = pd.DataFrame(data)
+                split = df.columns.get_loc("V.3L") + 1 if "V.3L" in df.columns else len(df.columns)
+                df = pd.concat([df.iloc[:, :split], month_table, df.iloc[:, split:]], axis=1)
                 
                 # PRIMARY COLUMNS (same as render_interactive_table)
                 primary_cols = [
                     "Selecteaza", "Produs", "Cost", "PVanz", "Stoc Idx", "Stoc Mag", "V.3L",
-                    "V.Oct'25", "V.Oct'24", "Tr.Oct",
-                    "V.Nov'25", "V.Nov'24", "Tr.Nov",
-                    "V.Dec'25", "V.Dec'24",
+                    *month_table.columns,
                     "Status", "Cant.Sug."
                 ]
                 
@@ -2748,8 +2579,10 @@ Cantitate Sugerata = Vanzari Medii Zilnice × (Lead Time + Safety Stock + 60) -
     # ORDER BUILDER v2 TAB
     # ============================================================
     if "ORDER v2" in selected_nav:
-        render_order_builder_v2(config, cubaj_data)
+        render_order_builder_v2(config, reference)
 
 
 if __name__ == "__main__":
-    main()
+    with timed("app"):
+        main()
+    render_timings()
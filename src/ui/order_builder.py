@@ -14,9 +14,20 @@ import streamlit as st
 import pandas as pd
 from dataclasses import dataclass
 from typing import List, Dict, Optional
-import io
 import math
 import numpy as np
+from src.core.safety_stock import effective_safety_days
+from src.core.forecasting import forecast_daily_rate
+from src.core.reference_data import join_reference
+from src.core.database import get_product_affinity, get_family_affinity, load_subclass_products, load_search_catalogue
+from src.core.exports import download_buttons, export_frame
+from src.core import prefetch
+from src.core.search_index import fold
+from src.ui.timing import timed
+from src.ui.view_cache import product_index
+from src.models.product import extract_family_dimension
+
+PREFETCH_SUBCLASSES = 5  # Cele mai urgente subclase încărcate în fundal
 
 # ============================================================
 # DATA CLASSES
@@ -119,9 +130,18 @@ def get_order_totals() -> dict:
 # RENDER FUNCTIONS
 # ============================================================
 
+@st.fragment
 def render_order_panel():
     """
-    Panoul din dreapta: Comandă Curentă
+    Panoul din dreapta: Comandă Curentă, ca fragment - actualizarea
+    cantităților, ștergerea și golirea comenzii rerulează doar panoul.
+    """
+    with timed("order_panel"):
+        _render_order_panel()
+
+
+def _render_order_panel():
+    """
     OPTIMIZED: Cantitățile sunt editate într-un form pentru a preveni reruns.
     """
     st.markdown("### Comandă Curentă")
@@ -189,7 +209,7 @@ def render_order_panel():
         
         if items_to_delete:
             st.success(f"Șters {len(items_to_delete)} articole")
-        st.rerun()
+        st.rerun(scope="fragment")
     
     # Totaluri (calculated fresh)
     totals = get_order_totals()
@@ -207,20 +227,29 @@ def render_order_panel():
     # Butoane acțiuni (outside form)
     col_exp, col_clear = st.columns(2)
     with col_exp:
-        if st.button("Export Excel", key="ob2_export", type="primary"):
-            excel_data = export_order_excel()
-            st.download_button(
-                "⬇️ Descarcă",
-                excel_data,
-                f"comanda_{st.session_state.ob2_supplier or 'export'}.xlsx",
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="ob2_download"
-            )
+        # Fișierul se generează doar la click (nu mai e nevoie de "Export" + "Descarcă")
+        download_buttons(lambda fmt: export_frame(order_frame(), fmt, "Comanda"),
+                         f"comanda_{st.session_state.ob2_supplier or 'export'}", key="ob2_export",
+                         formats=("xlsx", "csv"), label="⬇️")
     
     with col_clear:
         if st.button("Golește Tot", key="ob2_clear"):
             clear_order()
-            st.rerun()
+            st.rerun(scope="fragment")
+
+
+def _subclass_job(furnizor: str, subclasa: str) -> tuple:
+    """(key, fn, *args) pentru src.core.prefetch"""
+    return (("subclass", furnizor, subclasa), load_subclass_products, furnizor, subclasa)
+
+
+def prefetch_subclasses(furnizor: str, subclass_summaries: List[dict], limit: int = PREFETCH_SUBCLASSES):
+    """
+    Încarcă în fundal articolele celor mai urgente subclase (summaries sunt
+    deja sortate după urgency_score), ca "Deschide" să fie instant.
+    """
+    urgent = [s["subclasa"] for s in subclass_summaries if s["urgency_score"] > 0][:limit]
+    prefetch.prefetch_many(_subclass_job(furnizor, sub) for sub in urgent)
 
 
 def render_subclass_list(subclass_summaries: List[dict]):
@@ -303,7 +332,7 @@ def render_simulation_controls():
             )
 
 
-def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: dict = None):
+def render_articles_table(products_df: pd.DataFrame, config: dict, reference: pd.DataFrame = None, forecast_data: pd.DataFrame = None):
     """
     Tabelul de articole cu checkbox pentru selecție.
     OPTIMIZED: Folosește date pre-calculate din DB, fără loop Product().
@@ -313,8 +342,6 @@ def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: d
         st.warning("Nu există articole în această subclasă.")
         return
     
-    cubaj_data = cubaj_data or {}
-    
     # Simulation Parameters
     sim_freq = st.session_state.get("sim_order_freq", 30)
     sim_buffer = st.session_state.get("sim_safety_buffer", 0)
@@ -328,21 +355,26 @@ def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: d
     
     # 1. Fill NA to ensures numeric ops work
     df_calc = products_df.copy()
-    cols_to_fix = ["avg_daily_sales", "lead_time_days", "safety_stock_days", "stoc_total", "stoc_tranzit", "moq", "vanzari_360z", "vanzari_4luni", "cost_achizitie", "pret_vanzare", "days_of_coverage"]
+    cols_to_fix = ["avg_daily_sales", "lead_time_days", "safety_stock_days", "stoc_total", "stoc_tranzit", "moq", "vanzari_360z", "vanzari_4luni", "cost_achizitie", "pret_vanzare", "days_of_coverage", "safety_stock_qty"]
     for c in cols_to_fix:
         if c not in df_calc.columns:
             df_calc[c] = 0.0
         df_calc[c] = pd.to_numeric(df_calc[c], errors='coerce').fillna(0)
 
     # 2. Apply Simulation Parameters
-    # Seasonality
-    df_calc["sim_avg_daily"] = df_calc["avg_daily_sales"] * sim_factor
-    
     # Lead Time Override
     if sim_lt_override > 0:
         df_calc["sim_lead_time"] = sim_lt_override
     else:
         df_calc["sim_lead_time"] = df_calc["lead_time_days"]
+    
+    # Demand rate: forecast (SBA / Holt-Winters) over Lead + Interval, else historical average
+    df_calc["cycle_days"] = df_calc["sim_lead_time"] + sim_freq
+    df_calc["forecast_daily"] = forecast_daily_rate(df_calc["cod_articol"], forecast_data, df_calc["cycle_days"])
+    df_calc["base_daily"] = df_calc["forecast_daily"].fillna(df_calc["avg_daily_sales"])
+    
+    # Seasonality
+    df_calc["sim_avg_daily"] = df_calc["base_daily"] * sim_factor
         
     # MOQ Override
     if sim_ignore_moq:
@@ -350,12 +382,22 @@ def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: d
     else:
         df_calc["sim_moq"] = df_calc["moq"].clip(lower=1.0)
 
+    # Safety stock: statistical SS (z × σ × √L) scaled to the simulated lead time,
+    # expressed in days; flat safety_stock_days when not computed
+    lt_ratio = np.sqrt(df_calc["sim_lead_time"] / df_calc["lead_time_days"].where(df_calc["lead_time_days"] > 0))
+    df_calc["safety_days"] = effective_safety_days(
+        df_calc["safety_stock_qty"] * lt_ratio.fillna(1.0),
+        df_calc["avg_daily_sales"],
+        df_calc["safety_stock_days"]
+    )
+
     # 3. Calculate Formulas
     # Target Days = Lead + Interval + Safety + Buffer
-    df_calc["target_days"] = df_calc["sim_lead_time"] + sim_freq + df_calc["safety_stock_days"] + sim_buffer
+    df_calc["target_days"] = df_calc["sim_lead_time"] + sim_freq + df_calc["safety_days"] + sim_buffer
     
-    # Target Qty
-    df_calc["target_qty"] = df_calc["sim_avg_daily"] * df_calc["target_days"]
+    # Target Qty = demand over the cycle + safety stock (+ buffer) at the historical rate
+    df_calc["safety_qty"] = df_calc["avg_daily_sales"] * sim_factor * (df_calc["safety_days"] + sim_buffer)
+    df_calc["target_qty"] = df_calc["sim_avg_daily"] * df_calc["cycle_days"] + df_calc["safety_qty"]
     
     # Stock
     df_calc["total_stock_avail"] = df_calc["stoc_total"] + df_calc["stoc_tranzit"]
@@ -382,25 +424,19 @@ def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: d
     
     def fmt_details(row):
         return (
-            f"1. CONSUM: {row['avg_daily_sales']:.2f}/zi (x {sim_factor}) = {row['sim_avg_daily']:.2f}/zi || "
-            f"2. DURATA: {row['sim_lead_time']:.0f} (Lead) + {sim_freq:.0f} (Int) + {row['safety_stock_days']+sim_buffer:.0f} (Safe) = {row['target_days']:.0f} Zile || "
-            f"3. NECESAR: {row['sim_avg_daily']:.2f} x {row['target_days']:.0f} = {row['target_qty']:.0f} buc || "
+            f"1. CONSUM: {row['base_daily']:.2f}/zi{' (prognoza)' if pd.notna(row['forecast_daily']) else ''} (x {sim_factor}) = {row['sim_avg_daily']:.2f}/zi || "
+            f"2. DURATA: {row['sim_lead_time']:.0f} (Lead) + {sim_freq:.0f} (Int) + {row['safety_days']+sim_buffer:.0f} (Safe) = {row['target_days']:.0f} Zile || "
+            f"3. NECESAR: {row['sim_avg_daily']:.2f} x {row['cycle_days']:.0f} + {row['safety_qty']:.0f} (Safe) = {row['target_qty']:.0f} buc || "
             f"4. STOC: {row['stoc_total']:.0f} + {row['stoc_tranzit']:.0f} = {row['total_stock_avail']:.0f} || "
             f"5. FINAL: {row['target_qty']:.0f} - {row['total_stock_avail']:.0f} = {row['needed']:.0f} -> {row['qty_suggested']} (bax {row['sim_moq']:.0f})"
         )
             
     df_calc["details_calc"] = df_calc.apply(fmt_details, axis=1)
     
-    # Map cubaj if needed
-    # (Leaving iterating for cubaj map if dict provided, or map using map())
-    # cubaj_data is dict: cod -> {cubaj_m3, ...}
-    # Optimized map:
-    if cubaj_data:
-        df_calc["_cubaj"] = df_calc["cod_articol"].map(lambda x: cubaj_data.get(str(x), {}).get("cubaj_m3"))
-        df_calc["_masa"] = df_calc["cod_articol"].map(lambda x: cubaj_data.get(str(x), {}).get("masa_kg"))
-    else:
-        df_calc["_cubaj"] = None
-        df_calc["_masa"] = None
+    # Cubaj / masa from the reference store (one indexed lookup)
+    logistics = join_reference(df_calc[["cod_articol"]].copy(), reference, ["cubaj_m3", "masa_kg"])
+    df_calc["_cubaj"] = logistics["cubaj_m3"]
+    df_calc["_masa"] = logistics["masa_kg"]
         
     # Construct Final DataFrame
     data_list = []
@@ -530,12 +566,49 @@ def render_articles_table(products_df: pd.DataFrame, config: dict, cubaj_data: d
             <strong>{total_value:,}</strong> RON
         </div>
         """, unsafe_allow_html=True)
+        
+        render_affinity_panel(selected_df["_cod"].tolist(), selected_df["_denumire"].tolist())
 
 
-def export_order_excel() -> bytes:
-    """Export comanda ca Excel"""
-    output = io.BytesIO()
+def render_affinity_panel(codes: List[str], names: Optional[List[str]] = None, limit: int = 10):
+    """
+    Articole / familii cumpărate frecvent împreună cu selecția (același client, aceeași zi).
+    Date precalculate de scripts/compute_affinity.py; nimic afișat dacă tabelul lipsește.
+    """
+    codes = tuple(dict.fromkeys(str(c) for c in codes if c))
+    if not codes:
+        return
+    related = get_product_affinity(codes, limit)
+    families = sorted({extract_family_dimension(n)[0] for n in (names or []) if n} - {""})
+    if related.empty and not families:
+        return
     
+    with st.expander(f"🔗 Cumpărate împreună ({len(codes)} selectate)", expanded=False):
+        if not related.empty:
+            st.dataframe(
+                related.rename(columns={
+                    "related_cod": "Cod", "related_denumire": "Denumire",
+                    "baskets": "Coșuri", "confidence": "Încredere", "lift": "Lift",
+                }),
+                column_config={
+                    "Încredere": st.column_config.ProgressColumn(
+                        "Încredere", help="% din coșurile cu selecția care conțin și articolul",
+                        format="percent", min_value=0.0, max_value=1.0),
+                    "Lift": st.column_config.NumberColumn(
+                        "Lift", help="> 1 = cumpărate împreună mai des decât întâmplător", format="%.1f"),
+                },
+                hide_index=True,
+                width="stretch",
+            )
+        for familie in families[:3]:
+            fam = get_family_affinity(familie)
+            if not fam.empty:
+                pairs = ", ".join(f"{r.related_familie} (×{r.lift:.1f})" for r in fam.itertuples())
+                st.caption(f"Familia **{familie}** se vinde împreună cu: {pairs}")
+
+
+def order_frame() -> pd.DataFrame:
+    """Comanda curentă ca DataFrame (coloanele exportului)"""
     rows = []
     for item in st.session_state.ob2_order_items.values():
         rows.append({
@@ -551,28 +624,29 @@ def export_order_excel() -> bytes:
             "Cubaj (m³)": item.total_cubaj,
             "Masa (kg)": item.total_masa,
         })
-    
-    if rows:
-        df = pd.DataFrame(rows)
-        df.to_excel(output, index=False, sheet_name="Comanda")
-    
-    return output.getvalue()
+    return pd.DataFrame(rows)
+
+
+def export_order_excel() -> bytes:
+    """Export comanda ca Excel"""
+    with export_frame(order_frame(), "xlsx", "Comanda") as f:
+        return f.read()
 
 
 # ============================================================
 # MAIN RENDER FUNCTION
 # ============================================================
 
-def render_order_builder_v2(config: dict, cubaj_data: dict = None):
+def render_order_builder_v2(config: dict, reference: pd.DataFrame = None):
     """
     Entry point pentru Order Builder v2.
     Renderizează întregul modul cu layout 2 coloane.
     
     Args:
         config: Configurație furnizori (lead time, etc)
-        cubaj_data: Date cubaj pentru produse
+        reference: Date de referință (cubaj, sezonalitate) - implicit load_reference()
     """
-    from src.core.database import get_unique_suppliers, get_subclass_summary, load_subclass_products, get_supplier_priority_list
+    from src.core.database import get_unique_suppliers, get_subclass_summary, get_supplier_priority_list, load_forecast_matrix
     
     init_order_state()
     
@@ -660,6 +734,9 @@ def render_order_builder_v2(config: dict, cubaj_data: dict = None):
         st.info("Selectează un furnizor pentru a începe.")
         return
     
+    # Subclasele urgente se încarcă în fundal cât timp cumpărătorul citește lista / tabelul
+    prefetch_subclasses(st.session_state.ob2_supplier, get_subclass_summary(st.session_state.ob2_supplier))
+    
     # Main layout: 2 columns
     col_left, col_right = st.columns([3, 2])
     
@@ -675,21 +752,20 @@ def render_order_builder_v2(config: dict, cubaj_data: dict = None):
             
             # Load products
             with st.spinner("Se încarcă..."):
-                products_df = load_subclass_products(
+                products_df = prefetch.fetch(*_subclass_job(
                     st.session_state.ob2_supplier,
                     st.session_state.ob2_current_subclass
-                )
+                ))
             
-            # Apply search filter if any
+            # Apply search filter if any (search index: typos / diacritics tolerated, best match first)
             if search_term:
-                mask = (
-                    products_df["cod_articol"].str.contains(search_term, case=False, na=False) |
-                    products_df["denumire"].str.contains(search_term, case=False, na=False)
+                matches = product_index("db", load_search_catalogue).codes_for(
+                    search_term, limit=None, candidates=products_df["cod_articol"]
                 )
-                products_df = products_df[mask]
+                products_df = products_df.set_index("cod_articol", drop=False).loc[matches].reset_index(drop=True)
                 st.caption(f"🔍 Filtrat: {len(products_df)} rezultate pentru '{search_term}'")
             
-            render_articles_table(products_df, config, cubaj_data)
+            render_articles_table(products_df, config, reference, load_forecast_matrix())
         
         else:
             # Show subclass list
@@ -699,7 +775,7 @@ def render_order_builder_v2(config: dict, cubaj_data: dict = None):
             if search_term:
                 subclass_summaries = [
                     s for s in subclass_summaries 
-                    if search_term.lower() in s["subclasa"].lower()
+                    if fold(search_term) in fold(s["subclasa"])
                 ]
             
             render_subclass_list(subclass_summaries)
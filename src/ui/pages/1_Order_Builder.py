@@ -11,7 +11,7 @@ if project_root not in sys.path:
 # Import necessary modules
 try:
     from src.ui.order_builder import render_order_builder_v2
-    from src.core.cubaj_loader import get_cubaj_map
+    from src.core.reference_data import load_reference, empty_reference
 except ImportError as e:
     st.error(f"Eroare la import: {e}. Vă rugăm să rulați aplicația din folderul rădăcină al proiectului.")
     st.stop()
@@ -54,14 +54,16 @@ def main():
     # Load config from file (synced with App Settings)
     config = load_supplier_config()
     
-    # Load Cubaj Data
+    # Load reference data (cubaj, seasonality) - cached per process
     try:
-        cubaj_data = get_cubaj_map()
-    except:
-        cubaj_data = {}
+        reference = load_reference()
+    except Exception as e:
+        # Empty frame, not None: join_reference would call load_reference again
+        st.warning(f"Date de referință indisponibile (cubaj, sezonalitate): {e}")
+        reference = empty_reference()
 
     # Render Builder
-    render_order_builder_v2(config, cubaj_data)
+    render_order_builder_v2(config, reference)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,193 @@
+"""
+Segment Grid - tabel paginat pe server pentru taburile de segment
+=================================================================
+Încarcă și procesează doar pagina vizibilă (LIMIT / OFFSET în PostgreSQL),
+cu sortare și căutare făcute în SQL. Cu `search_codes` (indexul de căutare
+din src.core.search_index) căutarea tolerează greșeli de tastare și
+diacritice: textul devine lista de coduri potrivite, ordonabilă după relevanță. Pagina următoare și prima pagină a
+celorlalte segmente (aceleași filtre) sunt încărcate și procesate în fundal
+(src.core.prefetch), iar selecția (coduri bifate) se păstrează între pagini în
+st.session_state, așa că timpul de randare nu mai crește cu mărimea segmentului.
+Exportul întregului segment (toate paginile) e citit în bucăți la click.
+"""
+
+import math
+from typing import Callable, Hashable, Iterable, Optional, Set
+
+import pandas as pd
+import streamlit as st
+
+from src.core.database import load_segment_from_db, count_segment_products, segment_export_query
+from src.core.exports import download_buttons, export_query
+from src.core import prefetch
+
+# ============================================================
+# CONFIG
+# ============================================================
+PAGE_SIZES = [25, 50, 100, 200]
+DEFAULT_PAGE_SIZE = 50
+
+SORT_OPTIONS = {
+    "coverage": "Urgență (zile acoperire)",
+    "value": "Valoare stoc",
+    "sales": "Vânzări 4 luni",
+    "name": "Denumire",
+    "code": "Cod",
+    "relevance": "Relevanță căutare",
+}
+
+SEGMENTS = ["CRITICAL", "URGENT", "ATTENTION", "OK", "OVERSTOCK"]
+
+
+def selection_for(segment: str) -> Set[str]:
+    """Codurile bifate într-un segment (persistă între pagini)."""
+    return st.session_state.setdefault(f"grid_sel_{segment}", set())
+
+
+def _reset_page(segment: str):
+    st.session_state[f"grid_page_{segment}"] = 0
+
+
+def _step_page(segment: str, delta: int, n_pages: int):
+    page = st.session_state.get(f"grid_page_{segment}", 0) + delta
+    st.session_state[f"grid_page_{segment}"] = min(max(page, 0), n_pages - 1)
+
+
+def _default_sort(segment: str) -> str:
+    return "coverage" if segment in ("CRITICAL", "URGENT") else "value"
+
+
+def _search_filter(search: Optional[str], search_codes: Optional[Callable[[str], tuple]]):
+    """(search ILIKE, coduri) pentru SQL: cu index, textul devine lista de coduri potrivite."""
+    if search is None or search_codes is None:
+        return search, None
+    return None, search_codes(search)
+
+
+def _load_page(segment, furnizor, stare_pm, limit, offset, sort_by, search, codes, process):
+    raw_df = load_segment_from_db(segment, furnizor, stare_pm, limit, offset, sort_by, search, codes)
+    return process(raw_df) if process is not None else raw_df
+
+
+def _page_job(segment, furnizor, stare_pm, limit, offset, sort_by, search, codes, process, process_key):
+    """(key, fn, *args) for prefetch: one page, loaded and processed."""
+    key = ("segment_page", segment, furnizor, stare_pm, limit, offset, sort_by, search, codes, process_key)
+    return (key, _load_page, segment, furnizor, stare_pm, limit, offset, sort_by, search, codes, process)
+
+
+def _count_job(segment, furnizor, stare_pm, search, codes):
+    """(key, fn, *args) for prefetch: number of products matching the filters."""
+    key = ("segment_count", segment, furnizor, stare_pm, search, codes)
+    return (key, count_segment_products, segment, furnizor, stare_pm, search, codes)
+
+
+def _view_state(segment: str):
+    """Pagina / sortarea / căutarea pe care le va cere tabul segmentului la deschidere."""
+    state = st.session_state
+    size = state.get(f"grid_size_{segment}", DEFAULT_PAGE_SIZE)
+    search = (state.get(f"grid_search_{segment}") or "").strip() or None
+    return (size, state.get(f"grid_page_{segment}", 0) * size,
+            state.get(f"grid_sort_{segment}", _default_sort(segment)), search)
+
+
+def prefetch_segments(segments: Iterable[str], furnizor: Optional[str], stare_pm: Optional[str],
+                      process: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                      process_key: Hashable = None,
+                      search_codes: Optional[Callable[[str], tuple]] = None) -> int:
+    """
+    Încarcă în fundal pagina curentă a altor segmente (aceleași filtre),
+    ca schimbarea tabului să fie instantă.
+    """
+    jobs = []
+    for segment in segments:
+        limit, offset, sort_by, search = _view_state(segment)
+        search, codes = _search_filter(search, search_codes)
+        prefetch.prefetch(*_count_job(segment, furnizor, stare_pm, search, codes))
+        jobs.append(_page_job(segment, furnizor, stare_pm, limit, offset, sort_by, search, codes,
+                              process, process_key))
+    return prefetch.prefetch_many(jobs)
+
+
+def render_segment_grid(segment: str, furnizor: Optional[str], stare_pm: Optional[str],
+                        render_page: Callable[[pd.DataFrame, Set[str], str], None],
+                        default_sort: Optional[str] = None,
+                        process: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                        process_key: Hashable = None,
+                        search_codes: Optional[Callable[[str], tuple]] = None):
+    """
+    Toolbar (căutare, sortare, mărime pagină, navigare) + pagina curentă.
+
+    Args:
+        segment: CRITICAL, URGENT, ATTENTION, OK, OVERSTOCK
+        furnizor, stare_pm: Filtre sidebar (None = toate)
+        render_page: (pagină procesată, selecție, sufix cheie widget) -> randează tabelul
+        default_sort: Cheie SORT_OPTIONS (None = urgență pentru CRITICAL/URGENT, valoare în rest)
+        process: raw_df -> DataFrame procesat (rulat și la preîncărcare; None = raw)
+        process_key: Tot ce influențează `process` (config, luni comparație...) - cheie de cache
+        search_codes: text căutat -> coduri potrivite, cele mai relevante primele
+                      (None = ILIKE pe cod / denumire în SQL)
+    """
+    if default_sort is None:
+        default_sort = _default_sort(segment)
+    selection = selection_for(segment)
+
+    cols = st.columns([3, 2, 1])
+    with cols[0]:
+        search = st.text_input("🔎", key=f"grid_search_{segment}", placeholder="Caută cod/denumire...",
+                               label_visibility="collapsed", on_change=_reset_page, args=(segment,))
+    with cols[1]:
+        sort_by = st.selectbox("Sortare", list(SORT_OPTIONS), index=list(SORT_OPTIONS).index(default_sort),
+                               format_func=SORT_OPTIONS.get, key=f"grid_sort_{segment}",
+                               label_visibility="collapsed", on_change=_reset_page, args=(segment,))
+    with cols[2]:
+        page_size = st.selectbox("Rânduri", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"grid_size_{segment}", label_visibility="collapsed",
+                                 on_change=_reset_page, args=(segment,))
+    search, codes = _search_filter(search.strip() or None, search_codes)
+
+    try:
+        total = prefetch.fetch(*_count_job(segment, furnizor, stare_pm, search, codes))
+    except Exception as e:  # Failures are not cached: the next rerun queries again
+        st.error(f"Eroare la citirea segmentului {segment} din baza de date: {e}")
+        return selection
+    if total == 0:
+        st.info("Nu exista produse in aceasta categorie")
+        return selection
+
+    n_pages = math.ceil(total / page_size)
+    page = min(st.session_state.get(f"grid_page_{segment}", 0), n_pages - 1)
+    st.session_state[f"grid_page_{segment}"] = page
+    offset = page * page_size
+
+    try:
+        with st.spinner(f"Se încarcă produsele {segment}..."):
+            page_df = prefetch.fetch(*_page_job(segment, furnizor, stare_pm, page_size, offset, sort_by, search,
+                                                codes, process, process_key)).copy()
+    except Exception as e:
+        st.error(f"Eroare la citirea segmentului {segment} din baza de date: {e}")
+        return selection
+    if page + 1 < n_pages:
+        prefetch.prefetch(*_page_job(segment, furnizor, stare_pm, page_size, offset + page_size, sort_by, search,
+                                     codes, process, process_key))
+    prefetch_segments([s for s in SEGMENTS if s != segment], furnizor, stare_pm, process, process_key,
+                      search_codes)
+
+    nav = st.columns([1, 4, 1, 1])
+    with nav[0]:
+        st.button("◀", key=f"grid_prev_{segment}", disabled=page == 0, use_container_width=True,
+                  on_click=_step_page, args=(segment, -1, n_pages))
+    with nav[1]:
+        st.caption(f"Pagina {page + 1} / {n_pages} · rânduri {offset + 1}-{min(offset + page_size, total)} "
+                   f"din {total:,}")
+    with nav[2]:
+        st.button("▶", key=f"grid_next_{segment}", disabled=page + 1 >= n_pages, use_container_width=True,
+                  on_click=_step_page, args=(segment, 1, n_pages))
+    with nav[3]:
+        with st.popover("📥 Tot", use_container_width=True, help=f"Export {total:,} rânduri (toate paginile)"):
+            query, params = segment_export_query(segment, furnizor, stare_pm, sort_by, search, codes)
+            download_buttons(lambda fmt: export_query(query, params, fmt, segment), f"{segment.lower()}_complet",
+                             key=f"grid_export_{segment}")
+
+    # The page (a fragment) shows the cross-page selection count itself, so it updates on each tick
+    render_page(page_df, selection, f"p{page}_{page_size}_{sort_by}")
+    return selection
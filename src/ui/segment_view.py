@@ -0,0 +1,225 @@
+"""
+Segment View - tabelul "Buyer 12" construit coloană cu coloană
+==============================================================
+Transformă direct DataFrame-ul procesat (process_products_vectorized) în
+tabelul afișat de render_interactive_table: coloane formatate, alerte
+(🔴 / ⚠️ / ✅) și coloanele ascunse "_". Fără obiecte Python pe rând: sortarea
+pe familii, dezechilibrul de stoc și formatarea sunt operații pe coloane.
+
+Listele de Product (calea CSV) trec prin products_frame().
+"""
+
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Attributes read from Product objects (CSV path) - the processed frame already has them
+VIEW_FIELDS = [
+    "nr_art", "cod_articol", "nume_produs", "familie", "dimensiune", "clasa", "subclasa", "segment",
+    "cost_achizitie", "pret_vanzare", "stoc_indomex", "stoc_magazin_total", "stoc_in_tranzit", "total_stock",
+    "sales_last_3m", "vanzari_ultimele_4_luni", "vanzari_ultimele_360_zile", "vanzari_2024", "vanzari_2025",
+    "avg_daily_sales", "days_of_coverage", "lead_time_days", "effective_safety_stock_days",
+    "dimension_coefficient", "suggested_order_qty", "seasonality_index", "yoy_growth",
+    "stoc_baneasa", "stoc_pipera", "stoc_militari", "stoc_pantelimon", "stoc_iasi", "stoc_brasov",
+    "stoc_pitesti", "stoc_sibiu", "stoc_oradea", "stoc_constanta",
+    "cubaj_m3", "masa_kg", "image_url", "product_url", "sales_history",
+]
+
+STORE_COLUMNS = {
+    "S.Ban": "stoc_baneasa", "S.Pip": "stoc_pipera", "S.Mil": "stoc_militari", "S.Pan": "stoc_pantelimon",
+    "S.Iasi": "stoc_iasi", "S.Bras": "stoc_brasov", "S.Pit": "stoc_pitesti", "S.Sib": "stoc_sibiu",
+    "S.Ora": "stoc_oradea", "S.Cta": "stoc_constanta",
+}
+
+UNBALANCED_SHARE_GAP = 0.15  # |sales share - stock share| within the family
+ALERT_MARGIN_DAYS = 5        # Marja (coverage - lead time) below this = 🔴
+WARNING_EXTRA_DAYS = 14      # Zile→0 below lead + this = ⚠️
+
+
+def products_frame(products: Iterable) -> pd.DataFrame:
+    """Product / SimpleNamespace objects -> frame with VIEW_FIELDS (missing attributes = None)."""
+    return pd.DataFrame([{f: getattr(p, f, None) for f in VIEW_FIELDS} for p in products], columns=VIEW_FIELDS)
+
+
+def _num(frame: pd.DataFrame, column: str, default: float = 0.0) -> pd.Series:
+    if column not in frame.columns:
+        return pd.Series(default, index=frame.index, dtype=float)
+    return pd.to_numeric(frame[column], errors="coerce").fillna(default)
+
+
+def _int(frame: pd.DataFrame, column: str) -> pd.Series:
+    return _num(frame, column).astype(int)
+
+
+def _round(values: pd.Series, ndigits: int) -> pd.Series:
+    """Python round() per value (as the table always showed it; np.round differs on halves)."""
+    return pd.Series([round(v, ndigits) for v in values.tolist()], index=values.index, dtype=float)
+
+
+def _text(frame: pd.DataFrame, column: str) -> pd.Series:
+    if column not in frame.columns:
+        return pd.Series("", index=frame.index, dtype=object)
+    return frame[column].fillna("").astype(str)
+
+
+def _or_dash(values: pd.Series, dash: str = "-") -> pd.Series:
+    return values.where(values != "", dash)
+
+
+def _fmt(values: pd.Series, spec: str) -> pd.Series:
+    return values.map(("{:" + spec + "}").format)
+
+
+def family_balance(frame: pd.DataFrame):
+    """
+    Family totals and the unbalanced flag per row.
+
+    Returns:
+        (family sales per row, unbalanced bool Series); products without a
+        family get 0 / False
+    """
+    familie = _text(frame, "familie")
+    has_family = familie != ""
+    sales = _num(frame, "vanzari_ultimele_4_luni")
+    stock = _num(frame, "total_stock")
+    fam_sales = sales.groupby(familie).transform("sum").where(has_family, 0.0)
+    fam_stock = stock.groupby(familie).transform("sum").where(has_family, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap = (sales / fam_sales - stock / fam_stock).abs()
+    unbalanced = has_family & (fam_sales > 0) & (fam_stock > 0) & (gap > UNBALANCED_SHARE_GAP)
+    return fam_sales, unbalanced
+
+
+def family_order(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Families together (best-selling family first, then family name, then
+    dimension); products without a family last, by name. Stable like sorted().
+    """
+    familie = _text(frame, "familie")
+    fam_sales, _ = family_balance(frame)
+    has_family = familie != ""
+    keys = pd.DataFrame({
+        "group": np.where(has_family, 0, 1),
+        "sales": np.where(has_family, -fam_sales, 0.0),
+        "family": familie.where(has_family, ""),
+        "within": _text(frame, "dimensiune").replace("", "zzz").where(has_family, _text(frame, "nume_produs")),
+    }, index=frame.index)
+    order = keys.sort_values(["group", "sales", "family", "within"], kind="mergesort").index
+    return frame.loc[order]
+
+
+def build_segment_view(frame: pd.DataFrame, month_table: pd.DataFrame = None,
+                       interval1_sales: Optional[dict] = None, interval2_sales: Optional[dict] = None,
+                       image_resolver: Optional[Callable[[str], Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Display frame for render_interactive_table, one column at a time.
+
+    Args:
+        frame: Processed products (process_products_vectorized or products_frame), in display order
+        month_table: Month comparison columns (month_comparison.comparison_table), aligned by position
+        interval1_sales, interval2_sales: {cod_articol: qty} from the dual calendar
+        image_resolver: product_url -> image URL, for rows without image_url
+
+    Returns:
+        DataFrame with the visible columns (after "Selecteaza") and the hidden "_" columns,
+        RangeIndex in the order of `frame`
+    """
+    frame = frame.reset_index(drop=True)
+    cod = _text(frame, "cod_articol")
+    nr_art = _text(frame, "nr_art")
+    name = _text(frame, "nume_produs")
+    _, unbalanced = family_balance(frame)
+
+    coverage = _num(frame, "days_of_coverage")
+    lead = frame["lead_time_days"] if "lead_time_days" in frame.columns else pd.Series(30, index=frame.index)
+    lead_num = pd.to_numeric(lead, errors="coerce").fillna(0)
+    avg_daily = _num(frame, "avg_daily_sales")
+    suggested = _int(frame, "suggested_order_qty")
+    last_3m = _num(frame, "sales_last_3m")
+    sales_4m = _num(frame, "vanzari_ultimele_4_luni")
+
+    # Images: stored URL, else lazily resolved from the product page
+    image = frame["image_url"] if "image_url" in frame.columns else pd.Series(None, index=frame.index)
+    if image_resolver is not None and "product_url" in frame.columns:
+        image = pd.Series([
+            img if img else (image_resolver(url) if url else None)
+            for img, url in zip(image.tolist(), frame["product_url"].tolist())
+        ], index=frame.index, dtype=object)
+
+    # Zile→0: days until stockout vs lead time
+    cov_int = coverage.astype(int).astype(str)
+    zile_0 = np.select(
+        [avg_daily <= 0, coverage < lead_num, coverage < lead_num + WARNING_EXTRA_DAYS, coverage < 999],
+        ["∞", "🔴 " + cov_int, "⚠️ " + cov_int, "✅ " + cov_int],
+        default="∞",
+    )
+
+    # Lead time alert: Marja = Zile Acoperire - Lead Time, 🔴 when < ALERT_MARGIN_DAYS
+    finite = coverage < 999
+    coverage_r = _round(coverage, 1)
+    marja = coverage_r.where(finite, 999.0) - lead_num
+    alert = (marja < ALERT_MARGIN_DAYS) & finite
+    red = pd.Series(np.where(alert, "🔴 ", ""), index=frame.index)
+
+    adjusted_safety = _round(_num(frame, "effective_safety_stock_days") * _num(frame, "dimension_coefficient", 1.0), 1)
+    formula = [
+        f"Media: {a:.2f}/zi × (Lead:{l} + Safety:{s} + 60) - Stoc:{int(t)} = {q} buc"
+        for a, l, s, t, q in zip(avg_daily.tolist(), lead.tolist(), adjusted_safety.tolist(),
+                                 _num(frame, "total_stock").tolist(), suggested.tolist())
+    ]
+
+    familie = _or_dash(_text(frame, "familie"))
+    yoy = _num(frame, "yoy_growth")
+    cubaj = pd.to_numeric(frame.get("cubaj_m3"), errors="coerce") if "cubaj_m3" in frame.columns else pd.Series(np.nan, index=frame.index)
+    masa = pd.to_numeric(frame.get("masa_kg"), errors="coerce") if "masa_kg" in frame.columns else pd.Series(np.nan, index=frame.index)
+    has_cubaj = cubaj.fillna(0) != 0
+    has_masa = masa.fillna(0) != 0
+
+    columns = {
+        "Selecteaza": False,
+        "Img": image,
+        "Produs": nr_art + " | " + name.where(name.str.len() <= 18, name.str.slice(0, 18) + ".."),
+        "Cost": _round(_num(frame, "cost_achizitie"), 0),
+        "PVanz": _round(_num(frame, "pret_vanzare"), 0),
+        "Stoc Idx": _int(frame, "stoc_indomex"),
+        "Stoc Mag": _int(frame, "stoc_magazin_total"),
+        "V.3L": last_3m.where(last_3m > 0, sales_4m).astype(int),
+        "Zile→0": zile_0,
+        "Status": frame["segment"] if "segment" in frame.columns else "",
+        "NECESAR": suggested,
+        "_marja_raw": marja,
+        "Zile Ac.": red + _fmt(coverage_r, ".1f").where(finite, "999"),
+        "Lead": red + lead.astype(str),
+        "Marja": red + _fmt(marja, ".1f"),
+        "Cod": nr_art,
+        "Denumire": name,
+        "Familie": familie,
+        "Dim": _or_dash(_text(frame, "dimensiune")),
+        "Tranzit": _int(frame, "stoc_in_tranzit"),
+        "V.4L": sales_4m.astype(int),
+        "V.360": _int(frame, "vanzari_ultimele_360_zile"),
+        "V.2024": _int(frame, "vanzari_2024"),
+        "V.2025": _int(frame, "vanzari_2025"),
+        "Med/Zi": _round(avg_daily, 2),
+        "Sezon": _round(_num(frame, "seasonality_index", 1.0), 2),
+        "YoY%": pd.Series([f"{int(v):+d}%" if v != 0 else "-" for v in yoy.tolist()], index=frame.index),
+        "Clasa": _or_dash(_text(frame, "clasa").str.slice(0, 15)),
+        "Subclasa": _or_dash(_text(frame, "subclasa").str.slice(0, 15)),
+        **{label: _int(frame, column) for label, column in STORE_COLUMNS.items()},
+        "Cubaj": _fmt(cubaj.fillna(0), ".3f").where(has_cubaj, "N/A"),
+        "Masa": _fmt(masa.fillna(0), ".1f").where(has_masa, "-"),
+        "V.Int1": cod.map(interval1_sales or {}).fillna(0).astype(int),
+        "V.Int2": cod.map(interval2_sales or {}).fillna(0).astype(int),
+        "_formula": formula,
+        "_unbalanced": unbalanced,
+        "_cubaj_m3": cubaj,  # Raw value for calculation
+        "_masa_kg": masa,
+    }
+    view = pd.DataFrame(columns, index=frame.index)
+
+    # Month comparison columns right after V.3L
+    if month_table is not None and not month_table.empty:
+        split = view.columns.get_loc("V.3L") + 1
+        view = pd.concat([view.iloc[:, :split], month_table.reset_index(drop=True), view.iloc[:, split:]], axis=1)
+    return view
@@ -0,0 +1,57 @@
+"""
+Timing - durata randării pe blocuri
+===================================
+Măsoară cât durează o rulare completă a scriptului ("app") și fiecare fragment
+(tabelul de segment, panoul de comandă). Cu fragmentele, o bifă rerulează doar
+fragmentul: latența interacțiunii = durata fragmentului, nu a întregii pagini.
+
+Ultimele MAX_SAMPLES durate pe bloc stau în st.session_state; render_timings()
+le afișează în sidebar când URL-ul conține ?timings=1.
+scripts/benchmark_fragments.py le citește pentru comparația înainte / după.
+"""
+
+import time
+from contextlib import contextmanager
+from statistics import median
+
+import pandas as pd
+import streamlit as st
+
+MAX_SAMPLES = 50
+
+_STATE_KEY = "_timings"
+
+
+def record(block: str, seconds: float):
+    samples = st.session_state.setdefault(_STATE_KEY, {}).setdefault(block, [])
+    samples.append(seconds)
+    del samples[:-MAX_SAMPLES]
+
+
+@contextmanager
+def timed(block: str):
+    """Înregistrează durata blocului (și când acesta aruncă o excepție)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(block, time.perf_counter() - start)
+
+
+def timing_summary(samples: dict = None) -> pd.DataFrame:
+    """Rulări, ultima și mediana (ms) pe bloc."""
+    samples = st.session_state.get(_STATE_KEY, {}) if samples is None else samples
+    return pd.DataFrame(
+        [{"Bloc": block, "Rulări": len(values), "Ultima (ms)": round(values[-1] * 1000, 1),
+          "Mediana (ms)": round(median(values) * 1000, 1)}
+         for block, values in samples.items() if values],
+        columns=["Bloc", "Rulări", "Ultima (ms)", "Mediana (ms)"],
+    )
+
+
+def render_timings():
+    """Panou de diagnostic în sidebar (doar cu ?timings=1 în URL)."""
+    if st.query_params.get("timings") != "1":
+        return
+    with st.sidebar.expander("⏱️ Timpi randare", expanded=True):
+        st.dataframe(timing_summary(), hide_index=True, width="stretch")
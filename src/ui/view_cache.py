@@ -0,0 +1,81 @@
+"""
+View Cache - vederi calculate memorate în sesiune
+=================================================
+Orice widget (Detalii extinse, căutare, "All", intervalele din calendar)
+rerulează app.py de sus. Cadrele procesate (process_products_vectorized,
+build_segment_view, produsele din CSV) se păstrează în st.session_state sub o
+cheie formată din tot ce le determină: furnizor, stare, segment, filtrul de
+subclase, hash-ul configurației furnizorilor, versiunea datelor și perechea de
+intervale. Schimbările pur de UI doar reselectează coloane / filtrează rânduri.
+
+Cheile noi înlocuiesc cele vechi (MAX_VIEWS pe vedere), deci memoria nu crește
+cu numărul de combinații de filtre încercate. O vedere expiră după VIEW_TTL
+secunde (ca st.cache_data ttl=300 al interogărilor): scrierile în DB care nu
+schimbă versiunea datelor (Recalculează Segmente, importuri rulate separat,
+alte sesiuni) apar fără reîncărcarea sesiunii.
+
+Indexul de căutare (src.core.search_index) e comun tuturor sesiunilor și se
+reconstruiește doar când se schimbă sursa sau versiunea datelor.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Callable, Hashable
+
+import streamlit as st
+
+from src.core.pipeline import data_version as pipeline_data_version
+from src.core.reference_data import reference_version
+from src.core.search_index import SearchIndex, get_index
+
+MAX_VIEWS = 4  # Chei păstrate per vedere (ex. ultimele pagini / segmente deschise)
+VIEW_TTL = 300  # Secunde; aceeași durată ca interogările din src/core/database.py
+
+_STATE_KEY = "_view_cache"
+
+
+def config_hash(config: dict) -> str:
+    """Hash scurt al configurației furnizorilor (lead time, safety, MOQ...)."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def data_version() -> str:
+    """Versiunea datelor: fișierele de referință + ultima rulare a pipeline-ului."""
+    return f"{reference_version()}:{pipeline_data_version()}"
+
+
+def product_index(source: str, load: Callable) -> SearchIndex:
+    """
+    Indexul de căutare al catalogului pentru versiunea curentă a datelor.
+
+    Args:
+        source: Sursa catalogului (ex. "db", "csv:<fișier>")
+        load: Returnează catalogul (cod_articol, denumire, furnizor); apelată doar la reconstruire
+    """
+    return get_index(f"{source}:{data_version()}", load)
+
+
+def cached_view(name: str, key: Hashable, build: Callable[[], Any]) -> Any:
+    """
+    Rezultatul build() pentru (name, key), calculat o dată pe sesiune și pe VIEW_TTL.
+
+    Args:
+        name: Vederea (ex. "segment_CRITICAL", "csv_products")
+        key: Tot ce determină rezultatul (tuplu hashable)
+        build: Funcție fără argumente care calculează vederea
+    """
+    views = st.session_state.setdefault(_STATE_KEY, {}).setdefault(name, {})
+    entry = views.pop(key, None)  # Re-insert: cea mai recent folosită la final
+    if entry is None or time.monotonic() - entry[0] > VIEW_TTL:
+        entry = (time.monotonic(), build())
+        while len(views) >= MAX_VIEWS:
+            views.pop(next(iter(views)))
+    views[key] = entry
+    return entry[1]
+
+
+def clear_views():
+    """Șterge toate vederile memorate (după salvarea configurației / reîncărcarea datelor)."""
+    st.session_state.pop(_STATE_KEY, None)
@@ -0,0 +1,64 @@
+"""
+Exports: JSONB (dict / list) cells and columns whose type only shows up in a
+later chunk, for every format.
+
+Rulează cu: python -m pytest -q tests
+"""
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.core.exports import write_chunks  # noqa: E402
+
+
+def make_chunks():
+    """Two chunks as pd.read_sql yields them from products (sales_history is JSONB)."""
+    first = pd.DataFrame({
+        "cod_articol": ["A1", "A2"],
+        "sales_history": [{"2025-01": 3}, {"2025-01": 1}],
+        "safety_stock_qty": [None, None],        # Null only in the first chunk
+        "stoc": [5, 7],
+    })
+    second = pd.DataFrame({
+        "cod_articol": ["A3", "A4"],
+        "sales_history": [{"2025-01": 2, "2025-02": 4}, [1, 2]],   # New keys / a list
+        "safety_stock_qty": [12.5, 3.0],
+        "stoc": [None, 9],                       # int column with a NULL -> float chunk
+    })
+    return [first, second]
+
+
+def read_back(fmt: str) -> pd.DataFrame:
+    with write_chunks(iter(make_chunks()), fmt) as f:
+        data = f.read()
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(data)).to_pandas()
+    if fmt == "arrow":
+        return ipc.open_file(io.BytesIO(data)).read_all().to_pandas()
+    if fmt == "xlsx":
+        return pd.read_excel(io.BytesIO(data), dtype={"cod_articol": str, "safety_stock_qty": str})
+    return pd.read_csv(io.BytesIO(data), dtype={"safety_stock_qty": str})
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx", "parquet", "arrow"])
+def test_jsonb_and_late_typed_columns(fmt):
+    df = read_back(fmt)
+
+    assert list(df["cod_articol"]) == ["A1", "A2", "A3", "A4"]
+    history = [json.loads(v) for v in df["sales_history"]]
+    assert history == [{"2025-01": 3}, {"2025-01": 1}, {"2025-01": 2, "2025-02": 4}, [1, 2]]
+
+    late = df["safety_stock_qty"]
+    assert late.iloc[:2].isna().all()
+    assert [float(v) for v in late.iloc[2:]] == [12.5, 3.0]
+
+    stoc = df["stoc"]
+    assert [stoc.iloc[0], stoc.iloc[1], stoc.iloc[3]] == [5, 7, 9]
+    assert pd.isna(stoc.iloc[2])